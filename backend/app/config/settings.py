@@ -43,6 +43,7 @@ class Settings(BaseSettings):
     max_file_size_mb: int = 10
     max_avatar_size_mb: int = 2
     max_files_per_upload: int = 5
+    max_document_size_mb: int = 50  # S3 document uploads (multipart above s3_multipart_threshold_mb)
     
     # Image settings
     image_optimization_quality: int = 85
@@ -55,6 +56,23 @@ class Settings(BaseSettings):
     # Storage settings
     static_url_prefix: str = "/static"
     temp_file_cleanup_hours: int = 24
+    storage_backend: str = "auto"  # auto (S3 when configured, else local), local, s3 or memory
+    storage_fanout_levels: int = 2  # Hashed subdirectory levels for local files (0 = flat)
+    storage_delete_workers: int = 8  # Threads unlinking local files in bulk deletes
+    static_max_age_seconds: int = 3600  # Browser cache lifetime of /static files without a content-hashed name
+    static_path_cache_entries: int = 10000  # Resolved /static paths kept per worker
+    static_path_cache_ttl_seconds: float = 300
+    media_gc_folders: str = "avatars,posts,images,documents,general"  # Folders whose files must be referenced
+    media_gc_grace_hours: int = 24  # Unreferenced files younger than this are kept (posts still being written)
+    
+    # S3 client settings
+    s3_max_pool_connections: int = 32  # Covers s3_upload_workers x s3_multipart_concurrency
+    s3_max_attempts: int = 5  # Standard retry mode (exponential backoff with jitter)
+    s3_upload_workers: int = 8  # Threads running blocking boto3 calls
+    s3_multipart_threshold_mb: int = 8
+    s3_multipart_chunk_mb: int = 8
+    s3_multipart_concurrency: int = 4  # Parts uploaded in parallel per file
+    s3_direct_upload_expiry_seconds: int = 900  # Lifetime of a presigned direct-upload slot
     
     # Security settings
     allowed_image_extensions: str = "jpg,jpeg,png,webp,gif"
@@ -65,6 +83,48 @@ class Settings(BaseSettings):
     enable_image_optimization: bool = True
     enable_thumbnail_generation: bool = True
     enable_duplicate_detection: bool = True
+    image_process_workers: int = 2  # Pillow worker processes (0 = run in a thread)
+    image_queue_size: int = 16  # Image jobs allowed to wait for a worker
+    image_queue_timeout_seconds: float = 10  # Wait for a queue slot before answering 503
+    image_webp_renditions: bool = False  # Also store a .webp copy of every image rendition
+    image_resize_ladder: str = "64,128,256,400,640,800,1200"  # Sizes /static/img requests snap up to
+    image_resize_quality: int = 82
+    image_resize_cache_mb: int = 512  # Disk budget of uploads/thumbnails (shared by all workers)
+    image_resize_sweep_seconds: int = 60  # How often each worker may trim uploads/thumbnails to the budget
+    
+    # Notification settings
+    notification_rollup_enabled: bool = False  # Serve admin analytics from notification_daily_stats
+    notification_coalesce_window_hours: int = 24  # Likes/comments on one post fold into one row per window
+    notification_recent_actors_limit: int = 5
+    notification_fanout_follower_threshold: int = 1000  # Above this, new posts are pulled at read time
+    notification_partition_months_ahead: int = 3  # Monthly partitions created ahead (PostgreSQL)
+    notification_retention_batch_size: int = 5000
+    notification_retention_batch_pause_ms: int = 50
+    notification_maintenance_interval_hours: int = 24
+    
+    # Comment cache settings
+    comment_cache_enabled: bool = True
+    comment_cache_max_entries: int = 2000
+    comment_cache_ttl_seconds: int = 30  # Bounds staleness across workers (cache is per process)
+    comment_cache_max_pages: int = 3  # Only the first pages of a post are cached
+    
+    # Autocomplete index settings (the indexes are per process)
+    user_index_sync_seconds: float = 5  # How often each worker re-reads recently updated users
+    user_index_reload_minutes: int = 15  # Full background reload (picks up deleted users)
+    hashtag_index_reload_minutes: int = 10  # Reload of #hashtag counts (other workers' posts)
+    
+    # Follow suggestion settings
+    follow_suggestions_precomputed: bool = False  # Serve from follow_suggestions (filled nightly)
+    follow_suggestions_per_user: int = 50
+    
+    # Follow graph settings
+    follow_graph_enabled: bool = False  # Answer follow checks from the in-process CSR graph
+    follow_graph_sync_seconds: float = 2  # How often each worker polls the change feed
+    follow_graph_rebuild_threshold: int = 50000  # Delta size that triggers a background reload
+    follow_graph_change_retention_hours: int = 24
+    
+    # Admin dashboard settings
+    admin_stats_refresh_minutes: int = 15  # How often the dashboard stats snapshot is recomputed
     
     class Config:
         env_file = ".env"
@@ -96,6 +156,16 @@ class Settings(BaseSettings):
                 self.allowed_document_extensions_list + 
                 self.allowed_video_extensions_list)
     
+    @property
+    def image_resize_ladder_list(self) -> List[int]:
+        """Convert the comma-separated resize ladder to sorted sizes."""
+        return sorted(int(size) for size in self.image_resize_ladder.split(",") if size.strip())
+    
+    @property
+    def media_gc_folders_list(self) -> List[str]:
+        """Convert the comma-separated garbage-collected folders to a list."""
+        return [folder.strip().strip('/') for folder in self.media_gc_folders.split(",") if folder.strip()]
+    
     @property
     def upload_folder_path(self) -> Path:
         """Get upload folder as Path object."""
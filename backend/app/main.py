@@ -5,17 +5,20 @@ Entry point for the backend API server.
 FIXED: Static file serving with proper CORS headers
 """
 
-from fastapi import FastAPI, Depends, APIRouter
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, Depends, APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from pathlib import Path
+from typing import Optional
 
 from .config.database import engine, Base
 from .middleware.cors import add_cors_middleware
-from .routers import auth, users, posts, comments, admin, bookmarks
+from .middleware.upload_limit import add_upload_limit_middleware
+from .routers import auth, users, posts, comments, admin, bookmarks, autocomplete
 from .utils.dependencies import get_current_active_user
+from .utils.static_files import static_file_response
 from .models.user import User
 
 # Try to import S3 upload routes safely
@@ -56,6 +59,9 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Reject oversized uploads before their body is read (added first so CORS headers wrap the 413)
+add_upload_limit_middleware(app)
+
 # Add CORS middleware
 add_cors_middleware(app)
 
@@ -71,8 +77,17 @@ class CORSStaticFiles(StaticFiles):
             return response
         return await super().__call__(scope, receive, send)
 
+STATIC_CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, HEAD, OPTIONS",
+    "Access-Control-Allow-Headers": "*",
+    "Access-Control-Expose-Headers": "Content-Length, Content-Range, Accept-Ranges, ETag",
+}
+
 # Setup file upload system if available
 if UPLOAD_AVAILABLE:
+    from .services.image_resizer import resized_image_cache
+    
     # Create uploads directory if it doesn't exist
     upload_dir = "uploads"
     os.makedirs(upload_dir, exist_ok=True)
@@ -82,61 +97,56 @@ if UPLOAD_AVAILABLE:
     for subdir in upload_subdirs:
         os.makedirs(f"{upload_dir}/{subdir}", exist_ok=True)
     
+    # Resized renditions, rendered on first request (registered before the /static catch-all)
+    @app.api_route("/static/img/{key:path}", methods=["GET", "HEAD"])
+    async def serve_resized_image(
+        key: str,
+        request: Request,
+        w: Optional[int] = Query(None, ge=1, le=4096, description="Maximum width (snapped up to the size ladder)"),
+        h: Optional[int] = Query(None, ge=1, le=4096, description="Maximum height (snapped up to the size ladder)"),
+        fmt: Optional[str] = Query(None, pattern="^(jpg|webp)$", description="Output format (default: keep PNG/GIF, else JPEG)")
+    ):
+        """
+        Serve an uploaded image resized to a ladder size, from the resized image cache
+        """
+        try:
+            relative = await resized_image_cache.get_variant(key, w, h, fmt)
+            response = await static_file_response(request, resized_image_cache.root, relative, headers=STATIC_CORS_HEADERS)
+            if response.status_code == 404:
+                # Evicted by another worker meanwhile; render it again
+                resized_image_cache.forget(relative)
+                relative = await resized_image_cache.get_variant(key, w, h, fmt)
+                response = await static_file_response(request, resized_image_cache.root, relative, headers=STATIC_CORS_HEADERS)
+            return response
+        except HTTPException as e:
+            return JSONResponse(
+                status_code=e.status_code,
+                content={"detail": e.detail},
+                headers={**STATIC_CORS_HEADERS, **(e.headers or {})}
+            )
+        except Exception as e:
+            print(f"Resized image serve error: {str(e)}")
+            return JSONResponse(
+                status_code=500,
+                content={"detail": "Failed to serve image"},
+                headers=STATIC_CORS_HEADERS
+            )
+    
     # FIXED: Custom static file endpoint with proper CORS
-    @app.get("/static/{file_path:path}")
-    async def serve_static_file(file_path: str):
+    @app.api_route("/static/{file_path:path}", methods=["GET", "HEAD"])
+    async def serve_static_file(file_path: str, request: Request):
         """
         Serve static files with proper CORS headers
+        ETag/Last-Modified validators, 304s, byte ranges and immutable caching of content-hashed files
         """
         try:
-            full_path = Path(upload_dir) / file_path
-            
-            if not full_path.exists() or not full_path.is_file():
-                return JSONResponse(
-                    status_code=404,
-                    content={"detail": "File not found"},
-                    headers={
-                        "Access-Control-Allow-Origin": "*",
-                        "Access-Control-Allow-Methods": "GET, OPTIONS",
-                        "Access-Control-Allow-Headers": "*",
-                    }
-                )
-            
-            # Security check - ensure file is within upload directory
-            try:
-                full_path.resolve().relative_to(Path(upload_dir).resolve())
-            except ValueError:
-                return JSONResponse(
-                    status_code=403,
-                    content={"detail": "Access denied"},
-                    headers={
-                        "Access-Control-Allow-Origin": "*",
-                        "Access-Control-Allow-Methods": "GET, OPTIONS",
-                        "Access-Control-Allow-Headers": "*",
-                    }
-                )
-            
-            return FileResponse(
-                path=str(full_path),
-                filename=full_path.name,
-                headers={
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "GET, OPTIONS",
-                    "Access-Control-Allow-Headers": "*",
-                    "Cache-Control": "public, max-age=3600",
-                }
-            )
-            
+            return await static_file_response(request, Path(upload_dir), file_path, headers=STATIC_CORS_HEADERS)
         except Exception as e:
             print(f"Static file serve error: {str(e)}")
             return JSONResponse(
                 status_code=500,
                 content={"detail": "Failed to serve file"},
-                headers={
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "GET, OPTIONS",
-                    "Access-Control-Allow-Headers": "*",
-                }
+                headers=STATIC_CORS_HEADERS
             )
     
     print("✅ Static file serving enabled at /static with CORS")
@@ -148,6 +158,7 @@ app.include_router(posts.router, prefix="/api/v1")
 app.include_router(comments.router, prefix="/api/v1")
 app.include_router(bookmarks.router, prefix="/api/v1")
 app.include_router(admin.router, prefix="/api/v1")
+app.include_router(autocomplete.router, prefix="/api/v1")
 
 # FIXED: Include S3 upload routes with consistent prefix
 if S3_UPLOAD_AVAILABLE:
@@ -366,6 +377,95 @@ async def create_admin_user():
         print(f"Admin creation error: {e}")
 
 
+@app.on_event("startup")
+async def start_notification_maintenance():
+    """Run notification maintenance (partitions ahead, daily rollup) periodically"""
+    if not NOTIFICATIONS_AVAILABLE:
+        return
+    
+    import asyncio
+    from .config.database import SessionLocal
+    from .config.settings import settings
+    from .services.notification_service import NotificationService
+    
+    def run_maintenance():
+        db = SessionLocal()
+        try:
+            NotificationService.ensure_notification_partitions(db)
+            if settings.notification_rollup_enabled:
+                NotificationService.refresh_daily_rollup(db)
+        finally:
+            db.close()
+    
+    async def maintenance_loop():
+        while True:
+            try:
+                await asyncio.to_thread(run_maintenance)
+            except Exception as e:
+                print(f"⚠️ Notification maintenance failed: {e}")
+            await asyncio.sleep(max(settings.notification_maintenance_interval_hours, 1) * 3600)
+    
+    app.state.notification_maintenance_task = asyncio.create_task(maintenance_loop())
+
+
+@app.on_event("startup")
+async def start_admin_stats_refresh():
+    """Keep the admin dashboard stats snapshot fresh"""
+    import asyncio
+    from .config.database import SessionLocal
+    from .config.settings import settings
+    from .services.admin_stats_service import refresh_admin_stats_if_stale
+    
+    def run_refresh():
+        db = SessionLocal()
+        try:
+            refresh_admin_stats_if_stale(db)
+        finally:
+            db.close()
+    
+    async def refresh_loop():
+        while True:
+            try:
+                await asyncio.to_thread(run_refresh)
+            except Exception as e:
+                print(f"⚠️ Admin stats refresh failed: {e}")
+            await asyncio.sleep(max(settings.admin_stats_refresh_minutes, 1) * 60)
+    
+    app.state.admin_stats_refresh_task = asyncio.create_task(refresh_loop())
+
+
+@app.on_event("startup")
+async def load_autocomplete_indexes():
+    """Load the user prefix index, #hashtag completion index and follow graph without blocking startup"""
+    import asyncio
+    from .config.database import SessionLocal
+    from .config.settings import settings
+    from .services.autocomplete_service import load_hashtag_index
+    from .services.search_service import user_prefix_index
+    from .services.follow_graph import follow_graph
+    
+    def load_indexes():
+        db = SessionLocal()
+        try:
+            user_prefix_index.load(db)
+            load_hashtag_index(db)
+            if settings.follow_graph_enabled:
+                follow_graph.load(db)
+        except Exception as e:
+            print(f"⚠️ In-memory index load failed: {e}")
+        finally:
+            db.close()
+    
+    app.state.autocomplete_load_task = asyncio.create_task(asyncio.to_thread(load_indexes))
+
+
+@app.on_event("shutdown")
+async def stop_image_executor():
+    """Stop image worker processes"""
+    from .services.image_executor import image_executor
+    image_executor.shutdown()
+
+
 @app.on_event("startup")
 async def check_s3_system():
     """Check S3 system on startup"""
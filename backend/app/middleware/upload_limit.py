@@ -0,0 +1,97 @@
+"""
+Upload size limit middleware for IAP Connect application.
+Rejects oversized upload requests before their body is parsed.
+"""
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+
+from ..config.settings import settings
+
+
+# Allowance for multipart boundaries and part headers, per file
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Upload routes by request path suffix
+_AVATAR_ROUTES = ("/upload/avatar", "/upload-s3/avatar")
+_MULTI_FILE_ROUTES = ("/upload/post-media", "/upload-s3/images", "/upload-s3/post-images")
+_UPLOAD_PREFIXES = ("/api/v1/upload/", "/api/v1/upload-s3/")
+
+
+def upload_request_limit(path: str) -> int:
+    """
+    Largest request body accepted for a path, or 0 when the path is not an upload route.
+
+    Args:
+        path: Request path
+
+    Returns:
+        int: Limit in bytes (0 = not limited here)
+    """
+    mb = 1024 * 1024
+    if path.endswith(_AVATAR_ROUTES):
+        return settings.max_avatar_size_mb * mb + MULTIPART_OVERHEAD
+    if path.endswith(_MULTI_FILE_ROUTES):
+        return settings.max_files_per_upload * (settings.max_file_size_mb * mb + MULTIPART_OVERHEAD)
+    if path.endswith("/upload-s3/document"):
+        return settings.max_document_size_mb * mb + MULTIPART_OVERHEAD
+    if path.endswith("/users/upload-avatar"):
+        return 5 * mb + MULTIPART_OVERHEAD
+    if path.startswith(_UPLOAD_PREFIXES):
+        return settings.max_file_size_mb * mb + MULTIPART_OVERHEAD
+    return 0
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware enforcing upload_request_limit.
+
+    Requests whose Content-Length is over the limit get a 413 without their
+    body being read. Chunked requests are counted as they stream in and
+    fail with 413 as soon as they pass the limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT"):
+            return await self.app(scope, receive, send)
+
+        limit = upload_request_limit(scope["path"])
+        if not limit:
+            return await self.app(scope, receive, send)
+
+        detail = f"Upload too large. Maximum request size is {limit // (1024 * 1024)}MB"
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content={"detail": detail},
+                headers={"Connection": "close"}
+            )
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised while the form is parsed; FastAPI turns it into the 413 response
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def add_upload_limit_middleware(app):
+    """
+    Add upload size limits to FastAPI application.
+
+    Args:
+        app: FastAPI application instance
+    """
+    app.add_middleware(UploadSizeLimitMiddleware)
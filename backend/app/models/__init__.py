@@ -11,7 +11,9 @@ from .like import Like
 from .comment_like import CommentLike
 from .share import Share
 from .bookmark import Bookmark  # NEW: Import Bookmark model
-from .follow import Follow
+from .follow import Follow, FollowSuggestion, FollowChange
+from .admin_stats import AdminStatsSnapshot
+from .media import MediaObject, MediaFile
 
 __all__ = [
     "Base",
@@ -23,5 +25,10 @@ __all__ = [
     "CommentLike",
     "Share",
     "Bookmark",  # NEW: Add to exports
-    "Follow"
+    "Follow",
+    "FollowSuggestion",
+    "FollowChange",
+    "AdminStatsSnapshot",
+    "MediaObject",
+    "MediaFile"
 ]
\ No newline at end of file
@@ -0,0 +1,32 @@
+"""
+Admin statistics snapshot model for IAP Connect application.
+Holds the periodically refreshed admin dashboard figures.
+"""
+
+from sqlalchemy import Column, Integer, DateTime, JSON
+
+from ..config.database import Base
+
+
+class AdminStatsSnapshot(Base):
+    """
+    Admin dashboard snapshot (a single row, id 1).
+
+    Attributes:
+        id: Primary key (always 1)
+        stats: Dashboard payload (user/content stats, engagement, top posts/users)
+        estimated_tables: Tables whose counts came from planner estimates
+        computed_at: When the snapshot was computed (UTC)
+        compute_ms: Time the refresh took
+    """
+
+    __tablename__ = "admin_stats_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    stats = Column(JSON, nullable=False)
+    estimated_tables = Column(JSON)
+    computed_at = Column(DateTime, nullable=False)
+    compute_ms = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<AdminStatsSnapshot(computed_at={self.computed_at})>"
@@ -10,6 +10,10 @@ from sqlalchemy.orm import relationship
 from ..config.database import Base
 
 
+# Width of one zero-padded comment ID inside a materialized path
+PATH_SEGMENT_WIDTH = 10
+
+
 class Comment(Base):
     """
     Comment model for post interactions with nested replies support.
@@ -22,6 +26,8 @@ class Comment(Base):
         content: Comment text content
         likes_count: Number of likes on this comment
         replies_count: Number of replies to this comment
+        path: Materialized path of zero-padded ancestor IDs ending with this comment's ID
+        depth: Nesting level (0 for top-level comments)
         created_at: Comment creation timestamp
     """
     
@@ -34,6 +40,11 @@ class Comment(Base):
     parent_id = Column(Integer, ForeignKey("comments.id", ondelete="CASCADE"), nullable=True)  # For nested replies
     content = Column(Text, nullable=False)
     
+    # Materialized path: sorting by path gives depth-first display order and a
+    # subtree is the contiguous range [path, next_sibling_path)
+    path = Column(Text, nullable=True, index=True)
+    depth = Column(Integer, default=0, nullable=False)
+    
     # Engagement counters
     likes_count = Column(Integer, default=0)
     replies_count = Column(Integer, default=0)
@@ -50,4 +61,14 @@ class Comment(Base):
     replies = relationship("Comment", back_populates="parent_comment", cascade="all, delete-orphan")
     
     # Comment likes relationship
-    comment_likes = relationship("CommentLike", back_populates="comment", cascade="all, delete-orphan")
\ No newline at end of file
+    comment_likes = relationship("CommentLike", back_populates="comment", cascade="all, delete-orphan")
+    
+    @staticmethod
+    def path_segment(comment_id: int) -> str:
+        """Zero-padded path segment for a comment ID."""
+        return str(comment_id).zfill(PATH_SEGMENT_WIDTH)
+    
+    @property
+    def subtree_upper_bound(self) -> str:
+        """Exclusive upper bound of this comment's subtree in path order."""
+        return self.path[:-PATH_SEGMENT_WIDTH] + self.path_segment(self.id + 1)
@@ -3,7 +3,7 @@ Follow model for IAP Connect application.
 Handles user following relationships.
 """
 
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, Float, Boolean, DateTime, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -38,4 +38,53 @@ class Follow(Base):
     # Constraints
     __table_args__ = (
         UniqueConstraint('follower_id', 'following_id', name='unique_follower_following'),
-    )
\ No newline at end of file
+    )
+
+
+class FollowSuggestion(Base):
+    """
+    Precomputed follow suggestion (filled by the nightly suggestion job).
+    
+    Attributes:
+        user_id: User the suggestion is for
+        suggested_user_id: Suggested user to follow
+        rank: Position in the user's suggestion list (0 = best)
+        score: Combined ranking score
+        mutual_count: Number of people the user follows who follow the suggestion
+        computed_at: When the batch job computed this row
+    """
+    
+    __tablename__ = "follow_suggestions"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    suggested_user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    rank = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+    mutual_count = Column(Integer, default=0, nullable=False)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Serving is one range read in rank order
+    __table_args__ = (
+        Index("ix_follow_suggestions_user_rank", "user_id", "rank"),
+    )
+
+
+class FollowChange(Base):
+    """
+    Follow change feed used to keep in-process follow graphs of all workers in sync.
+    
+    Attributes:
+        id: Feed position
+        follower_id: User who followed/unfollowed
+        following_id: User who was followed/unfollowed
+        followed: True for follow, False for unfollow
+        created_at: When the change was committed (rows are pruned after a day)
+    """
+    
+    __tablename__ = "follow_graph_changes"
+    
+    id = Column(Integer, primary_key=True)
+    follower_id = Column(Integer, nullable=False)
+    following_id = Column(Integer, nullable=False)
+    followed = Column(Boolean, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -0,0 +1,116 @@
+"""
+Media models for IAP Connect application.
+Content-addressed store of uploaded media, shared between identical uploads,
+and an index of every stored file for stats and file info.
+"""
+
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, JSON, ForeignKey, UniqueConstraint, Index
+from sqlalchemy.sql import func
+
+from ..config.database import Base
+
+
+class MediaObject(Base):
+    """
+    One stored upload, keyed by the SHA-256 of the original bytes.
+
+    Re-uploads of the same bytes to the same folder and storage reuse the
+    stored files and renditions and bump ref_count. Deletes decrement it,
+    and the files are removed when it reaches zero.
+
+    Attributes:
+        id: Primary key
+        content_hash: SHA-256 hex digest of the original upload
+        storage: Where the files live ('local' or 's3')
+        folder: Upload folder (renditions depend on it)
+        key: Stored main file (path under uploads/ or S3 key)
+        url: Public URL of the main file
+        thumbnail_url: Public URL of the thumbnail, if one was made
+        renditions: Rendition URLs ({rendition: {format: url}})
+        content_type: MIME type of the upload
+        size: Stored size of the main file in bytes
+        original_size: Size of the original upload in bytes
+        ref_count: Uploads currently referencing these files
+        created_at: First upload timestamp
+        updated_at: Last reference change
+    """
+
+    __tablename__ = "media_objects"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), nullable=False)
+    storage = Column(String(10), nullable=False, default="local")
+    folder = Column(String(100), nullable=False)
+    key = Column(String(500), nullable=False)
+    url = Column(String(1000), nullable=False)
+    thumbnail_url = Column(String(1000))
+    renditions = Column(JSON)
+    content_type = Column(String(100))
+    size = Column(BigInteger, nullable=False, default=0)
+    original_size = Column(BigInteger, nullable=False, default=0)
+    ref_count = Column(Integer, nullable=False, default=1)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('storage', 'folder', 'content_hash', name='unique_media_object_content'),
+        Index('idx_media_objects_storage_key', 'storage', 'key', unique=True),
+        Index('idx_media_objects_updated', 'storage', 'updated_at'),
+    )
+
+    def __repr__(self):
+        return f"<MediaObject(key='{self.key}', ref_count={self.ref_count})>"
+
+
+class MediaFile(Base):
+    """
+    One stored file (an upload or one of its renditions).
+
+    Written by the upload pipeline and removed on delete, so storage stats
+    are aggregate queries and file info is a primary-key lookup instead of
+    a walk of the upload directory or a request to S3. Files stored before
+    the index existed are added by backfill_media_index.py.
+
+    Attributes:
+        storage: Where the file lives ('local', 's3', 'memory')
+        key: Storage key, e.g. 'posts/<name>.jpg'
+        url: Public URL
+        folder: Upload folder
+        extension: File extension (without dot)
+        content_type: MIME type
+        file_type: 'image', 'document', 'video' or 'other'
+        rendition: Image rendition ('main', 'thumbnail'); None for other files
+        size: Size in bytes
+        width: Image width in pixels
+        height: Image height in pixels
+        owner_id: Uploading user
+        file_hash: SHA-256 hex digest of the stored bytes
+        created_at: When the file was stored
+    """
+
+    __tablename__ = "media_files"
+
+    storage = Column(String(10), primary_key=True)
+    key = Column(String(500), primary_key=True)
+    url = Column(String(1000), nullable=False)
+    folder = Column(String(100), nullable=False, default="")
+    extension = Column(String(10), nullable=False, default="")
+    content_type = Column(String(100))
+    file_type = Column(String(20), nullable=False, default="other")
+    rendition = Column(String(20))
+    size = Column(BigInteger, nullable=False, default=0)
+    width = Column(Integer)
+    height = Column(Integer)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    file_hash = Column(String(64))
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index('idx_media_files_created', 'created_at'),
+        Index('idx_media_files_owner', 'owner_id'),
+    )
+
+    def __repr__(self):
+        return f"<MediaFile(storage='{self.storage}', key='{self.key}', size={self.size})>"
@@ -5,7 +5,7 @@ Handles user notifications for social interactions.
 COMPLETE: All features integrated with existing structure (500+ lines)
 """
 
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Enum, and_
+from sqlalchemy import Column, Integer, String, Text, Boolean, Date, DateTime, ForeignKey, Enum, Index, and_
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship, Session, joinedload
 import enum
@@ -38,8 +38,12 @@ class Notification(Base):
         title: Notification title
         message: Notification message
         data: Additional JSON data (post_id, comment_id, etc.)
+        group_key: Aggregation key (type, target entity, window) for coalesced notifications
+        actor_count: Number of distinct users folded into a coalesced notification
+        recent_actor_ids: JSON list of the most recent actor IDs (capped)
         is_read: Whether notification has been read
-        created_at: Notification creation timestamp
+        created_at: Notification creation timestamp (the partition key; never changed)
+        updated_at: Last activity timestamp (bumped when an action is coalesced in)
     """
     
     __tablename__ = "notifications"
@@ -55,16 +59,34 @@ class Notification(Base):
     message = Column(Text, nullable=False)
     data = Column(Text, nullable=True)  # JSON string for additional data
     
+    # Coalescing (e.g. "Dr. A and 41 others liked your post")
+    group_key = Column(String(120), nullable=True)
+    actor_count = Column(Integer, default=1, nullable=False)
+    recent_actor_ids = Column(Text, nullable=True)  # JSON list of user IDs, newest first
+    
     # Status
     is_read = Column(Boolean, default=False, index=True)
     
-    # Timestamp
+    # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
     # Relationships
     recipient = relationship("User", foreign_keys=[recipient_id], back_populates="received_notifications")
     sender = relationship("User", foreign_keys=[sender_id])
     
+    # One row per (recipient, aggregation key) - stops duplicates on retry
+    __table_args__ = (
+        Index(
+            "uq_notifications_recipient_group_key",
+            "recipient_id", "group_key",
+            unique=True,
+            postgresql_where=group_key.isnot(None),
+            sqlite_where=group_key.isnot(None)
+        ),
+        Index("ix_notifications_recipient_updated", "recipient_id", "updated_at"),
+    )
+    
     def __repr__(self):
         return f"<Notification(id={self.id}, type='{self.type}', recipient_id={self.recipient_id})>"
     
@@ -85,8 +107,11 @@ class Notification(Base):
             "data": data_dict,
             "is_read": self.is_read,
             "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
             "recipient_id": self.recipient_id,
             "sender_id": self.sender_id,
+            "actor_count": self.actor_count or 1,
+            "recent_actor_ids": self.recent_actor_id_list,
             "sender": {
                 "id": self.sender.id,
                 "username": self.sender.username,
@@ -98,23 +123,36 @@ class Notification(Base):
             } if self.sender else None
         }
     
+    @property
+    def recent_actor_id_list(self) -> List[int]:
+        """Get recent actor IDs of a coalesced notification as a list"""
+        if not self.recent_actor_ids:
+            return [self.sender_id] if self.sender_id else []
+        try:
+            return json.loads(self.recent_actor_ids)
+        except json.JSONDecodeError:
+            return []
+    
     @property
     def display_message(self):
-        """Get formatted display message with sender name"""
-        if self.sender:
+        """Get formatted display message with sender name ("Dr. A and 41 others liked your post")"""
+        if not self.sender:
+            return self.message
+        others = (self.actor_count or 1) - 1
+        if others <= 0:
             return f"{self.sender.full_name} {self.message}"
-        return self.message
+        return f"{self.sender.full_name} and {others} {'other' if others == 1 else 'others'} {self.message}"
     
     @property
     def time_since_created(self):
-        """Get human-readable time since notification was created"""
-        if not self.created_at:
+        """Get human-readable time since the notification's latest activity"""
+        if not (self.updated_at or self.created_at):
             return "Unknown"
         
         try:
             # Handle timezone-aware vs timezone-naive datetime
             now = datetime.utcnow()
-            created_time = self.created_at
+            created_time = self.updated_at or self.created_at
             
             # If created_at is timezone-aware, make now timezone-aware too
             if hasattr(created_time, 'tzinfo') and created_time.tzinfo is not None:
@@ -144,6 +182,110 @@ class Notification(Base):
             return "Unknown"
 
 
+class NotificationDailyStat(Base):
+    """
+    Daily notification rollup used by admin analytics.
+    
+    One row per (day, type) with the number of notifications sent that day and
+    how many of them were read when the rollup was last refreshed.
+    
+    Attributes:
+        day: Calendar day (UTC) the notifications were created on
+        type: Notification type
+        sent_count: Notifications created that day
+        read_count: Notifications from that day marked as read
+        updated_at: Last refresh timestamp
+    """
+    
+    __tablename__ = "notification_daily_stats"
+    
+    day = Column(Date, primary_key=True)
+    type = Column(Enum(NotificationType), primary_key=True)
+    sent_count = Column(Integer, default=0, nullable=False)
+    read_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<NotificationDailyStat(day={self.day}, type='{self.type}', sent={self.sent_count})>"
+
+
+class AuthorActivity(Base):
+    """
+    Author activity stream for pull-based new-post notifications.
+    
+    Posts by authors above the fan-out threshold are recorded here once instead
+    of writing one notification row per follower; followers' notification lists
+    merge these entries at read time.
+    
+    Attributes:
+        id: Primary key (monotonic, used as the read high-water mark)
+        author_id: User who created the post
+        post_id: Post that was created
+        created_at: Activity timestamp
+    """
+    
+    __tablename__ = "author_activities"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    author_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    
+    author = relationship("User", foreign_keys=[author_id])
+    
+    def __repr__(self):
+        return f"<AuthorActivity(id={self.id}, author_id={self.author_id}, post_id={self.post_id})>"
+
+
+class NotificationGroupActor(Base):
+    """
+    Distinct actors folded into a coalesced notification.
+    
+    One row per (recipient, aggregation key, actor), so actor_count counts each
+    user once no matter how often they repeat the action (like, unlike, like) or
+    whether they are still on the capped recent-actors list. Rows are useless
+    once their window has passed and are purged by notification retention.
+    
+    Attributes:
+        recipient_id: User receiving the coalesced notification
+        group_key: Aggregation key of the notification
+        actor_id: User folded into the notification
+        created_at: When the actor was first folded in
+    """
+    
+    __tablename__ = "notification_group_actors"
+    
+    recipient_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    group_key = Column(String(120), primary_key=True)
+    actor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<NotificationGroupActor(recipient_id={self.recipient_id}, group_key='{self.group_key}', actor_id={self.actor_id})>"
+
+
+class NotificationReadMark(Base):
+    """
+    Per-user read high-water mark for pulled author activities.
+    
+    Activities with an id greater than last_read_activity_id are unread.
+    
+    Attributes:
+        user_id: User the mark belongs to
+        last_read_activity_id: Highest author activity ID marked as read
+        updated_at: Last update timestamp
+    """
+    
+    __tablename__ = "notification_read_marks"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    last_read_activity_id = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<NotificationReadMark(user_id={self.user_id}, last_read={self.last_read_activity_id})>"
+
+
 class NotificationService:
     """Service class for notification operations with complete functionality"""
     
@@ -275,9 +417,9 @@ class NotificationService:
                 )
             ).count()
             
-            # Get paginated results ordered by creation date (newest first)
+            # Get paginated results ordered by latest activity (newest first)
             notifications = (query
-                            .order_by(Notification.created_at.desc())
+                            .order_by(Notification.updated_at.desc())
                             .offset((page - 1) * size)
                             .limit(size)
                             .all())
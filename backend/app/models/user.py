@@ -68,7 +68,7 @@ class User(Base):
     # Account status and timestamps
     is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)  # Read by the prefix index sync
 
     # Relationships
     posts = relationship("Post", back_populates="author", cascade="all, delete-orphan")
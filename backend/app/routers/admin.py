@@ -7,16 +7,19 @@ FIXED: Using proper UserType enum values instead of strings
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy import desc
 from typing import List
 from ..config.database import get_db
 from ..schemas.user import UserSearchResponse
-from ..models.user import User, UserType  # IMPORTANT: Import UserType enum
-from ..models.post import Post
-from ..models.comment import Comment
-from ..models.like import Like
-from ..models.follow import Follow
+from ..models.user import User
 from ..services.post_service import get_post_by_id
+from ..services.comment_service import comment_page_cache
+from ..services.search_service import user_prefix_index
+from ..services.autocomplete_service import hashtag_index, record_post_hashtags
+from ..services.follow_graph import follow_graph, record_user_removal
+from ..services.image_executor import image_executor
+from ..services.image_resizer import resized_image_cache
+from ..services.admin_stats_service import get_admin_stats, refresh_admin_stats
 from ..utils.dependencies import get_admin_user
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
@@ -95,8 +98,10 @@ def delete_user(
             detail="Cannot delete your own admin account"
         )
     
+    record_user_removal(db, user_to_delete.id)
     db.delete(user_to_delete)
     db.commit()
+    user_prefix_index.remove_user(user_id)
     
     return {"message": f"User {user_to_delete.username} deleted successfully"}
 
@@ -121,8 +126,10 @@ def delete_post_admin(
             detail="Post not found"
         )
     
+    hashtags = post.hashtags
     db.delete(post)
     db.commit()
+    record_post_hashtags(hashtags, -1)
     
     return {"message": f"Post {post_id} deleted successfully"}
 
@@ -139,74 +146,40 @@ def get_admin_dashboard(
     - Total users by type
     - Total posts and engagement metrics
     - Recent activity summary
+    
+    Served from the periodically refreshed stats snapshot; `snapshot.age_seconds`
+    tells how old the figures are. Counts listed in `snapshot.estimated_tables`
+    are planner estimates.
+    """
+    return get_admin_stats(db)
+
+
+@router.post("/dashboard/refresh")
+def refresh_admin_dashboard(
+    admin_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Recompute the dashboard statistics snapshot now.
+    """
+    refresh_admin_stats(db)
+    return get_admin_stats(db)
+
+
+@router.get("/cache/stats")
+def get_cache_stats(admin_user: User = Depends(get_admin_user)):
     """
-    # User statistics - FIXED: Using enum values properly
-    total_users = db.query(User).count()
-    total_doctors = db.query(User).filter(User.user_type == UserType.DOCTOR).count()  # FIXED: Use enum
-    total_students = db.query(User).filter(User.user_type == UserType.STUDENT).count()  # FIXED: Use enum
-    total_admins = db.query(User).filter(User.user_type == UserType.ADMIN).count()  # FIXED: Use enum
-    active_users = db.query(User).filter(User.is_active == True).count()
-    
-    # Content statistics
-    total_posts = db.query(Post).count()
-    total_comments = db.query(Comment).count()
-    total_likes = db.query(Like).count()
-    total_follows = db.query(Follow).count()
-    
-    # Engagement metrics - Handle division by zero
-    avg_likes_per_post = 0
-    avg_comments_per_post = 0
-    
-    if total_posts > 0:
-        likes_result = db.query(func.avg(Post.likes_count)).scalar()
-        comments_result = db.query(func.avg(Post.comments_count)).scalar()
-        
-        avg_likes_per_post = float(likes_result) if likes_result else 0
-        avg_comments_per_post = float(comments_result) if comments_result else 0
-    
-    # Top engaging posts (last 30 days) - Simple version
-    top_posts = db.query(Post).order_by(
-        desc(Post.likes_count + Post.comments_count)
-    ).limit(5).all()
-    
-    # Most followed users - Simplified
-    most_followed = db.query(User).order_by(desc(User.followers_count)).limit(5).all()
+    Get in-process cache statistics for this worker.
     
+    Returns hit rate, entry count and approximate memory use of the comment page cache,
+    and the size of the autocomplete indexes and the follow graph, plus image executor
+    queue depth and job timings and the resized image cache's hit rate and render timings.
+    """
     return {
-        "user_stats": {
-            "total_users": total_users,
-            "total_doctors": total_doctors,
-            "total_students": total_students,
-            "total_admins": total_admins,
-            "active_users": active_users
-        },
-        "content_stats": {
-            "total_posts": total_posts,
-            "total_comments": total_comments,
-            "total_likes": total_likes,
-            "total_follows": total_follows
-        },
-        "engagement_metrics": {
-            "avg_likes_per_post": round(avg_likes_per_post, 2),
-            "avg_comments_per_post": round(avg_comments_per_post, 2)
-        },
-        "top_posts": [
-            {
-                "id": post.id,
-                "content": post.content[:100] + "..." if len(post.content) > 100 else post.content,
-                "likes_count": post.likes_count or 0,
-                "comments_count": post.comments_count or 0,
-                "author": post.author.username if post.author else "Unknown"
-            }
-            for post in top_posts
-        ],
-        "most_followed_users": [
-            {
-                "id": user.id,
-                "username": user.username,
-                "full_name": user.full_name,
-                "followers_count": user.followers_count or 0
-            }
-            for user in most_followed
-        ]
-    }
\ No newline at end of file
+        "comment_pages": comment_page_cache.stats(),
+        "user_prefix_index": user_prefix_index.stats(),
+        "hashtag_index": hashtag_index.stats(),
+        "follow_graph": follow_graph.stats(),
+        "image_executor": image_executor.stats(),
+        "resized_images": resized_image_cache.stats()
+    }
@@ -0,0 +1,65 @@
+"""
+Autocomplete routes for IAP Connect application.
+Serves @mention and #hashtag suggestions for the post composer from
+in-memory indexes (no database work per keystroke). Mentions share the
+user prefix index with /users/autocomplete.
+"""
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List
+
+from ..schemas.autocomplete import MentionSuggestion, HashtagSuggestion
+from ..config.database import get_db
+from ..services.autocomplete_service import hashtag_index, normalize_hashtag, refresh_hashtag_index
+from ..services.search_service import user_prefix_index
+from ..utils.dependencies import get_current_active_user
+from ..models.user import User
+
+router = APIRouter(prefix="/autocomplete", tags=["Autocomplete"])
+
+
+@router.get("/mentions", response_model=List[MentionSuggestion])
+def suggest_mentions(
+    q: str = Query(..., min_length=1, max_length=50, description="Text typed after '@'"),
+    limit: int = Query(8, ge=1, le=20),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Suggest usernames for an @mention.
+    
+    - **q**: Prefix typed after '@' (a leading '@' is ignored)
+    - **limit**: Number of suggestions (default: 8, max: 20)
+    
+    Returns active users whose username or a full-name word starts with the prefix,
+    most followed first.
+    """
+    user_prefix_index.ensure_loaded(db)
+    completions = user_prefix_index.complete(q.lstrip("@"), limit, exclude_user_id=current_user.id)
+    return [
+        MentionSuggestion(id=user["id"], username=user["username"], followers_count=user["followers_count"])
+        for user in completions
+    ]
+
+
+@router.get("/hashtags", response_model=List[HashtagSuggestion])
+def suggest_hashtags(
+    q: str = Query(..., min_length=1, max_length=50, description="Text typed after '#'"),
+    limit: int = Query(8, ge=1, le=20),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Suggest hashtags.
+    
+    - **q**: Prefix typed after '#' (a leading '#' is ignored)
+    - **limit**: Number of suggestions (default: 8, max: 20)
+    
+    Returns hashtags starting with the prefix, most used first.
+    """
+    refresh_hashtag_index()
+    completions = hashtag_index.complete(normalize_hashtag(q), limit)
+    return [
+        HashtagSuggestion(hashtag=completion["term"], posts_count=completion["weight"])
+        for completion in completions
+    ]
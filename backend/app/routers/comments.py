@@ -4,15 +4,15 @@ Handles comment creation, replies, likes and management.
 UPDATED: Added notification integration for comments
 """
 
-import json
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from ..config.database import get_db
-from ..schemas.comment import CommentCreate, CommentResponse, CommentListResponse, CommentLikeResponse
+from ..schemas.comment import CommentCreate, CommentResponse, CommentListResponse, CommentLikeResponse, CommentThreadResponse
 from ..schemas.user import UserSearchResponse
 from ..services.comment_service import (
     create_comment, get_post_comments, delete_comment, get_comment_by_id,
-    like_comment, unlike_comment, get_comment_replies
+    like_comment, unlike_comment, get_comment_replies, get_comment_thread
 )
 from ..services.post_service import get_post_by_id
 from ..utils.dependencies import get_current_active_user
@@ -21,7 +21,7 @@ from ..models.user import User
 # NEW: Import notification system for comments
 NOTIFICATIONS_ENABLED = True
 try:
-    from ..models.notification import Notification, NotificationType
+    from ..services.notification_service import NotificationService
     print("✅ Notification service loaded for comments")
 except ImportError:
     NOTIFICATIONS_ENABLED = False
@@ -103,22 +103,8 @@ def create_new_comment(
     # NEW: Create comment notification
     if NOTIFICATIONS_ENABLED and post.user_id != current_user.id:
         try:
-            notification = Notification(
-                recipient_id=post.user_id,
-                sender_id=current_user.id,
-                type=NotificationType.COMMENT,
-                title="New Comment",
-                message=f"{current_user.full_name} commented on your post",
-                data=json.dumps({
-                    "post_id": post.id,
-                    "comment_id": new_comment.id,
-                    "action": "comment",
-                    "user_id": current_user.id
-                })
-            )
-            db.add(notification)
-            db.commit()
-            db.refresh(notification)
+            # Comments on the same post fold into one coalesced notification
+            NotificationService.create_comment_notification(db, post, current_user, new_comment)
             print(f"✅ Created comment notification for post {post_id}")
         except Exception as e:
             print(f"⚠️ Failed to create comment notification: {e}")
@@ -153,6 +139,33 @@ def get_comment_replies_endpoint(
     )
 
 
+@router.get("/comments/{comment_id}/thread", response_model=CommentThreadResponse)
+def get_comment_thread_endpoint(
+    comment_id: int,
+    max_depth: Optional[int] = Query(None, ge=1, le=50),
+    after: Optional[str] = Query(None, max_length=1000),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the whole reply tree under a comment in one request.
+    
+    - **comment_id**: Comment ID whose descendants to load
+    - **max_depth**: Only load this many levels below the comment (optional)
+    - **after**: next_cursor from the previous page (optional)
+    - **limit**: Number of comments per page (default: 50, max: 200)
+    
+    Returns descendants in depth-first display order; use depth for indentation.
+    """
+    comments, next_cursor = get_comment_thread(comment_id, db, max_depth, after, limit, current_user.id)
+    
+    return CommentThreadResponse(
+        comments=comments,
+        next_cursor=next_cursor
+    )
+
+
 @router.post("/comments/{comment_id}/like", response_model=CommentLikeResponse)
 def like_comment_endpoint(
     comment_id: int,
@@ -5,10 +5,12 @@ Handles notification management and delivery.
 COMPLETE: All endpoints integrated with existing structure and fallback support
 """
 
+import json
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from ..config.database import get_db
+from ..config.database import get_db, SessionLocal
 from ..utils.dependencies import get_current_active_user, get_admin_user
 from ..models.user import User
 
@@ -391,40 +393,63 @@ if NOTIFICATION_SYSTEM_AVAILABLE:
     
     @router.get("/export")
     def export_notifications(
-        format: str = Query("json", description="Export format (json or csv)"),
+        format: str = Query("ndjson", description="Export format (ndjson or csv; json is an alias for ndjson)"),
         days: Optional[int] = Query(None, ge=1, le=365, description="Number of days to export"),
-        current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        since: Optional[int] = Query(None, ge=0, description="Only export notifications with an ID greater than this cursor"),
+        since_activity: Optional[int] = Query(None, ge=0, description="Only export followed-author posts with an activity ID greater than this cursor"),
+        current_user: User = Depends(get_current_active_user)
     ):
         """
-        Export user notifications in specified format.
+        Stream user notifications as NDJSON or CSV.
         
-        - **format**: Export format (json or csv)
+        - **format**: Export format (ndjson or csv)
         - **days**: Number of days to include (optional, all if not specified)
+        - **since**: ID cursor for incremental exports (use the last exported ID)
+        - **since_activity**: Activity cursor for incremental exports (the last exported
+          negative ID, negated)
         
-        Returns exported notification data.
+        Returns a streamed download ordered by notification ID, followed by new posts of
+        followed authors (negative IDs). If the export fails part-way, an NDJSON stream
+        ends with an {"error": ...} record and a CSV stream with an "# error:" line, so a
+        truncated file is never mistaken for a complete one.
         """
-        try:
-            # Validate format
-            if format not in ["json", "csv"]:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Format must be either 'json' or 'csv'"
-                )
-            
-            export_result = NotificationService.export_notifications(
-                db, current_user.id, format, days
-            )
-            
-            return export_result
-        except HTTPException:
-            raise
-        except Exception as e:
-            print(f"Error exporting notifications: {str(e)}")
+        export_format = "ndjson" if format == "json" else format
+        if export_format not in ["ndjson", "csv"]:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to export notifications"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Format must be either 'ndjson' or 'csv'"
             )
+        
+        user_id = current_user.id
+        
+        def stream_export():
+            # The request-scoped session is closed before a streamed body finishes,
+            # so the export owns its session for the lifetime of the stream.
+            export_db = SessionLocal()
+            try:
+                yield from NotificationService.iter_notification_export(
+                    export_db, user_id, export_format, days, since,
+                    since_activity_id=since_activity
+                )
+            except Exception as e:
+                # Headers are already sent, so terminate the body with an error record
+                print(f"Error exporting notifications: {str(e)}")
+                if export_format == "ndjson":
+                    yield json.dumps({"error": "Export failed before completion"}) + "\n"
+                else:
+                    yield "# error: Export failed before completion\n"
+                raise
+            finally:
+                export_db.close()
+        
+        media_type = "application/x-ndjson" if export_format == "ndjson" else "text/csv"
+        extension = "ndjson" if export_format == "ndjson" else "csv"
+        
+        return StreamingResponse(
+            stream_export(),
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="notifications.{extension}"'}
+        )
     
     
     @router.get("/{notification_id}")
@@ -540,6 +565,60 @@ if NOTIFICATION_SYSTEM_AVAILABLE:
             )
     
     
+    @router.post("/admin/partitions/maintain")
+    def maintain_notification_partitions(
+        months_ahead: int = Query(3, ge=0, le=24, description="Months of partitions to create ahead"),
+        current_user: User = Depends(get_admin_user),  # Admin only
+        db: Session = Depends(get_db)
+    ):
+        """
+        Create monthly notification partitions ahead of time (Admin only).
+
+        - **months_ahead**: Number of future months to cover
+
+        No-op unless the notifications table is partitioned (PostgreSQL).
+        """
+        try:
+            created = NotificationService.ensure_notification_partitions(db, months_ahead)
+            return {
+                "success": True,
+                "partitioned": NotificationService.is_partitioned(db),
+                "created_partitions": created
+            }
+        except Exception as e:
+            print(f"Error maintaining notification partitions: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to maintain notification partitions"
+            )
+
+
+    @router.delete("/admin/duplicates")
+    def cleanup_duplicate_notifications(
+        current_user: User = Depends(get_admin_user),  # Admin only
+        db: Session = Depends(get_db)
+    ):
+        """
+        Remove duplicate like/comment notifications written before coalescing (Admin only).
+
+        Returns number of deleted notifications.
+        """
+        try:
+            deleted_count = NotificationService.cleanup_duplicate_notifications(db)
+
+            return {
+                "success": True,
+                "message": f"Deleted {deleted_count} duplicate notifications",
+                "deleted_count": deleted_count
+            }
+        except Exception as e:
+            print(f"Error cleaning up duplicate notifications: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to cleanup duplicate notifications"
+            )
+
+
     @router.get("/admin/analytics")
     def get_notification_analytics(
         days: int = Query(30, ge=1, le=365, description="Number of days for analytics"),
@@ -563,6 +642,35 @@ if NOTIFICATION_SYSTEM_AVAILABLE:
                 detail="Failed to get notification analytics"
             )
 
+
+    @router.post("/admin/rollup/refresh")
+    def refresh_notification_rollup(
+        days: int = Query(2, ge=1, le=365, description="Number of completed days to rebuild"),
+        current_user: User = Depends(get_admin_user),  # Admin only
+        db: Session = Depends(get_db)
+    ):
+        """
+        Rebuild the daily notification rollup (Admin only).
+
+        - **days**: Number of completed days (ending yesterday) to recompute
+
+        Used by admin analytics when the rollup is enabled in settings.
+        """
+        try:
+            rows_written = NotificationService.refresh_daily_rollup(db, days)
+            return {
+                "success": True,
+                "message": f"Rebuilt notification rollup for {days} days",
+                "rows_written": rows_written,
+                "days": days
+            }
+        except Exception as e:
+            print(f"Error refreshing notification rollup: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to refresh notification rollup"
+            )
+
 else:
     # Fallback endpoints when notification system is not available
     print("⚠️ Advanced notification endpoints not available - using basic functionality only")
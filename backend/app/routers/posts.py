@@ -4,7 +4,6 @@ Handles post creation, management, and social interactions.
 UPDATED: Added notification integration and enhanced features while maintaining existing structure.
 """
 
-import json
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from typing import Optional
@@ -19,13 +18,12 @@ from ..services.post_service import (
     like_post, unlike_post, check_user_liked_post
 )
 from ..utils.dependencies import get_current_active_user
-from ..models.user import User, Follow
+from ..models.user import User
 from datetime import datetime
-from ..models.notification import Notification, NotificationType
 
 # NEW: Import notification service for social interactions
 try:
-    from ..models.notification import NotificationService
+    from ..services.notification_service import NotificationService
     NOTIFICATIONS_ENABLED = True
     print("✅ Notification service loaded for posts")
 except ImportError:
@@ -48,12 +46,8 @@ def create_user_basic_info(user, current_user=None, db=None):
     # Check if current user is following this user
     if current_user and db and current_user.id != user.id:
         try:
-            from ..models.follow import Follow
-            follow_check = db.query(Follow).filter(
-                Follow.follower_id == current_user.id,
-                Follow.following_id == user.id
-            ).first()
-            is_following = follow_check is not None
+            from ..services.user_service import check_user_following
+            is_following = check_user_following(current_user.id, user.id, db)
         except Exception as e:
             print(f"Error checking follow status: {e}")
             is_following = False
@@ -299,38 +293,9 @@ def create_new_post(
         db.refresh(new_post)
         post_with_author = get_post_by_id(new_post.id, db)
         
-        # NEW: Notify followers about new post
+        # NEW: Notify followers about new post (bulk push, or pull for high-follower authors)
         if NOTIFICATIONS_ENABLED:
-            try:
-                from ..models.notification import Notification, NotificationType
-                
-                # Get all followers
-                followers = db.query(Follow.follower_id).filter(
-                    Follow.following_id == current_user.id
-                ).all()
-                
-                # Create notification for each follower
-                notifications_created = 0
-                for follower in followers:
-                    notification = Notification(
-                        recipient_id=follower[0],
-                        sender_id=current_user.id,
-                        type=NotificationType.POST_UPDATE,
-                        title="New Post",
-                        message=f"{current_user.full_name} shared a new post",
-                        data=f'{{"post_id": {new_post.id}, "action": "new_post", "user_id": {current_user.id}}}'
-                    )
-                    db.add(notification)
-                    notifications_created += 1
-                
-                if notifications_created > 0:
-                    db.commit()
-                    print(f"✅ Created post notifications for {notifications_created} followers")
-                else:
-                    print("📝 New post created but no followers to notify")
-                    
-            except Exception as e:
-                print(f"⚠️ Failed to create post notifications: {e}")
+            NotificationService.create_new_post_notifications(db, current_user, new_post)
         
         return create_post_response(post_with_author, current_user, db)
         
@@ -457,21 +422,8 @@ def like_post_endpoint(
         # NEW: Create notification for post owner
         if NOTIFICATIONS_ENABLED and post.user_id != current_user.id:
             try:
-                notification = Notification(
-                    recipient_id=post.user_id,
-                    sender_id=current_user.id,
-                    type=NotificationType.LIKE,
-                    title="New Like",
-                    message=f"{current_user.full_name} liked your post",
-                    data=json.dumps({
-                        "post_id": post.id,
-                        "action": "like", 
-                        "user_id": current_user.id
-                    })
-                )
-                db.add(notification)
-                db.commit()
-                db.refresh(notification)
+                # Likes on the same post fold into one coalesced notification
+                notification = NotificationService.create_like_notification(db, post, current_user)
                 print(f"✅ Created like notification for post {post_id}")
                 # NEW: Trigger real-time notification update
                 try:
@@ -479,7 +431,7 @@ def like_post_endpoint(
                     notify_user_realtime(post.user_id, {
                         "type": "new_notification",
                         "notification_type": "like",
-                        "message": f"{current_user.full_name} liked your post"
+                        "message": notification.message if notification else f"{current_user.full_name} liked your post"
                     })
                 except ImportError:
                     pass  # WebSocket service not available yet
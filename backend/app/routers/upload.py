@@ -6,8 +6,7 @@ ENHANCED: Added missing /config endpoint for frontend integration
 FIXED: Avatar upload with proper debugging and error handling
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import os
@@ -15,11 +14,17 @@ from pathlib import Path
 
 from ..config.database import get_db
 from ..utils.dependencies import get_current_active_user, get_admin_user
+from ..utils.static_files import static_file_response
 from ..models.user import User
 from ..services.file_service import (
-    upload_file, upload_post_media, delete_file, 
-    get_file_info, cleanup_temp_files, UPLOAD_FOLDER
+    upload_file, upload_post_media, delete_file, delete_files,
+    get_file_info, cleanup_temp_files, get_upload_size, UPLOAD_FOLDER
 )
+from ..services.storage import local_storage, get_storage, get_s3_storage
+from ..services.media_index import media_stats
+from ..services.media_gc import collect_orphaned_media
+from ..services.image_executor import image_executor
+from ..services.image_resizer import resized_image_cache
 from ..schemas.file import (
     FileUploadResponse, MultipleFileUploadResponse, FileInfo, 
     FileDeleteResponse, AvatarUploadResponse, PostMediaUploadResponse,
@@ -35,7 +40,8 @@ router = APIRouter(prefix="/upload", tags=["File Upload"])
 async def upload_single_image(
     file: UploadFile = File(..., description="Single image file (max 10MB)"),
     folder: str = Form("posts", description="Upload folder"),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
     """
     Upload a single image file.
@@ -62,7 +68,9 @@ async def upload_single_image(
             folder=folder,
             optimize_images=True,
             max_size=10 * 1024 * 1024,  # 10MB
-            should_create_thumbnail=False
+            should_create_thumbnail=False,
+            db=db,
+            owner_id=current_user.id
         )
         
         print(f"✅ Single image upload successful: {result}")
@@ -126,14 +134,10 @@ async def upload_user_avatar(
                 detail=f"Invalid file type: {file.content_type}. Only image files are allowed."
             )
         
-        # Check file size
-        file_content = await file.read()
-        file_size = len(file_content)
+        # Check file size (without reading the upload into memory)
+        file_size = get_upload_size(file)
         print(f"📊 File size: {file_size} bytes ({file_size / 1024 / 1024:.2f} MB)")
         
-        # Reset file pointer
-        await file.seek(0)
-        
         # Size limit: 2MB
         max_size = 2 * 1024 * 1024  # 2MB
         if file_size > max_size:
@@ -145,86 +149,26 @@ async def upload_user_avatar(
         
         print("✅ File validation passed, proceeding with upload...")
         
-        # NEW: Check if S3 is available and use it first
-        try:
-            from ..services.s3_service import S3_AVAILABLE, s3_service
-            if S3_AVAILABLE and s3_service:
-                print("🔄 Using S3 for avatar upload...")
-                
-                # Reset file pointer for S3
-                await file.seek(0)
-                
-                # Upload to S3 directly
-                s3_result = await s3_service.upload_avatar(
-                    file=file,
-                    user_id=current_user.id,
-                    max_size_mb=2
-                )
-                
-                print(f"✅ S3 avatar upload successful: {s3_result}")
-                
-                # Update user profile in database
-                current_user.profile_picture_url = s3_result['url']
-                db.commit()
-                db.refresh(current_user)
-                
-                print(f"✅ User profile picture URL updated to: {s3_result['url']}")
-                
-                # Return S3 response in correct format
-                return AvatarUploadResponse(
-                    success=True,
-                    filename=s3_result['filename'],
-                    original_filename=s3_result['original_filename'],
-                    url=s3_result['url'],
-                    avatar_url=s3_result['url'],
-                    file_size=s3_result['size'],
-                    content_type=s3_result['content_type']
-                )
-                
-        except ImportError:
-            print("⚠️ S3 service not available, using local upload")
-        except Exception as e:
-            print(f"⚠️ S3 upload failed: {e}, falling back to local")
-        
-        # EXISTING: Fallback to local upload
         try:
-            print("🔄 Using local upload for avatar...")
-            
-            # Reset file pointer for local upload
-            await file.seek(0)
-            
             # Delete old avatar if exists
             if current_user.profile_picture_url:
                 try:
-                    await delete_file(current_user.profile_picture_url)
+                    await delete_file(current_user.profile_picture_url, db=db)
                     print(f"🗑️ Deleted old avatar: {current_user.profile_picture_url}")
                 except Exception as e:
                     print(f"⚠️ Could not delete old avatar: {str(e)}")
             
-            # Create upload avatar function if not exists
-            async def upload_avatar_local(file: UploadFile, user_id: int) -> dict:
-                """Local avatar upload function"""
-                try:
-                    print(f"🔄 Processing local avatar upload for user {user_id}")
-                    
-                    # Upload to avatars folder
-                    result = await upload_file(
-                        file=file,
-                        folder="avatars",
-                        optimize_images=True,
-                        max_size=2 * 1024 * 1024,  # 2MB
-                        should_create_thumbnail=False
-                    )
-                    
-                    print(f"✅ Local avatar uploaded successfully: {result}")
-                    return result
-                    
-                except Exception as e:
-                    print(f"❌ Local avatar upload service error: {str(e)}")
-                    raise e
-            
-            # Upload new avatar using local service
-            result = await upload_avatar_local(file, current_user.id)
+            # Upload new avatar to the configured storage (S3 when available)
+            result = await upload_file(
+                file=file,
+                folder="avatars",
+                optimize_images=True,
+                max_size=2 * 1024 * 1024,  # 2MB
+                should_create_thumbnail=False,
+                db=db,
+                owner_id=current_user.id
+            )
+            print(f"✅ Avatar uploaded to {result['storage']} storage: {result['url']}")
             
             # FIXED: Ensure result has required fields
             if not result.get('url'):
@@ -255,7 +199,8 @@ async def upload_user_avatar(
                 'is_image': result.get('is_image', True),
                 'file_hash': result.get('file_hash', ''),
                 'folder': result.get('folder', 'avatars'),
-                'upload_time': result.get('upload_time')
+                'upload_time': result.get('upload_time'),
+                'deduplicated': result.get('deduplicated', False)
             }
             
             print(f"✅ Avatar upload completed successfully for user {current_user.username}")
@@ -264,7 +209,7 @@ async def upload_user_avatar(
         except HTTPException:
             raise
         except Exception as e:
-            print(f"❌ Local avatar upload error: {str(e)}")
+            print(f"❌ Avatar upload service error: {str(e)}")
             import traceback
             print(f"📋 Traceback: {traceback.format_exc()}")
             raise HTTPException(
@@ -288,7 +233,8 @@ async def upload_user_avatar(
 @router.post("/post-media", response_model=MultipleFileUploadResponse)
 async def upload_post_media_files(
     files: List[UploadFile] = File(..., description="Media files for post (max 5 files, 10MB each)"),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
     """
     Upload media files for posts.
@@ -305,7 +251,7 @@ async def upload_post_media_files(
         print(f"🔍 Post media upload started by: {current_user.username}")
         print(f"📁 Number of files: {len(files)}")
         
-        results = await upload_post_media(files, current_user.id)
+        results = await upload_post_media(files, current_user.id, db=db)
         
         # Separate successful and failed uploads
         successful_uploads = []
@@ -348,7 +294,8 @@ async def upload_post_media_files(
 async def upload_document(
     file: UploadFile = File(..., description="Document file (PDF, DOC, DOCX, TXT)"),
     folder: str = Form("documents", description="Target folder"),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
     """
     Upload a document file.
@@ -368,7 +315,9 @@ async def upload_document(
             file=file,
             folder=folder,
             optimize_images=False,
-            max_size=5 * 1024 * 1024  # 5MB
+            max_size=5 * 1024 * 1024,  # 5MB
+            db=db,
+            owner_id=current_user.id
         )
         
         print(f"✅ Document upload successful: {result}")
@@ -387,7 +336,8 @@ async def upload_document(
 @router.get("/file-info")
 async def get_file_information(
     file_path: str = Query(..., description="File path or URL"),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
     """
     Get information about an uploaded file.
@@ -397,7 +347,7 @@ async def get_file_information(
     Returns file metadata including size, type, and URLs.
     """
     try:
-        info = get_file_info(file_path)
+        info = await get_file_info(file_path, db=db)
         return FileInfo(**info)
         
     except Exception as e:
@@ -411,7 +361,8 @@ async def get_file_information(
 @router.delete("/file")
 async def delete_uploaded_file(
     file_path: str = Query(..., description="File path or URL to delete"),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
     """
     Delete an uploaded file.
@@ -422,7 +373,7 @@ async def delete_uploaded_file(
     """
     try:
         # TODO: Add file ownership validation
-        success = await delete_file(file_path)
+        success = await delete_file(file_path, db=db)
         
         if success:
             return FileDeleteResponse(
@@ -449,7 +400,8 @@ async def delete_uploaded_file(
 @router.post("/batch-delete", response_model=FileBatchDeleteResponse)
 async def batch_delete_files(
     request: FileBatchDeleteRequest,
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
     """
     Delete multiple files in batch.
@@ -462,15 +414,13 @@ async def batch_delete_files(
         deleted_files = []
         failed_files = []
         
+        # One bulk delete per storage instead of a request per file
+        results = await delete_files(request.file_paths, db=db)
         for file_path in request.file_paths:
-            try:
-                success = await delete_file(file_path)
-                if success:
-                    deleted_files.append(file_path)
-                else:
-                    failed_files.append({"path": file_path, "error": "File not found"})
-            except Exception as e:
-                failed_files.append({"path": file_path, "error": str(e)})
+            if results.get(file_path):
+                deleted_files.append(file_path)
+            else:
+                failed_files.append({"path": file_path, "error": "File not found"})
         
         return FileBatchDeleteResponse(
             success=len(deleted_files) > 0,
@@ -490,40 +440,24 @@ async def batch_delete_files(
 
 
 # Static file serving
-@router.get("/static/{file_path:path}")
-async def serve_uploaded_file(file_path: str):
+@router.api_route("/static/{file_path:path}", methods=["GET", "HEAD"])
+async def serve_uploaded_file(file_path: str, request: Request):
     """
     Serve uploaded files statically.
     
     - **file_path**: Path to the file
     
-    Returns the file for download/display.
+    Returns the file for download/display, with the same validators, 304s,
+    byte ranges and caching as /static (see utils.static_files).
     """
     try:
-        full_path = Path(UPLOAD_FOLDER) / file_path
-        
-        if not full_path.exists() or not full_path.is_file():
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="File not found"
-            )
+        # Keys ('posts/a.jpg') resolve to their fanned-out path; stored paths are used as-is
+        stored_path = local_storage.path(file_path)
+        if stored_path.is_relative_to(local_storage.root):
+            file_path = stored_path.relative_to(local_storage.root).as_posix()
+        # Paths escaping the upload directory are refused with a 403 there
+        return await static_file_response(request, local_storage.root, file_path)
         
-        # Security check - ensure file is within upload directory
-        try:
-            full_path.resolve().relative_to(Path(UPLOAD_FOLDER).resolve())
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied"
-            )
-        
-        return FileResponse(
-            path=str(full_path),
-            filename=full_path.name
-        )
-        
-    except HTTPException:
-        raise
     except Exception as e:
         print(f"❌ File serve error: {str(e)}")
         raise HTTPException(
@@ -535,46 +469,25 @@ async def serve_uploaded_file(file_path: str):
 # Admin endpoints
 @router.get("/admin/stats", response_model=FileStatsResponse)
 async def get_upload_statistics(
-    current_user: User = Depends(get_admin_user)
+    current_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
 ):
     """
     Get file upload statistics (Admin only).
     
-    Returns comprehensive storage and usage statistics.
+    Returns comprehensive storage and usage statistics, aggregated from
+    the media index rather than by walking the upload directory.
     """
     try:
-        upload_path = Path(UPLOAD_FOLDER)
-        
-        if not upload_path.exists():
-            return FileStatsResponse(
-                total_files=0,
-                total_size_mb=0.0,
-                files_by_type={},
-                storage_usage_mb=0.0,
-                recent_uploads=0
-            )
-        
-        total_files = 0
-        total_size = 0
-        files_by_type = {}
-        
-        # Walk through all files
-        for file_path in upload_path.rglob("*"):
-            if file_path.is_file():
-                total_files += 1
-                file_size = file_path.stat().st_size
-                total_size += file_size
-                
-                # Count by extension
-                extension = file_path.suffix.lower().lstrip('.')
-                files_by_type[extension] = files_by_type.get(extension, 0) + 1
+        stats = media_stats(db)
+        total_size_mb = round(stats['total_size'] / (1024 * 1024), 2)
         
         return FileStatsResponse(
-            total_files=total_files,
-            total_size_mb=round(total_size / (1024 * 1024), 2),
-            files_by_type=files_by_type,
-            storage_usage_mb=round(total_size / (1024 * 1024), 2),
-            recent_uploads=0  # TODO: Implement based on file timestamps
+            total_files=stats['total_files'],
+            total_size_mb=total_size_mb,
+            files_by_type=stats['files_by_type'],
+            storage_usage_mb=total_size_mb,
+            recent_uploads=stats['recent_uploads']
         )
         
     except Exception as e:
@@ -616,6 +529,52 @@ async def cleanup_files(
         )
 
 
+@router.post("/admin/cleanup-orphans", response_model=FileCleanupResponse)
+async def cleanup_orphaned_files(
+    grace_hours: Optional[int] = Query(None, ge=1, le=720, description="Keep unreferenced files younger than this"),
+    target: Optional[str] = Query(None, pattern="^(local|s3)$", description="Storage to collect (default: the configured one)"),
+    dry_run: bool = Query(False, description="Only report what would be deleted"),
+    current_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Delete uploaded files that no post or profile references (Admin only).
+    
+    - **grace_hours**: Minimum age of deleted files (default: MEDIA_GC_GRACE_HOURS)
+    - **target**: 'local' or 's3'
+    - **dry_run**: Count without deleting
+    
+    Walks the garbage-collected folders in pages and deletes in batches.
+    """
+    storage = get_s3_storage() if target == "s3" else local_storage if target == "local" else get_storage()
+    if storage is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="S3 storage is not configured"
+        )
+    
+    try:
+        result = await collect_orphaned_media(db, storage, grace_hours=grace_hours, dry_run=dry_run)
+        freed_space_mb = round(result['bytes_reclaimed'] / (1024 * 1024), 2)
+        verb = "Would delete" if dry_run else "Deleted"
+        
+        return FileCleanupResponse(
+            success=result['files_failed'] == 0,
+            message=f"{verb} {result['files_deleted']} orphaned files ({freed_space_mb} MB) "
+                    f"of {result['files_scanned']} scanned in {storage.name} storage",
+            cleaned_files=result['files_deleted'],
+            freed_space_mb=freed_space_mb,
+            operation_type="orphaned_cleanup"
+        )
+        
+    except Exception as e:
+        print(f"❌ Orphaned file cleanup error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to cleanup orphaned files"
+        )
+
+
 # FIXED: Improved config endpoint with better error handling
 @router.get("/config")
 async def get_upload_config():
@@ -725,6 +684,8 @@ async def upload_service_health():
             "upload_directory_writable": os.access(upload_path, os.W_OK) if upload_path.exists() else False,
             "max_file_size_mb": 10,
             "s3_available": s3_available,
+            "image_executor": image_executor.stats(),
+            "resized_images": resized_image_cache.stats(),
             "supported_formats": {
                 "images": ["jpg", "jpeg", "png", "webp", "gif"],
                 "documents": ["pdf", "doc", "docx", "txt"],
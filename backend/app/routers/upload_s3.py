@@ -6,20 +6,24 @@ FIXED: Complete router implementation with all endpoints and proper response for
 ADDED: Missing /image endpoint for single image upload
 """
 
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, HTTPException, Form
 from typing import List, Optional
 from sqlalchemy.orm import Session
 
 from ..config.database import get_db
+from ..config.settings import settings
 from ..utils.dependencies import get_current_active_user
 from ..models.user import User
+from ..schemas.file import DirectUploadRequest, DirectUploadFinalizeRequest
+from ..services.file_service import get_file_info
 
 # Safe import with fallback
 try:
-    from ..services.s3_service import s3_service, S3_AVAILABLE
+    from ..services.s3_service import s3_service, S3_AVAILABLE, DIRECT_UPLOAD_BUSY_RETRIES
 except ImportError:
     s3_service = None
     S3_AVAILABLE = False
+    DIRECT_UPLOAD_BUSY_RETRIES = 0
 
 # Create router instance
 router = APIRouter(prefix="/upload-s3", tags=["S3 Image Upload"])
@@ -63,7 +67,9 @@ async def upload_image_s3(
             file=file,
             folder="posts",  # Use posts folder for consistency
             optimize=True,
-            max_size_mb=10
+            max_size_mb=10,
+            db=db,
+            owner_id=current_user.id
         )
         
         print(f"✅ S3 service result: {result}")
@@ -120,7 +126,9 @@ async def upload_multiple_images_s3(
         result = await s3_service.upload_multiple_images(
             files=files,
             folder="images",
-            max_files=5
+            max_files=5,
+            db=db,
+            owner_id=current_user.id
         )
         
         print(f"✅ S3 multiple upload completed: {result['successful_uploads']}/{result['total_files']}")
@@ -166,7 +174,8 @@ async def upload_avatar_s3(
         result = await s3_service.upload_avatar(
             file=file,
             user_id=current_user.id,
-            max_size_mb=2
+            max_size_mb=2,
+            db=db
         )
         
         print(f"✅ S3 service result: {result}")
@@ -229,7 +238,9 @@ async def upload_post_images_s3(
         result = await s3_service.upload_multiple_images(
             files=files,
             folder="posts",
-            max_files=5
+            max_files=5,
+            db=db,
+            owner_id=current_user.id
         )
         
         # If post_id provided, you can associate images with post here
@@ -258,6 +269,135 @@ async def upload_post_images_s3(
         raise HTTPException(status_code=500, detail=f"S3 post images upload failed: {str(e)}")
 
 
+@router.post("/document")
+async def upload_document_s3(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload a document to S3 (PDF, DOC, DOCX, TXT)
+    Large files go up as parallel multipart uploads
+    """
+    check_s3_available()
+    
+    try:
+        print(f"🔍 S3 document upload started by: {current_user.username}")
+        
+        result = await s3_service.upload_document(
+            file=file, folder="documents", db=db, owner_id=current_user.id
+        )
+        
+        return {
+            "success": True,
+            "message": "Document uploaded successfully to S3",
+            "file_url": result['url'],
+            "url": result['url'],
+            "filename": result['filename'],
+            "original_filename": result['original_filename'],
+            "size": result['size'],
+            "s3_key": result['s3_key'],
+            "storage": "aws_s3",
+            "data": result
+        }
+        
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        print(f"❌ S3 document upload error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"S3 document upload failed: {str(e)}")
+
+
+@router.post("/direct/slot")
+async def create_direct_upload_s3(
+    request: DirectUploadRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get a presigned POST for uploading an image straight to S3
+    The client POSTs the returned fields plus the file to upload_url,
+    then calls /direct/finalize with the key. The proxy routes above
+    (/image, /images, /avatar) remain as the fallback.
+    """
+    check_s3_available()
+    
+    slot = s3_service.create_direct_upload(
+        user_id=current_user.id,
+        content_type=request.content_type,
+        folder=request.folder,
+        size=request.size
+    )
+    
+    return {
+        "success": True,
+        "storage": "aws_s3",
+        "data": slot
+    }
+
+
+@router.post("/direct/finalize")
+async def finalize_direct_upload_s3(
+    request: DirectUploadFinalizeRequest,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Verify a direct upload and publish its renditions
+    Renditions are rendered in the background unless wait is set; poll
+    /direct/status until ready. Avatars are always rendered before responding.
+    If processing fails (or the image pool answers 503), the upload is kept
+    and finalize can be called again with the same key.
+    """
+    check_s3_available()
+    
+    result = await s3_service.finalize_direct_upload(current_user.id, request.key)
+    process_args = (result['source_key'], result['s3_key'], result['folder'])
+    
+    if request.wait or result['folder'] == "avatars":
+        if not await s3_service.process_direct_upload(*process_args, owner_id=current_user.id, db=db):
+            raise HTTPException(status_code=500, detail="S3 upload processing failed")
+        ready = True
+    else:
+        background_tasks.add_task(
+            s3_service.process_direct_upload, *process_args,
+            busy_retries=DIRECT_UPLOAD_BUSY_RETRIES, owner_id=current_user.id
+        )
+        ready = False
+    
+    if result['folder'] == "avatars":
+        current_user.profile_picture_url = result['url']
+        db.commit()
+    
+    print(f"✅ S3 direct upload finalized by {current_user.username}: {result['s3_key']}")
+    
+    return {
+        "success": True,
+        "message": "Upload finalized" if ready else "Upload finalized, processing",
+        "file_url": result['url'],
+        "url": result['url'],
+        "filename": result['filename'],
+        "ready": ready,
+        "storage": "aws_s3",
+        "data": {**result, "ready": ready}
+    }
+
+
+@router.get("/direct/status")
+async def direct_upload_status_s3(
+    s3_key: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Whether a finalized direct upload has been published (s3_key from /direct/finalize)"""
+    check_s3_available()
+    
+    return {
+        "success": True,
+        "s3_key": s3_key,
+        "ready": await s3_service.direct_upload_ready(s3_key)
+    }
+
+
 @router.delete("/file/{s3_key:path}")
 async def delete_image_s3(
     s3_key: str,
@@ -269,7 +409,7 @@ async def delete_image_s3(
     
     try:
         # Add permission check here if needed
-        success = s3_service.delete_file(s3_key)
+        success = await s3_service.delete_file(s3_key, db=db)
         
         if success:
             return {
@@ -288,13 +428,14 @@ async def delete_image_s3(
 @router.get("/file-info/{s3_key:path}")
 async def get_image_info_s3(
     s3_key: str,
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
     """Get image information from S3"""
     check_s3_available()
     
     try:
-        info = s3_service.get_file_info(s3_key)
+        info = await get_file_info(s3_key, storage=s3_service.storage, db=db)
         return {
             "success": True,
             "data": info
@@ -314,6 +455,7 @@ async def get_s3_upload_config():
             "max_avatar_size_mb": 2,
             "allowed_types": ["image/jpeg", "image/png", "image/webp", "image/gif"],
             "max_files_per_upload": 5,
+            "max_document_size_mb": settings.max_document_size_mb,
             "storage_provider": "aws_s3",
             "region": "ap-south-1",
             "supported_formats": ["JPG", "PNG", "WebP", "GIF"],
@@ -322,7 +464,8 @@ async def get_s3_upload_config():
                 "optimization": True,
                 "auto_resize": True,
                 "mumbai_region": True,
-                "fast_upload": True
+                "fast_upload": True,
+                "direct_upload": True
             }
         }
     }
\ No newline at end of file
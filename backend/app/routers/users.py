@@ -8,7 +8,7 @@ FIXED: Added missing /profile endpoint that was causing 422 errors.
 
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, func
 from typing import List, Optional
 import os
 import uuid
@@ -19,10 +19,13 @@ from ..models.user import User, Follow
 from ..models.post import Post
 from ..schemas.user import (
     UserResponse, UserUpdate, UserPublic, UserSearchResponse, 
-    CompleteProfile, FileUploadResponse, FollowResponse
+    CompleteProfile, FileUploadResponse, FollowResponse, UserAutocompleteItem
 )
 from ..utils.dependencies import get_current_user
-from ..services.file_service import upload_file, allowed_file
+from ..services.file_service import upload_file, allowed_file, get_upload_size
+from ..services.search_service import UserSearchService, user_prefix_index
+from ..services.user_service import get_follow_suggestions, check_user_following
+from ..services.follow_graph import get_follow_graph, record_follow_change
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -152,89 +155,6 @@ async def get_my_profile(
         )
 
 
-# ==============================================
-# NEW: MISSING ROUTE ADDED FOR FRONTEND
-# ==============================================
-
-@router.get("/{user_id}", response_model=CompleteProfile)
-async def get_user_by_id(
-    user_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """
-    Get user profile by user ID (simplified route for frontend compatibility).
-    
-    This is the route that the frontend expects: GET /api/v1/users/{user_id}
-    Maps to the same functionality as /users/profile/{user_id} but with simpler path.
-    """
-    print(f"🎯 Frontend requested user profile for ID: {user_id}")
-    
-    # Get user profile
-    user = db.query(User).filter(User.id == user_id, User.is_active == True).first()
-    if not user:
-        print(f"❌ User {user_id} not found in database")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
-    print(f"✅ Found user: {user.full_name} (@{user.username})")
-    
-    # FIXED: Sync user stats with real database counts
-    user = sync_user_stats(user, db)
-    
-    # Check follow relationships
-    is_following = False
-    is_follower = False
-    
-    if current_user.id != user_id:
-        # Check if current user follows this user
-        follow_check = db.query(Follow).filter(
-            Follow.follower_id == current_user.id,
-            Follow.following_id == user_id
-        ).first()
-        is_following = follow_check is not None
-        
-        # Check if this user follows current user
-        follower_check = db.query(Follow).filter(
-            Follow.follower_id == user_id,
-            Follow.following_id == current_user.id
-        ).first()
-        is_follower = follower_check is not None
-    
-    # Get recent posts (last 5)
-    recent_posts = db.query(Post).filter(
-        Post.user_id == user_id
-    ).order_by(Post.created_at.desc()).limit(5).all()
-    
-    # Convert to response format with REAL stats
-    profile_data = user.to_dict()
-    profile_data['is_following'] = is_following
-    profile_data['is_follower'] = is_follower
-    
-    # FIXED: Convert posts manually instead of using to_dict()
-    profile_data['recent_posts'] = []
-    for post in recent_posts:
-        post_data = {
-            "id": post.id,
-            "content": post.content,
-            "media_urls": post.media_urls or [],
-            "hashtags": post.hashtags or [],
-            "likes_count": post.likes_count,
-            "comments_count": post.comments_count,
-            "shares_count": post.shares_count,
-            "is_trending": post.is_trending,
-            "created_at": post.created_at.isoformat() if post.created_at else None,
-            "updated_at": post.updated_at.isoformat() if post.updated_at else None
-        }
-        profile_data['recent_posts'].append(post_data)
-    
-    print(f"📊 User {user_id} profile served: {user.followers_count} followers, {user.following_count} following, {user.posts_count} posts")
-    
-    return profile_data
-
-
 # ==============================================
 # EXISTING ROUTES (UNCHANGED)
 # ==============================================
@@ -266,18 +186,10 @@ async def get_user_profile(
     
     if current_user.id != user_id:
         # Check if current user follows this user
-        follow_check = db.query(Follow).filter(
-            Follow.follower_id == current_user.id,
-            Follow.following_id == user_id
-        ).first()
-        is_following = follow_check is not None
+        is_following = check_user_following(current_user.id, user_id, db)
         
         # Check if this user follows current user
-        follower_check = db.query(Follow).filter(
-            Follow.follower_id == user_id,
-            Follow.following_id == current_user.id
-        ).first()
-        is_follower = follower_check is not None
+        is_follower = check_user_following(user_id, current_user.id, db)
     
     # Get recent posts (last 5)
     recent_posts = db.query(Post).filter(
@@ -322,9 +234,11 @@ async def update_profile(
     # Save changes
     db.commit()
     db.refresh(current_user)
+    user_prefix_index.upsert_user(current_user)
     
     # FIXED: Sync stats after update
     current_user = sync_user_stats(current_user, db)
+    user_prefix_index.update_followers(current_user.id, current_user.followers_count)
     
     return current_user.to_dict()
 
@@ -346,10 +260,8 @@ async def upload_avatar(
             detail="Invalid file type. Only JPG, PNG, and WebP images are allowed."
         )
     
-    # Check file size (5MB limit)
-    file_size = 0
-    content = await file.read()
-    file_size = len(content)
+    # Check file size (5MB limit) without reading the upload into memory
+    file_size = get_upload_size(file)
     
     if file_size > 5 * 1024 * 1024:  # 5MB
         raise HTTPException(
@@ -362,7 +274,7 @@ async def upload_avatar(
     
     try:
         # Upload file
-        file_url = await upload_file(file, folder="avatars")
+        file_url = await upload_file(file, folder="avatars", db=db, owner_id=current_user.id)
         
         # Update user profile picture
         current_user.profile_picture_url = file_url
@@ -382,6 +294,42 @@ async def upload_avatar(
         )
 
 
+@router.get("/autocomplete", response_model=List[UserAutocompleteItem])
+async def autocomplete_users(
+    q: str = Query(..., min_length=1, max_length=100, description="Typed prefix"),
+    limit: int = Query(10, ge=1, le=25),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Prefix autocomplete over usernames and full-name words.
+    Served from the in-memory prefix index; ordered by followers count.
+    """
+    user_prefix_index.ensure_loaded(db)
+    return user_prefix_index.complete(q, limit, exclude_user_id=current_user.id)
+
+
+@router.get("/suggestions", response_model=List[UserPublic])
+async def get_suggestions(
+    limit: int = Query(10, ge=1, le=50, description="Number of suggestions"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Suggest people to follow.
+    Ranked by mutual connections, shared specialty/college and recency.
+    """
+    suggestions = get_follow_suggestions(current_user, db, limit)
+    
+    user_results = []
+    for user in suggestions:
+        user_data = user.to_dict()
+        user_data['is_following'] = False
+        user_results.append(UserPublic(**user_data))
+    
+    return user_results
+
+
 @router.get("/search", response_model=UserSearchResponse)
 async def search_users(
     q: str = Query(..., min_length=2, description="Search query"),
@@ -395,35 +343,12 @@ async def search_users(
     Search users by name, username, or professional info.
     Supports filtering by user type and pagination.
     """
-    # Build search query
-    search_query = db.query(User).filter(User.is_active == True)
-    
-    # Add search conditions
-    search_terms = or_(
-        User.full_name.ilike(f"%{q}%"),
-        User.username.ilike(f"%{q}%"),
-        User.bio.ilike(f"%{q}%"),
-        User.specialty.ilike(f"%{q}%"),
-        User.college.ilike(f"%{q}%")
+    # Trigram-ranked search (similarity, then followers_count)
+    users, total = UserSearchService.search_users(
+        db, q, page, per_page,
+        user_type=user_type if user_type in ["doctor", "student"] else None,
+        exclude_user_id=current_user.id
     )
-    search_query = search_query.filter(search_terms)
-    
-    # Filter by user type if specified
-    if user_type and user_type in ["doctor", "student"]:
-        search_query = search_query.filter(User.user_type == user_type)
-    
-    # Exclude current user from results
-    search_query = search_query.filter(User.id != current_user.id)
-    
-    # Get total count
-    total = search_query.count()
-    
-    # Apply pagination
-    offset = (page - 1) * per_page
-    users = search_query.order_by(
-        User.followers_count.desc(),  # Popular users first
-        User.created_at.desc()
-    ).offset(offset).limit(per_page).all()
     
     # FIXED: Sync stats for all search results
     for user in users:
@@ -433,7 +358,10 @@ async def search_users(
     user_ids = [user.id for user in users]
     following_ids = set()
     
-    if user_ids:
+    graph = get_follow_graph(db)
+    if graph:
+        following_ids = graph.following_among(current_user.id, user_ids)
+    elif user_ids:
         follows = db.query(Follow.following_id).filter(
             Follow.follower_id == current_user.id,
             Follow.following_id.in_(user_ids)
@@ -501,6 +429,7 @@ async def follow_user(
     # Create follow relationship
     follow = Follow(follower_id=current_user.id, following_id=user_id)
     db.add(follow)
+    record_follow_change(db, current_user.id, user_id, True)
     db.commit()
 
     # NEW: Create follow notification
@@ -525,6 +454,7 @@ async def follow_user(
     # FIXED: Calculate real counts after follow
     current_user = sync_user_stats(current_user, db)
     target_user = sync_user_stats(target_user, db)
+    user_prefix_index.update_followers(target_user.id, target_user.followers_count)
     
     print(f"✅ {current_user.username} followed {target_user.username}. Target user now has {target_user.followers_count} followers")
     
@@ -571,11 +501,13 @@ async def unfollow_user(
     
     # Remove follow relationship
     db.delete(follow)
+    record_follow_change(db, current_user.id, user_id, False)
     db.commit()
     
     # FIXED: Calculate real counts after unfollow
     current_user = sync_user_stats(current_user, db)
     target_user = sync_user_stats(target_user, db)
+    user_prefix_index.update_followers(target_user.id, target_user.followers_count)
     
     print(f"✅ {current_user.username} unfollowed {target_user.username}. Target user now has {target_user.followers_count} followers")
     
@@ -701,4 +633,81 @@ async def get_trending_users(
     return {
         "success": True,
         "users": [user.to_dict() for user in users]
-    }
\ No newline at end of file
+    }
+
+
+# ==============================================
+# NEW: MISSING ROUTE ADDED FOR FRONTEND
+# Declared last: /{user_id} matches any single segment, so it must not
+# shadow /search, /autocomplete, /trending, ...
+# ==============================================
+
+@router.get("/{user_id}", response_model=CompleteProfile)
+async def get_user_by_id(
+    user_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get user profile by user ID (simplified route for frontend compatibility).
+    
+    This is the route that the frontend expects: GET /api/v1/users/{user_id}
+    Maps to the same functionality as /users/profile/{user_id} but with simpler path.
+    """
+    print(f"🎯 Frontend requested user profile for ID: {user_id}")
+    
+    # Get user profile
+    user = db.query(User).filter(User.id == user_id, User.is_active == True).first()
+    if not user:
+        print(f"❌ User {user_id} not found in database")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    print(f"✅ Found user: {user.full_name} (@{user.username})")
+    
+    # FIXED: Sync user stats with real database counts
+    user = sync_user_stats(user, db)
+    
+    # Check follow relationships
+    is_following = False
+    is_follower = False
+    
+    if current_user.id != user_id:
+        # Check if current user follows this user
+        is_following = check_user_following(current_user.id, user_id, db)
+        
+        # Check if this user follows current user
+        is_follower = check_user_following(user_id, current_user.id, db)
+    
+    # Get recent posts (last 5)
+    recent_posts = db.query(Post).filter(
+        Post.user_id == user_id
+    ).order_by(Post.created_at.desc()).limit(5).all()
+    
+    # Convert to response format with REAL stats
+    profile_data = user.to_dict()
+    profile_data['is_following'] = is_following
+    profile_data['is_follower'] = is_follower
+    
+    # FIXED: Convert posts manually instead of using to_dict()
+    profile_data['recent_posts'] = []
+    for post in recent_posts:
+        post_data = {
+            "id": post.id,
+            "content": post.content,
+            "media_urls": post.media_urls or [],
+            "hashtags": post.hashtags or [],
+            "likes_count": post.likes_count,
+            "comments_count": post.comments_count,
+            "shares_count": post.shares_count,
+            "is_trending": post.is_trending,
+            "created_at": post.created_at.isoformat() if post.created_at else None,
+            "updated_at": post.updated_at.isoformat() if post.updated_at else None
+        }
+        profile_data['recent_posts'].append(post_data)
+    
+    print(f"📊 User {user_id} profile served: {user.followers_count} followers, {user.following_count} following, {user.posts_count} posts")
+    
+    return profile_data
@@ -0,0 +1,32 @@
+"""
+Autocomplete schemas for IAP Connect application.
+Handles response validation for composer mention and hashtag suggestions.
+"""
+
+from pydantic import BaseModel
+
+
+class MentionSuggestion(BaseModel):
+    """
+    @mention suggestion.
+    
+    Attributes:
+        id: User ID
+        username: Username to insert after '@'
+        followers_count: Ranking weight
+    """
+    id: int
+    username: str
+    followers_count: int
+
+
+class HashtagSuggestion(BaseModel):
+    """
+    #hashtag suggestion.
+    
+    Attributes:
+        hashtag: Hashtag to insert after '#'
+        posts_count: Number of posts using it (ranking weight)
+    """
+    hashtag: str
+    posts_count: int
@@ -31,6 +31,7 @@ class CommentResponse(BaseModel):
         parent_id: Parent comment ID (if this is a reply)
         likes_count: Number of likes on this comment
         replies_count: Number of replies to this comment
+        depth: Nesting level (0 for top-level comments)
         created_at: Creation timestamp
         author: Comment author information
         is_liked: Whether current user liked this comment
@@ -41,6 +42,7 @@ class CommentResponse(BaseModel):
     parent_id: Optional[int] = None
     likes_count: int = 0
     replies_count: int = 0
+    depth: int = 0
     created_at: datetime
     author: UserPublic  # FIXED: Use UserPublic
     is_liked: Optional[bool] = False
@@ -62,6 +64,18 @@ class CommentListResponse(BaseModel):
     total: int
 
 
+class CommentThreadResponse(BaseModel):
+    """
+    Comment subtree response schema.
+    
+    Attributes:
+        comments: Descendants in depth-first display order
+        next_cursor: Cursor for the next page (None when the subtree is exhausted)
+    """
+    comments: List[CommentResponse]
+    next_cursor: Optional[str] = None
+
+
 class CommentLikeResponse(BaseModel):
     """
     Comment like response schema.
@@ -33,6 +33,7 @@ class FileUploadResponse(BaseModel):
     original_filename: str
     url: str
     thumbnail_url: Optional[str] = None
+    renditions: Optional[Dict[str, Dict[str, str]]] = None  # {rendition: {format: url}}
     file_size: int
     original_size: int
     content_type: str
@@ -41,6 +42,7 @@ class FileUploadResponse(BaseModel):
     file_hash: str
     folder: str
     upload_time: datetime
+    deduplicated: bool = False  # Bytes were already stored; existing files reused
     
     class Config:
         from_attributes = True
@@ -76,6 +78,8 @@ class FileInfo(BaseModel):
     mime_type: Optional[str] = None
     is_image: Optional[bool] = None
     url: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
     error: Optional[str] = None
 
 
@@ -100,6 +104,19 @@ class AvatarUploadResponse(FileUploadResponse):
             data['avatar_url'] = data['url']
         super().__init__(**data)
 
+class DirectUploadRequest(BaseModel):
+    """Request schema for a presigned direct-to-S3 upload slot"""
+    content_type: str
+    folder: str = "images"
+    size: Optional[int] = Field(None, gt=0)
+
+
+class DirectUploadFinalizeRequest(BaseModel):
+    """Request schema for finalizing a direct-to-S3 upload"""
+    key: str
+    wait: bool = False  # Render before responding instead of in the background
+
+
 class PostMediaUploadRequest(BaseModel):
     """Request schema for post media upload"""
     post_id: Optional[int] = None
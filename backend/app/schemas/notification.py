@@ -82,9 +82,12 @@ class NotificationResponse(NotificationBase):
     sender_id: Optional[int] = None
     is_read: bool
     created_at: datetime
+    updated_at: Optional[datetime] = None  # latest coalesced activity
     sender: Optional[UserBasicInfo] = None
     time_since_created: Optional[str] = None
     display_message: Optional[str] = None
+    actor_count: int = 1  # > 1 for coalesced notifications
+    recent_actor_ids: List[int] = []
 
     class Config:
         from_attributes = True
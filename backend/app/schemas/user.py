@@ -115,6 +115,16 @@ class UserSearchResponse(BaseModel):
     has_prev: bool
 
 
+class UserAutocompleteItem(BaseModel):
+    """Schema for autocomplete suggestions"""
+    id: int
+    username: str
+    full_name: str
+    profile_picture_url: Optional[str] = None
+    user_type: str
+    followers_count: int = 0
+
+
 # Follow schemas
 class FollowResponse(BaseModel):
     """Schema for follow action responses"""
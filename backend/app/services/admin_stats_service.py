@@ -0,0 +1,228 @@
+"""
+Admin statistics service for IAP Connect application.
+Computes the admin dashboard figures into a single-row snapshot table, so
+dashboard page views read one row instead of scanning every table.
+
+Row counts for the big tables (posts, comments, likes, follows) come from
+the planner's estimate in pg_class.reltuples on PostgreSQL, which is kept
+current by autovacuum/ANALYZE. Small or never-analyzed tables, and every
+table on other databases, are counted exactly.
+"""
+
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import desc, func, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload, load_only
+
+from ..config.settings import settings
+from ..models.admin_stats import AdminStatsSnapshot
+from ..models.user import User, UserType
+from ..models.post import Post
+from ..models.comment import Comment
+from ..models.like import Like
+from ..models.follow import Follow
+
+
+# Snapshot row ID (the table holds one row)
+SNAPSHOT_ID = 1
+
+# Tables counted from planner estimates, keyed by dashboard field
+ESTIMATED_TABLES = {
+    "total_posts": Post,
+    "total_comments": Comment,
+    "total_likes": Like,
+    "total_follows": Follow
+}
+
+# Estimates below this are replaced by an exact COUNT(*) (cheap at that size)
+EXACT_COUNT_THRESHOLD = 100000
+
+TOP_POSTS_LIMIT = 5
+MOST_FOLLOWED_LIMIT = 5
+
+
+def _table_estimates(db: Session) -> Dict[str, float]:
+    """Planner row estimates by table name (PostgreSQL only, empty elsewhere)."""
+    if db.get_bind().dialect.name != "postgresql":
+        return {}
+    table_names = [model.__tablename__ for model in ESTIMATED_TABLES.values()]
+    rows = db.execute(
+        text("SELECT relname, reltuples FROM pg_class WHERE relkind IN ('r', 'p') AND relname = ANY(:names)"),
+        {"names": table_names}
+    ).all()
+    return {relname: reltuples for relname, reltuples in rows}
+
+
+def _content_counts(db: Session) -> Tuple[Dict[str, int], List[str]]:
+    """
+    Row counts of the big tables.
+
+    Returns:
+        Tuple[Dict[str, int], List[str]]: Counts by dashboard field and the tables that were estimated
+    """
+    estimates = _table_estimates(db)
+    counts, estimated = {}, []
+    for field, model in ESTIMATED_TABLES.items():
+        estimate = estimates.get(model.__tablename__)
+        # reltuples is -1 (or 0) until the table is first analyzed
+        if estimate is not None and estimate >= EXACT_COUNT_THRESHOLD:
+            counts[field] = int(estimate)
+            estimated.append(model.__tablename__)
+        else:
+            counts[field] = db.query(func.count()).select_from(model).scalar() or 0
+    return counts, estimated
+
+
+def _user_counts(db: Session) -> Dict[str, int]:
+    """Exact user counts by type and activity in one grouped query."""
+    rows = db.query(
+        User.user_type,
+        func.count(User.id),
+        func.count(User.id).filter(User.is_active == True)
+    ).group_by(User.user_type).all()
+
+    by_type = {user_type: total for user_type, total, _ in rows}
+    return {
+        "total_users": sum(total for _, total, _ in rows),
+        "total_doctors": by_type.get(UserType.DOCTOR, 0),
+        "total_students": by_type.get(UserType.STUDENT, 0),
+        "total_admins": by_type.get(UserType.ADMIN, 0),
+        "active_users": sum(active for _, _, active in rows)
+    }
+
+
+def compute_admin_stats(db: Session) -> Tuple[dict, List[str]]:
+    """
+    Compute the admin dashboard payload.
+
+    Args:
+        db: Database session
+
+    Returns:
+        Tuple[dict, List[str]]: Dashboard stats and the tables whose counts were estimated
+    """
+    content_stats, estimated = _content_counts(db)
+
+    avg_likes, avg_comments = db.query(
+        func.avg(Post.likes_count),
+        func.avg(Post.comments_count)
+    ).one()
+
+    top_posts = db.query(Post).options(
+        load_only(Post.id, Post.content, Post.likes_count, Post.comments_count),
+        joinedload(Post.author).load_only(User.username)
+    ).order_by(
+        desc(func.coalesce(Post.likes_count, 0) + func.coalesce(Post.comments_count, 0))
+    ).limit(TOP_POSTS_LIMIT).all()
+
+    most_followed = db.query(User.id, User.username, User.full_name, User.followers_count).order_by(
+        desc(User.followers_count)
+    ).limit(MOST_FOLLOWED_LIMIT).all()
+
+    stats = {
+        "user_stats": _user_counts(db),
+        "content_stats": content_stats,
+        "engagement_metrics": {
+            "avg_likes_per_post": round(float(avg_likes or 0), 2),
+            "avg_comments_per_post": round(float(avg_comments or 0), 2)
+        },
+        "top_posts": [
+            {
+                "id": post.id,
+                "content": post.content[:100] + "..." if len(post.content) > 100 else post.content,
+                "likes_count": post.likes_count or 0,
+                "comments_count": post.comments_count or 0,
+                "author": post.author.username if post.author else "Unknown"
+            }
+            for post in top_posts
+        ],
+        "most_followed_users": [
+            {
+                "id": user.id,
+                "username": user.username,
+                "full_name": user.full_name,
+                "followers_count": user.followers_count or 0
+            }
+            for user in most_followed
+        ]
+    }
+    return stats, estimated
+
+
+def refresh_admin_stats(db: Session) -> AdminStatsSnapshot:
+    """
+    Recompute the snapshot and store it.
+
+    Args:
+        db: Database session
+
+    Returns:
+        AdminStatsSnapshot: The stored snapshot
+    """
+    started = time.monotonic()
+    stats, estimated = compute_admin_stats(db)
+    compute_ms = int((time.monotonic() - started) * 1000)
+
+    snapshot = db.get(AdminStatsSnapshot, SNAPSHOT_ID)
+    if snapshot is None:
+        snapshot = AdminStatsSnapshot(id=SNAPSHOT_ID)
+        db.add(snapshot)
+    snapshot.stats = stats
+    snapshot.estimated_tables = estimated
+    snapshot.computed_at = datetime.utcnow()
+    snapshot.compute_ms = compute_ms
+
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another worker created the row first; its snapshot is just as fresh
+        db.rollback()
+        snapshot = db.get(AdminStatsSnapshot, SNAPSHOT_ID)
+
+    print(f"✅ Admin stats snapshot refreshed in {compute_ms} ms")
+    return snapshot
+
+
+def refresh_admin_stats_if_stale(db: Session, max_age_seconds: Optional[float] = None) -> bool:
+    """
+    Refresh the snapshot unless another worker refreshed it recently.
+
+    Returns:
+        bool: Whether a refresh ran
+    """
+    if max_age_seconds is None:
+        max_age_seconds = settings.admin_stats_refresh_minutes * 60
+    computed_at = db.query(AdminStatsSnapshot.computed_at).filter(
+        AdminStatsSnapshot.id == SNAPSHOT_ID
+    ).scalar()
+    if computed_at is not None and (datetime.utcnow() - computed_at).total_seconds() < max_age_seconds:
+        return False
+    refresh_admin_stats(db)
+    return True
+
+
+def get_admin_stats(db: Session) -> dict:
+    """
+    Dashboard payload from the snapshot row (computed on first use).
+
+    Returns:
+        dict: Dashboard stats plus a "snapshot" entry with its age
+    """
+    snapshot = db.get(AdminStatsSnapshot, SNAPSHOT_ID)
+    if snapshot is None:
+        snapshot = refresh_admin_stats(db)
+
+    age_seconds = max((datetime.utcnow() - snapshot.computed_at).total_seconds(), 0)
+    return {
+        **snapshot.stats,
+        "snapshot": {
+            "computed_at": snapshot.computed_at.isoformat() + "Z",
+            "age_seconds": int(age_seconds),
+            "compute_ms": snapshot.compute_ms,
+            "estimated_tables": snapshot.estimated_tables or [],
+            "refresh_interval_minutes": settings.admin_stats_refresh_minutes
+        }
+    }
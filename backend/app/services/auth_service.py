@@ -9,6 +9,7 @@ from fastapi import HTTPException, status
 from ..models.user import User, UserType
 from ..schemas.auth import UserRegister, UserLogin
 from ..utils.security import get_password_hash, verify_password, create_access_token
+from .search_service import user_prefix_index
 
 
 def register_user(user_data: UserRegister, db: Session) -> User:
@@ -68,6 +69,7 @@ def register_user(user_data: UserRegister, db: Session) -> User:
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    user_prefix_index.upsert_user(new_user)
     
     print(f"✅ Created user: {new_user.username} ({new_user.user_type.value})")
     return new_user
@@ -3,16 +3,137 @@ Comment service for IAP Connect application.
 Handles comment-related business logic with replies and likes.
 """
 
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import desc, and_
+from sqlalchemy.orm import Session, joinedload, contains_eager
+from sqlalchemy import desc, and_, func
 from fastapi import HTTPException, status
-from typing import List, Dict
+from typing import List, Dict, Set, Iterable, Optional
 from ..models.user import User
 from ..models.post import Post
 from ..models.comment import Comment
 from ..models.comment_like import CommentLike
 from ..schemas.comment import CommentCreate, CommentResponse
 from ..schemas.user import UserPublic  # FIXED: Use UserPublic instead of UserSearchResponse
+from ..config.settings import settings
+from ..utils.cache import LRUCache
+
+
+# Number of replies previewed under each top-level comment
+REPLIES_PREVIEW_LIMIT = 3
+
+# Author columns needed for UserPublic (display_info uses user_type/specialty/college)
+AUTHOR_COLUMNS = (
+    User.id, User.username, User.full_name, User.bio, User.profile_picture_url,
+    User.user_type, User.specialty, User.college,
+    User.followers_count, User.following_count, User.posts_count
+)
+
+
+# Viewer-independent comment pages keyed by (post_id, page, size) and tagged with post_id
+comment_page_cache = LRUCache(
+    max_entries=settings.comment_cache_max_entries,
+    ttl_seconds=settings.comment_cache_ttl_seconds
+)
+
+
+def _comments_with_authors(db: Session):
+    """Comment query with the author joined and projected to the UserPublic columns."""
+    return db.query(Comment).join(Comment.author).options(
+        contains_eager(Comment.author).load_only(*AUTHOR_COLUMNS)
+    )
+
+
+def _author_public(author: User) -> UserPublic:
+    """Build the public author payload for a comment."""
+    return UserPublic(
+        id=author.id,
+        username=author.username,
+        full_name=author.full_name,
+        bio=author.bio,
+        profile_picture_url=author.profile_picture_url,
+        user_type=author.user_type,
+        display_info=author.display_info,
+        followers_count=author.followers_count,
+        following_count=author.following_count,
+        posts_count=author.posts_count,
+        is_following=False
+    )
+
+
+def _comment_response(comment: Comment, liked_ids: Set[int], replies: List[CommentResponse] = None) -> CommentResponse:
+    """Build a CommentResponse from a comment whose author is already loaded."""
+    return CommentResponse(
+        id=comment.id,
+        content=comment.content,
+        parent_id=comment.parent_id,
+        likes_count=comment.likes_count,
+        replies_count=comment.replies_count,
+        depth=comment.depth or 0,
+        created_at=comment.created_at,
+        author=_author_public(comment.author),
+        is_liked=comment.id in liked_ids,
+        replies=replies or []
+    )
+
+
+def get_liked_comment_ids(db: Session, user_id: int, comment_ids: Iterable[int]) -> Set[int]:
+    """
+    Get which of the given comments a user has liked, in one IN query.
+    
+    Args:
+        db: Database session
+        user_id: Current user ID
+        comment_ids: Comment IDs on the page
+        
+    Returns:
+        Set[int]: IDs of the comments the user liked
+    """
+    comment_ids = list(comment_ids)
+    if not user_id or not comment_ids:
+        return set()
+    
+    return {
+        row[0] for row in db.query(CommentLike.comment_id).filter(
+            and_(CommentLike.user_id == user_id, CommentLike.comment_id.in_(comment_ids))
+        ).all()
+    }
+
+
+def get_replies_preview(db: Session, parent_ids: List[int], limit: int = REPLIES_PREVIEW_LIMIT) -> Dict[int, List[Comment]]:
+    """
+    Get the first `limit` replies of every given comment in one query.
+    
+    Uses ROW_NUMBER() OVER (PARTITION BY parent_id) so the cost does not grow
+    with the number of comments on the page.
+    
+    Args:
+        db: Database session
+        parent_ids: Top-level comment IDs
+        limit: Replies per comment
+        
+    Returns:
+        Dict[int, List[Comment]]: Replies (oldest first) keyed by parent ID
+    """
+    if not parent_ids:
+        return {}
+    
+    ranked = db.query(
+        Comment.id.label("id"),
+        func.row_number().over(
+            partition_by=Comment.parent_id,
+            order_by=(Comment.created_at, Comment.id)
+        ).label("row_number")
+    ).filter(Comment.parent_id.in_(parent_ids)).subquery()
+    
+    replies = _comments_with_authors(db).join(
+        ranked, ranked.c.id == Comment.id
+    ).filter(
+        ranked.c.row_number <= limit
+    ).order_by(Comment.parent_id, ranked.c.row_number).all()
+    
+    replies_by_parent: Dict[int, List[Comment]] = {}
+    for reply in replies:
+        replies_by_parent.setdefault(reply.parent_id, []).append(reply)
+    return replies_by_parent
 
 
 def create_comment(user: User, post: Post, comment_data: CommentCreate, db: Session) -> CommentResponse:
@@ -28,33 +149,44 @@ def create_comment(user: User, post: Post, comment_data: CommentCreate, db: Sess
     Returns:
         CommentResponse: Newly created comment response
     """
+    parent_comment = None
+    if comment_data.parent_id:
+        parent_comment = db.query(Comment).filter(Comment.id == comment_data.parent_id).first()
+    
     new_comment = Comment(
         user_id=user.id,
         post_id=post.id,
         parent_id=comment_data.parent_id,
-        content=comment_data.content
+        content=comment_data.content,
+        depth=parent_comment.depth + 1 if parent_comment else 0
     )
     
     db.add(new_comment)
+    db.flush()  # Need the ID for the materialized path
+    
+    # Path extends the parent's path; left empty under a parent that has not been backfilled yet
+    if parent_comment is None:
+        new_comment.path = Comment.path_segment(new_comment.id)
+    elif parent_comment.path:
+        new_comment.path = parent_comment.path + Comment.path_segment(new_comment.id)
     
     # Update post comments count (only for top-level comments)
     if not comment_data.parent_id:
         post.comments_count += 1
-    else:
+    elif parent_comment:
         # Update parent comment replies count
-        parent_comment = db.query(Comment).filter(Comment.id == comment_data.parent_id).first()
-        if parent_comment:
-            parent_comment.replies_count += 1
+        parent_comment.replies_count += 1
     
     db.commit()
     db.refresh(new_comment)
     
-    return CommentResponse(
+    response = CommentResponse(
         id=new_comment.id,
         content=new_comment.content,
         parent_id=new_comment.parent_id,
         likes_count=new_comment.likes_count,
         replies_count=new_comment.replies_count,
+        depth=new_comment.depth,
         created_at=new_comment.created_at,
         author=UserPublic(  # FIXED: Use UserPublic
             id=user.id,
@@ -72,12 +204,71 @@ def create_comment(user: User, post: Post, comment_data: CommentCreate, db: Sess
         is_liked=False,
         replies=[]
     )
+    
+    if parent_comment is None:
+        # New top-level comment shifts every page window of the post
+        comment_page_cache.invalidate_tag(post.id)
+    else:
+        def add_reply(parent: CommentResponse):
+            parent.replies_count += 1
+            if parent.parent_id is None and len(parent.replies) < REPLIES_PREVIEW_LIMIT:
+                parent.replies.append(response.model_copy())
+        
+        _patch_cached_comment(post.id, parent_comment.id, add_reply)
+    
+    return response
+
+
+def _build_comment_page(post_id: int, db: Session, page: int, size: int) -> tuple[List[CommentResponse], int]:
+    """
+    Build the viewer-independent part of a comment page (is_liked left False).
+    
+    Runs a constant number of queries: count, comments with projected authors
+    and the replies preview for every comment (window function).
+    """
+    # Get top-level comments (no parent)
+    top_level_filter = and_(Comment.post_id == post_id, Comment.parent_id.is_(None))
+    
+    total = db.query(func.count(Comment.id)).filter(top_level_filter).scalar()
+    comments = _comments_with_authors(db).filter(
+        top_level_filter
+    ).order_by(desc(Comment.created_at)).offset((page - 1) * size).limit(size).all()
+    
+    # Recent replies for all comments on the page (limit 3 each)
+    replies_by_parent = get_replies_preview(db, [comment.id for comment in comments])
+    
+    comment_responses = []
+    for comment in comments:
+        replies_responses = [
+            _comment_response(reply, set())
+            for reply in replies_by_parent.get(comment.id, [])
+        ]
+        comment_responses.append(_comment_response(comment, set(), replies_responses))
+    
+    return comment_responses, total
+
+
+def _with_viewer_likes(comments: List[CommentResponse], liked_ids: Set[int]) -> List[CommentResponse]:
+    """Copy cached comments with the viewer's is_liked flags layered on top."""
+    return [
+        comment.model_copy(update={
+            "is_liked": comment.id in liked_ids,
+            "replies": [
+                reply.model_copy(update={"is_liked": reply.id in liked_ids})
+                for reply in comment.replies
+            ]
+        })
+        for comment in comments
+    ]
 
 
 def get_post_comments(post_id: int, db: Session, page: int = 1, size: int = 50, user_id: int = None) -> tuple[List[CommentResponse], int]:
     """
     Get top-level comments for a specific post with nested replies.
     
+    The first pages of a post are served from the in-process comment cache;
+    only the viewer's like state (one IN query) is computed per request.
+    
     Args:
         post_id: Post ID
         db: Database session
@@ -88,90 +279,39 @@ def get_post_comments(post_id: int, db: Session, page: int = 1, size: int = 50,
     Returns:
         Tuple[List[CommentResponse], int]: List of comments and total count
     """
-    # Get top-level comments (no parent)
-    comments_query = db.query(Comment).options(
-        joinedload(Comment.author)
-    ).filter(
-        and_(Comment.post_id == post_id, Comment.parent_id.is_(None))
-    ).order_by(desc(Comment.created_at))
+    cacheable = settings.comment_cache_enabled and page <= settings.comment_cache_max_pages
+    cache_key = (post_id, page, size)
     
-    total = comments_query.count()
-    comments = comments_query.offset((page - 1) * size).limit(size).all()
+    cached = comment_page_cache.get(cache_key) if cacheable else None
+    if cached is None:
+        comments, total = _build_comment_page(post_id, db, page, size)
+        cached = {"comments": comments, "total": total}
+        if cacheable:
+            comment_page_cache.set(
+                cache_key, cached,
+                size=sum(len(comment.model_dump_json()) for comment in comments),
+                tags=(post_id,)
+            )
     
-    comment_responses = []
-    for comment in comments:
-        # Check if current user liked this comment
-        is_liked = False
-        if user_id:
-            is_liked = db.query(CommentLike).filter(
-                and_(CommentLike.comment_id == comment.id, CommentLike.user_id == user_id)
-            ).first() is not None
-        
-        # Get recent replies (limit to 3 for performance)
-        recent_replies = db.query(Comment).options(
-            joinedload(Comment.author)
-        ).filter(
-            Comment.parent_id == comment.id
-        ).order_by(Comment.created_at).limit(3).all()
-        
-        replies_responses = []
-        for reply in recent_replies:
-            reply_is_liked = False
-            if user_id:
-                reply_is_liked = db.query(CommentLike).filter(
-                    and_(CommentLike.comment_id == reply.id, CommentLike.user_id == user_id)
-                ).first() is not None
-            
-            replies_responses.append(CommentResponse(
-                id=reply.id,
-                content=reply.content,
-                parent_id=reply.parent_id,
-                likes_count=reply.likes_count,
-                replies_count=reply.replies_count,
-                created_at=reply.created_at,
-                author=UserPublic(  # FIXED: Use UserPublic
-                    id=reply.author.id,
-                    username=reply.author.username,
-                    full_name=reply.author.full_name,
-                    bio=reply.author.bio,
-                    profile_picture_url=reply.author.profile_picture_url,
-                    user_type=reply.author.user_type,
-                    display_info=reply.author.display_info,
-                    followers_count=reply.author.followers_count,
-                    following_count=reply.author.following_count,
-                    posts_count=reply.author.posts_count,
-                    is_following=False
-                ),
-                is_liked=reply_is_liked,
-                replies=[]
-            ))
-        
-        comment_response = CommentResponse(
-            id=comment.id,
-            content=comment.content,
-            parent_id=comment.parent_id,
-            likes_count=comment.likes_count,
-            replies_count=comment.replies_count,
-            created_at=comment.created_at,
-            author=UserPublic(  # FIXED: Use UserPublic
-                id=comment.author.id,
-                username=comment.author.username,
-                full_name=comment.author.full_name,
-                bio=comment.author.bio,
-                profile_picture_url=comment.author.profile_picture_url,
-                user_type=comment.author.user_type,
-                display_info=comment.author.display_info,
-                followers_count=comment.author.followers_count,
-                following_count=comment.author.following_count,
-                posts_count=comment.author.posts_count,
-                is_following=False
-            ),
-            is_liked=is_liked,
-            replies=replies_responses
-        )
-        comment_responses.append(comment_response)
+    # Like state for every comment and reply on the page
+    with comment_page_cache.lock:
+        page_ids = [comment.id for comment in cached["comments"]]
+        page_ids.extend(reply.id for comment in cached["comments"] for reply in comment.replies)
+    liked_ids = get_liked_comment_ids(db, user_id, page_ids)
     
-    return comment_responses, total
+    with comment_page_cache.lock:
+        return _with_viewer_likes(cached["comments"], liked_ids), cached["total"]
+
+
+def _patch_cached_comment(post_id: int, comment_id: int, patch) -> int:
+    """Apply patch(comment_response) to a comment or preview reply in every cached page of a post."""
+    def patch_page(cached: Dict):
+        for comment in cached["comments"]:
+            for candidate in [comment, *comment.replies]:
+                if candidate.id == comment_id:
+                    patch(candidate)
+    
+    return comment_page_cache.patch_tag(post_id, patch_page)
 
 
 def get_comment_replies(comment_id: int, db: Session, page: int = 1, size: int = 20, user_id: int = None) -> tuple[List[CommentResponse], int]:
@@ -188,49 +328,61 @@ def get_comment_replies(comment_id: int, db: Session, page: int = 1, size: int =
     Returns:
         Tuple[List[CommentResponse], int]: List of reply comments and total count
     """
-    replies_query = db.query(Comment).options(
-        joinedload(Comment.author)
-    ).filter(
+    total = db.query(func.count(Comment.id)).filter(Comment.parent_id == comment_id).scalar()
+    replies = _comments_with_authors(db).filter(
         Comment.parent_id == comment_id
-    ).order_by(Comment.created_at)
+    ).order_by(Comment.created_at).offset((page - 1) * size).limit(size).all()
     
-    total = replies_query.count()
-    replies = replies_query.offset((page - 1) * size).limit(size).all()
+    liked_ids = get_liked_comment_ids(db, user_id, [reply.id for reply in replies])
     
-    replies_responses = []
-    for reply in replies:
-        # Check if current user liked this reply
-        is_liked = False
-        if user_id:
-            is_liked = db.query(CommentLike).filter(
-                and_(CommentLike.comment_id == reply.id, CommentLike.user_id == user_id)
-            ).first() is not None
+    return [_comment_response(reply, liked_ids) for reply in replies], total
+
+
+def get_comment_thread(comment_id: int, db: Session, max_depth: Optional[int] = None, after: Optional[str] = None,
+                       limit: int = 50, user_id: int = None) -> tuple[List[CommentResponse], Optional[str]]:
+    """
+    Get the subtree under a comment in depth-first display order.
+    
+    The subtree is one indexed range scan over the materialized path, so a
+    deep thread loads in a single query instead of one request per level.
+    
+    Args:
+        comment_id: Root comment ID (not included in the result)
+        db: Database session
+        max_depth: Only include descendants up to this many levels below the root
+        after: Continuation cursor returned by the previous page
+        limit: Maximum number of comments to return
+        user_id: Current user ID for like status
+        
+    Returns:
+        Tuple[List[CommentResponse], Optional[str]]: Flat list of descendants
+        (use depth for indentation) and the cursor for the next page, if any
         
-        replies_responses.append(CommentResponse(
-            id=reply.id,
-            content=reply.content,
-            parent_id=reply.parent_id,
-            likes_count=reply.likes_count,
-            replies_count=reply.replies_count,
-            created_at=reply.created_at,
-            author=UserPublic(  # FIXED: Use UserPublic
-                id=reply.author.id,
-                username=reply.author.username,
-                full_name=reply.author.full_name,
-                bio=reply.author.bio,
-                profile_picture_url=reply.author.profile_picture_url,
-                user_type=reply.author.user_type,
-                display_info=reply.author.display_info,
-                followers_count=reply.author.followers_count,
-                following_count=reply.author.following_count,
-                posts_count=reply.author.posts_count,
-                is_following=False
-            ),
-            is_liked=is_liked,
-            replies=[]
-        ))
-    
-    return replies_responses, total
+    Raises:
+        HTTPException: If the comment is not found or its path is not backfilled
+    """
+    root = get_comment_by_id(comment_id, db)
+    if not root.path:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Comment thread is not indexed yet"
+        )
+    
+    query = _comments_with_authors(db).filter(
+        Comment.path > (after if after and after > root.path else root.path),
+        Comment.path < root.subtree_upper_bound
+    )
+    if max_depth is not None:
+        query = query.filter(Comment.depth <= root.depth + max_depth)
+    
+    # Fetch one extra row to know whether another page exists
+    comments = query.order_by(Comment.path).limit(limit + 1).all()
+    next_cursor = comments[limit - 1].path if len(comments) > limit else None
+    comments = comments[:limit]
+    
+    liked_ids = get_liked_comment_ids(db, user_id, [comment.id for comment in comments])
+    
+    return [_comment_response(comment, liked_ids) for comment in comments], next_cursor
 
 
 def like_comment(comment: Comment, user: User, db: Session) -> Dict:
@@ -267,6 +419,9 @@ def like_comment(comment: Comment, user: User, db: Session) -> Dict:
     
     db.commit()
     
+    likes_count = comment.likes_count
+    _patch_cached_comment(comment.post_id, comment.id, lambda cached: setattr(cached, "likes_count", likes_count))
+    
     return {
         'liked': True,
         'likes_count': comment.likes_count
@@ -302,6 +457,9 @@ def unlike_comment(comment: Comment, user: User, db: Session) -> Dict:
     
     db.commit()
     
+    likes_count = comment.likes_count
+    _patch_cached_comment(comment.post_id, comment.id, lambda cached: setattr(cached, "likes_count", likes_count))
+    
     return {
         'liked': False,
         'likes_count': comment.likes_count
@@ -343,8 +501,20 @@ def delete_comment(comment: Comment, user: User, db: Session) -> bool:
         if parent_comment:
             parent_comment.replies_count = max(0, parent_comment.replies_count - 1)
     
-    db.delete(comment)
+    post_id = comment.post_id
+    if comment.path:
+        # Remove the whole subtree with range deletes instead of cascading level by level
+        subtree_filter = and_(Comment.path >= comment.path, Comment.path < comment.subtree_upper_bound)
+        subtree_ids = db.query(Comment.id).filter(subtree_filter)
+        db.query(CommentLike).filter(CommentLike.comment_id.in_(subtree_ids.scalar_subquery())).delete(synchronize_session=False)
+        db.query(Comment).filter(subtree_filter).delete(synchronize_session=False)
+        db.expunge(comment)
+    else:
+        db.delete(comment)
     db.commit()
+    
+    # Deleting may remove preview replies or shift page windows; rebuild on next read
+    comment_page_cache.invalidate_tag(post_id)
     return True
 
 
@@ -9,7 +9,8 @@ import os
 import uuid
 import aiofiles
 from fastapi import UploadFile, HTTPException, status
-from typing import List, Optional, Dict, Any
+from sqlalchemy.orm import Session
+from typing import List, Optional, Dict, Any, NamedTuple, Tuple, Union
 from pathlib import Path
 import hashlib
 from PIL import Image, ImageOps, ExifTags
@@ -19,6 +20,18 @@ import asyncio
 from datetime import datetime
 import shutil
 
+from ..config.settings import settings
+from .image_executor import image_executor
+from .media_index import (
+    media_file_row, record_media_files, forget_media_files,
+    get_media_file, media_file_info, image_dimensions
+)
+from .media_store import (
+    content_filename, find_media_object, acquire_media_object,
+    register_media_object, release_media_object
+)
+from .storage import StorageBackend, get_storage, storage_for_url
+
 
 # Configuration
 UPLOAD_FOLDER = "uploads"
@@ -30,6 +43,8 @@ ALLOWED_EXTENSIONS = {
     'all': ['jpg', 'jpeg', 'png', 'webp', 'gif', 'pdf', 'doc', 'docx', 'txt', 'mp4', 'avi', 'mov', 'webm']
 }
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB default
+UPLOAD_CHUNK_SIZE = 256 * 1024  # Bytes read per chunk while spooling an upload
+TEMP_FOLDER = "temp"  # Under UPLOAD_FOLDER; swept by cleanup_temp_files
 
 # MIME type mappings for security
 ALLOWED_MIME_TYPES = {
@@ -108,6 +123,219 @@ def generate_unique_filename(original_filename: str, folder: str = "", prefix: s
     return filename
 
 
+class Rendition(NamedTuple):
+    """One output size of an uploaded image."""
+    max_width: int
+    max_height: int
+    quality: int = 85
+    keep_format: bool = False  # Keep PNG/GIF sources in their own format instead of JPEG
+
+
+# Renditions produced per upload folder (thumbnails only when requested)
+RENDITION_PRESETS = {
+    'avatars': {
+        'main': Rendition(400, 400, quality=90, keep_format=True),
+        'thumbnail': Rendition(150, 150, quality=80)
+    },
+    'default': {
+        'main': Rendition(1200, 1200, quality=85, keep_format=True),
+        'thumbnail': Rendition(150, 150, quality=80)
+    }
+}
+
+# Rendition output format -> Content-Type
+RENDITION_CONTENT_TYPES = {
+    'jpg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'webp': 'image/webp'
+}
+
+# Orientations (EXIF tag 274) that swap width and height
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+def _fit_size(size: tuple, max_width: int, max_height: int) -> tuple:
+    """Largest size within the box keeping the aspect ratio (never upscales)."""
+    width, height = size
+    scale = min(max_width / width, max_height / height, 1.0)
+    return max(round(width * scale), 1), max(round(height * scale), 1)
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """Composite transparent images onto white (for JPEG compatibility)."""
+    if image.mode not in ('RGBA', 'LA', 'P'):
+        return image if image.mode in ('RGB', 'L') else image.convert('RGB')
+    if image.mode == 'P':
+        image = image.convert('RGBA')
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.split()[-1])
+    return background
+
+
+def _encode(image: Image.Image, rendition: Rendition, source_format: str, webp: bool) -> Dict[str, bytes]:
+    """Encode one rendition; the primary format comes first."""
+    encoded = {}
+    output = io.BytesIO()
+    if rendition.keep_format and source_format in ('PNG', 'GIF'):
+        image.save(output, format=source_format, optimize=True)
+        encoded[source_format.lower()] = output.getvalue()
+    else:
+        image.save(output, format='JPEG', quality=rendition.quality, optimize=True)
+        encoded['jpg'] = output.getvalue()
+
+    if webp:
+        output = io.BytesIO()
+        image.save(output, format='WEBP', quality=rendition.quality, method=4)
+        encoded['webp'] = output.getvalue()
+    return encoded
+
+
+def rendition_filename(filename: str, rendition: str = 'main', extension: Optional[str] = None) -> str:
+    """
+    Stored filename of an image rendition.
+    
+    'posts/a.jpg' -> 'posts/thumb_a.jpg' (thumbnail), 'posts/a.webp' (main, webp),
+    'posts/thumb_a.webp' (thumbnail, webp).
+    """
+    folder, _, name = filename.rpartition('/')
+    if rendition == 'thumbnail':
+        name = f"thumb_{name}"
+    elif rendition != 'main':
+        name = f"{rendition}_{name}"
+    if extension:
+        name = f"{name.rsplit('.', 1)[0]}.{extension}"
+    return f"{folder}/{name}" if folder else name
+
+
+def rendition_storage_keys(filename: str, outputs: Dict[str, Dict[str, bytes]]) -> Dict[str, tuple]:
+    """
+    Stored key of every encoded rendition from render_renditions.
+    
+    The main rendition's primary format takes the upload's own filename. A
+    WebP copy whose key would be that of the primary format (a .webp upload)
+    is skipped, so it never overwrites the primary.
+    
+    Returns:
+        Dict[str, tuple]: (rendition, format) by key
+    """
+    keys = {}
+    for name, encoded in outputs.items():
+        for position, output_format in enumerate(encoded):
+            if name == 'main' and position == 0:
+                key = filename
+            else:
+                key = rendition_filename(filename, name, None if position == 0 else output_format)
+            keys.setdefault(key, (name, output_format))
+    return keys
+
+
+def rendition_urls(rendition_keys: Dict[str, tuple], urls: Dict[str, str]) -> Tuple[Dict[str, Dict[str, str]], Optional[str]]:
+    """
+    URLs of stored renditions by rendition and format, plus the thumbnail URL.
+    
+    Args:
+        rendition_keys: (rendition, format) by key, from rendition_storage_keys
+        urls: Public URL by stored key
+    
+    Returns:
+        Tuple[Dict[str, Dict[str, str]], Optional[str]]: Rendition URLs and the thumbnail URL (None without one)
+    """
+    by_rendition = {}
+    for key, (name, output_format) in rendition_keys.items():
+        by_rendition.setdefault(name, {})[output_format] = urls[key]
+    thumbnail_url = next(iter(by_rendition['thumbnail'].values())) if 'thumbnail' in by_rendition else None
+    return by_rendition, thumbnail_url
+
+
+def rendition_index_rows(storage_name: str, rendition_keys: Dict[str, tuple], outputs: Dict[str, Dict[str, bytes]],
+                         urls: Dict[str, str], owner_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Media index rows of the renditions written under rendition_keys."""
+    rows = []
+    for key, (name, output_format) in rendition_keys.items():
+        data = outputs[name][output_format]
+        width, height = image_dimensions(data)
+        rows.append(media_file_row(
+            storage_name, key, urls[key], len(data),
+            content_type=RENDITION_CONTENT_TYPES.get(output_format),
+            rendition=name,
+            width=width,
+            height=height,
+            owner_id=owner_id,
+            file_hash=hashlib.sha256(data).hexdigest()
+        ))
+    return rows
+
+
+def stored_rendition_keys(filename: str) -> List[str]:
+    """Keys that renditions of a stored file may have been written under (main file excluded)."""
+    keys = [
+        rendition_filename(filename, rendition, extension)
+        for rendition, extension in (('thumbnail', None), ('main', 'webp'), ('thumbnail', 'webp'))
+    ]
+    # Thumbnails from before renditions were stored next to the file
+    keys.append(f"thumb_{filename}")
+    return keys
+
+
+def render_renditions(image_source: Union[bytes, str], renditions: Dict[str, Rendition], webp: bool = False) -> Dict[str, Dict[str, bytes]]:
+    """
+    Produce every rendition of an image from a single decode.
+    
+    JPEGs are decoded at the smallest DCT scale (1/2, 1/4, 1/8) that still
+    covers the largest rendition, EXIF orientation is applied once, and each
+    smaller rendition is resized from the previous one (Pillow reduce()
+    first, then Lanczos).
+    
+    Args:
+        image_source: Raw image bytes, or the path of a spooled upload
+        renditions: Rendition specs by name
+        webp: Also encode every rendition as WebP
+    
+    Returns:
+        dict: {rendition name: {format extension: bytes}}, primary format first
+    
+    Raises:
+        Exception: If the image cannot be decoded
+    """
+    image = Image.open(io.BytesIO(image_source) if isinstance(image_source, bytes) else image_source)
+    source_format = image.format
+    transposed = image.getexif().get(ExifTags.Base.Orientation) in _TRANSPOSED_ORIENTATIONS
+    
+    # Oriented size the renditions are fitted to
+    width, height = image.size
+    oriented_size = (height, width) if transposed else (width, height)
+    targets = {
+        name: _fit_size(oriented_size, rendition.max_width, rendition.max_height)
+        for name, rendition in renditions.items()
+    }
+    
+    if source_format == 'JPEG' and targets:
+        largest = max(targets.values(), key=lambda size: size[0] * size[1])
+        image.draft(image.mode, largest[::-1] if transposed else largest)
+    
+    ImageOps.exif_transpose(image, in_place=True)
+    base = _flatten(image)
+    
+    # Largest first, so each rendition is resized from the smallest image that covers it
+    outputs = {}
+    source = base
+    for name in sorted(targets, key=lambda name: -(targets[name][0] * targets[name][1])):
+        size = _fit_size(base.size, renditions[name].max_width, renditions[name].max_height)
+        if size[0] > source.width or size[1] > source.height:
+            source = base
+        if size != source.size:
+            source = source.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        outputs[name] = _encode(source, renditions[name], source_format, webp)
+    
+    return {name: outputs[name] for name in renditions}
+
+
+def _primary(encoded: Dict[str, bytes]) -> bytes:
+    """Primary-format bytes of an encoded rendition."""
+    return next(iter(encoded.values()))
+
+
 def optimize_image(image_data: bytes, max_width: int = 1200, max_height: int = 1200, quality: int = 85) -> bytes:
     """
     Optimize image for web usage by resizing and compressing.
@@ -119,90 +347,43 @@ def optimize_image(image_data: bytes, max_width: int = 1200, max_height: int = 1
         quality: JPEG quality (1-100)
     
     Returns:
-        bytes: Optimized image data
+        bytes: Optimized image data (PNG/GIF stay in their format, others become JPEG)
     """
     try:
-        # Open image
-        image = Image.open(io.BytesIO(image_data))
-        
-        # Fix image orientation based on EXIF data
-        try:
-            for orientation in ExifTags.TAGS.keys():
-                if ExifTags.TAGS[orientation] == 'Orientation':
-                    break
-            
-            exif = image._getexif()
-            if exif is not None:
-                orientation_value = exif.get(orientation)
-                if orientation_value == 3:
-                    image = image.rotate(180, expand=True)
-                elif orientation_value == 6:
-                    image = image.rotate(270, expand=True)
-                elif orientation_value == 8:
-                    image = image.rotate(90, expand=True)
-        except (AttributeError, KeyError, TypeError):
-            pass
-        
-        # Convert to RGB if needed (for JPEG compatibility)
-        if image.mode in ('RGBA', 'LA', 'P'):
-            # Create white background for transparency
-            background = Image.new('RGB', image.size, (255, 255, 255))
-            if image.mode == 'P':
-                image = image.convert('RGBA')
-            if 'A' in image.mode:
-                background.paste(image, mask=image.split()[-1])
-            else:
-                background.paste(image)
-            image = background
-        
-        # Resize if needed (maintain aspect ratio)
-        if image.width > max_width or image.height > max_height:
-            image.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-        
-        # Save optimized image
-        output = io.BytesIO()
-        
-        # Use original format if it's PNG/GIF, otherwise JPEG
-        original_format = Image.open(io.BytesIO(image_data)).format
-        if original_format in ['PNG', 'GIF']:
-            if original_format == 'PNG':
-                image.save(output, format='PNG', optimize=True)
-            else:
-                image.save(output, format='GIF', optimize=True)
-        else:
-            image.save(output, format='JPEG', quality=quality, optimize=True)
-        
-        return output.getvalue()
-    
+        rendition = Rendition(max_width, max_height, quality=quality, keep_format=True)
+        return _primary(render_renditions(image_data, {'main': rendition})['main'])
     except Exception as e:
         print(f"Image optimization failed: {str(e)}")
         # If optimization fails, return original data
         return image_data
 
 
+def optimize_image_jpeg(image_data: bytes, max_width: int = 1200, max_height: int = 1200, quality: int = 85) -> bytes:
+    """
+    Optimize image for web as JPEG (used for S3 uploads).
+    
+    Args:
+        image_data: Raw image bytes
+        max_width: Maximum width for the image
+        max_height: Maximum height for the image
+        quality: JPEG quality (1-100)
+    
+    Returns:
+        bytes: Optimized JPEG data, or the original bytes if optimization fails
+    """
+    try:
+        rendition = Rendition(max_width, max_height, quality=quality)
+        return _primary(render_renditions(image_data, {'main': rendition})['main'])
+    except Exception as e:
+        print(f"Image optimization failed: {e}")
+        return image_data
+
+
 def create_thumbnail(image_data: bytes, size: tuple = (150, 150)) -> bytes:
     """Create thumbnail version of image"""
     try:
-        image = Image.open(io.BytesIO(image_data))
-        
-        # Create thumbnail maintaining aspect ratio
-        image.thumbnail(size, Image.Resampling.LANCZOS)
-        
-        # Convert to RGB if needed
-        if image.mode in ('RGBA', 'LA', 'P'):
-            background = Image.new('RGB', image.size, (255, 255, 255))
-            if image.mode == 'P':
-                image = image.convert('RGBA')
-            if 'A' in image.mode:
-                background.paste(image, mask=image.split()[-1])
-            else:
-                background.paste(image)
-            image = background
-        
-        output = io.BytesIO()
-        image.save(output, format='JPEG', quality=80, optimize=True)
-        return output.getvalue()
-    
+        rendition = Rendition(size[0], size[1], quality=80)
+        return _primary(render_renditions(image_data, {'thumbnail': rendition})['thumbnail'])
     except Exception as e:
         print(f"Thumbnail creation failed: {str(e)}")
         return image_data
@@ -233,22 +414,140 @@ async def save_uploaded_file(content: bytes, filename: str) -> str:
     return str(file_path)
 
 
+class SpooledUpload(NamedTuple):
+    """An upload copied to uploads/temp."""
+    path: Path
+    size: int
+    md5: str
+    sha256: str  # Content address (see media_store)
+
+
+def _file_too_large(max_size: int) -> HTTPException:
+    """413 error for an upload over max_size."""
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File too large. Maximum size is {max_size // (1024*1024)}MB"
+    )
+
+
+def get_upload_size(file: UploadFile) -> int:
+    """Size of an upload without reading it (from the multipart parser, or by seeking its spool file)."""
+    if file.size is not None:
+        return file.size
+    position = file.file.tell()
+    file.file.seek(0, 2)
+    size = file.file.tell()
+    file.file.seek(position)
+    return size
+
+
+async def spool_upload(file: UploadFile, max_size: int) -> SpooledUpload:
+    """
+    Copy an upload to uploads/temp in chunks, hashing it (MD5 and SHA-256) as it streams.
+    
+    Only one chunk is held in memory at a time, and the copy stops as soon
+    as the running size passes max_size. The caller must delete the spooled
+    file if it is still there (StorageBackend.put_file may move it into place).
+    
+    Args:
+        file: FastAPI UploadFile object
+        max_size: Maximum allowed file size in bytes
+    
+    Returns:
+        SpooledUpload: Temp file path, size and hashes
+    
+    Raises:
+        HTTPException: 413 if the file is over max_size, 400 if it is empty
+    """
+    # The multipart parser already knows the part size; fail before copying anything
+    if file.size is not None and file.size > max_size:
+        raise _file_too_large(max_size)
+    
+    ensure_upload_directory()
+    temp_path = Path(UPLOAD_FOLDER) / TEMP_FOLDER / f"{uuid.uuid4().hex}.part"
+    digest = hashlib.md5()
+    content_digest = hashlib.sha256()
+    size = 0
+    
+    try:
+        await file.seek(0)
+        async with aiofiles.open(temp_path, 'wb') as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise _file_too_large(max_size)
+                digest.update(chunk)
+                content_digest.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    
+    if size == 0:
+        temp_path.unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Empty file not allowed"
+        )
+    
+    return SpooledUpload(temp_path, size, digest.hexdigest(), content_digest.hexdigest())
+
+
+def _deduplicated_result(media, file: UploadFile, upload: SpooledUpload, extension: str, is_image: bool, folder: str) -> Dict[str, Any]:
+    """upload_file result for an upload whose bytes were already stored."""
+    return {
+        'success': True,
+        'filename': media.key,
+        'original_filename': file.filename,
+        'url': media.url,
+        'thumbnail_url': media.thumbnail_url,
+        'renditions': media.renditions,
+        'file_path': media.key,
+        'file_size': media.size,
+        'original_size': upload.size,
+        'content_type': file.content_type,
+        'extension': extension,
+        'is_image': is_image,
+        'file_hash': upload.md5,
+        'folder': folder,
+        'storage': media.storage,
+        'upload_time': datetime.now().isoformat(),
+        'deduplicated': True
+    }
+
+
 async def upload_file(
     file: UploadFile, 
     folder: str = "general",
     optimize_images: bool = True,
     max_size: int = MAX_FILE_SIZE,
-    should_create_thumbnail: bool = False
+    should_create_thumbnail: bool = False,
+    db: Optional[Session] = None,
+    storage: Optional[StorageBackend] = None,
+    owner_id: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Complete file upload workflow with validation and optimization.
     
+    The upload is spooled and hashed, images are rendered once in the image
+    process pool, and every file is written through the storage backend.
+    
+    With a database session and settings.enable_duplicate_detection, files
+    are stored content-addressed and a re-upload of bytes already stored in
+    the folder reuses them without processing or writing anything.
+    
+    With a database session every stored file is also added to the media
+    index (media_files) for stats and file info.
+    
     Args:
         file: FastAPI UploadFile object
         folder: Subfolder for organization
         optimize_images: Whether to optimize image files
         max_size: Maximum allowed file size in bytes
         should_create_thumbnail: Whether to create thumbnail for images
+        db: Database session for the content-addressed store and media index
+        storage: Storage backend (default: the configured backend)
+        owner_id: Uploading user, recorded in the media index
     
     Returns:
         dict: Upload result with file info and URLs
@@ -269,59 +568,105 @@ async def upload_file(
             detail=f"Invalid file type: {file.content_type}"
         )
     
-    # Read file content
-    content = await file.read()
-    file_size = len(content)
+    storage = storage or get_storage()
     
-    # Check file size
-    if file_size > max_size:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"File too large. Maximum size is {max_size // (1024*1024)}MB"
-        )
-    
-    # Check if file is empty
-    if file_size == 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Empty file not allowed"
-        )
+    # Stream to a temp file with a running size cap (never fully buffered)
+    upload = await spool_upload(file, max_size)
     
     try:
-        # Generate unique filename
-        unique_filename = generate_unique_filename(file.filename, folder)
-        
         # Get file extension and type
         extension = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
         is_image = extension in ALLOWED_EXTENSIONS['images']
+        wants_thumbnail = is_image and optimize_images and should_create_thumbnail
         
-        # Process image if needed
-        processed_content = content
-        thumbnail_url = None
+        deduplicate = db is not None and settings.enable_duplicate_detection
+        if deduplicate:
+            media = find_media_object(db, storage.name, folder, upload.sha256)
+            if (media is not None
+                    and (media.thumbnail_url or not wants_thumbnail)
+                    and await storage.stat(media.key) is not None
+                    and acquire_media_object(db, media)):
+                print(f"♻️ Duplicate upload reused: {media.key} ({media.ref_count} references)")
+                return _deduplicated_result(media, file, upload, extension, is_image, folder)
+            unique_filename = content_filename(folder, upload.sha256, extension)
+        else:
+            # Generate unique filename
+            unique_filename = generate_unique_filename(file.filename, folder)
         
+        # Process image if needed
+        outputs = {}
         if is_image and optimize_images:
-            # Optimize main image
-            if folder == 'avatars':
-                processed_content = optimize_image(image_data=content, max_width=400, max_height=400, quality=90)
-            else:
-                processed_content = optimize_image(image_data=content, max_width=1200, max_height=1200, quality=85)
+            # Every rendition comes from one decode of the spooled file in the image process pool
+            preset = RENDITION_PRESETS.get(folder, RENDITION_PRESETS['default'])
+            renditions = {'main': preset['main']}
+            if should_create_thumbnail:
+                renditions['thumbnail'] = preset['thumbnail']
             
+            try:
+                outputs = await image_executor.run(
+                    render_renditions, str(upload.path.resolve()), renditions, settings.image_webp_renditions
+                )
+            except HTTPException:
+                raise
+            except Exception as e:
+                # Undecodable image: store the original file without renditions
+                print(f"Image optimization failed: {str(e)}")
         
-            # Create thumbnail if requested
-            if should_create_thumbnail:
-                thumbnail_content = create_thumbnail(image_data=content)
-                thumbnail_filename = f"thumb_{unique_filename}"
-                await save_uploaded_file(thumbnail_content, thumbnail_filename)
-                thumbnail_url = f"{STATIC_URL_PREFIX}/{thumbnail_filename}"
+        # The main rendition is stored under the upload's own filename
+        rendition_keys = rendition_storage_keys(unique_filename, outputs)
+        writes = [
+            storage.put(key, outputs[name][output_format], RENDITION_CONTENT_TYPES.get(output_format))
+            for key, (name, output_format) in rendition_keys.items()
+        ]
+        original_dimensions = (None, None)
+        if not outputs:
+            if db is not None and is_image:
+                # Read before the write, which may move the spooled file
+                original_dimensions = image_dimensions(upload.path)
+            # Documents (and unprocessed images) are stored as uploaded
+            writes.append(storage.put_file(unique_filename, upload.path, file.content_type))
+        urls = dict(zip([*rendition_keys, unique_filename], await asyncio.gather(*writes)))
         
-        # Save main file
-        file_path = await save_uploaded_file(processed_content, unique_filename)
+        stored_renditions, thumbnail_url = rendition_urls(rendition_keys, urls)
+        
+        if outputs:
+            processed_content = _primary(outputs['main'])
+            stored_size = len(processed_content)
+            # Calculate file hash for duplicate detection
+            file_hash = hashlib.md5(processed_content).hexdigest()
+        else:
+            stored_size = upload.size
+            file_hash = upload.md5
         
         # Generate public URL
-        public_url = f"{STATIC_URL_PREFIX}/{unique_filename}"
+        public_url = urls[unique_filename]
         
-        # Calculate file hash for duplicate detection
-        file_hash = hashlib.md5(processed_content).hexdigest()
+        if deduplicate:
+            register_media_object(
+                db, storage.name, folder, upload.sha256,
+                key=unique_filename,
+                url=public_url,
+                thumbnail_url=thumbnail_url,
+                renditions=stored_renditions or None,
+                content_type=file.content_type,
+                size=stored_size,
+                original_size=upload.size
+            )
+        
+        if db is not None:
+            index_rows = rendition_index_rows(storage.name, rendition_keys, outputs, urls, owner_id)
+            if not outputs:
+                width, height = original_dimensions
+                index_rows.append(media_file_row(
+                    storage.name, unique_filename, public_url, upload.size,
+                    content_type=file.content_type,
+                    rendition='main' if is_image else None,
+                    width=width,
+                    height=height,
+                    owner_id=owner_id,
+                    file_hash=upload.sha256
+                ))
+            record_media_files(db, index_rows)
         
         # Return comprehensive file info
         return {
@@ -330,32 +675,40 @@ async def upload_file(
             'original_filename': file.filename,
             'url': public_url,
             'thumbnail_url': thumbnail_url,
-            'file_path': file_path,
-            'file_size': len(processed_content),
-            'original_size': file_size,
+            'renditions': stored_renditions or None,
+            'file_path': unique_filename,
+            'file_size': stored_size,
+            'original_size': upload.size,
             'content_type': file.content_type,
             'extension': extension,
             'is_image': is_image,
             'file_hash': file_hash,
             'folder': folder,
-            'upload_time': datetime.now().isoformat()
+            'storage': storage.name,
+            'upload_time': datetime.now().isoformat(),
+            'deduplicated': False
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"File upload error: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"File upload failed: {str(e)}"
         )
+    finally:
+        upload.path.unlink(missing_ok=True)
 
 
-async def upload_avatar(file: UploadFile, user_id: int) -> Dict[str, Any]:
+async def upload_avatar(file: UploadFile, user_id: int, db: Optional[Session] = None) -> Dict[str, Any]:
     """
     Upload user avatar with specific optimizations.
     
     Args:
         file: FastAPI UploadFile object
-        user_id: User ID for filename prefix
+        user_id: User ID, recorded as the owner in the media index
+        db: Database session for the content-addressed store and media index
     
     Returns:
         dict: Upload result with avatar URLs
@@ -381,19 +734,22 @@ async def upload_avatar(file: UploadFile, user_id: int) -> Dict[str, Any]:
         folder="avatars",
         optimize_images=True,
         max_size=2 * 1024 * 1024,
-        should_create_thumbnail=True
+        should_create_thumbnail=True,
+        db=db,
+        owner_id=user_id
     )
     
     return result
 
 
-async def upload_post_media(files: List[UploadFile], user_id: int) -> List[Dict[str, Any]]:
+async def upload_post_media(files: List[UploadFile], user_id: int, db: Optional[Session] = None) -> List[Dict[str, Any]]:
     """
     Upload multiple media files for a post.
     
     Args:
         files: List of FastAPI UploadFile objects
-        user_id: User ID for filename prefix
+        user_id: User ID, recorded as the owner in the media index
+        db: Database session for the content-addressed store and media index
     
     Returns:
         list: List of upload results
@@ -422,7 +778,9 @@ async def upload_post_media(files: List[UploadFile], user_id: int) -> List[Dict[
                 folder="posts",
                 optimize_images=is_image,
                 max_size=max_size,
-                should_create_thumbnail=is_image
+                should_create_thumbnail=is_image,
+                db=db,
+                owner_id=user_id
             )
             
             results.append(result)
@@ -439,74 +797,133 @@ async def upload_post_media(files: List[UploadFile], user_id: int) -> List[Dict[
     return results
 
 
-async def delete_file(file_path: str) -> bool:
+async def delete_files(
+    file_paths: List[str],
+    db: Optional[Session] = None,
+    storage: Optional[StorageBackend] = None
+) -> Dict[str, bool]:
     """
-    Delete a file from the upload directory.
+    Delete uploaded files and their renditions in bulk.
+    
+    Files are grouped by storage and each group goes out as one
+    delete_many call (S3 DeleteObjects batches, concurrent local unlinks).
+    Content-addressed files shared by other uploads only lose a reference;
+    they are removed with the last one. Removed files are dropped from the
+    media index.
     
     Args:
-        file_path: Path to the file (relative to upload directory or full URL)
+        file_paths: Storage keys or public URLs of the files
+        db: Database session for the content-addressed store and media index
+        storage: Storage backend (default: the one each URL points into)
     
     Returns:
-        bool: True if file was deleted successfully
+        dict: True/False per file path (False if the file was not found or could not be deleted)
     """
-    try:
-        # Handle both relative paths and full URLs
-        if file_path.startswith(STATIC_URL_PREFIX):
-            file_path = file_path[len(STATIC_URL_PREFIX):].lstrip('/')
+    groups: Dict[str, tuple] = {}
+    for file_path in file_paths:
+        target = storage or storage_for_url(file_path)
+        groups.setdefault(target.name, (target, {}))[1][file_path] = target.key_from_url(file_path)
+    
+    results = {}
+    # Resized variants served from /static/img (imported here: image_resizer imports this module)
+    from .image_resizer import resized_image_cache
+    
+    for target, keys_by_path in groups.values():
+        to_delete = {}
+        for file_path, key in keys_by_path.items():
+            if db is not None:
+                remaining = release_media_object(db, target.name, key)
+                if remaining:
+                    print(f"♻️ Released shared upload {key} ({remaining} references left)")
+                    results[file_path] = True
+                    continue
+            to_delete[file_path] = key
+        if not to_delete:
+            continue
         
-        full_path = Path(UPLOAD_FOLDER) / file_path
+        # Also delete the thumbnail/WebP renditions if they exist
+        keys = list(to_delete.values())
+        all_keys = keys + [rendition_key for key in keys for rendition_key in stored_rendition_keys(key)]
+        deleted = await target.delete_many(all_keys)
+        if db is not None:
+            # Also when a file was already gone, so the index does not keep a stale row
+            forget_media_files(db, target.name, all_keys)
         
-        if full_path.exists() and full_path.is_file():
-            full_path.unlink()
-            
-            # Also try to delete thumbnail if it exists
-            thumbnail_path = full_path.parent / f"thumb_{full_path.name}"
-            if thumbnail_path.exists():
-                thumbnail_path.unlink()
-            
-            return True
-        return False
+        for file_path, key in to_delete.items():
+            results[file_path] = deleted.get(key, False)
+        await asyncio.gather(*(resized_image_cache.discard(key) for key in keys if deleted.get(key)))
+    
+    return results
+
+
+async def delete_file(file_path: str, db: Optional[Session] = None, storage: Optional[StorageBackend] = None) -> bool:
+    """
+    Delete an uploaded file and its renditions (see delete_files).
+    
+    Args:
+        file_path: Storage key or public URL of the file
+        db: Database session for the content-addressed store and media index
+        storage: Storage backend (default: the one the URL points into)
+    
+    Returns:
+        bool: True if file was deleted successfully
+    """
+    try:
+        return (await delete_files([file_path], db=db, storage=storage))[file_path]
     except Exception as e:
         print(f"Error deleting file {file_path}: {str(e)}")
         return False
 
 
-def get_file_info(file_path: str) -> Dict[str, Any]:
+async def get_file_info(
+    file_path: str,
+    storage: Optional[StorageBackend] = None,
+    db: Optional[Session] = None
+) -> Dict[str, Any]:
     """
     Get information about an uploaded file.
     
+    With a database session the media index is consulted first (one
+    primary-key lookup); storage is only asked about unindexed files.
+    
     Args:
-        file_path: Path to the file
+        file_path: Storage key or public URL of the file
+        storage: Storage backend (default: the one the URL points into)
+        db: Database session for the media index
     
     Returns:
         dict: File information including size, type, etc.
     """
     try:
-        # Handle both relative paths and full URLs
-        if file_path.startswith(STATIC_URL_PREFIX):
-            file_path = file_path[len(STATIC_URL_PREFIX):].lstrip('/')
+        storage = storage or storage_for_url(file_path)
+        key = storage.key_from_url(file_path)
+        if db is not None:
+            media = get_media_file(db, storage.name, key)
+            if media is not None:
+                return media_file_info(media)
         
-        full_path = Path(UPLOAD_FOLDER) / file_path
+        stored = await storage.stat(key)
         
-        if not full_path.exists():
+        if stored is None:
             return {'exists': False}
         
-        stat = full_path.stat()
-        
         # Get MIME type
-        mime_type, _ = mimetypes.guess_type(str(full_path))
+        mime_type = stored.content_type or mimetypes.guess_type(stored.key)[0]
+        filename = stored.key.rsplit('/', 1)[-1]
+        extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        modified = datetime.fromtimestamp(stored.modified).isoformat()
         
         return {
             'exists': True,
-            'filename': full_path.name,
-            'size': stat.st_size,
-            'size_mb': round(stat.st_size / (1024 * 1024), 2),
-            'created': datetime.fromtimestamp(stat.st_ctime).isoformat(),
-            'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
-            'extension': full_path.suffix.lower().lstrip('.'),
+            'filename': filename,
+            'size': stored.size,
+            'size_mb': round(stored.size / (1024 * 1024), 2),
+            'created': modified,
+            'modified': modified,
+            'extension': extension,
             'mime_type': mime_type,
-            'is_image': full_path.suffix.lower().lstrip('.') in ALLOWED_EXTENSIONS['images'],
-            'url': f"{STATIC_URL_PREFIX}/{file_path}"
+            'is_image': extension in ALLOWED_EXTENSIONS['images'],
+            'url': stored.url
         }
     except Exception as e:
         print(f"Error getting file info for {file_path}: {str(e)}")
@@ -0,0 +1,181 @@
+"""
+Image processing executor for IAP Connect application.
+Runs Pillow work (decode, resize, encode) in a process pool so a large upload
+never blocks the event loop or holds the GIL in the API worker.
+
+Jobs are admitted through a bounded queue. When the pool and queue are both
+full, callers wait up to image_queue_timeout_seconds for a slot and then get a
+503 with Retry-After, instead of piling up unbounded work in memory.
+
+Functions submitted must be module-level (picklable), e.g.
+file_service.render_renditions. The pool uses the "spawn" start method so
+workers never inherit the API process's threads or database connections.
+"""
+
+import asyncio
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, status
+
+from ..config.settings import settings
+
+
+# Recent job timings kept for the percentile stats
+TIMING_WINDOW = 500
+
+
+def _timed_call(func: Callable, args: tuple, kwargs: dict):
+    """Run a job inside a pool worker and return (result, seconds spent in the worker)."""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def _percentile(values, fraction: float) -> float:
+    """Nearest-rank percentile of a list of numbers (0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class ImageExecutor:
+    """
+    Bounded process pool for image jobs.
+
+    Attributes:
+        max_workers: Worker processes (0 runs jobs in a thread instead)
+        max_queue: Jobs allowed to wait for a worker before new jobs are rejected
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, queue_timeout: float):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop = None
+        self._in_flight = 0
+        self._waiting = 0
+        self.jobs = 0
+        self.failures = 0
+        self.rejected = 0
+        self._run_ms = deque(maxlen=TIMING_WINDOW)
+        self._wait_ms = deque(maxlen=TIMING_WINDOW)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Create the pool on first use."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+                    print(f"✅ Image executor started: {self.max_workers} worker processes")
+        return self._pool
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        """Admission semaphore for the running event loop (workers + queue)."""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(max(self.max_workers, 1) + self.max_queue)
+            self._slots_loop = loop
+        return self._slots
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run an image job off the event loop.
+
+        Args:
+            func: Module-level function to call
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Any: The function's result
+
+        Raises:
+            HTTPException: 503 when the queue stays full for queue_timeout seconds
+        """
+        slots = self._get_slots()
+        queued_at = time.perf_counter()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Image processing is busy, please retry shortly",
+                headers={"Retry-After": str(max(int(self.queue_timeout), 1))}
+            )
+        finally:
+            self._waiting -= 1
+
+        self._in_flight += 1
+        try:
+            if self.max_workers > 0:
+                loop = asyncio.get_running_loop()
+                try:
+                    result, run_seconds = await loop.run_in_executor(
+                        self._get_pool(), _timed_call, func, args, kwargs
+                    )
+                except BrokenProcessPool:
+                    # A worker died (e.g. OOM on a huge image); start a fresh pool for later jobs
+                    with self._pool_lock:
+                        self._pool = None
+                    raise
+            else:
+                result, run_seconds = await asyncio.to_thread(_timed_call, func, args, kwargs)
+
+            self.jobs += 1
+            self._run_ms.append(run_seconds * 1000)
+            self._wait_ms.append((time.perf_counter() - queued_at - run_seconds) * 1000)
+            return result
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self._in_flight -= 1
+            slots.release()
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def stats(self) -> dict:
+        """Queue depth and per-job timing for monitoring."""
+        run_ms, wait_ms = list(self._run_ms), list(self._wait_ms)
+        return {
+            "workers": self.max_workers,
+            "pool_started": self._pool is not None,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queue_depth": max(self._in_flight - max(self.max_workers, 1), 0) + self._waiting,
+            "jobs": self.jobs,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "run_ms_p50": round(_percentile(run_ms, 0.5), 1),
+            "run_ms_p99": round(_percentile(run_ms, 0.99), 1),
+            "wait_ms_p50": round(_percentile(wait_ms, 0.5), 1),
+            "wait_ms_p99": round(_percentile(wait_ms, 0.99), 1)
+        }
+
+
+# Global executor instance
+image_executor = ImageExecutor(
+    max_workers=settings.image_process_workers,
+    max_queue=settings.image_queue_size,
+    queue_timeout=settings.image_queue_timeout_seconds
+)
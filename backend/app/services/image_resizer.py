@@ -0,0 +1,411 @@
+"""
+On-demand image resizing for IAP Connect application.
+Serves /static/img/{key}?w=&h=&fmt= from a size-bounded LRU disk cache.
+
+Requested sizes are snapped up to settings.image_resize_ladder, so clients
+cannot fill the cache with arbitrary sizes. Each variant is rendered once
+from the stored image in the image process pool. Concurrent requests for a
+variant that is being rendered wait for that render (single flight), and
+later requests read the cached file.
+
+Variants live under uploads/thumbnails/<aa>/<source digest>/<variant digest>.<ext>,
+one directory per source image, so deleting an upload drops its variants.
+Variant names are content-hashed, so they are served as immutable. Each
+worker keeps its own LRU index (files written by other workers are picked up
+when first requested), but the byte budget covers the whole directory: every
+settings.image_resize_sweep_seconds one worker, holding an flock on
+.sweep.lock, deletes the oldest files by mtime until the directory fits.
+Cache hits touch their file once per sweep interval, so mtime tracks use
+across workers.
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from fastapi import HTTPException, status
+
+try:
+    import fcntl
+except ImportError:  # Windows: single worker, nothing to coordinate
+    fcntl = None
+
+from ..config.settings import settings
+from .file_service import ALLOWED_EXTENSIONS, Rendition, render_renditions
+from .image_executor import image_executor, _percentile
+from .storage import local_storage, get_storage
+
+
+# Cache directory under the upload folder
+RESIZE_CACHE_FOLDER = "thumbnails"
+
+# Lock file taken by the worker sweeping the cache directory
+SWEEP_LOCK_FILE = ".sweep.lock"
+
+# Recent render timings kept for the percentile stats
+TIMING_WINDOW = 500
+
+# Box side standing in for 'no limit' when only one dimension is requested
+UNBOUNDED = 1 << 16
+
+
+def snap_to_ladder(value: Optional[int], ladder: List[int]) -> int:
+    """Smallest ladder size covering value (the largest one above the ladder, 0 for no limit)."""
+    if not value:
+        return 0
+    for size in ladder:
+        if size >= value:
+            return size
+    return ladder[-1]
+
+
+def render_variant(source: Union[bytes, str], width: int, height: int, output_format: str, quality: int) -> bytes:
+    """
+    Render one resized variant of an image (runs in the image process pool).
+
+    Args:
+        source: Image bytes, or the path of a local file
+        width: Maximum width (0 = no limit)
+        height: Maximum height (0 = no limit)
+        output_format: 'jpg', 'webp', or the source's own 'png'/'gif'
+        quality: JPEG/WebP quality
+
+    Returns:
+        bytes: Encoded image (never upscaled)
+    """
+    rendition = Rendition(
+        width or UNBOUNDED, height or UNBOUNDED, quality=quality, keep_format=output_format in ('png', 'gif')
+    )
+    encoded = render_renditions(source, {'main': rendition}, webp=output_format == 'webp')['main']
+    return encoded.get(output_format) or next(iter(encoded.values()))
+
+
+class ResizedImageCache:
+    """
+    Size-bounded LRU cache of resized images on local disk.
+
+    Attributes:
+        root: Cache directory
+        max_bytes: Byte budget of the directory, shared by every worker using it;
+            least recently used variants (by mtime) are deleted beyond it
+        sweep_seconds: How often this worker trims the directory to max_bytes
+    """
+
+    def __init__(self, root: Path, max_bytes: int, sweep_seconds: float = 60):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.sweep_seconds = sweep_seconds
+        self._next_sweep = 0.0
+        self._touched: Set[str] = set()  # Hits whose mtime was bumped since the last sweep
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # relative path -> size, oldest first
+        self._by_source: Dict[str, Set[str]] = {}  # source directory -> relative paths
+        self._bytes = 0
+        self._loaded = False
+        self._load_lock: Optional[asyncio.Lock] = None
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.joined = 0
+        self.failures = 0
+        self.evictions = 0
+        self.sweeps = 0
+        self._render_ms = deque(maxlen=TIMING_WINDOW)
+
+    @staticmethod
+    def _source_dir(key: str) -> str:
+        """Cache directory of one source image."""
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return f"{digest[:2]}/{digest}"
+
+    def variant_path(self, key: str, width: int, height: int, output_format: str) -> str:
+        """Cache path (relative to root) of one variant."""
+        digest = hashlib.sha256(f"{key}|{width}|{height}|{output_format}".encode()).hexdigest()
+        return f"{self._source_dir(key)}/{digest}.{output_format}"
+
+    def _add(self, relative: str, size: int):
+        """Record a cached file as most recently used."""
+        if relative in self._index:
+            self._bytes -= self._index.pop(relative)
+        self._index[relative] = size
+        self._bytes += size
+        self._by_source.setdefault(relative.rsplit('/', 1)[0], set()).add(relative)
+
+    def _drop(self, relative: str) -> int:
+        """Forget a cached file. Returns its size."""
+        size = self._index.pop(relative, 0)
+        self._bytes -= size
+        source_dir = relative.rsplit('/', 1)[0]
+        paths = self._by_source.get(source_dir)
+        if paths is not None:
+            paths.discard(relative)
+            if not paths:
+                del self._by_source[source_dir]
+        return size
+
+    def _scan(self, remove_partial: bool = True) -> List[Tuple[float, str, int]]:
+        """
+        Cached files as (mtime, relative path, size), oldest first (blocking).
+
+        Args:
+            remove_partial: Delete leftover .tmp files (only safe before this worker renders)
+        """
+        entries = []
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = Path(directory) / filename
+                try:
+                    if filename.endswith('.tmp'):
+                        if remove_partial:
+                            path.unlink()
+                        continue
+                    if filename == SWEEP_LOCK_FILE:
+                        continue
+                    stat_result = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat_result.st_mtime, path.relative_to(self.root).as_posix(), stat_result.st_size))
+        return sorted(entries)
+
+    async def _ensure_loaded(self):
+        """Build the LRU index from the cache directory on first use."""
+        if self._loaded:
+            return
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if self._loaded:
+                return
+            self.root.mkdir(parents=True, exist_ok=True)
+            for _, relative, size in await asyncio.to_thread(self._scan):
+                self._add(relative, size)
+            self._loaded = True
+            print(f"✅ Resized image cache loaded: {len(self._index)} files, {self._bytes / (1024 * 1024):.1f} MB")
+            await self._evict()
+
+    async def _evict(self):
+        """
+        Keep the cache directory within its budget.
+
+        Other workers' files are not in this index, so victims are picked by the
+        directory sweep (oldest mtime first): right away once this worker's own
+        files exceed the budget, otherwise every sweep_seconds.
+        """
+        await self._sweep_if_due(force=self._bytes > self.max_bytes)
+
+    def _sweep(self) -> List[str]:
+        """
+        Trim the whole cache directory to max_bytes, oldest files first (blocking).
+
+        Returns:
+            List[str]: Relative paths deleted ([] if another worker is sweeping)
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / SWEEP_LOCK_FILE, 'a') as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return []
+            entries = self._scan(remove_partial=False)
+            total = sum(size for _, _, size in entries)
+            removed = []
+            for _, relative, size in entries[:-1]:  # Keep at least the newest file
+                if total <= self.max_bytes:
+                    break
+                (self.root / relative).unlink(missing_ok=True)
+                total -= size
+                removed.append(relative)
+            return removed
+
+    async def _sweep_if_due(self, force: bool = False):
+        """Run the shared directory sweep at most once per sweep_seconds in this worker (unless forced)."""
+        now = time.monotonic()
+        if now < self._next_sweep and not force:
+            return
+        self._next_sweep = now + self.sweep_seconds
+        self._touched.clear()
+        removed = await asyncio.to_thread(self._sweep)
+        self.sweeps += 1
+        for relative in removed:
+            self._drop(relative)
+        if removed:
+            self.evictions += len(removed)
+            print(f"🧹 Resized image cache sweep removed {len(removed)} files")
+
+    def _touch(self, relative: str):
+        """Bump a cached file's mtime so the sweep sees it as recently used (blocking)."""
+        try:
+            os.utime(self.root / relative)
+        except FileNotFoundError:
+            pass
+
+    def forget(self, relative: str):
+        """Drop a variant that turned out to be missing on disk (e.g. evicted by another worker)."""
+        self._drop(relative)
+
+    async def discard(self, key: str) -> int:
+        """
+        Delete every cached variant of a source image.
+
+        Returns:
+            int: Variants removed from this worker's index
+        """
+        source_dir = self._source_dir(key)
+        removed = 0
+        for relative in list(self._by_source.get(source_dir, ())):
+            self._drop(relative)
+            removed += 1
+        await asyncio.to_thread(shutil.rmtree, self.root / source_dir, True)
+        return removed
+
+    async def _load_source(self, key: str) -> Union[str, bytes]:
+        """Stored image to resize: a local file path, or the bytes from remote storage."""
+        path = local_storage.path(key).resolve()
+        try:
+            path.relative_to(local_storage.root.resolve())
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+        if path.is_file():
+            return str(path)
+
+        storage = get_storage()
+        data = await storage.get(key) if storage is not local_storage else None
+        if data is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+        return data
+
+    def _cached_size(self, relative: str) -> Optional[int]:
+        """Size of a cached file on disk, or None (blocking)."""
+        try:
+            return (self.root / relative).stat().st_size
+        except FileNotFoundError:
+            return None
+
+    def _render_done(self, relative: str, task: asyncio.Task):
+        """Clear a finished render (its error was raised to every waiter)."""
+        self._in_flight.pop(relative, None)
+        if not task.cancelled() and task.exception() is not None:
+            self.failures += 1
+
+    async def _render(self, key: str, width: int, height: int, output_format: str, relative: str):
+        """Render a variant into the cache."""
+        source = await self._load_source(key)
+        started = time.perf_counter()
+        try:
+            data = await image_executor.run(
+                render_variant, source, width, height, output_format, settings.image_resize_quality
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"Image resize failed for {key}: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Image could not be decoded"
+            )
+        self._render_ms.append((time.perf_counter() - started) * 1000)
+
+        # Written under a temporary name so readers never see a partial file
+        path = self.root / relative
+        temp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+
+        def write():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path.write_bytes(data)
+            os.replace(temp_path, path)
+
+        await asyncio.to_thread(write)
+        self._add(relative, len(data))
+        await self._evict()
+
+    async def get_variant(self, key: str, width: Optional[int], height: Optional[int], fmt: Optional[str]) -> str:
+        """
+        Cached variant of a stored image, rendering it on a miss.
+
+        Args:
+            key: Storage key of the source image (or its /static path)
+            width: Requested maximum width
+            height: Requested maximum height
+            fmt: 'jpg' or 'webp' (default: PNG/GIF keep their format, others become JPEG)
+
+        Returns:
+            str: Path of the variant relative to root
+
+        Raises:
+            HTTPException: 400 for a bad request, 404 if the source is missing, 422 if it cannot be decoded
+        """
+        key = local_storage.key_from_url(key)
+        extension = key.rsplit('.', 1)[-1].lower() if '.' in key else ''
+        if extension not in ALLOWED_EXTENSIONS['images']:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Not an image")
+        if not width and not height:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Give a width (w) or height (h)")
+
+        ladder = settings.image_resize_ladder_list
+        width, height = snap_to_ladder(width, ladder), snap_to_ladder(height, ladder)
+        output_format = fmt or (extension if extension in ('png', 'gif') else 'jpg')
+        relative = self.variant_path(key, width, height, output_format)
+
+        await self._ensure_loaded()
+        if relative in self._index:
+            self._index.move_to_end(relative)
+            self.hits += 1
+            if relative not in self._touched:
+                self._touched.add(relative)
+                await asyncio.to_thread(self._touch, relative)
+            return relative
+
+        if relative not in self._in_flight:
+            # Rendered by another worker since this one loaded its index
+            size = await asyncio.to_thread(self._cached_size, relative)
+            if size is not None:
+                self._add(relative, size)
+                self.hits += 1
+                return relative
+
+        render = self._in_flight.get(relative)
+        if render is not None:
+            self.joined += 1
+        else:
+            # One render per variant; it outlives the request that started it
+            self.misses += 1
+            render = asyncio.ensure_future(self._render(key, width, height, output_format, relative))
+            self._in_flight[relative] = render
+            render.add_done_callback(lambda task: self._render_done(relative, task))
+
+        await asyncio.shield(render)
+        return relative
+
+    def stats(self) -> dict:
+        """Hit rate, size and render timing for monitoring."""
+        render_ms = list(self._render_ms)
+        lookups = self.hits + self.misses + self.joined
+        return {
+            "entries": len(self._index),
+            "size_mb": round(self._bytes / (1024 * 1024), 2),
+            "max_size_mb": round(self.max_bytes / (1024 * 1024), 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "single_flight_joins": self.joined,
+            "hit_rate": round((self.hits + self.joined) / lookups, 4) if lookups else 0.0,
+            "failures": self.failures,
+            "evictions": self.evictions,
+            "sweeps": self.sweeps,
+            "in_flight": len(self._in_flight),
+            "render_ms_p50": round(_percentile(render_ms, 0.5), 1),
+            "render_ms_p99": round(_percentile(render_ms, 0.99), 1)
+        }
+
+
+# Global cache instance
+resized_image_cache = ResizedImageCache(
+    root=Path(settings.upload_folder) / RESIZE_CACHE_FOLDER,
+    max_bytes=settings.image_resize_cache_mb * 1024 * 1024,
+    sweep_seconds=settings.image_resize_sweep_seconds
+)
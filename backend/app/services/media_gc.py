@@ -0,0 +1,250 @@
+"""
+Orphaned media collector for IAP Connect application.
+Deletes stored files that no post or profile references any more.
+
+Media uploaded for posts that were never created, and the files of deleted
+posts and replaced avatars, otherwise stay in storage forever. The collector
+streams every referenced URL (Post.media_urls, User.profile_picture_url)
+into a set of 8-byte key digests, then walks the garbage-collected folders
+(settings.media_gc_folders) page by page and deletes files that are not
+referenced and older than the grace period, up to 1000 keys per delete call.
+Renditions of a referenced file count as referenced.
+
+Referenced URLs are matched on their path, so URLs on another host (a CDN,
+an older AWS_S3_URL, the regional or global S3 endpoint) still protect the
+file they name. Files that were stored, or reused by a duplicate upload,
+within the grace period are kept whatever their modification time; that
+set is reloaded before every delete call.
+
+A digest collision can only keep an orphan, never delete a referenced file.
+"""
+
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import unquote, urlparse
+
+from sqlalchemy.orm import Session
+
+from ..config.settings import settings
+from ..models.media import MediaFile, MediaObject
+from ..models.post import Post
+from ..models.user import User
+from .file_service import ALLOWED_EXTENSIONS, stored_rendition_keys
+from .image_resizer import resized_image_cache
+from .media_index import forget_media_files
+from .media_store import forget_media_objects
+from .storage import StorageBackend, StoredObject
+
+
+# Keys per delete_many call (the S3 DeleteObjects limit)
+GC_DELETE_BATCH_SIZE = 1000
+
+# Rows fetched per query page while loading references
+REFERENCE_QUERY_BATCH_SIZE = 1000
+
+
+def _digest(key: str) -> bytes:
+    """Compact set member for a storage key."""
+    return hashlib.blake2b(key.encode(), digest_size=8).digest()
+
+
+def _referenced_keys(storage: StorageBackend, url: str) -> List[str]:
+    """
+    Storage keys a referenced URL may point to.
+
+    URLs this storage writes map to one key. Any other URL is matched on its
+    path: every suffix starting at a garbage-collected folder is a candidate
+    ('https://cdn.example.com/posts/a.jpg' and the path-style
+    'https://s3.amazonaws.com/<bucket>/posts/a.jpg' both give 'posts/a.jpg'),
+    so a URL on another host keeps its file even if it names a different one.
+
+    Returns:
+        List[str]: Candidate keys (empty if the URL cannot name a collected file)
+    """
+    if storage.owns_url(url):
+        return [storage.key_from_url(url)]
+    path = unquote(urlparse(url).path)
+    if storage.owns_url(path):
+        # Absolute URL of a local file, e.g. 'https://api.example.com/static/posts/a.jpg'
+        return [storage.key_from_url(path)]
+
+    folders = set(settings.media_gc_folders_list)
+    parts = path.strip('/').split('/')
+    return [
+        storage.key_from_url('/'.join(parts[i:]))
+        for i, part in enumerate(parts[:-1])
+        if part in folders
+    ]
+
+
+def _referenced_urls(db: Session):
+    """Every media URL referenced by a post or profile, streamed in batches."""
+    posts = (
+        db.query(Post.media_urls)
+        .filter(Post.media_urls.isnot(None))
+        .execution_options(yield_per=REFERENCE_QUERY_BATCH_SIZE)
+    )
+    for (media_urls,) in posts:
+        for url in media_urls or ():
+            if isinstance(url, str) and url:
+                yield url
+
+    avatars = (
+        db.query(User.profile_picture_url)
+        .filter(User.profile_picture_url.isnot(None))
+        .execution_options(yield_per=REFERENCE_QUERY_BATCH_SIZE)
+    )
+    for (url,) in avatars:
+        if url:
+            yield url
+
+
+def load_referenced_keys(db: Session, storage: StorageBackend) -> Set[bytes]:
+    """Digests of every key in storage referenced by a post or profile, renditions included."""
+    referenced = set()
+    for url in _referenced_urls(db):
+        for key in _referenced_keys(storage, url):
+            referenced.add(_digest(key))
+            referenced.update(_digest(rendition_key) for rendition_key in stored_rendition_keys(key))
+    return referenced
+
+
+def load_recent_keys(db: Session, storage: StorageBackend, since: datetime) -> Set[bytes]:
+    """
+    Digests of the keys stored or reused since a time, renditions included.
+
+    A duplicate upload reuses old files without rewriting them, so their
+    modification time says nothing; the media_objects row's updated_at
+    does. Newly indexed files count too.
+    """
+    recent = set()
+    objects = db.query(MediaObject.key).filter(
+        MediaObject.storage == storage.name,
+        MediaObject.updated_at > since
+    )
+    for (key,) in objects:
+        recent.add(_digest(key))
+        recent.update(_digest(rendition_key) for rendition_key in stored_rendition_keys(key))
+
+    files = db.query(MediaFile.key).filter(
+        MediaFile.storage == storage.name,
+        MediaFile.created_at > since
+    )
+    recent.update(_digest(key) for (key,) in files)
+    return recent
+
+
+class _OrphanDeleter:
+    """Deletes orphaned files in batches and keeps the totals."""
+
+    def __init__(self, db: Session, storage: StorageBackend, since: datetime, dry_run: bool):
+        self.db = db
+        self.storage = storage
+        self.since = since
+        self.dry_run = dry_run
+        self.pending: List[StoredObject] = []
+        self.kept_recent = 0
+        self.deleted = 0
+        self.failed = 0
+        self.bytes_reclaimed = 0
+
+    async def add(self, stored: StoredObject):
+        self.pending.append(stored)
+        if len(self.pending) >= GC_DELETE_BATCH_SIZE:
+            await self.flush()
+
+    async def flush(self):
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+
+        # Files a duplicate upload reused since the scan started are kept
+        recent = load_recent_keys(self.db, self.storage, self.since)
+        kept = [stored for stored in batch if _digest(stored.key) in recent]
+        if kept:
+            self.kept_recent += len(kept)
+            batch = [stored for stored in batch if _digest(stored.key) not in recent]
+            if not batch:
+                return
+
+        if self.dry_run:
+            self.deleted += len(batch)
+            self.bytes_reclaimed += sum(stored.size for stored in batch)
+            return
+
+        results = await self.storage.delete_many([stored.key for stored in batch])
+        deleted_keys = []
+        for stored in batch:
+            if results.get(stored.key):
+                deleted_keys.append(stored.key)
+                self.bytes_reclaimed += stored.size
+            else:
+                self.failed += 1
+        self.deleted += len(deleted_keys)
+
+        # Drop the index and content-addressed store rows of the deleted files
+        forget_media_files(self.db, self.storage.name, deleted_keys)
+        forget_media_objects(self.db, self.storage.name, deleted_keys, updated_before=self.since)
+        for key in deleted_keys:
+            if key.rsplit('.', 1)[-1].lower() in ALLOWED_EXTENSIONS['images']:
+                await resized_image_cache.discard(key)
+
+
+async def collect_orphaned_media(
+    db: Session,
+    storage: StorageBackend,
+    grace_hours: Optional[int] = None,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Delete unreferenced files from the garbage-collected folders of a storage.
+
+    Args:
+        db: Database session
+        storage: Storage backend to collect
+        grace_hours: Keep unreferenced files younger than this (default: settings.media_gc_grace_hours)
+        dry_run: Only count what would be deleted
+
+    Returns:
+        dict: files_scanned, files_referenced, files_too_recent, files_deleted,
+              files_failed, bytes_reclaimed, dry_run, seconds
+    """
+    started = time.perf_counter()
+    grace_hours = settings.media_gc_grace_hours if grace_hours is None else grace_hours
+    cutoff = time.time() - grace_hours * 3600
+    since = datetime.now(timezone.utc) - timedelta(hours=grace_hours)
+
+    # References are loaded before listing, so files referenced later are younger than the
+    # cutoff, or were reused by a duplicate upload and show up in the recent keys
+    referenced = load_referenced_keys(db, storage)
+    recent = load_recent_keys(db, storage, since)
+    deleter = _OrphanDeleter(db, storage, since, dry_run)
+    scanned = kept_referenced = kept_recent = 0
+
+    for folder in settings.media_gc_folders_list:
+        async for page in storage.list(f"{folder}/"):
+            for stored in page:
+                scanned += 1
+                if _digest(stored.key) in referenced:
+                    kept_referenced += 1
+                elif stored.modified > cutoff or _digest(stored.key) in recent:
+                    kept_recent += 1
+                else:
+                    await deleter.add(stored)
+    await deleter.flush()
+
+    result = {
+        'files_scanned': scanned,
+        'files_referenced': kept_referenced,
+        'files_too_recent': kept_recent + deleter.kept_recent,
+        'files_deleted': deleter.deleted,
+        'files_failed': deleter.failed,
+        'bytes_reclaimed': deleter.bytes_reclaimed,
+        'dry_run': dry_run,
+        'seconds': round(time.perf_counter() - started, 2)
+    }
+    print(f"🧹 Orphaned media ({storage.name}): {deleter.deleted} files, "
+          f"{deleter.bytes_reclaimed / (1024 * 1024):.1f} MB {'would be ' if dry_run else ''}reclaimed")
+    return result
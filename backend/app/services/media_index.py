@@ -0,0 +1,350 @@
+"""
+Media file index for IAP Connect application.
+Keeps the media_files table in step with storage.
+
+The upload pipeline records every file it stores (renditions included) and
+delete_file removes them, so storage stats are aggregate queries and file
+info is a primary-key lookup rather than a directory walk or an S3 request.
+Files stored before the index existed are added by the backfill
+(backfill_media_index.py), which scans local directories in parallel.
+"""
+
+import hashlib
+import io
+import mimetypes
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from PIL import Image
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..config.settings import settings
+from ..models.media import MediaFile
+from ..models.post import Post
+from ..models.user import User
+
+
+# Rows inserted per backfill batch
+BACKFILL_BATCH_SIZE = 1000
+
+# Top-level folders that hold no uploads (spool files, resize cache, unfinalized direct uploads)
+BACKFILL_SKIP_FOLDERS = ("temp", "thumbnails", "incoming")
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def image_dimensions(source: Union[bytes, str, Path]) -> Tuple[Optional[int], Optional[int]]:
+    """Width and height of an image from its header, or (None, None) if it cannot be read."""
+    try:
+        with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as image:
+            return image.size
+    except Exception:
+        return None, None
+
+
+def media_file_row(
+    storage: str,
+    key: str,
+    url: str,
+    size: int,
+    content_type: Optional[str] = None,
+    rendition: Optional[str] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    owner_id: Optional[int] = None,
+    file_hash: Optional[str] = None,
+    created_at: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Column values of one stored file.
+
+    The folder, extension, file type and (when not given) content type are
+    derived from the key.
+    """
+    name = key.rsplit('/', 1)[-1]
+    extension = name.rsplit('.', 1)[1].lower() if '.' in name else ''
+    file_type = settings.get_file_type(name)
+    row = {
+        'storage': storage,
+        'key': key,
+        'url': url,
+        'folder': key.split('/', 1)[0] if '/' in key else '',
+        'extension': extension[:10],
+        'content_type': content_type or mimetypes.guess_type(name)[0],
+        'file_type': file_type if file_type != "unknown" else "other",
+        'rendition': rendition,
+        'size': size,
+        'width': width,
+        'height': height,
+        'owner_id': owner_id,
+        'file_hash': file_hash
+    }
+    if created_at is not None:
+        row['created_at'] = created_at
+    return row
+
+
+def record_media_files(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """
+    Add or refresh index rows for newly stored files.
+
+    Never fails the upload: on a database error the rows are skipped (the
+    backfill picks the files up later).
+    """
+    try:
+        for row in rows:
+            db.merge(MediaFile(**row))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ Could not index stored files: {str(e)}")
+
+
+def forget_media_files(db: Session, storage: str, keys: Iterable[str]) -> int:
+    """Remove index rows of deleted files. Returns the number of rows removed."""
+    keys = list(keys)
+    if not keys:
+        return 0
+    try:
+        removed = db.query(MediaFile).filter(
+            MediaFile.storage == storage,
+            MediaFile.key.in_(keys)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return removed
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ Could not remove index rows of deleted files: {str(e)}")
+        return 0
+
+
+def get_media_file(db: Session, storage: str, key: str) -> Optional[MediaFile]:
+    """Index row of a stored file (primary-key lookup)."""
+    return db.get(MediaFile, (storage, key))
+
+
+def media_file_info(media: MediaFile) -> Dict[str, Any]:
+    """File info (as returned by file_service.get_file_info) from an index row."""
+    created = media.created_at.isoformat() if media.created_at else None
+    return {
+        'exists': True,
+        'filename': media.key.rsplit('/', 1)[-1],
+        'size': media.size,
+        'size_mb': round(media.size / (1024 * 1024), 2),
+        'created': created,
+        'modified': created,
+        'extension': media.extension,
+        'mime_type': media.content_type,
+        'is_image': media.file_type == "image",
+        'url': media.url,
+        'width': media.width,
+        'height': media.height
+    }
+
+
+def media_stats(db: Session, storage: Optional[str] = None, recent_hours: int = 24) -> Dict[str, Any]:
+    """
+    Storage totals from the index.
+
+    Args:
+        db: Database session
+        storage: Only count files in this storage (default: all)
+        recent_hours: Window for recent_uploads
+
+    Returns:
+        dict: total_files, total_size, files_by_type (by extension), recent_uploads
+    """
+    filters = [MediaFile.storage == storage] if storage else []
+
+    total_files, total_size = db.query(
+        func.count(MediaFile.key),
+        func.coalesce(func.sum(MediaFile.size), 0)
+    ).filter(*filters).one()
+
+    files_by_type = dict(
+        db.query(MediaFile.extension, func.count(MediaFile.key))
+        .filter(*filters)
+        .group_by(MediaFile.extension)
+        .all()
+    )
+
+    since = datetime.now(timezone.utc) - timedelta(hours=recent_hours)
+    recent_uploads = db.query(func.count(MediaFile.key)).filter(
+        *filters,
+        MediaFile.created_at >= since
+    ).scalar()
+
+    return {
+        'total_files': total_files,
+        'total_size': int(total_size),
+        'files_by_type': files_by_type,
+        'recent_uploads': recent_uploads
+    }
+
+
+def load_media_owners(db: Session) -> Dict[str, int]:
+    """Owning user of every referenced media URL (avatars and post media)."""
+    owners = {}
+    for post_user_id, media_urls in db.query(Post.user_id, Post.media_urls).filter(Post.media_urls.isnot(None)):
+        for url in media_urls or ():
+            if isinstance(url, str):
+                owners[url] = post_user_id
+    for user_id, url in db.query(User.id, User.profile_picture_url).filter(User.profile_picture_url.isnot(None)):
+        owners[url] = user_id
+    return owners
+
+
+def file_sha256(path: Union[str, Path]) -> str:
+    """SHA-256 of a file, read in chunks (blocking)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _backfill_row(storage, stored, path: Optional[Path], owners: Dict[str, int], hash_files: bool) -> Dict[str, Any]:
+    """Index row of a stored file found by the backfill (blocking for local files)."""
+    name = stored.key.rsplit('/', 1)[-1]
+    is_image = settings.get_file_type(name) == "image"
+    width = height = None
+    file_hash = None
+    if path is not None:
+        if is_image:
+            width, height = image_dimensions(path)
+        if hash_files:
+            try:
+                file_hash = file_sha256(path)
+            except OSError:
+                pass
+    rendition = None
+    if is_image:
+        rendition = 'thumbnail' if name.startswith('thumb_') else 'main'
+    return media_file_row(
+        storage.name, stored.key, stored.url, stored.size,
+        content_type=stored.content_type,
+        rendition=rendition,
+        width=width,
+        height=height,
+        owner_id=owners.get(stored.url),
+        file_hash=file_hash,
+        created_at=datetime.fromtimestamp(stored.modified, timezone.utc)
+    )
+
+
+def _scan_for_backfill(storage, directory: Path, owners: Dict[str, int], hash_files: bool):
+    """Index rows of the files in one local directory, and its subdirectories (blocking)."""
+    files, subdirectories = storage.scan_directory(directory)
+    rows = [
+        _backfill_row(storage, stored, storage.root / stored.url[len(storage.url_prefix) + 1:], owners, hash_files)
+        for stored in files
+    ]
+    return rows, subdirectories
+
+
+class _BackfillWriter:
+    """Inserts backfill rows in batches, skipping files that are already indexed."""
+
+    def __init__(self, db: Session, storage_name: str):
+        self.db = db
+        self.storage_name = storage_name
+        self.pending: List[Dict[str, Any]] = []
+        self.scanned = 0
+        self.indexed = 0
+
+    def add(self, rows: List[Dict[str, Any]]):
+        self.scanned += len(rows)
+        self.pending.extend(rows)
+        while len(self.pending) >= BACKFILL_BATCH_SIZE:
+            self.flush(BACKFILL_BATCH_SIZE)
+
+    def flush(self, count: Optional[int] = None):
+        batch = self.pending[:count] if count else self.pending
+        self.pending = self.pending[len(batch):]
+        if not batch:
+            return
+        existing = {
+            key for (key,) in self.db.query(MediaFile.key).filter(
+                MediaFile.storage == self.storage_name,
+                MediaFile.key.in_([row['key'] for row in batch])
+            )
+        }
+        new_rows = list({row['key']: row for row in batch if row['key'] not in existing}.values())
+        if new_rows:
+            self.db.bulk_insert_mappings(MediaFile, new_rows)
+            self.db.commit()
+            self.indexed += len(new_rows)
+
+
+def backfill_local_media(db: Session, storage, workers: int = 8, hash_files: bool = True) -> Dict[str, Any]:
+    """
+    Index files already on local disk (one-time migration).
+
+    Directories are scanned in parallel: each worker scans one directory,
+    reads image dimensions and hashes its files, and hands back the
+    subdirectories it found as new work. Files already indexed are skipped,
+    so the backfill can be re-run.
+
+    Args:
+        db: Database session
+        storage: LocalStorageBackend to scan
+        workers: Scanner threads
+        hash_files: Whether to compute SHA-256 digests (reads every file)
+
+    Returns:
+        dict: files_scanned, files_indexed, seconds
+    """
+    started = time.perf_counter()
+    owners = load_media_owners(db)
+    writer = _BackfillWriter(db, storage.name)
+    top_level = [storage.root / folder for folder in BACKFILL_SKIP_FOLDERS]
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="media-backfill") as pool:
+        pending = {pool.submit(_scan_for_backfill, storage, storage.root, owners, hash_files)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                rows, subdirectories = future.result()
+                writer.add(rows)
+                for directory in subdirectories:
+                    if directory not in top_level:
+                        pending.add(pool.submit(_scan_for_backfill, storage, directory, owners, hash_files))
+    writer.flush()
+
+    return {
+        'files_scanned': writer.scanned,
+        'files_indexed': writer.indexed,
+        'seconds': round(time.perf_counter() - started, 2)
+    }
+
+
+async def backfill_remote_media(db: Session, storage) -> Dict[str, Any]:
+    """
+    Index objects already in remote storage from its listing (one-time migration).
+
+    Listing pages carry size and modification time, so no object is
+    downloaded; dimensions and hashes of these files stay empty.
+
+    Returns:
+        dict: files_scanned, files_indexed, seconds
+    """
+    started = time.perf_counter()
+    owners = load_media_owners(db)
+    writer = _BackfillWriter(db, storage.name)
+    async for page in storage.list():
+        writer.add([
+            _backfill_row(storage, stored, None, owners, False)
+            for stored in page
+            if stored.key.split('/', 1)[0] not in BACKFILL_SKIP_FOLDERS
+        ])
+    writer.flush()
+
+    return {
+        'files_scanned': writer.scanned,
+        'files_indexed': writer.indexed,
+        'seconds': round(time.perf_counter() - started, 2)
+    }
@@ -0,0 +1,221 @@
+"""
+Content-addressed media store for IAP Connect application.
+Deduplicates uploads by the SHA-256 of their original bytes.
+
+An upload whose bytes were already stored in the same folder and storage
+reuses the stored files and renditions, skipping image processing and the
+write, and takes a reference on the media_objects row. Deleting an upload
+drops one reference; the files go only when the last reference does.
+
+Stored names are derived from the hash (folder/<sha256>.<ext>), so
+identical uploads map to the same files in both the local and S3 stores.
+"""
+
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models.media import MediaObject
+
+
+# Storage labels
+LOCAL_STORAGE = "local"
+S3_STORAGE = "s3"
+
+
+def content_filename(folder: str, content_hash: str, extension: str = "") -> str:
+    """
+    Stored filename of a content-addressed upload.
+
+    Args:
+        folder: Upload folder
+        content_hash: SHA-256 hex digest of the original bytes
+        extension: File extension (without dot)
+
+    Returns:
+        str: e.g. 'posts/9f86d0...0f00a08.jpg'
+    """
+    filename = f"{content_hash}.{extension}" if extension else content_hash
+    return f"{folder}/{filename}" if folder else filename
+
+
+def find_media_object(db: Session, storage: str, folder: str, content_hash: str) -> Optional[MediaObject]:
+    """Stored media with these bytes in this folder and storage, if any."""
+    return db.query(MediaObject).filter(
+        MediaObject.storage == storage,
+        MediaObject.folder == folder,
+        MediaObject.content_hash == content_hash
+    ).first()
+
+
+def acquire_media_object(db: Session, media: MediaObject) -> bool:
+    """
+    Take a reference on stored media for a duplicate upload.
+
+    Returns:
+        bool: False if the media was released to zero meanwhile (store it again)
+    """
+    updated = db.query(MediaObject).filter(
+        MediaObject.id == media.id,
+        MediaObject.ref_count > 0
+    ).update({MediaObject.ref_count: MediaObject.ref_count + 1}, synchronize_session=False)
+    db.commit()
+    if not updated:
+        return False
+    db.refresh(media)
+    return True
+
+
+def register_media_object(
+    db: Session,
+    storage: str,
+    folder: str,
+    content_hash: str,
+    **fields
+) -> MediaObject:
+    """
+    Record newly stored media with one reference.
+
+    When the same bytes were stored concurrently (or re-stored to add a
+    rendition), the existing row takes the reference and the new fields.
+    If that row is released to zero before it can be updated, the insert
+    is tried again.
+
+    Args:
+        db: Database session
+        storage: Storage label
+        folder: Upload folder
+        content_hash: SHA-256 hex digest of the original bytes
+        **fields: key, url, thumbnail_url, renditions, content_type, size, original_size
+
+    Returns:
+        MediaObject: The stored media row
+    """
+    changes = {MediaObject.ref_count: MediaObject.ref_count + 1, **{
+        getattr(MediaObject, name): value for name, value in fields.items() if value is not None
+    }}
+    while True:
+        media = MediaObject(storage=storage, folder=folder, content_hash=content_hash, ref_count=1, **fields)
+        db.add(media)
+        try:
+            db.commit()
+            return media
+        except IntegrityError:
+            db.rollback()
+
+        media = find_media_object(db, storage, folder, content_hash)
+        if media is None:
+            continue  # Released between our insert and the lookup
+        updated = db.query(MediaObject).filter(MediaObject.id == media.id).update(
+            changes, synchronize_session=False
+        )
+        db.commit()
+        if updated:
+            db.refresh(media)
+            return media
+
+
+def adopt_media_object(
+    db: Session,
+    storage: str,
+    folder: str,
+    content_hash: str,
+    **fields
+) -> Optional[MediaObject]:
+    """
+    Record media stored under a key chosen before its content was known.
+
+    Direct uploads publish under the key handed to the client, so unlike
+    register_media_object an existing row for the same bytes is left as it
+    is (its key stays the one its references point at).
+
+    Args:
+        db: Database session
+        storage: Storage label
+        folder: Upload folder
+        content_hash: SHA-256 hex digest of the original bytes
+        **fields: key, url, thumbnail_url, renditions, content_type, size, original_size
+
+    Returns:
+        Optional[MediaObject]: The new row with one reference, None if the bytes were already recorded
+    """
+    media = MediaObject(storage=storage, folder=folder, content_hash=content_hash, ref_count=1, **fields)
+    db.add(media)
+    try:
+        db.commit()
+        return media
+    except IntegrityError:
+        db.rollback()
+        return None
+
+
+def release_media_object(db: Session, storage: str, key: str) -> Optional[int]:
+    """
+    Drop one reference to stored media.
+
+    The row is removed when the count reaches zero, unless a duplicate
+    upload took a new reference in between.
+
+    Args:
+        db: Database session
+        storage: Storage label
+        key: Stored main file (path under uploads/ or S3 key)
+
+    Returns:
+        Optional[int]: References left (0 = delete the files), None if the key is not content-addressed
+    """
+    media = db.query(MediaObject).filter(MediaObject.storage == storage, MediaObject.key == key).first()
+    if media is None:
+        return None
+
+    db.query(MediaObject).filter(
+        MediaObject.id == media.id,
+        MediaObject.ref_count > 0
+    ).update({MediaObject.ref_count: MediaObject.ref_count - 1}, synchronize_session=False)
+    db.commit()
+
+    deleted = db.query(MediaObject).filter(
+        MediaObject.id == media.id,
+        MediaObject.ref_count <= 0
+    ).delete(synchronize_session=False)
+    db.commit()
+    if deleted:
+        return 0
+
+    remaining = db.query(MediaObject.ref_count).filter(MediaObject.id == media.id).scalar()
+    return remaining or 0
+
+
+def forget_media_objects(
+    db: Session,
+    storage: str,
+    keys: List[str],
+    updated_before: Optional[datetime] = None
+) -> int:
+    """
+    Remove the rows of stored media whose files were deleted outside
+    release_media_object (e.g. by the orphaned media collector).
+
+    Args:
+        db: Database session
+        storage: Storage label
+        keys: Deleted main files
+        updated_before: Keep rows whose references changed after this
+            (a duplicate upload reused the files meanwhile)
+
+    Returns:
+        int: Rows removed
+    """
+    if not keys:
+        return 0
+    query = db.query(MediaObject).filter(
+        MediaObject.storage == storage,
+        MediaObject.key.in_(keys)
+    )
+    if updated_before is not None:
+        query = query.filter(MediaObject.updated_at <= updated_before)
+    removed = query.delete(synchronize_session=False)
+    db.commit()
+    return removed
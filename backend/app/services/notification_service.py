@@ -5,15 +5,23 @@ Handles notification creation, delivery, and management.
 COMPLETE: All service methods integrated with existing structure
 """
 
+import csv
+import io
 import json
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import desc, and_, func, or_
-from typing import List, Optional, Dict, Any, Tuple
+import time
+from sqlalchemy.orm import Session, joinedload, contains_eager
+from sqlalchemy import desc, and_, func, or_, select, insert, union_all, text
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional, Dict, Any, Tuple, Iterator
 from datetime import datetime, timedelta
 
 # Import models
 from ..models.user import User
-from ..models.notification import Notification, NotificationType
+from ..models.notification import (
+    Notification, NotificationType, NotificationDailyStat,
+    AuthorActivity, NotificationReadMark, NotificationGroupActor
+)
+from ..models.follow import Follow
 from ..models.post import Post
 from ..models.comment import Comment
 
@@ -22,6 +30,11 @@ from ..schemas.notification import (
     NotificationCreate, NotificationResponse, NotificationListResponse,
     UserBasicInfo, NotificationStatsResponse, NotificationFilter
 )
+from ..config.settings import settings
+
+
+# Column order for CSV notification exports
+EXPORT_CSV_COLUMNS = ["id", "type", "title", "message", "is_read", "created_at", "sender_name", "actor_count"]
 
 
 class NotificationService:
@@ -121,10 +134,152 @@ class NotificationService:
             print(f"❌ Failed to create notification: {str(e)}")
             return None
     
+    @staticmethod
+    def build_group_key(
+        notification_type: NotificationType,
+        target_type: str,
+        target_id: int,
+        window_hours: Optional[int] = None
+    ) -> str:
+        """
+        Build the aggregation key (type, target entity, time window) for coalescing.
+        
+        Notifications of the same type on the same target within one window share a
+        key, and the unique (recipient_id, group_key) index keeps them in one row.
+        """
+        window_seconds = max(window_hours or settings.notification_coalesce_window_hours, 1) * 3600
+        bucket = int(time.time() // window_seconds)
+        return f"{notification_type.value}:{target_type}:{target_id}:{bucket}"
+    
+    @staticmethod
+    def coalesce_notification(
+        db: Session,
+        recipient_id: int,
+        sender: User,
+        notification_type: NotificationType,
+        title: str,
+        action_text: str,
+        target_type: str,
+        target_id: int,
+        data: Optional[Dict[str, Any]] = None
+    ) -> Optional[Notification]:
+        """
+        Create or fold a notification into the row for its aggregation key (upsert).
+        
+        Repeated actions on the same target within the coalescing window update one
+        row: the actor count grows, the newest actor becomes the sender, the capped
+        recent-actors list is refreshed and the row is bumped back to unread. Distinct
+        actors are tracked in notification_group_actors, so actor_count counts each
+        user once. A repeated like by an actor already in the row leaves it untouched.
+        The row stores only the action text; Notification.display_message renders
+        "Dr. A and 41 others liked your post" from the sender and actor_count.
+        
+        Args:
+            db: Database session
+            recipient_id: User receiving the notification
+            sender: User who triggered the notification
+            notification_type: Type of notification
+            title: Notification title
+            action_text: Action phrase, e.g. "liked your post"
+            target_type: Target entity type, e.g. "post"
+            target_id: Target entity ID
+            data: Additional data (replaced with the latest action's data on fold)
+            
+        Returns:
+            Notification: The created or updated notification, or None on failure
+        """
+        if sender.id == recipient_id:
+            return None
+        
+        group_key = NotificationService.build_group_key(notification_type, target_type, target_id)
+        actors_limit = max(settings.notification_recent_actors_limit, 1)
+        data_json = json.dumps(data) if data else None
+        
+        # Two attempts: a concurrent insert of the same key loses on the unique index
+        # and is retried as a fold into the winning row. A partitioned table only has
+        # per-partition unique indexes (a first insert in a new month would not see a
+        # row in the previous one), so on PostgreSQL the key is also serialized with a
+        # transaction-scoped advisory lock. Folding only bumps updated_at; created_at
+        # is the partition key and never moves.
+        lock_key = f"{recipient_id}:{group_key}"
+        for attempt in range(2):
+            try:
+                if db.get_bind().dialect.name == "postgresql":
+                    db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": lock_key})
+                existing = db.query(Notification).filter(
+                    and_(
+                        Notification.recipient_id == recipient_id,
+                        Notification.group_key == group_key
+                    )
+                ).with_for_update().first()
+                
+                if existing:
+                    recent_actors = existing.recent_actor_id_list
+                    # The row lock serializes folds, so checking then inserting is safe
+                    is_new_actor = sender.id not in recent_actors and db.get(
+                        NotificationGroupActor, (recipient_id, group_key, sender.id)
+                    ) is None
+                    
+                    if not is_new_actor and notification_type == NotificationType.LIKE:
+                        print(f"⚠️ Duplicate notification prevented for user {recipient_id}")
+                        return existing
+                    
+                    if is_new_actor:
+                        existing.actor_count = (existing.actor_count or 1) + 1
+                        db.add(NotificationGroupActor(
+                            recipient_id=recipient_id, group_key=group_key, actor_id=sender.id
+                        ))
+                    
+                    recent_actors = [sender.id] + [a for a in recent_actors if a != sender.id]
+                    existing.recent_actor_ids = json.dumps(recent_actors[:actors_limit])
+                    existing.sender_id = sender.id
+                    existing.title = title
+                    existing.message = action_text
+                    existing.data = data_json
+                    existing.is_read = False
+                    existing.updated_at = func.now()
+                    
+                    db.commit()
+                    db.refresh(existing)
+                    print(f"✅ Coalesced notification {existing.id} ({existing.actor_count} actors) for user {recipient_id}")
+                    return existing
+                
+                notification = Notification(
+                    recipient_id=recipient_id,
+                    sender_id=sender.id,
+                    type=notification_type,
+                    title=title,
+                    message=action_text,
+                    data=data_json,
+                    group_key=group_key,
+                    actor_count=1,
+                    recent_actor_ids=json.dumps([sender.id])
+                )
+                db.add(notification)
+                db.add(NotificationGroupActor(recipient_id=recipient_id, group_key=group_key, actor_id=sender.id))
+                db.commit()
+                db.refresh(notification)
+                
+                print(f"✅ Created notification {notification.id} for user {recipient_id}")
+                return notification
+                
+            except IntegrityError:
+                db.rollback()
+                if attempt == 0:
+                    continue
+                print(f"❌ Failed to coalesce notification for user {recipient_id}: key conflict")
+                return None
+            except Exception as e:
+                db.rollback()
+                print(f"❌ Failed to coalesce notification: {str(e)}")
+                return None
+        
+        return None
+    
     @staticmethod
     def create_like_notification(db: Session, post: Post, liker: User) -> Optional[Notification]:
         """
-        Create notification for post like with enhanced context.
+        Create (or coalesce) notification for post like with enhanced context.
         
         Args:
             db: Database session
@@ -141,17 +296,20 @@ class NotificationService:
             # Get post preview for context
             post_preview = post.content[:50] + "..." if len(post.content) > 50 else post.content
             
-            return NotificationService.create_notification(
+            return NotificationService.coalesce_notification(
                 db=db,
                 recipient_id=post.user_id,
-                sender_id=liker.id,
+                sender=liker,
                 notification_type=NotificationType.LIKE,
                 title="New Like",
-                message=f"liked your post",
+                action_text="liked your post",
+                target_type="post",
+                target_id=post.id,
                 data={
                     "post_id": post.id,
                     "post_preview": post_preview,
                     "action": "like",
+                    "user_id": liker.id,
                     "timestamp": datetime.utcnow().isoformat()
                 }
             )
@@ -162,7 +320,7 @@ class NotificationService:
     @staticmethod
     def create_comment_notification(db: Session, post: Post, commenter: User, comment: Comment) -> Optional[Notification]:
         """
-        Create notification for new comment with enhanced context.
+        Create (or coalesce) notification for new comment with enhanced context.
         
         Args:
             db: Database session
@@ -181,19 +339,22 @@ class NotificationService:
             comment_preview = comment.content[:50] + "..." if len(comment.content) > 50 else comment.content
             post_preview = post.content[:50] + "..." if len(post.content) > 50 else post.content
             
-            return NotificationService.create_notification(
+            return NotificationService.coalesce_notification(
                 db=db,
                 recipient_id=post.user_id,
-                sender_id=commenter.id,
+                sender=commenter,
                 notification_type=NotificationType.COMMENT,
                 title="New Comment",
-                message=f"commented on your post",
+                action_text="commented on your post",
+                target_type="post",
+                target_id=post.id,
                 data={
                     "post_id": post.id,
                     "comment_id": comment.id,
                     "post_preview": post_preview,
                     "comment_preview": comment_preview,
                     "action": "comment",
+                    "user_id": commenter.id,
                     "timestamp": datetime.utcnow().isoformat()
                 }
             )
@@ -233,6 +394,132 @@ class NotificationService:
             print(f"❌ Error creating follow notification: {str(e)}")
             return None
     
+    @staticmethod
+    def create_new_post_notifications(db: Session, author: User, post: Post) -> Dict[str, Any]:
+        """
+        Notify followers about a new post using hybrid push/pull delivery.
+        
+        Authors with fewer followers than settings.notification_fanout_follower_threshold
+        get one POST_UPDATE row per follower, written in a single bulk insert. Authors
+        above the threshold get a single AuthorActivity row that followers merge into
+        their notification list at read time.
+        
+        Args:
+            db: Database session
+            author: User who created the post
+            post: The new post
+            
+        Returns:
+            dict: Delivery mode and number of rows written
+        """
+        try:
+            if (author.followers_count or 0) >= settings.notification_fanout_follower_threshold:
+                db.add(AuthorActivity(author_id=author.id, post_id=post.id))
+                db.commit()
+                print(f"✅ Recorded author activity for post {post.id} (pull delivery)")
+                return {"mode": "pull", "rows_written": 1}
+            
+            follower_ids = [
+                row[0] for row in db.query(Follow.follower_id).filter(
+                    Follow.following_id == author.id
+                ).all()
+            ]
+            if not follower_ids:
+                print("📝 New post created but no followers to notify")
+                return {"mode": "push", "rows_written": 0}
+            
+            data_json = json.dumps({"post_id": post.id, "action": "new_post", "user_id": author.id})
+            db.execute(
+                insert(Notification),
+                [
+                    {
+                        "recipient_id": follower_id,
+                        "sender_id": author.id,
+                        "type": NotificationType.POST_UPDATE,
+                        "title": "New Post",
+                        "message": "shared a new post",
+                        "data": data_json,
+                        "is_read": False,
+                        "actor_count": 1
+                    }
+                    for follower_id in follower_ids
+                ]
+            )
+            db.commit()
+            print(f"✅ Created post notifications for {len(follower_ids)} followers")
+            return {"mode": "push", "rows_written": len(follower_ids)}
+            
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Failed to create post notifications: {e}")
+            return {"mode": "error", "rows_written": 0}
+    
+    @staticmethod
+    def _get_read_mark(db: Session, user_id: int) -> int:
+        """Get the user's author-activity read high-water mark (0 if never set)"""
+        mark = db.query(NotificationReadMark.last_read_activity_id).filter(
+            NotificationReadMark.user_id == user_id
+        ).scalar()
+        return mark or 0
+    
+    @staticmethod
+    def _advance_read_mark(db: Session, user_id: int, activity_id: int) -> None:
+        """Move the user's read high-water mark forward (never backwards); caller commits"""
+        mark = db.query(NotificationReadMark).filter(
+            NotificationReadMark.user_id == user_id
+        ).with_for_update().first()
+        if mark is None:
+            db.add(NotificationReadMark(user_id=user_id, last_read_activity_id=activity_id))
+        elif activity_id > (mark.last_read_activity_id or 0):
+            mark.last_read_activity_id = activity_id
+    
+    @staticmethod
+    def _pulled_activity_query(db: Session, user_id: int):
+        """Author activities visible to a user: followed authors, posted after the follow"""
+        return db.query(AuthorActivity).join(
+            Follow,
+            and_(
+                Follow.following_id == AuthorActivity.author_id,
+                Follow.follower_id == user_id
+            )
+        ).filter(AuthorActivity.created_at >= Follow.created_at)
+    
+    @staticmethod
+    def _activity_to_response(activity: AuthorActivity, user_id: int, read_mark: int) -> NotificationResponse:
+        """
+        Render a pulled author activity as a POST_UPDATE notification.
+        
+        Pulled entries use the negated activity ID so they never collide with stored
+        notification IDs; marking one as read advances the high-water mark.
+        """
+        author = activity.author
+        sender_info = UserBasicInfo(
+            id=author.id,
+            username=author.username,
+            full_name=author.full_name,
+            user_type=author.user_type.value if hasattr(author.user_type, 'value') else str(author.user_type),
+            profile_picture_url=author.profile_picture_url,
+            specialty=author.specialty,
+            college=author.college
+        )
+        message = "shared a new post"
+        
+        return NotificationResponse(
+            id=-activity.id,
+            recipient_id=user_id,
+            sender_id=author.id,
+            type=NotificationType.POST_UPDATE.value,
+            title="New Post",
+            message=message,
+            data={"post_id": activity.post_id, "action": "new_post", "user_id": author.id, "source": "activity"},
+            is_read=activity.id <= read_mark,
+            created_at=activity.created_at,
+            sender=sender_info,
+            display_message=f"{author.full_name} {message}",
+            actor_count=1,
+            recent_actor_ids=[author.id]
+        )
+    
     @staticmethod
     def get_user_notifications(
         db: Session, 
@@ -285,21 +572,78 @@ class NotificationService:
             # Get total count for pagination
             total_count = query.count()
             
-            # Get unread count (separate query for accuracy)
-            unread_count = db.query(Notification).filter(
-                and_(Notification.recipient_id == user_id, Notification.is_read == False)
-            ).count()
+            # Unread count is the badge: every unread stored and pulled entry, whatever
+            # the list filters, so it always matches get_unread_count
+            unread_count = NotificationService.get_unread_count(db, user_id)
             
-            # Get paginated notifications ordered by creation date (newest first)
-            notifications = (query
-                           .order_by(Notification.created_at.desc())
-                           .offset((page - 1) * size)
-                           .limit(size)
-                           .all())
+            # Pulled new-post activities from high-follower authors (hybrid delivery)
+            read_mark = 0
+            activity_query = None
+            include_activities = not (notification_filter and notification_filter.type and
+                                      notification_filter.type.value != NotificationType.POST_UPDATE.value)
+            if include_activities:
+                read_mark = NotificationService._get_read_mark(db, user_id)
+                activity_query = NotificationService._pulled_activity_query(db, user_id)
+                
+                if notification_filter:
+                    if notification_filter.sender_id:
+                        activity_query = activity_query.filter(AuthorActivity.author_id == notification_filter.sender_id)
+                    if notification_filter.date_from:
+                        activity_query = activity_query.filter(AuthorActivity.created_at >= notification_filter.date_from)
+                    if notification_filter.date_to:
+                        activity_query = activity_query.filter(AuthorActivity.created_at <= notification_filter.date_to)
+                
+                activity_total, activity_unread = activity_query.with_entities(
+                    func.count(AuthorActivity.id),
+                    func.count(AuthorActivity.id).filter(AuthorActivity.id > read_mark)
+                ).one()
+                
+                only_unread = unread_only or (notification_filter and notification_filter.is_read is False)
+                only_read = notification_filter and notification_filter.is_read is True
+                if only_unread:
+                    activity_query = activity_query.filter(AuthorActivity.id > read_mark)
+                    activity_total = activity_unread
+                elif only_read:
+                    activity_query = activity_query.filter(AuthorActivity.id <= read_mark)
+                    activity_total = activity_total - (activity_unread or 0)
+                
+                if not activity_total:
+                    activity_query = None
+                total_count += activity_total or 0
+            
+            if activity_query is None:
+                # Get paginated notifications ordered by latest activity (newest first)
+                notifications = (query
+                               .order_by(Notification.updated_at.desc())
+                               .offset((page - 1) * size)
+                               .limit(size)
+                               .all())
+            else:
+                # Merge the newest page * size of both streams, then slice the page
+                window = page * size
+                stored = (query
+                          .order_by(Notification.updated_at.desc())
+                          .limit(window)
+                          .all())
+                activities = (activity_query
+                              .options(joinedload(AuthorActivity.author))
+                              .order_by(AuthorActivity.created_at.desc(), AuthorActivity.id.desc())
+                              .limit(window)
+                              .all())
+                notifications = sorted(
+                    stored + activities,
+                    key=lambda item: item.created_at if isinstance(item, AuthorActivity) else item.updated_at,
+                    reverse=True
+                )[(page - 1) * size:window]
             
             # Convert to response objects with complete sender information
             notification_responses = []
             for notification in notifications:
+                if isinstance(notification, AuthorActivity):
+                    notification_responses.append(
+                        NotificationService._activity_to_response(notification, user_id, read_mark)
+                    )
+                    continue
                 try:
                     sender_info = None
                     if notification.sender:
@@ -332,9 +676,12 @@ class NotificationService:
                         data=data,
                         is_read=notification.is_read,
                         created_at=notification.created_at,
+                        updated_at=notification.updated_at,
                         sender=sender_info,
                         time_since_created=notification.time_since_created,
-                        display_message=notification.display_message
+                        display_message=notification.display_message,
+                        actor_count=notification.actor_count or 1,
+                        recent_actor_ids=notification.recent_actor_id_list
                     )
                     
                     notification_responses.append(notification_response)
@@ -376,6 +723,18 @@ class NotificationService:
             bool: True if successful, False otherwise
         """
         try:
+            # Pulled author activities carry negated IDs and are read via the high-water mark
+            if notification_id < 0:
+                activity_exists = NotificationService._pulled_activity_query(db, user_id).filter(
+                    AuthorActivity.id == -notification_id
+                ).first()
+                if not activity_exists:
+                    print(f"⚠️ Notification {notification_id} not found for user {user_id}")
+                    return False
+                NotificationService._advance_read_mark(db, user_id, -notification_id)
+                db.commit()
+                return True
+            
             notification = db.query(Notification).filter(
                 and_(
                     Notification.id == notification_id,
@@ -420,6 +779,17 @@ class NotificationService:
                 )
             ).update({"is_read": True})
             
+            # Pulled activities: move the high-water mark past the newest visible one
+            latest_activity_id, pulled_unread = NotificationService._pulled_activity_query(db, user_id).with_entities(
+                func.max(AuthorActivity.id),
+                func.count(AuthorActivity.id).filter(
+                    AuthorActivity.id > NotificationService._get_read_mark(db, user_id)
+                )
+            ).one()
+            if latest_activity_id:
+                NotificationService._advance_read_mark(db, user_id, latest_activity_id)
+                updated_count += pulled_unread or 0
+            
             db.commit()
             print(f"✅ Marked {updated_count} notifications as read for user {user_id}")
             return updated_count
@@ -431,7 +801,7 @@ class NotificationService:
     
     @staticmethod
     def get_unread_count(db: Session, user_id: int) -> int:
-        """Get unread notification count for a user with error handling"""
+        """Get unread notification count for a user (stored and pulled) with error handling"""
         try:
             count = db.query(Notification).filter(
                 and_(
@@ -439,22 +809,183 @@ class NotificationService:
                     Notification.is_read == False
                 )
             ).count()
+            
+            read_mark = NotificationService._get_read_mark(db, user_id)
+            count += NotificationService._pulled_activity_query(db, user_id).filter(
+                AuthorActivity.id > read_mark
+            ).count()
             return count
         except Exception as e:
             print(f"❌ Error getting unread count for user {user_id}: {str(e)}")
             return 0
     
+    @staticmethod
+    def _month_start(value: datetime, months: int = 0) -> datetime:
+        """First instant of the month containing value, shifted by `months`"""
+        month_index = value.year * 12 + (value.month - 1) + months
+        return datetime(month_index // 12, month_index % 12 + 1, 1)
+    
+    @staticmethod
+    def _partition_name(month_start: datetime) -> str:
+        """Monthly partition naming convention: notifications_pYYYYMM"""
+        return f"notifications_p{month_start.year:04d}{month_start.month:02d}"
+    
+    @staticmethod
+    def is_partitioned(db: Session) -> bool:
+        """Check whether notifications is a range-partitioned PostgreSQL table"""
+        if db.get_bind().dialect.name != "postgresql":
+            return False
+        return bool(db.execute(text("""
+            SELECT EXISTS (
+                SELECT 1 FROM pg_partitioned_table pt
+                JOIN pg_class c ON c.oid = pt.partrelid
+                WHERE c.relname = 'notifications'
+            )
+        """)).scalar())
+    
+    @staticmethod
+    def ensure_notification_partitions(
+        db: Session,
+        months_ahead: Optional[int] = None,
+        start: Optional[datetime] = None,
+        commit: bool = True
+    ) -> List[str]:
+        """
+        Create monthly notification partitions ahead of time (maintenance task).
+        
+        Creates notifications_pYYYYMM partitions from the month of `start` (default:
+        current month) through `months_ahead` months in the future, each with its own
+        unique (recipient_id, group_key) index. No-op unless notifications is a
+        partitioned PostgreSQL table. Pass commit=False to keep the DDL inside the
+        caller's transaction (used by the partition migration).
+        
+        Returns:
+            list: Names of partitions created
+        """
+        if not NotificationService.is_partitioned(db):
+            return []
+        
+        months_ahead = settings.notification_partition_months_ahead if months_ahead is None else months_ahead
+        first_month = NotificationService._month_start(start or datetime.utcnow())
+        last_month = NotificationService._month_start(datetime.utcnow(), months_ahead)
+        
+        existing = {
+            row[0] for row in db.execute(text("""
+                SELECT c.relname FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                JOIN pg_class p ON p.oid = i.inhparent
+                WHERE p.relname = 'notifications'
+            """)).all()
+        }
+        
+        created = []
+        month = first_month
+        while month <= last_month:
+            name = NotificationService._partition_name(month)
+            if name not in existing:
+                next_month = NotificationService._month_start(month, 1)
+                db.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF notifications "
+                    f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{next_month:%Y-%m-%d}')"
+                ))
+                db.execute(text(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS uq_{name}_group_key "
+                    f"ON {name} (recipient_id, group_key) WHERE group_key IS NOT NULL"
+                ))
+                created.append(name)
+            month = NotificationService._month_start(month, 1)
+        
+        if commit:
+            db.commit()
+        if created:
+            print(f"✅ Created notification partitions: {', '.join(created)}")
+        return created
+    
+    @staticmethod
+    def _drop_expired_partitions(db: Session, cutoff_date: datetime) -> int:
+        """
+        Drop monthly partitions that lie entirely before cutoff_date.
+        
+        Returns:
+            int: Estimated rows removed (from pg_class.reltuples, no COUNT scan)
+        """
+        cutoff_month = NotificationService._month_start(cutoff_date)
+        partitions = db.execute(text("""
+            SELECT c.relname, GREATEST(c.reltuples, 0)::bigint FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = 'notifications' AND c.relname LIKE 'notifications\\_p%'
+        """)).all()
+        
+        removed = 0
+        for name, estimated_rows in partitions:
+            try:
+                month = datetime.strptime(name[len("notifications_p"):], "%Y%m")
+            except ValueError:
+                continue
+            # A partition is fully expired once its upper bound is at or before the cutoff
+            if NotificationService._month_start(month, 1) <= cutoff_month:
+                db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                db.commit()
+                removed += estimated_rows or 0
+                print(f"✅ Dropped notification partition {name}")
+        return removed
+    
+    @staticmethod
+    def _batched_delete_before(
+        db: Session,
+        cutoff_date: datetime,
+        batch_size: Optional[int] = None,
+        pause_seconds: Optional[float] = None
+    ) -> int:
+        """
+        Delete notifications older than cutoff_date in primary-key chunks.
+        
+        Each chunk is its own short transaction, with a pause between chunks, so
+        retention never holds long locks or produces one huge WAL burst.
+        """
+        batch_size = batch_size or settings.notification_retention_batch_size
+        if pause_seconds is None:
+            pause_seconds = settings.notification_retention_batch_pause_ms / 1000
+        
+        deleted_count = 0
+        while True:
+            batch_ids = [
+                row[0] for row in db.query(Notification.id).filter(
+                    Notification.created_at < cutoff_date
+                ).limit(batch_size).all()
+            ]
+            if not batch_ids:
+                break
+            
+            deleted_count += db.query(Notification).filter(
+                Notification.id.in_(batch_ids)
+            ).delete(synchronize_session=False)
+            db.commit()
+            
+            if len(batch_ids) < batch_size:
+                break
+            if pause_seconds:
+                time.sleep(pause_seconds)
+        
+        return deleted_count
+    
     @staticmethod
     def delete_old_notifications(db: Session, days: int = 30) -> int:
         """
         Delete notifications older than specified days with safety checks.
         
+        On a month-partitioned PostgreSQL table, fully expired months are removed
+        with DROP of their partition; the remaining rows (the partially expired
+        month, or the whole table on SQLite/unpartitioned databases) are deleted
+        in primary-key batches with pauses between them.
+        
         Args:
             db: Database session
             days: Number of days to keep notifications (minimum 7)
             
         Returns:
-            int: Number of deleted notifications
+            int: Number of deleted notifications (estimated for dropped partitions)
         """
         try:
             # Safety check - don't delete too recent notifications
@@ -464,22 +995,23 @@ class NotificationService:
             
             cutoff_date = datetime.utcnow() - timedelta(days=days)
             
-            # Get count first for logging
-            to_delete_count = db.query(Notification).filter(
-                Notification.created_at < cutoff_date
-            ).count()
+            deleted_count = 0
+            if NotificationService.is_partitioned(db):
+                deleted_count += NotificationService._drop_expired_partitions(db, cutoff_date)
             
-            if to_delete_count == 0:
-                print(f"✅ No notifications older than {days} days found")
-                return 0
-            
-            # Perform deletion
-            deleted_count = db.query(Notification).filter(
-                Notification.created_at < cutoff_date
-            ).delete()
+            deleted_count += NotificationService._batched_delete_before(db, cutoff_date)
             
+            # Actor sets only matter while their window can still be folded into
+            actors_cutoff = datetime.utcnow() - timedelta(hours=2 * max(settings.notification_coalesce_window_hours, 1))
+            db.query(NotificationGroupActor).filter(
+                NotificationGroupActor.created_at < actors_cutoff
+            ).delete(synchronize_session=False)
             db.commit()
-            print(f"✅ Deleted {deleted_count} notifications older than {days} days")
+            
+            if deleted_count == 0:
+                print(f"✅ No notifications older than {days} days found")
+            else:
+                print(f"✅ Deleted {deleted_count} notifications older than {days} days")
             return deleted_count
             
         except Exception as e:
@@ -487,42 +1019,72 @@ class NotificationService:
             print(f"❌ Error deleting old notifications: {str(e)}")
             return 0
     
+    @staticmethod
+    def _grouped_type_counts(db: Session, *criteria, recent_since: Optional[datetime] = None) -> List[tuple]:
+        """
+        Run one GROUP BY type, is_read aggregate over the matching notifications.
+        
+        Every per-type and read/unread figure used by stats, digest and analytics is
+        derived from these rows, so the cost is one query regardless of how many
+        notification types exist.
+        
+        Returns:
+            list: Rows of (type, is_read, total, recent, latest_created_at, latest_id)
+        """
+        recent_since = recent_since or datetime.utcnow() - timedelta(hours=24)
+        return db.query(
+            Notification.type,
+            Notification.is_read,
+            func.count(Notification.id),
+            func.count(Notification.id).filter(Notification.created_at >= recent_since),
+            func.max(Notification.created_at),
+            func.max(Notification.id)
+        ).filter(*criteria).group_by(Notification.type, Notification.is_read).all()
+    
+    @staticmethod
+    def _summarize_type_counts(rows: List[tuple]) -> Dict[str, Any]:
+        """Fold grouped (type, is_read) rows into totals and per-type breakdowns"""
+        summary = {
+            "total": 0,
+            "unread": 0,
+            "read": 0,
+            "recent": 0,
+            "latest_id": None,
+            "type_counts": {notification_type.value: 0 for notification_type in NotificationType},
+            "type_read_counts": {notification_type.value: 0 for notification_type in NotificationType},
+            "type_latest": {notification_type.value: None for notification_type in NotificationType}
+        }
+        
+        for notification_type, is_read, total, recent, latest_at, latest_id in rows:
+            type_value = notification_type.value if hasattr(notification_type, 'value') else str(notification_type)
+            summary["total"] += total
+            summary["recent"] += recent or 0
+            summary["type_counts"][type_value] = summary["type_counts"].get(type_value, 0) + total
+            
+            if is_read:
+                summary["read"] += total
+                summary["type_read_counts"][type_value] = summary["type_read_counts"].get(type_value, 0) + total
+            elif is_read is not None:
+                summary["unread"] += total
+            
+            current_latest = summary["type_latest"].get(type_value)
+            if latest_at and (current_latest is None or latest_at > current_latest):
+                summary["type_latest"][type_value] = latest_at
+            if latest_id and (summary["latest_id"] is None or latest_id > summary["latest_id"]):
+                summary["latest_id"] = latest_id
+        
+        return summary
+    
     @staticmethod
     def get_notification_stats(db: Session, user_id: int) -> Dict[str, Any]:
-        """Get comprehensive notification statistics for a user"""
+        """Get comprehensive notification statistics for a user (single grouped query)"""
         try:
-            # Get total notifications
-            total_notifications = db.query(Notification).filter(
-                Notification.recipient_id == user_id
-            ).count()
-            
-            # Get unread count
-            unread_count = NotificationService.get_unread_count(db, user_id)
-            
-            # Get recent notifications (last 24 hours)
-            yesterday = datetime.utcnow() - timedelta(hours=24)
-            recent_count = db.query(Notification).filter(
-                and_(
-                    Notification.recipient_id == user_id,
-                    Notification.created_at >= yesterday
-                )
-            ).count()
-            
-            # Get notifications by type
-            type_counts = {}
-            for notification_type in NotificationType:
-                count = db.query(Notification).filter(
-                    and_(
-                        Notification.recipient_id == user_id,
-                        Notification.type == notification_type
-                    )
-                ).count()
-                type_counts[notification_type.value] = count
+            summary = NotificationService._summarize_type_counts(
+                NotificationService._grouped_type_counts(db, Notification.recipient_id == user_id)
+            )
             
-            # Get most recent notification
-            latest_notification = db.query(Notification).filter(
-                Notification.recipient_id == user_id
-            ).order_by(Notification.created_at.desc()).first()
+            total_notifications = summary["total"]
+            unread_count = summary["unread"]
             
             # Calculate read rate
             read_rate = 0.0
@@ -533,10 +1095,10 @@ class NotificationService:
             return {
                 "total_notifications": total_notifications,
                 "unread_count": unread_count,
-                "recent_count": recent_count,
-                "type_counts": type_counts,
+                "recent_count": summary["recent"],
+                "type_counts": summary["type_counts"],
                 "read_rate": round(read_rate, 2),
-                "latest_notification_id": latest_notification.id if latest_notification else None,
+                "latest_notification_id": summary["latest_id"],
                 "success": True
             }
             
@@ -604,7 +1166,7 @@ class NotificationService:
             total = search_query.count()
             
             notifications = (search_query
-                           .order_by(Notification.created_at.desc())
+                           .order_by(Notification.updated_at.desc())
                            .offset((page - 1) * size)
                            .limit(size)
                            .all())
@@ -720,30 +1282,37 @@ class NotificationService:
         try:
             start_date = datetime.utcnow() - timedelta(days=days)
             
-            # Get notifications in the period
-            notifications = db.query(Notification).filter(
-                and_(
+            # Per-type counts and latest timestamps from one grouped aggregate
+            summary = NotificationService._summarize_type_counts(
+                NotificationService._grouped_type_counts(
+                    db,
                     Notification.recipient_id == user_id,
                     Notification.created_at >= start_date
                 )
-            ).order_by(Notification.created_at.desc()).all()
+            )
             
-            # Group by type
             type_summary = {}
-            for notification_type in NotificationType:
-                type_notifications = [n for n in notifications if n.type == notification_type]
-                type_summary[notification_type.value] = {
-                    "count": len(type_notifications),
-                    "latest": type_notifications[0].created_at.isoformat() if type_notifications else None
+            for type_value, count in summary["type_counts"].items():
+                latest = summary["type_latest"].get(type_value)
+                type_summary[type_value] = {
+                    "count": count,
+                    "latest": latest.isoformat() if latest else None
                 }
             
             # Get top 5 most recent
-            top_notifications = notifications[:5]
+            top_notifications = db.query(Notification).options(
+                joinedload(Notification.sender)
+            ).filter(
+                and_(
+                    Notification.recipient_id == user_id,
+                    Notification.created_at >= start_date
+                )
+            ).order_by(Notification.created_at.desc()).limit(5).all()
             
             return {
                 "period_days": days,
-                "total_notifications": len(notifications),
-                "unread_count": len([n for n in notifications if not n.is_read]),
+                "total_notifications": summary["total"],
+                "unread_count": summary["total"] - summary["read"],
                 "type_summary": type_summary,
                 "top_notifications": [n.to_dict() for n in top_notifications],
                 "success": True
@@ -762,56 +1331,274 @@ class NotificationService:
             }
     
     @staticmethod
-    def export_notifications(
+    def iter_notification_export(
         db: Session, 
         user_id: int, 
-        format: str = "json",
-        days: Optional[int] = None
-    ) -> Dict[str, Any]:
-        """Export user notifications in specified format"""
+        format: str = "ndjson",
+        days: Optional[int] = None,
+        since_id: Optional[int] = None,
+        batch_size: int = 500,
+        since_activity_id: Optional[int] = None
+    ) -> Iterator[str]:
+        """
+        Stream user notifications as NDJSON lines or CSV rows.
+        
+        Rows come from a server-side cursor (yield_per) in ascending ID order and are
+        written out in chunks, so memory stays constant regardless of export size and
+        the first bytes are sent immediately. Stored notifications are followed by the
+        pulled new-post activities of followed authors (hybrid delivery), exported like
+        the list shows them: POST_UPDATE entries with the negated activity ID. Pass the
+        last exported IDs as since_id / since_activity_id for an incremental export.
+        
+        Args:
+            db: Database session (must stay open while the iterator is consumed)
+            user_id: User ID
+            format: "ndjson" or "csv"
+            days: Only export notifications from the last N days
+            since_id: Only export notifications with an ID greater than this cursor
+            batch_size: Rows fetched per round-trip and written per chunk
+            since_activity_id: Only export pulled activities with an ID greater than this cursor
+            
+        Yields:
+            str: Chunks of NDJSON or CSV text
+        """
+        format = format.lower()
+        if format not in ("ndjson", "csv"):
+            raise ValueError(f"Unsupported format: {format}")
+        
+        query = db.query(Notification).outerjoin(
+            Notification.sender
+        ).options(
+            contains_eager(Notification.sender)
+        ).filter(Notification.recipient_id == user_id)
+        
+        if days:
+            start_date = datetime.utcnow() - timedelta(days=days)
+            query = query.filter(Notification.created_at >= start_date)
+        
+        if since_id:
+            query = query.filter(Notification.id > since_id)
+        
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if format == "csv" else None
+        if writer:
+            writer.writerow(EXPORT_CSV_COLUMNS)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        
+        pending = 0
+        for n in query.order_by(Notification.id).yield_per(batch_size):
+            if writer:
+                writer.writerow([
+                    n.id,
+                    n.type.value,
+                    n.title,
+                    n.message,
+                    n.is_read,
+                    n.created_at.isoformat() if n.created_at else "",
+                    n.sender.full_name if n.sender else "System",
+                    n.actor_count or 1
+                ])
+            else:
+                buffer.write(json.dumps(n.to_dict()))
+                buffer.write("\n")
+            
+            pending += 1
+            if pending >= batch_size:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        
+        read_mark = NotificationService._get_read_mark(db, user_id)
+        activities = NotificationService._pulled_activity_query(db, user_id).options(
+            joinedload(AuthorActivity.author)
+        )
+        if days:
+            activities = activities.filter(AuthorActivity.created_at >= start_date)
+        if since_activity_id:
+            activities = activities.filter(AuthorActivity.id > since_activity_id)
+        
+        for activity in activities.order_by(AuthorActivity.id).yield_per(batch_size):
+            entry = NotificationService._activity_to_response(activity, user_id, read_mark)
+            if writer:
+                writer.writerow([
+                    entry.id,
+                    NotificationType.POST_UPDATE.value,
+                    entry.title,
+                    entry.message,
+                    entry.is_read,
+                    entry.created_at.isoformat() if entry.created_at else "",
+                    entry.sender.full_name,
+                    1
+                ])
+            else:
+                buffer.write(json.dumps(entry.model_dump(
+                    mode="json", exclude={"time_since_created", "display_message"}
+                )))
+                buffer.write("\n")
+            
+            pending += 1
+            if pending >= batch_size:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        
+        if pending:
+            yield buffer.getvalue()
+    
+    @staticmethod
+    def _unrolled_ranges(db: Session, start_date: datetime, today_start: datetime) -> List[Tuple[datetime, datetime]]:
+        """
+        Time ranges since start_date that notification_daily_stats does not cover.
+        
+        Days the rollup never saw (before it was enabled, or when a refresh
+        failed) have no rows, so they are aggregated live instead of counting
+        as zero. Today is always live. Consecutive days are merged into one range.
+        """
+        covered = {
+            day for (day,) in db.query(NotificationDailyStat.day).filter(
+                and_(
+                    NotificationDailyStat.day >= start_date.date(),
+                    NotificationDailyStat.day < today_start.date()
+                )
+            ).distinct()
+        }
+        
+        ranges = []
+        day_start = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day_start < today_start:
+            if day_start.date() not in covered:
+                range_start = max(day_start, start_date)
+                if ranges and ranges[-1][1] == day_start:
+                    ranges[-1] = (ranges[-1][0], day_start + timedelta(days=1))
+                else:
+                    ranges.append((range_start, day_start + timedelta(days=1)))
+            day_start += timedelta(days=1)
+        
+        if ranges and ranges[-1][1] == today_start:
+            ranges[-1] = (ranges[-1][0], None)
+        else:
+            ranges.append((today_start, None))
+        return ranges
+    
+    @staticmethod
+    def _analytics_type_totals(db: Session, start_date: datetime) -> Dict[str, Dict[str, int]]:
+        """
+        Get sent/read totals per type since start_date in a single statement.
+        
+        With the daily rollup enabled, rolled-up days are read from
+        notification_daily_stats and the remaining days (today, and any day
+        without rollup rows) are aggregated live in the same UNION ALL
+        statement; otherwise the whole range is aggregated from notifications.
+        """
+        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        live_query = select(
+            Notification.type,
+            func.count(Notification.id).label("sent"),
+            func.count(Notification.id).filter(Notification.is_read == True).label("read")
+        ).group_by(Notification.type)
+        
+        if settings.notification_rollup_enabled and start_date < today_start:
+            rollup_query = select(
+                NotificationDailyStat.type,
+                NotificationDailyStat.sent_count.label("sent"),
+                NotificationDailyStat.read_count.label("read")
+            ).where(
+                and_(
+                    NotificationDailyStat.day >= start_date.date(),
+                    NotificationDailyStat.day < today_start.date()
+                )
+            )
+            live_ranges = [
+                and_(Notification.created_at >= range_start, Notification.created_at < range_end)
+                if range_end is not None else Notification.created_at >= range_start
+                for range_start, range_end in NotificationService._unrolled_ranges(db, start_date, today_start)
+            ]
+            statement = union_all(
+                rollup_query,
+                live_query.where(or_(*live_ranges))
+            )
+        else:
+            statement = live_query.where(Notification.created_at >= start_date)
+        
+        totals = {
+            notification_type.value: {"sent": 0, "read": 0}
+            for notification_type in NotificationType
+        }
+        for notification_type, sent, read in db.execute(statement).all():
+            if isinstance(notification_type, str):
+                notification_type = NotificationType[notification_type]
+            type_totals = totals.setdefault(notification_type.value, {"sent": 0, "read": 0})
+            type_totals["sent"] += sent or 0
+            type_totals["read"] += read or 0
+        
+        return totals
+    
+    @staticmethod
+    def refresh_daily_rollup(db: Session, days: int = 2) -> int:
+        """
+        Recompute notification_daily_stats for the last `days` completed days.
+        
+        Read counts change after a day is rolled up, so the most recent days are
+        recomputed on every refresh. Intended to run periodically (or from the
+        admin endpoint) when settings.notification_rollup_enabled is on. Older
+        days without rollup rows are aggregated live by analytics until a
+        refresh with a larger `days` covers them.
+        
+        Args:
+            db: Database session
+            days: Number of completed days to (re)build, ending yesterday
+            
+        Returns:
+            int: Number of rollup rows written
+            
+        Raises:
+            Exception: Database errors, after rolling back
+        """
         try:
-            query = db.query(Notification).options(
-                joinedload(Notification.sender)
-            ).filter(Notification.recipient_id == user_id)
+            today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+            range_start = today_start - timedelta(days=max(days, 1))
             
-            if days:
-                start_date = datetime.utcnow() - timedelta(days=days)
-                query = query.filter(Notification.created_at >= start_date)
-            
-            notifications = query.order_by(Notification.created_at.desc()).all()
-            
-            if format.lower() == "json":
-                export_data = [n.to_dict() for n in notifications]
-            elif format.lower() == "csv":
-                # Simplified CSV format
-                export_data = []
-                for n in notifications:
-                    export_data.append({
-                        "id": n.id,
-                        "type": n.type.value,
-                        "title": n.title,
-                        "message": n.message,
-                        "is_read": n.is_read,
-                        "created_at": n.created_at.isoformat(),
-                        "sender_name": n.sender.full_name if n.sender else "System"
-                    })
-            else:
-                raise ValueError(f"Unsupported format: {format}")
+            db.query(NotificationDailyStat).filter(
+                and_(
+                    NotificationDailyStat.day >= range_start.date(),
+                    NotificationDailyStat.day < today_start.date()
+                )
+            ).delete(synchronize_session=False)
+            
+            day_column = func.date(Notification.created_at)
+            aggregate = select(
+                day_column,
+                Notification.type,
+                func.count(Notification.id),
+                func.count(Notification.id).filter(Notification.is_read == True)
+            ).where(
+                and_(
+                    Notification.created_at >= range_start,
+                    Notification.created_at < today_start
+                )
+            ).group_by(day_column, Notification.type)
             
-            return {
-                "success": True,
-                "format": format,
-                "count": len(notifications),
-                "data": export_data
-            }
+            result = db.execute(
+                insert(NotificationDailyStat).from_select(
+                    ["day", "type", "sent_count", "read_count"],
+                    aggregate
+                )
+            )
+            db.commit()
+            
+            written = result.rowcount if result.rowcount and result.rowcount > 0 else 0
+            print(f"✅ Refreshed notification rollup for {days} days ({written} rows)")
+            return written
             
         except Exception as e:
-            print(f"❌ Error exporting notifications: {str(e)}")
-            return {
-                "success": False,
-                "error": str(e),
-                "data": []
-            }
+            db.rollback()
+            print(f"❌ Error refreshing notification rollup: {str(e)}")
+            raise
     
     @staticmethod
     def get_notification_analytics(db: Session, days: int = 30) -> Dict[str, Any]:
@@ -819,32 +1606,18 @@ class NotificationService:
         try:
             start_date = datetime.utcnow() - timedelta(days=days)
             
-            # Total notifications sent
-            total_sent = db.query(Notification).filter(
-                Notification.created_at >= start_date
-            ).count()
+            # Sent/read per type in one grouped statement (rollup-backed when enabled)
+            type_totals = NotificationService._analytics_type_totals(db, start_date)
             
-            # Total read
-            total_read = db.query(Notification).filter(
-                and_(
-                    Notification.created_at >= start_date,
-                    Notification.is_read == True
-                )
-            ).count()
+            total_sent = sum(totals["sent"] for totals in type_totals.values())
+            total_read = sum(totals["read"] for totals in type_totals.values())
             
             # Read rate
             read_rate = total_read / total_sent if total_sent > 0 else 0
             
-            # Notifications by type
-            type_breakdown = {}
-            for notification_type in NotificationType:
-                count = db.query(Notification).filter(
-                    and_(
-                        Notification.created_at >= start_date,
-                        Notification.type == notification_type
-                    )
-                ).count()
-                type_breakdown[notification_type.value] = count
+            type_breakdown = {
+                type_value: totals["sent"] for type_value, totals in type_totals.items()
+            }
             
             # Most active users (by notifications received)
             active_users = db.query(
@@ -866,6 +1639,7 @@ class NotificationService:
                     {"user_id": user_id, "notification_count": count} 
                     for user_id, count in active_users
                 ],
+                "rollup_enabled": settings.notification_rollup_enabled,
                 "success": True
             }
             
@@ -877,29 +1651,67 @@ class NotificationService:
             }
     
     @staticmethod
-    def cleanup_duplicate_notifications(db: Session) -> int:
-        """Remove duplicate notifications (admin function)"""
+    def cleanup_duplicate_notifications(db: Session, batch_size: int = 1000) -> int:
+        """
+        Remove duplicate like/comment notifications (admin function).
+        
+        Coalesced rows are already unique per aggregation key; this folds legacy rows
+        written before coalescing, keeping the oldest row per
+        (recipient, sender, type, post, comment) and deleting the rest in batches.
+        
+        Args:
+            db: Database session
+            batch_size: Rows fetched and deleted per round-trip
+            
+        Returns:
+            int: Number of deleted notifications
+        """
         try:
-            # Find duplicates based on recipient, sender, type, and same post/comment within 1 hour
-            duplicates_query = """
-                DELETE FROM notifications 
-                WHERE id NOT IN (
-                    SELECT MIN(id) 
-                    FROM notifications 
-                    GROUP BY recipient_id, sender_id, type, 
-                             EXTRACT(HOUR FROM created_at),
-                             EXTRACT(DAY FROM created_at)
-                    HAVING COUNT(*) > 1
+            rows = db.query(
+                Notification.id,
+                Notification.recipient_id,
+                Notification.sender_id,
+                Notification.type,
+                Notification.data
+            ).filter(
+                and_(
+                    Notification.group_key.is_(None),
+                    Notification.sender_id.isnot(None),
+                    Notification.type.in_([NotificationType.LIKE, NotificationType.COMMENT])
                 )
-                AND created_at >= NOW() - INTERVAL '24 hours'
-            """
+            ).order_by(Notification.id).yield_per(batch_size)
             
-            # Note: This is a simplified version. In production, you'd want more sophisticated duplicate detection
+            seen = set()
+            duplicate_ids = []
+            for notification_id, recipient_id, sender_id, notification_type, data in rows:
+                try:
+                    data_dict = json.loads(data) if data else {}
+                except json.JSONDecodeError:
+                    continue
+                if not isinstance(data_dict, dict) or data_dict.get("post_id") is None:
+                    continue
+                
+                key = (recipient_id, sender_id, notification_type, data_dict.get("post_id"))
+                if notification_type == NotificationType.COMMENT:
+                    key += (data_dict.get("comment_id"),)
+                
+                if key in seen:
+                    duplicate_ids.append(notification_id)
+                else:
+                    seen.add(key)
             
-            print("⚠️ Duplicate cleanup requires manual implementation based on your specific duplicate criteria")
-            return 0
+            deleted_count = 0
+            for i in range(0, len(duplicate_ids), batch_size):
+                deleted_count += db.query(Notification).filter(
+                    Notification.id.in_(duplicate_ids[i:i + batch_size])
+                ).delete(synchronize_session=False)
+                db.commit()
+            
+            print(f"✅ Removed {deleted_count} duplicate notifications")
+            return deleted_count
             
         except Exception as e:
+            db.rollback()
             print(f"❌ Error cleaning up duplicates: {str(e)}")
             return 0
     
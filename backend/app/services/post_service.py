@@ -12,6 +12,8 @@ from ..models.user import User
 from ..models.post import Post
 from ..models.like import Like
 from ..models.comment import Comment
+from .autocomplete_service import record_post_hashtags
+from .follow_graph import get_follow_graph
 from ..models.follow import Follow
 from ..schemas.post import PostCreate, PostUpdate
 
@@ -38,6 +40,7 @@ def create_post(user: User, post_data: PostCreate, db: Session) -> Post:
     db.add(new_post)
     db.commit()
     db.refresh(new_post)
+    record_post_hashtags(new_post.hashtags)
     
     return new_post
 
@@ -79,12 +82,17 @@ def update_post(post: Post, user: User, post_data: PostUpdate, db: Session) -> P
         )
     
     update_data = post_data.dict(exclude_unset=True)
+    previous_hashtags = post.hashtags
     
     for field, value in update_data.items():
         setattr(post, field, value)
     
     db.commit()
     db.refresh(post)
+    
+    if "hashtags" in update_data:
+        record_post_hashtags(previous_hashtags, -1)
+        record_post_hashtags(post.hashtags)
     return post
 
 
@@ -109,8 +117,10 @@ def delete_post(post: Post, user: User, db: Session) -> bool:
             detail="Not authorized to delete this post"
         )
     
+    hashtags = post.hashtags
     db.delete(post)
     db.commit()
+    record_post_hashtags(hashtags, -1)
     return True
 
 
@@ -158,7 +168,11 @@ def get_following_feed(user: User, db: Session, page: int = 1, size: int = 20) -
         Tuple[List[Post], int]: List of posts and total count
     """
     # Get IDs of users that the current user follows
-    following_ids = db.query(Follow.following_id).filter(Follow.follower_id == user.id).subquery()
+    graph = get_follow_graph(db)
+    if graph:
+        following_ids = list(graph.following_ids(user.id))
+    else:
+        following_ids = db.query(Follow.following_id).filter(Follow.follower_id == user.id).subquery()
     
     # Get posts from followed users + own posts
     posts_query = db.query(Post).options(joinedload(Post.author)).filter(
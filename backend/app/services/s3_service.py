@@ -1,15 +1,60 @@
 # backend/app/services/s3_service.py - FIXED VERSION
 
+import asyncio
 import boto3
 import uuid
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Optional, Dict, Any, List
 from fastapi import UploadFile, HTTPException
+from sqlalchemy.orm import Session
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError, NoCredentialsError
-from PIL import Image, ImageOps
-import io
-from datetime import datetime
-import mimetypes
+
+from ..config.settings import settings
+from . import file_service
+from .file_service import (
+    upload_file, validate_image_file, validate_document_file, generate_unique_filename,
+    render_renditions, rendition_filename, rendition_storage_keys, rendition_urls, rendition_index_rows,
+    RENDITION_PRESETS, RENDITION_CONTENT_TYPES, UPLOAD_FOLDER, TEMP_FOLDER
+)
+from .image_executor import image_executor
+from .media_index import file_sha256, media_file_row, record_media_files
+from .media_store import adopt_media_object
+from .storage import S3StorageBackend
+
+MB = 1024 * 1024
+
+# Direct (presigned) uploads land privately under incoming/<user_id>/<folder>/
+# until finalized. Add a bucket lifecycle rule expiring incoming/ after a day
+# to clear slots that were never finalized.
+DIRECT_UPLOAD_PREFIX = "incoming"
+
+# Times a background finalize retries when the image pool is saturated (503)
+DIRECT_UPLOAD_BUSY_RETRIES = 5
+DIRECT_UPLOAD_FOLDERS = ("images", "posts", "avatars")
+DIRECT_UPLOAD_TYPES = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/webp': 'webp',
+    'image/gif': 'gif'
+}
+DIRECT_UPLOAD_CONTENT_TYPES = {extension: content_type for content_type, extension in DIRECT_UPLOAD_TYPES.items()}
+
+
+def _sniff_image_type(header: bytes) -> Optional[str]:
+    """Content type from an image file's leading bytes"""
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
 
 
 class S3Service:
@@ -19,10 +64,13 @@ class S3Service:
         self.secret_key = os.getenv('AWS_SECRET_ACCESS_KEY')
         self.bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
         self.region = os.getenv('AWS_S3_REGION', 'ap-south-1')
+        self.endpoint_url = os.getenv('AWS_S3_ENDPOINT_URL')  # S3-compatible stand-ins (MinIO, moto)
         
         # FIXED: Auto-generate S3 URL if not provided
         if os.getenv('AWS_S3_URL'):
             self.base_url = os.getenv('AWS_S3_URL')
+        elif self.endpoint_url:
+            self.base_url = f"{self.endpoint_url.rstrip('/')}/{self.bucket_name}"
         else:
             self.base_url = f"https://{self.bucket_name}.s3.{self.region}.amazonaws.com"
         
@@ -37,13 +85,38 @@ class S3Service:
             raise ValueError("AWS credentials not properly configured")
         
         try:
+            # One pooled client shared by the upload threads (boto3 clients are thread-safe)
             self.s3_client = boto3.client(
                 's3',
                 aws_access_key_id=self.access_key,
                 aws_secret_access_key=self.secret_key,
-                region_name=self.region
+                region_name=self.region,
+                endpoint_url=self.endpoint_url,
+                config=Config(
+                    max_pool_connections=settings.s3_max_pool_connections,
+                    retries={'max_attempts': settings.s3_max_attempts, 'mode': 'standard'},
+                    connect_timeout=5,
+                    read_timeout=60,
+                    tcp_keepalive=True
+                )
+            )
+            
+            # Files above the threshold go up as parallel multipart uploads
+            self.transfer_config = TransferConfig(
+                multipart_threshold=settings.s3_multipart_threshold_mb * MB,
+                multipart_chunksize=settings.s3_multipart_chunk_mb * MB,
+                max_concurrency=settings.s3_multipart_concurrency
             )
             
+            # Bounded pool for blocking boto3 calls, so they never run on the event loop
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.s3_upload_workers,
+                thread_name_prefix="s3-upload"
+            )
+            
+            # Uploads, renditions and deletes all go through the shared storage interface
+            self.storage = S3StorageBackend(self)
+            
             # Test S3 connection
             self.s3_client.head_bucket(Bucket=self.bucket_name)
             print(f"✅ S3 Client initialized and bucket '{self.bucket_name}' accessible")
@@ -61,72 +134,10 @@ class S3Service:
         except Exception as e:
             raise ValueError(f"Failed to initialize S3 client: {e}")
 
-    def _generate_file_key(self, original_filename: str, folder: str = "images") -> str:
-        """Generate unique S3 key for file"""
-        extension = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else 'jpg'
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        unique_id = str(uuid.uuid4())[:8]
-        filename = f"{timestamp}_{unique_id}.{extension}"
-        return f"{folder}/{filename}"
-
-    def _validate_image(self, file: UploadFile, max_size_mb: int = 10) -> Dict[str, Any]:
-        """Validate uploaded image file"""
-        # Check file size
-        file.file.seek(0, 2)
-        file_size = file.file.tell()
-        file.file.seek(0)
-        
-        max_size_bytes = max_size_mb * 1024 * 1024
-        if file_size > max_size_bytes:
-            raise HTTPException(
-                status_code=413,
-                detail=f"File too large. Maximum size: {max_size_mb}MB"
-            )
-        
-        # Check file type
-        content_type = file.content_type
-        if not content_type:
-            content_type, _ = mimetypes.guess_type(file.filename)
-        
-        allowed_types = ['image/jpeg', 'image/png', 'image/webp', 'image/gif']
-        
-        if content_type not in allowed_types:
-            raise HTTPException(
-                status_code=400,
-                detail="File type not allowed. Use JPEG, PNG, WebP, or GIF"
-            )
-        
-        return {
-            'content_type': content_type,
-            'file_size': file_size
-        }
-
-    def _optimize_image(self, file_content: bytes, max_width: int = 1200, max_height: int = 1200) -> bytes:
-        """Optimize image for web"""
-        try:
-            image = Image.open(io.BytesIO(file_content))
-            
-            # Fix orientation
-            image = ImageOps.exif_transpose(image)
-            
-            # Convert to RGB if necessary
-            if image.mode in ('RGBA', 'P'):
-                background = Image.new('RGB', image.size, (255, 255, 255))
-                background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-                image = background
-            
-            # Resize if too large
-            if image.width > max_width or image.height > max_height:
-                image.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-            
-            # Save optimized
-            output = io.BytesIO()
-            image.save(output, format='JPEG', quality=85, optimize=True)
-            return output.getvalue()
-            
-        except Exception as e:
-            print(f"Image optimization failed: {e}")
-            return file_content
+    async def _run_blocking(self, func, *args, **kwargs):
+        """Run a blocking boto3 call on the S3 upload thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
 
     async def upload_image(
         self,
@@ -134,52 +145,46 @@ class S3Service:
         folder: str = "images",
         optimize: bool = True,
         max_size_mb: int = 10,
-        max_width: int = 1200,
-        max_height: int = 1200
+        db: Optional[Session] = None,
+        owner_id: Optional[int] = None
     ) -> Dict[str, Any]:
-        """Upload image to S3 Mumbai region"""
+        """
+        Upload image to S3 Mumbai region
+        Runs the shared upload pipeline (file_service.upload_file) against S3:
+        the same renditions as local uploads, and with a database session
+        re-uploads of the same bytes reuse the stored object (see media_store)
+        """
+        if not validate_image_file(file):
+            raise HTTPException(
+                status_code=400,
+                detail="File type not allowed. Use JPEG, PNG, WebP, or GIF"
+            )
+        
         try:
-            validation = self._validate_image(file, max_size_mb)
-            
-            file_content = await file.read()
-            original_size = len(file_content)
-            
-            if optimize:
-                file_content = self._optimize_image(file_content, max_width, max_height)
-            
-            s3_key = self._generate_file_key(file.filename, folder)
-            
-            # Upload to S3
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Body=file_content,
-                ContentType=validation['content_type'],
-                ACL='public-read',
-                CacheControl='max-age=31536000',
-                Metadata={
-                    'original-filename': file.filename,
-                    'original-size': str(original_size),
-                    'optimized-size': str(len(file_content)),
-                    'upload-timestamp': datetime.now().isoformat(),
-                    'region': self.region
-                }
+            result = await upload_file(
+                file=file,
+                folder=folder,
+                optimize_images=optimize,
+                max_size=max_size_mb * MB,
+                db=db,
+                storage=self.storage,
+                owner_id=owner_id
             )
             
-            file_url = f"{self.base_url}/{s3_key}"
-            
-            print(f"✅ Image uploaded: {s3_key} -> {file_url}")
+            if not result['deduplicated']:
+                print(f"✅ Image uploaded: {result['filename']} -> {result['url']}")
             
             return {
                 'success': True,
-                'filename': s3_key.split('/')[-1],
+                'filename': result['filename'].split('/')[-1],
                 'original_filename': file.filename,
-                'url': file_url,
-                's3_key': s3_key,
-                'size': len(file_content),
-                'original_size': original_size,
-                'content_type': validation['content_type'],
-                'optimized': optimize
+                'url': result['url'],
+                's3_key': result['filename'],
+                'size': result['file_size'],
+                'original_size': result['original_size'],
+                'content_type': result['content_type'],
+                'optimized': optimize,
+                'deduplicated': result['deduplicated']
             }
             
         except HTTPException:
@@ -192,7 +197,8 @@ class S3Service:
         self,
         file: UploadFile,
         user_id: int,
-        max_size_mb: int = 2
+        max_size_mb: int = 2,
+        db: Optional[Session] = None
     ) -> Dict[str, Any]:
         """Upload user avatar to S3"""
         result = await self.upload_image(
@@ -200,8 +206,8 @@ class S3Service:
             folder="avatars",
             optimize=True,
             max_size_mb=max_size_mb,
-            max_width=400,
-            max_height=400
+            db=db,
+            owner_id=user_id
         )
         
         result['avatar_url'] = result['url']
@@ -212,7 +218,9 @@ class S3Service:
         files: List[UploadFile],
         folder: str = "images",
         max_files: int = 5,
-        max_size_mb: int = 10
+        max_size_mb: int = 10,
+        db: Optional[Session] = None,
+        owner_id: Optional[int] = None
     ) -> Dict[str, Any]:
         """Upload multiple images to S3"""
         if len(files) > max_files:
@@ -221,23 +229,28 @@ class S3Service:
                 detail=f"Too many files. Maximum {max_files} files allowed"
             )
         
+        # Files upload concurrently; image work and S3 calls are bounded by their own pools
+        results = await asyncio.gather(
+            *(
+                self.upload_image(
+                    file=file, folder=folder, optimize=True, max_size_mb=max_size_mb, db=db, owner_id=owner_id
+                )
+                for file in files
+            ),
+            return_exceptions=True
+        )
+        
         uploaded_files = []
         failed_files = []
         
-        for file in files:
-            try:
-                result = await self.upload_image(
-                    file=file,
-                    folder=folder,
-                    optimize=True,
-                    max_size_mb=max_size_mb
-                )
-                uploaded_files.append(result)
-            except Exception as e:
+        for file, result in zip(files, results):
+            if isinstance(result, BaseException):
                 failed_files.append({
                     'filename': file.filename,
-                    'error': str(e)
+                    'error': result.detail if isinstance(result, HTTPException) else str(result)
                 })
+            else:
+                uploaded_files.append(result)
         
         return {
             'uploaded_files': uploaded_files,
@@ -251,7 +264,8 @@ class S3Service:
         self,
         file: UploadFile,
         user_id: int,
-        max_size_mb: int = 2
+        max_size_mb: int = 2,
+        db: Optional[Session] = None
     ) -> Dict[str, Any]:
         """Upload user avatar to S3"""
         result = await self.upload_image(
@@ -259,22 +273,333 @@ class S3Service:
             folder="avatars",
             optimize=True,
             max_size_mb=max_size_mb,
-            max_width=400,
-            max_height=400
+            db=db,
+            owner_id=user_id
         )
         
         result['avatar_url'] = result['url']
         return result
 
-    def delete_file(self, s3_key: str) -> bool:
-        """Delete file from S3"""
+    async def upload_document(
+        self,
+        file: UploadFile,
+        folder: str = "documents",
+        max_size_mb: Optional[int] = None,
+        db: Optional[Session] = None,
+        owner_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Upload a document to S3, streamed from disk (multipart above the threshold)"""
+        max_size_mb = max_size_mb or settings.max_document_size_mb
+        if not validate_document_file(file):
+            raise HTTPException(
+                status_code=400,
+                detail="File type not allowed. Use PDF, DOC, DOCX or TXT"
+            )
+        
         try:
-            self.s3_client.delete_object(Bucket=self.bucket_name, Key=s3_key)
-            print(f"✅ File deleted from S3: {s3_key}")
+            # Stored as uploaded, streamed from the spool file (multipart above the threshold)
+            result = await upload_file(
+                file=file,
+                folder=folder,
+                optimize_images=False,
+                max_size=max_size_mb * MB,
+                db=db,
+                storage=self.storage,
+                owner_id=owner_id
+            )
+            print(f"✅ Document uploaded: {result['filename']} -> {result['url']}")
+            
+            return {
+                'success': True,
+                'filename': result['filename'].split('/')[-1],
+                'original_filename': file.filename,
+                'url': result['url'],
+                's3_key': result['filename'],
+                'size': result['file_size'],
+                'content_type': file.content_type,
+                'multipart': result['file_size'] >= self.transfer_config.multipart_threshold
+            }
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"S3 document upload error: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+    def _direct_upload_limit_mb(self, folder: str) -> int:
+        """Size limit for a direct upload into folder"""
+        return settings.max_avatar_size_mb if folder == "avatars" else settings.max_file_size_mb
+
+    def create_direct_upload(
+        self,
+        user_id: int,
+        content_type: str,
+        folder: str = "images",
+        size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Issue a presigned POST so the client uploads an image straight to S3.
+        
+        The policy pins the key, Content-Type and size range, and the object
+        stays private under incoming/ until finalize_direct_upload checks it.
+        
+        Args:
+            user_id: Uploading user's ID (scopes the key)
+            content_type: Declared image type
+            folder: Destination folder (images, posts or avatars)
+            size: Declared size in bytes, checked early when given
+        
+        Returns:
+            Dict[str, Any]: URL and form fields to POST, plus the key to finalize
+        """
+        if folder not in DIRECT_UPLOAD_FOLDERS:
+            raise HTTPException(status_code=400, detail=f"Invalid folder. Use one of: {', '.join(DIRECT_UPLOAD_FOLDERS)}")
+        if content_type not in DIRECT_UPLOAD_TYPES:
+            raise HTTPException(status_code=400, detail="File type not allowed. Use JPEG, PNG, WebP, or GIF")
+        
+        max_size_mb = self._direct_upload_limit_mb(folder)
+        if size is not None and size > max_size_mb * MB:
+            raise HTTPException(status_code=413, detail=f"File too large. Maximum size: {max_size_mb}MB")
+        
+        s3_key = generate_unique_filename(
+            f"upload.{DIRECT_UPLOAD_TYPES[content_type]}",
+            f"{DIRECT_UPLOAD_PREFIX}/{user_id}/{folder}"
+        )
+        
+        # Signed locally; no request to S3
+        presigned = self.s3_client.generate_presigned_post(
+            Bucket=self.bucket_name,
+            Key=s3_key,
+            Fields={'Content-Type': content_type},
+            Conditions=[
+                {'Content-Type': content_type},
+                ['content-length-range', 1, max_size_mb * MB]
+            ],
+            ExpiresIn=settings.s3_direct_upload_expiry_seconds
+        )
+        
+        return {
+            'upload_url': presigned['url'],
+            'fields': presigned['fields'],
+            'key': s3_key,
+            'max_size': max_size_mb * MB,
+            'expires_in': settings.s3_direct_upload_expiry_seconds
+        }
+
+    async def finalize_direct_upload(self, user_id: int, s3_key: str) -> Dict[str, Any]:
+        """
+        Verify a direct upload and work out where its renditions will be stored.
+        
+        Checks the object's size and declared type with a HEAD and its real
+        type from the first bytes. Objects that fail are deleted.
+        
+        Args:
+            user_id: Finalizing user's ID (must own the slot)
+            s3_key: Key returned by create_direct_upload
+        
+        Returns:
+            Dict[str, Any]: Source key, final key, folder and final URLs
+        """
+        parts = s3_key.split('/')
+        if (len(parts) != 4 or parts[0] != DIRECT_UPLOAD_PREFIX or parts[1] != str(user_id)
+                or parts[2] not in DIRECT_UPLOAD_FOLDERS):
+            raise HTTPException(status_code=403, detail="Not your upload slot")
+        folder, name = parts[2], parts[3]
+        
+        stored = await self.storage.stat(s3_key)
+        if stored is None:
+            raise HTTPException(status_code=404, detail="Upload not found. It may have expired or already been finalized")
+        
+        content_type = stored.content_type
+        max_size_mb = self._direct_upload_limit_mb(folder)
+        error = None
+        if stored.size > max_size_mb * MB:
+            error = (413, f"File too large. Maximum size: {max_size_mb}MB")
+        elif DIRECT_UPLOAD_TYPES.get(content_type) != name.rsplit('.', 1)[-1]:
+            error = (400, "File type does not match the upload slot")
+        else:
+            ranged = await self._run_blocking(
+                self.s3_client.get_object, Bucket=self.bucket_name, Key=s3_key, Range='bytes=0-15'
+            )
+            if _sniff_image_type(ranged['Body'].read()) != content_type:
+                error = (400, "File content is not a valid image of the declared type")
+        
+        if error:
+            await self.storage.delete(s3_key)
+            raise HTTPException(status_code=error[0], detail=error[1])
+        
+        final_key = f"{folder}/{name}"
+        return {
+            'source_key': s3_key,
+            's3_key': final_key,
+            'folder': folder,
+            'filename': name,
+            'size': stored.size,
+            'content_type': content_type,
+            'url': self.storage.url(final_key),
+            'thumbnail_url': self.storage.url(rendition_filename(final_key, 'thumbnail'))
+        }
+
+    async def process_direct_upload(self, source_key: str, final_key: str, folder: str,
+                                    busy_retries: int = 0, owner_id: Optional[int] = None,
+                                    db: Optional[Session] = None) -> bool:
+        """
+        Render a finalized direct upload and publish the renditions.
+        
+        The original is downloaded to uploads/temp, rendered in the image
+        process pool and each rendition is PUT next to final_key. Images that
+        cannot be decoded are published as uploaded. The incoming object is
+        deleted only once everything is published; after a failure it is
+        kept, so finalize can be called again (the incoming/ lifecycle rule
+        clears it eventually). Published files are recorded like upload_file's:
+        in the media index, and in the content-addressed store so later
+        uploads of the same bytes reuse them.
+        
+        Args:
+            source_key: Incoming object
+            final_key: Key of the published main rendition
+            folder: Upload folder (selects the rendition preset)
+            busy_retries: Retries, after the Retry-After delay, while the image
+                pool is saturated. With 0 (a request waiting for the result)
+                the 503 is raised to the client instead.
+            owner_id: Uploading user, recorded in the media index
+            db: Database session (background runs open their own)
+        
+        Returns:
+            bool: Whether the image was published
+        """
+        for attempt in range(busy_retries + 1):
+            try:
+                published = await self._publish_direct_upload(source_key, final_key, folder, owner_id, db)
+            except HTTPException as e:
+                if e.status_code != 503:
+                    raise
+                if attempt < busy_retries:
+                    await asyncio.sleep(int((e.headers or {}).get('Retry-After', 1)))
+                    continue
+                if not busy_retries:
+                    raise
+                print(f"❌ Direct upload {source_key} not processed: image pool busy, kept for a retry")
+                return False
+            
+            if published:
+                await self.storage.delete(source_key)
+            return published
+        return False
+
+    async def _publish_direct_upload(self, source_key: str, final_key: str, folder: str,
+                                     owner_id: Optional[int] = None, db: Optional[Session] = None) -> bool:
+        """Render and publish one direct upload; raises HTTPException 503 when the image pool is busy."""
+        temp_path = os.path.join(UPLOAD_FOLDER, TEMP_FOLDER, f"{uuid.uuid4().hex}.part")
+        os.makedirs(os.path.dirname(temp_path), exist_ok=True)
+        
+        try:
+            await self._run_blocking(self.s3_client.download_file, self.bucket_name, source_key, temp_path)
+            original_size = os.path.getsize(temp_path)
+            content_hash = await self._run_blocking(file_sha256, temp_path)
+            content_type = DIRECT_UPLOAD_CONTENT_TYPES.get(final_key.rsplit('.', 1)[-1])
+            
+            preset = RENDITION_PRESETS.get(folder, RENDITION_PRESETS['default'])
+            try:
+                outputs = await image_executor.run(
+                    render_renditions, os.path.abspath(temp_path), preset, settings.image_webp_renditions
+                )
+            except HTTPException:
+                raise
+            except Exception as e:
+                print(f"Image optimization failed: {str(e)}")
+                outputs = {}
+            
+            if not outputs:
+                # Undecodable image: publish the original without renditions
+                await self._run_blocking(
+                    self.s3_client.copy_object,
+                    Bucket=self.bucket_name,
+                    Key=final_key,
+                    CopySource={'Bucket': self.bucket_name, 'Key': source_key},
+                    MetadataDirective='COPY',
+                    ACL='public-read',
+                    CacheControl='max-age=31536000'
+                )
+                url = self.storage.url(final_key)
+                index_row = media_file_row(
+                    self.storage.name, final_key, url, original_size,
+                    content_type=content_type,
+                    rendition='main',
+                    owner_id=owner_id,
+                    file_hash=content_hash
+                )
+                self._record_direct_upload(
+                    db, folder, content_hash, [index_row],
+                    key=final_key,
+                    url=url,
+                    content_type=content_type,
+                    size=original_size,
+                    original_size=original_size
+                )
+                return True
+            
+            rendition_keys = rendition_storage_keys(final_key, outputs)
+            urls = dict(zip(rendition_keys, await asyncio.gather(*(
+                self.storage.put(key, outputs[name][output_format], RENDITION_CONTENT_TYPES.get(output_format))
+                for key, (name, output_format) in rendition_keys.items()
+            ))))
+            
+            stored_renditions, thumbnail_url = rendition_urls(rendition_keys, urls)
+            self._record_direct_upload(
+                db, folder, content_hash,
+                rendition_index_rows(self.storage.name, rendition_keys, outputs, urls, owner_id),
+                key=final_key,
+                url=urls[final_key],
+                thumbnail_url=thumbnail_url,
+                renditions=stored_renditions,
+                content_type=content_type,
+                size=len(outputs['main'][rendition_keys[final_key][1]]),
+                original_size=original_size
+            )
+            
+            print(f"✅ Direct upload published: {source_key} -> {final_key}")
             return True
+            
+        except HTTPException:
+            raise
         except Exception as e:
-            print(f"❌ Failed to delete file {s3_key}: {e}")
+            print(f"❌ Direct upload processing failed for {source_key}: {str(e)}")
             return False
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _record_direct_upload(self, db: Optional[Session], folder: str, content_hash: str,
+                              index_rows: List[Dict[str, Any]], **fields):
+        """Add a published direct upload to the media index and the content-addressed store"""
+        from ..config.database import SessionLocal
+        session = db or SessionLocal()
+        try:
+            if settings.enable_duplicate_detection:
+                adopt_media_object(session, self.storage.name, folder, content_hash, **fields)
+            record_media_files(session, index_rows)
+        except Exception as e:
+            # Never fails the publish; the media backfill indexes the files later
+            session.rollback()
+            print(f"⚠️ Could not record direct upload {fields['key']}: {str(e)}")
+        finally:
+            if db is None:
+                session.close()
+
+    async def direct_upload_ready(self, final_key: str) -> bool:
+        """Whether a finalized direct upload has been published"""
+        try:
+            return await self.storage.stat(final_key) is not None
+        except ClientError:
+            return False
+
+    async def delete_file(self, s3_key: str, db: Optional[Session] = None) -> bool:
+        """Delete file and its renditions from S3 (content-addressed objects only when their last reference goes)"""
+        deleted = await file_service.delete_file(s3_key, db=db, storage=self.storage)
+        if deleted:
+            print(f"✅ File deleted from S3: {s3_key}")
+        return deleted
 
 
 # Global S3 service instance
@@ -0,0 +1,443 @@
+"""
+User search service for IAP Connect application.
+Trigram-ranked user search (pg_trgm on PostgreSQL, pure-Python fallback elsewhere)
+and an in-memory prefix index for username/full-name autocomplete.
+"""
+
+import bisect
+import re
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.exc import ProgrammingError, OperationalError
+from sqlalchemy.orm import Session
+
+from ..config.settings import settings
+from ..models.user import User
+
+
+# Columns matched by user search
+SEARCH_COLUMNS = (User.full_name, User.username, User.bio, User.specialty, User.college)
+
+# Prefixes up to this many characters keep a ranked top list (their slices are the largest)
+TOP_PREFIX_LENGTH = 3
+
+# Users kept per top list; a list that shrinks below the requested limit is rebuilt
+TOP_LIST_SIZE = 64
+
+# Users updated this long before the newest change already seen are read again on sync,
+# covering transactions that committed late
+SYNC_OVERLAP = timedelta(seconds=30)
+
+# PostgreSQL error codes meaning pg_trgm is not installed (undefined_function, undefined_object)
+TRIGRAM_MISSING_PGCODES = ("42883", "42704")
+
+_WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def _trigrams(text: str) -> set:
+    """Trigram set of a string, using pg_trgm's rules (lowercase words padded with spaces)."""
+    grams = set()
+    for word in _WORD_RE.findall((text or "").lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def trigram_similarity(a: str, b: str) -> float:
+    """
+    Python equivalent of pg_trgm similarity().
+
+    Args:
+        a: First string
+        b: Second string
+
+    Returns:
+        float: Shared trigrams divided by total distinct trigrams (0..1)
+    """
+    grams_a, grams_b = _trigrams(a), _trigrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+
+class UserSearchService:
+    """Service for ranked user search."""
+
+    # None until the first PostgreSQL search tells us whether pg_trgm is installed
+    _trigram_available: Optional[bool] = None
+
+    @staticmethod
+    def _search_filter(query: str):
+        """Substring match over the searchable columns (served by the GIN trigram indexes)."""
+        pattern = f"%{query}%"
+        return or_(*[column.ilike(pattern) for column in SEARCH_COLUMNS])
+
+    @staticmethod
+    def _base_query(db: Session, query: str, user_type: Optional[str], exclude_user_id: Optional[int]):
+        """Active users matching the query, optionally filtered by type."""
+        search_query = db.query(User).filter(
+            User.is_active == True,
+            UserSearchService._search_filter(query)
+        )
+        if user_type:
+            search_query = search_query.filter(User.user_type == user_type)
+        if exclude_user_id:
+            search_query = search_query.filter(User.id != exclude_user_id)
+        return search_query
+
+    @staticmethod
+    def search_users(
+        db: Session,
+        query: str,
+        page: int = 1,
+        per_page: int = 20,
+        user_type: Optional[str] = None,
+        exclude_user_id: Optional[int] = None
+    ) -> Tuple[List[User], int]:
+        """
+        Search users ranked by trigram similarity, then followers_count.
+
+        Args:
+            db: Database session
+            query: Search text
+            page: Page number (1-indexed)
+            per_page: Results per page
+            user_type: Optional user type filter
+            exclude_user_id: User to leave out (usually the searcher)
+
+        Returns:
+            Tuple[List[User], int]: Page of users and total matches
+        """
+        query = query.strip()
+
+        if db.get_bind().dialect.name == "postgresql" and UserSearchService._trigram_available is not False:
+            try:
+                result = UserSearchService._search_trigram(db, query, page, per_page, user_type, exclude_user_id)
+                UserSearchService._trigram_available = True
+                return result
+            except (ProgrammingError, OperationalError) as e:
+                db.rollback()
+                if getattr(e.orig, "pgcode", None) in TRIGRAM_MISSING_PGCODES:
+                    UserSearchService._trigram_available = False
+                    print(f"⚠️ pg_trgm unavailable, using Python ranking (run migrate_user_search.py): {e}")
+                else:
+                    # Transient (timeout, lost connection): fall back for this request only
+                    print(f"⚠️ Trigram search failed, using Python ranking: {e}")
+
+        return UserSearchService._search_python(db, query, page, per_page, user_type, exclude_user_id)
+
+    @staticmethod
+    def _search_trigram(db: Session, query: str, page: int, per_page: int,
+                        user_type: Optional[str], exclude_user_id: Optional[int]) -> Tuple[List[User], int]:
+        """Rank in PostgreSQL with pg_trgm similarity()."""
+        search_query = UserSearchService._base_query(db, query, user_type, exclude_user_id)
+        total = search_query.order_by(None).with_entities(func.count(User.id)).scalar()
+
+        score = func.greatest(*[
+            func.similarity(func.coalesce(column, ""), query) for column in SEARCH_COLUMNS
+        ])
+        users = search_query.order_by(
+            score.desc(),
+            User.followers_count.desc(),
+            User.id
+        ).offset((page - 1) * per_page).limit(per_page).all()
+
+        return users, total
+
+    @staticmethod
+    def _search_python(db: Session, query: str, page: int, per_page: int,
+                       user_type: Optional[str], exclude_user_id: Optional[int]) -> Tuple[List[User], int]:
+        """Rank matching rows in Python (SQLite / no pg_trgm)."""
+        candidates = UserSearchService._base_query(db, query, user_type, exclude_user_id).with_entities(
+            User.id, User.followers_count, *SEARCH_COLUMNS
+        ).all()
+
+        ranked = sorted(
+            candidates,
+            key=lambda row: (
+                -max(trigram_similarity(value, query) for value in row[2:]),
+                -(row.followers_count or 0),
+                row.id
+            )
+        )
+        page_ids = [row.id for row in ranked[(page - 1) * per_page:page * per_page]]
+
+        users_by_id = {user.id: user for user in db.query(User).filter(User.id.in_(page_ids)).all()} if page_ids else {}
+        return [users_by_id[user_id] for user_id in page_ids if user_id in users_by_id], len(candidates)
+
+
+class UserPrefixIndex:
+    """
+    In-memory prefix index over usernames and full names.
+
+    Keys live in one sorted array of (key, user_id) pairs, so a prefix is a
+    contiguous slice found with two binary searches. Full names are indexed
+    from every word, so "smi" finds "Jane Smith". Updates insert/remove
+    single entries instead of rebuilding the array.
+
+    Short prefixes match most of the index, so each one (up to
+    TOP_PREFIX_LENGTH characters) keeps a sorted list of its best-ranked
+    users, built on first lookup. A list always holds the top len(list)
+    users of its prefix: updates insert users that beat its last entry and
+    drop members that fall below it, and a list that runs short is rebuilt
+    from the slice. Longer prefixes rank their whole (small) slice, so
+    results are exact either way.
+
+    The index is per process, and writes only update the worker that
+    handled them. Every worker therefore re-reads users whose updated_at
+    moved (profile edits, follower counts, deactivations) at most every
+    settings.user_index_sync_seconds. It also reloads in full in the
+    background every settings.user_index_reload_minutes, which picks up
+    hard-deleted users.
+
+    Memory is about 1 KB per user (the entry dict plus four keys on
+    average), so roughly 1 GB per worker at 1M users. Past a few hundred
+    thousand users, serve autocomplete from the trigram search instead.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[str, int]] = []
+        self._users: Dict[int, dict] = {}
+        # prefix -> (ranks, complete); complete lists hold every user of the prefix
+        self._top: Dict[str, Tuple[List[tuple], bool]] = {}
+        self._lock = threading.RLock()
+        self._synced_until = None  # Newest users.updated_at applied
+        self._next_sync = 0.0
+        self._next_reload = 0.0
+        self._reloading = False
+        self.loaded = False
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Lowercase words joined by single spaces ("Dr_Jane.S" -> "dr jane s")."""
+        return " ".join(_WORD_RE.findall((text or "").lower()))
+
+    @staticmethod
+    def _index_keys(username: str, full_name: str) -> List[str]:
+        """Index keys for one user: the username and every word-suffix of the full name."""
+        keys = {UserPrefixIndex._normalize(username)}
+        words = UserPrefixIndex._normalize(full_name).split()
+        keys.update(" ".join(words[i:]) for i in range(len(words)))
+        keys.discard("")
+        return sorted(keys)
+
+    def load(self, db: Session):
+        """(Re)build the index from all active users in one query."""
+        rows = db.query(
+            User.id, User.username, User.full_name, User.profile_picture_url,
+            User.user_type, User.followers_count, User.updated_at
+        ).filter(User.is_active == True).yield_per(5000)
+
+        keys, users, synced_until = [], {}, None
+        for row in rows:
+            users[row.id] = self._user_entry(row)
+            keys.extend((key, row.id) for key in self._index_keys(row.username, row.full_name))
+            if row.updated_at is not None and (synced_until is None or row.updated_at > synced_until):
+                synced_until = row.updated_at
+        keys.sort()
+
+        with self._lock:
+            self._keys, self._users, self._top = keys, users, {}
+            # Changes made while we were loading are re-read by the next sync
+            if synced_until is not None and (self._synced_until is None or synced_until > self._synced_until):
+                self._synced_until = synced_until
+            self._next_reload = time.monotonic() + max(settings.user_index_reload_minutes, 1) * 60
+            self.loaded = True
+        print(f"✅ User prefix index loaded: {len(users)} users, {len(keys)} keys")
+
+    def ensure_loaded(self, db: Session):
+        """Load the index on first use, then keep it in sync with other workers' writes."""
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    self.load(db)
+                    return
+        try:
+            self.sync(db)
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ User prefix index sync failed: {e}")
+
+    def sync(self, db: Session):
+        """Apply user changes committed by any worker since the last sync (rate-limited)."""
+        now = time.monotonic()
+        if not self.loaded or now < self._next_sync:
+            return
+        self._next_sync = now + settings.user_index_sync_seconds
+        if now >= self._next_reload and not self._reloading:
+            self._reload_in_background()
+
+        query = db.query(
+            User.id, User.username, User.full_name, User.profile_picture_url,
+            User.user_type, User.followers_count, User.is_active, User.updated_at
+        )
+        if self._synced_until is not None:
+            query = query.filter(User.updated_at >= self._synced_until - SYNC_OVERLAP)
+        for row in query.all():
+            self.upsert_user(row)
+            if row.updated_at is not None and (self._synced_until is None or row.updated_at > self._synced_until):
+                self._synced_until = row.updated_at
+
+    def _reload_in_background(self):
+        """Rebuild from the users table, picking up hard-deleted users."""
+        from ..config.database import SessionLocal
+
+        def reload():
+            db = SessionLocal()
+            try:
+                self.load(db)
+            except Exception as e:
+                print(f"⚠️ User prefix index reload failed: {e}")
+            finally:
+                db.close()
+                self._reloading = False
+
+        self._reloading = True
+        threading.Thread(target=reload, daemon=True).start()
+
+    @staticmethod
+    def _user_entry(user) -> dict:
+        """Autocomplete payload kept per user."""
+        return {
+            "id": user.id,
+            "username": user.username,
+            "full_name": user.full_name,
+            "profile_picture_url": user.profile_picture_url,
+            "user_type": user.user_type.value if hasattr(user.user_type, "value") else user.user_type,
+            "followers_count": user.followers_count or 0
+        }
+
+    def upsert_user(self, user: User):
+        """Add or refresh one user after register/profile update (or a synced users row)."""
+        if not self.loaded:
+            return
+        with self._lock:
+            old_entry = self._remove_keys(user.id)
+            new_entry = None
+            if user.is_active:
+                new_entry = self._users[user.id] = self._user_entry(user)
+                for key in self._index_keys(user.username, user.full_name):
+                    bisect.insort(self._keys, (key, user.id))
+            self._update_top(old_entry, new_entry)
+
+    def remove_user(self, user_id: int):
+        """Drop a user (deleted or deactivated)."""
+        if not self.loaded:
+            return
+        with self._lock:
+            self._update_top(self._remove_keys(user_id), None)
+
+    def update_followers(self, user_id: int, followers_count: int):
+        """Refresh the ranking weight of a user."""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None:
+                old_entry = dict(entry)
+                entry["followers_count"] = followers_count
+                self._update_top(old_entry, entry)
+
+    def _remove_keys(self, user_id: int) -> Optional[dict]:
+        """Remove a user's keys and return the removed entry (lock must be held)."""
+        entry = self._users.pop(user_id, None)
+        if entry is None:
+            return None
+        for key in self._index_keys(entry["username"], entry["full_name"]):
+            position = bisect.bisect_left(self._keys, (key, user_id))
+            if position < len(self._keys) and self._keys[position] == (key, user_id):
+                del self._keys[position]
+        return entry
+
+    @staticmethod
+    def _rank(entry: dict) -> tuple:
+        """Sort key of a user: most followers first, then username."""
+        return -entry["followers_count"], entry["username"], entry["id"]
+
+    def _top_prefixes(self, entry: Optional[dict]) -> set:
+        """Short prefixes (those with top lists) of a user's index keys."""
+        if entry is None:
+            return set()
+        return {
+            key[:length]
+            for key in self._index_keys(entry["username"], entry["full_name"])
+            for length in range(1, min(len(key), TOP_PREFIX_LENGTH) + 1)
+        }
+
+    def _update_top(self, old_entry: Optional[dict], new_entry: Optional[dict]):
+        """Move a changed user within the top lists it was or is now in (lock must be held)."""
+        old_rank = self._rank(old_entry) if old_entry else None
+        new_rank = self._rank(new_entry) if new_entry else None
+        new_prefixes = self._top_prefixes(new_entry)
+
+        for prefix in self._top_prefixes(old_entry) | new_prefixes:
+            cached = self._top.get(prefix)
+            if cached is None:
+                continue
+            ranks, complete = cached
+            if old_rank is not None:
+                position = bisect.bisect_left(ranks, old_rank)
+                if position < len(ranks) and ranks[position] == old_rank:
+                    del ranks[position]
+            if prefix not in new_prefixes:
+                continue
+            # An incomplete list only takes users that beat its last entry
+            if complete or (ranks and new_rank < ranks[-1]):
+                bisect.insort(ranks, new_rank)
+                if len(ranks) > TOP_LIST_SIZE:
+                    ranks.pop()
+                    self._top[prefix] = (ranks, False)
+
+    def _slice_ranks(self, prefix: str) -> List[tuple]:
+        """Ranks of every user with a key starting with the prefix, best first (lock must be held)."""
+        start = bisect.bisect_left(self._keys, (prefix, -1))
+        end = bisect.bisect_left(self._keys, (prefix + "\U0010ffff", -1), lo=start)
+        user_ids = {user_id for _, user_id in self._keys[start:end]}
+        return sorted(self._rank(self._users[user_id]) for user_id in user_ids)
+
+    def complete(self, prefix: str, limit: int = 10, exclude_user_id: Optional[int] = None) -> List[dict]:
+        """
+        Top users whose username or name word starts with the prefix.
+
+        Args:
+            prefix: Typed text
+            limit: Maximum results
+            exclude_user_id: User to leave out
+
+        Returns:
+            List[dict]: Users ordered by followers_count, then username
+        """
+        prefix = self._normalize(prefix)
+        if not prefix:
+            return []
+
+        with self._lock:
+            if len(prefix) <= TOP_PREFIX_LENGTH and limit < TOP_LIST_SIZE:
+                cached = self._top.get(prefix)
+                # One spare entry covers the excluded user
+                if cached is None or (not cached[1] and len(cached[0]) <= limit):
+                    ranks = self._slice_ranks(prefix)
+                    cached = self._top[prefix] = (ranks[:TOP_LIST_SIZE], len(ranks) <= TOP_LIST_SIZE)
+                ranks = cached[0][:limit + 1]
+            else:
+                ranks = self._slice_ranks(prefix)
+            return [
+                dict(self._users[user_id]) for _, _, user_id in ranks if user_id != exclude_user_id
+            ][:limit]
+
+    def stats(self) -> dict:
+        """Index size for monitoring."""
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "users": len(self._users),
+                "keys": len(self._keys),
+                "top_lists": len(self._top),
+                "synced_until": self._synced_until.isoformat() if self._synced_until else None
+            }
+
+
+# Global prefix index instance
+user_prefix_index = UserPrefixIndex()
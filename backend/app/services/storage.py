@@ -0,0 +1,496 @@
+"""
+Storage backends for IAP Connect application.
+One async interface for where uploaded files live: local disk, S3 or memory.
+
+The upload pipeline (file_service.upload_file) validates, hashes and renders
+an upload once, then writes through a StorageBackend, so storage-specific
+performance work lives here rather than in each upload path.
+
+Keys are logical paths such as 'posts/<name>.jpg'. On local disk every file
+is fanned out into hashed subdirectories ('posts/3f/a2/<name>.jpg') so no
+folder grows to millions of entries; files written before fan-out are still
+found at their flat path.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Union
+
+import aiofiles
+
+from ..config.settings import settings
+
+
+# Keys listed per page
+LIST_PAGE_SIZE = 1000
+
+# Keys per S3 DeleteObjects request (the API limit)
+S3_DELETE_BATCH_SIZE = 1000
+
+# Local unlinks for delete_many run here, so bulk deletes do not tie up the default executor
+_delete_executor = ThreadPoolExecutor(
+    max_workers=settings.storage_delete_workers, thread_name_prefix="storage-delete"
+)
+
+
+class StoredObject(NamedTuple):
+    """A stored file as seen by stat/list."""
+    key: str
+    size: int
+    modified: float  # Unix timestamp
+    url: str
+    content_type: Optional[str] = None
+
+
+class StorageBackend(ABC):
+    """
+    Async storage interface.
+
+    Attributes:
+        name: Storage label, also used by the media store ('local', 's3', 'memory')
+    """
+
+    name: str = ""
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """Public URL of a key written by this backend."""
+
+    @abstractmethod
+    def key_from_url(self, url: str) -> str:
+        """Key of a public URL (or of a key, returned unchanged)."""
+
+    def owns_url(self, url: str) -> bool:
+        """Whether a URL points into this backend."""
+        return False
+
+    @abstractmethod
+    async def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> str:
+        """
+        Store bytes under key.
+
+        Returns:
+            str: Public URL
+        """
+
+    @abstractmethod
+    async def put_file(self, key: str, path: Union[str, Path], content_type: Optional[str] = None) -> str:
+        """
+        Store a local file under key. The source file may be moved rather
+        than copied; callers delete it afterwards only if it still exists.
+
+        Returns:
+            str: Public URL
+        """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """Contents of key, or None if it does not exist."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """Delete key. Returns whether it existed (always True where the store cannot tell)."""
+
+    @abstractmethod
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        """Size and modification time of key, or None if it does not exist."""
+
+    @abstractmethod
+    def list(self, prefix: str = "") -> AsyncIterator[List[StoredObject]]:
+        """Objects under prefix, a page at a time."""
+
+    async def put_many(self, items: Dict[str, bytes], content_types: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Store several keys concurrently. Returns URLs by key."""
+        content_types = content_types or {}
+        urls = await asyncio.gather(*(
+            self.put(key, data, content_types.get(key)) for key, data in items.items()
+        ))
+        return dict(zip(items, urls))
+
+    async def delete_many(self, keys: List[str]) -> Dict[str, bool]:
+        """Delete several keys concurrently. Returns per-key results."""
+        results = await asyncio.gather(*(self.delete(key) for key in keys), return_exceptions=True)
+        return {key: result is True for key, result in zip(keys, results)}
+
+    async def stat_many(self, keys: List[str]) -> Dict[str, Optional[StoredObject]]:
+        """Stat several keys concurrently."""
+        results = await asyncio.gather(*(self.stat(key) for key in keys))
+        return dict(zip(keys, results))
+
+
+def _fanout_dirs(name: str, levels: int) -> List[str]:
+    """Hashed subdirectories for a filename ('3f', 'a2' for two levels)."""
+    digest = hashlib.md5(name.encode()).hexdigest()
+    return [digest[i * 2:i * 2 + 2] for i in range(levels)]
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Files under a local directory, served at url_prefix.
+
+    Attributes:
+        root: Upload directory
+        url_prefix: URL prefix the directory is served at
+        fanout_levels: Hashed subdirectory levels for new files (0 = flat)
+    """
+
+    name = "local"
+
+    def __init__(self, root: str, url_prefix: str, fanout_levels: int = 2):
+        self.root = Path(root)
+        self.url_prefix = url_prefix.rstrip('/')
+        self.fanout_levels = fanout_levels
+
+    def _relative_path(self, key: str) -> str:
+        """Path of a new file under root, with fan-out."""
+        folder, _, name = key.rpartition('/')
+        parts = ([folder] if folder else []) + _fanout_dirs(name, self.fanout_levels) + [name]
+        return '/'.join(parts)
+
+    def _existing_path(self, key: str) -> Optional[Path]:
+        """Where key is stored: the fanned-out path, or the flat path of older files."""
+        for relative in (self._relative_path(key), key):
+            path = self.root / relative
+            if path.is_file():
+                return path
+        return None
+
+    def _key_of(self, relative: str) -> str:
+        """Logical key of a path under root (fan-out directories removed)."""
+        parts = relative.split('/')
+        levels = self.fanout_levels
+        if levels and len(parts) > levels and parts[-1 - levels:-1] == _fanout_dirs(parts[-1], levels):
+            parts = parts[:-1 - levels] + parts[-1:]
+        return '/'.join(parts)
+
+    def path(self, key: str) -> Path:
+        """Local path of key (existing file, else where a new one would go)."""
+        return self._existing_path(key) or self.root / self._relative_path(key)
+
+    def url(self, key: str) -> str:
+        return f"{self.url_prefix}/{self._relative_path(key)}"
+
+    def owns_url(self, url: str) -> bool:
+        return url.startswith(self.url_prefix + '/')
+
+    def key_from_url(self, url: str) -> str:
+        if self.owns_url(url):
+            url = url[len(self.url_prefix):]
+        return self._key_of(url.lstrip('/'))
+
+    async def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> str:
+        path = self.root / self._relative_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        async with aiofiles.open(path, 'wb') as f:
+            await f.write(data)
+        return self.url(key)
+
+    async def put_file(self, key: str, path: Union[str, Path], content_type: Optional[str] = None) -> str:
+        target = self.root / self._relative_path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Spooled uploads already live under root, so this is a rename, not a copy
+        os.replace(path, target)
+        return self.url(key)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        path = self._existing_path(key)
+        if path is None:
+            return None
+        async with aiofiles.open(path, 'rb') as f:
+            return await f.read()
+
+    def _delete_sync(self, key: str) -> bool:
+        path = self._existing_path(key)
+        if path is None:
+            return False
+        try:
+            path.unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def delete(self, key: str) -> bool:
+        return await asyncio.to_thread(self._delete_sync, key)
+
+    def _delete_chunk_sync(self, keys: List[str]) -> Dict[str, bool]:
+        results = {}
+        for key in keys:
+            try:
+                results[key] = self._delete_sync(key)
+            except OSError as e:
+                print(f"⚠️ Could not delete {key}: {str(e)}")
+                results[key] = False
+        return results
+
+    async def delete_many(self, keys: List[str]) -> Dict[str, bool]:
+        # Unlinks run concurrently, one chunk of keys per delete worker
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        chunk_size = -(-len(keys) // settings.storage_delete_workers)
+        loop = asyncio.get_running_loop()
+        chunks = await asyncio.gather(*(
+            loop.run_in_executor(_delete_executor, self._delete_chunk_sync, keys[start:start + chunk_size])
+            for start in range(0, len(keys), chunk_size)
+        ))
+        return {key: deleted for chunk in chunks for key, deleted in chunk.items()}
+
+    def _stat_sync(self, key: str) -> Optional[StoredObject]:
+        path = self._existing_path(key)
+        if path is None:
+            return None
+        stat = path.stat()
+        relative = path.relative_to(self.root).as_posix()
+        return StoredObject(key, stat.st_size, stat.st_mtime, f"{self.url_prefix}/{relative}")
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        return await asyncio.to_thread(self._stat_sync, key)
+
+    def scan_directory(self, directory: Path):
+        """Files and subdirectories of one directory (blocking)."""
+        files, subdirectories = [], []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(Path(entry.path))
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat()
+                        relative = Path(entry.path).relative_to(self.root).as_posix()
+                        files.append(StoredObject(
+                            self._key_of(relative), stat.st_size, stat.st_mtime, f"{self.url_prefix}/{relative}"
+                        ))
+        except FileNotFoundError:
+            pass
+        return files, subdirectories
+
+    async def list(self, prefix: str = "") -> AsyncIterator[List[StoredObject]]:
+        # Directories are scanned one at a time off the event loop
+        pending = [self.root / prefix.rstrip('/')] if prefix else [self.root]
+        page = []
+        while pending:
+            files, subdirectories = await asyncio.to_thread(self.scan_directory, pending.pop())
+            pending.extend(subdirectories)
+            page.extend(files)
+            while len(page) >= LIST_PAGE_SIZE:
+                yield page[:LIST_PAGE_SIZE]
+                page = page[LIST_PAGE_SIZE:]
+        if page:
+            yield page
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    Objects in the S3 bucket of an S3Service, written through its pooled
+    client and upload thread pool (multipart for large files).
+    """
+
+    name = "s3"
+
+    def __init__(self, service):
+        self.service = service
+
+    @property
+    def _client(self):
+        return self.service.s3_client
+
+    @property
+    def _bucket(self) -> str:
+        return self.service.bucket_name
+
+    def _extra_args(self, content_type: Optional[str]) -> dict:
+        extra_args = {'ACL': 'public-read', 'CacheControl': 'max-age=31536000'}
+        if content_type:
+            extra_args['ContentType'] = content_type
+        return extra_args
+
+    def url(self, key: str) -> str:
+        return f"{self.service.base_url}/{key}"
+
+    def owns_url(self, url: str) -> bool:
+        return url.startswith(self.service.base_url + '/')
+
+    def key_from_url(self, url: str) -> str:
+        if self.owns_url(url):
+            return url[len(self.service.base_url) + 1:]
+        return url.lstrip('/')
+
+    async def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> str:
+        await self.service._run_blocking(
+            self._client.put_object, Bucket=self._bucket, Key=key, Body=data, **self._extra_args(content_type)
+        )
+        return self.url(key)
+
+    async def put_file(self, key: str, path: Union[str, Path], content_type: Optional[str] = None) -> str:
+        await self.service._run_blocking(
+            self._client.upload_file, str(path), self._bucket, key,
+            ExtraArgs=self._extra_args(content_type),
+            Config=self.service.transfer_config
+        )
+        return self.url(key)
+
+    def _get_sync(self, key: str) -> Optional[bytes]:
+        try:
+            return self._client.get_object(Bucket=self._bucket, Key=key)['Body'].read()
+        except self._client.exceptions.NoSuchKey:
+            return None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.service._run_blocking(self._get_sync, key)
+
+    async def delete(self, key: str) -> bool:
+        await self.service._run_blocking(self._client.delete_object, Bucket=self._bucket, Key=key)
+        return True
+
+    def _delete_batch_sync(self, keys: List[str]) -> Dict[str, bool]:
+        response = self._client.delete_objects(
+            Bucket=self._bucket,
+            Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+        )
+        # Quiet mode lists only the keys that failed
+        failed = set()
+        for error in response.get('Errors', []):
+            failed.add(error['Key'])
+            print(f"⚠️ Could not delete {error['Key']}: {error.get('Code')} {error.get('Message')}")
+        return {key: key not in failed for key in keys}
+
+    async def delete_many(self, keys: List[str]) -> Dict[str, bool]:
+        # One DeleteObjects request per 1000 keys, the requests running concurrently
+        keys = list(dict.fromkeys(keys))
+        batches = [keys[start:start + S3_DELETE_BATCH_SIZE] for start in range(0, len(keys), S3_DELETE_BATCH_SIZE)]
+        responses = await asyncio.gather(
+            *(self.service._run_blocking(self._delete_batch_sync, batch) for batch in batches),
+            return_exceptions=True
+        )
+        results = {}
+        for batch, response in zip(batches, responses):
+            if isinstance(response, BaseException):
+                print(f"⚠️ S3 batch delete of {len(batch)} keys failed: {str(response)}")
+                results.update(dict.fromkeys(batch, False))
+            else:
+                results.update(response)
+        return results
+
+    def _stat_sync(self, key: str) -> Optional[StoredObject]:
+        from botocore.exceptions import ClientError
+        try:
+            head = self._client.head_object(Bucket=self._bucket, Key=key)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return StoredObject(
+            key, head['ContentLength'], head['LastModified'].timestamp(), self.url(key), head.get('ContentType')
+        )
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        return await self.service._run_blocking(self._stat_sync, key)
+
+    async def list(self, prefix: str = "") -> AsyncIterator[List[StoredObject]]:
+        kwargs = {'Bucket': self._bucket, 'Prefix': prefix, 'MaxKeys': LIST_PAGE_SIZE}
+        while True:
+            response = await self.service._run_blocking(self._client.list_objects_v2, **kwargs)
+            page = [
+                StoredObject(item['Key'], item['Size'], item['LastModified'].timestamp(), self.url(item['Key']))
+                for item in response.get('Contents', [])
+            ]
+            if page:
+                yield page
+            if not response.get('IsTruncated'):
+                break
+            kwargs['ContinuationToken'] = response['NextContinuationToken']
+
+
+class InMemoryStorageBackend(StorageBackend):
+    """Objects in a dict; for development and tests."""
+
+    name = "memory"
+    url_prefix = "memory://"
+
+    def __init__(self):
+        self.objects: Dict[str, StoredObject] = {}
+        self.data: Dict[str, bytes] = {}
+
+    def url(self, key: str) -> str:
+        return f"{self.url_prefix}{key}"
+
+    def owns_url(self, url: str) -> bool:
+        return url.startswith(self.url_prefix)
+
+    def key_from_url(self, url: str) -> str:
+        return url[len(self.url_prefix):] if self.owns_url(url) else url.lstrip('/')
+
+    async def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> str:
+        self.data[key] = data
+        self.objects[key] = StoredObject(key, len(data), time.time(), self.url(key), content_type)
+        return self.url(key)
+
+    async def put_file(self, key: str, path: Union[str, Path], content_type: Optional[str] = None) -> str:
+        async with aiofiles.open(path, 'rb') as f:
+            return await self.put(key, await f.read(), content_type)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self.data.get(key)
+
+    async def delete(self, key: str) -> bool:
+        self.objects.pop(key, None)
+        return self.data.pop(key, None) is not None
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        return self.objects.get(key)
+
+    async def list(self, prefix: str = "") -> AsyncIterator[List[StoredObject]]:
+        keys = sorted(key for key in self.objects if key.startswith(prefix))
+        for start in range(0, len(keys), LIST_PAGE_SIZE):
+            yield [self.objects[key] for key in keys[start:start + LIST_PAGE_SIZE]]
+
+
+# Backends, created on first use
+local_storage = LocalStorageBackend(
+    settings.upload_folder, settings.static_url_prefix, settings.storage_fanout_levels
+)
+_memory_storage: Optional[InMemoryStorageBackend] = None
+
+
+def get_s3_storage() -> Optional[S3StorageBackend]:
+    """The S3 backend, or None when S3 is not configured."""
+    from .s3_service import s3_service, S3_AVAILABLE
+    return s3_service.storage if S3_AVAILABLE and s3_service else None
+
+
+def get_storage() -> StorageBackend:
+    """
+    The configured storage backend (settings.storage_backend).
+
+    'auto' uses S3 when it is configured and local disk otherwise.
+    """
+    global _memory_storage
+    backend = settings.storage_backend
+    if backend == "memory":
+        if _memory_storage is None:
+            _memory_storage = InMemoryStorageBackend()
+        return _memory_storage
+    if backend in ("s3", "auto"):
+        s3_storage = get_s3_storage()
+        if s3_storage is not None:
+            return s3_storage
+        if backend == "s3":
+            print("⚠️ S3 storage configured but not available, using local storage")
+    return local_storage
+
+
+def storage_for_url(url: str) -> StorageBackend:
+    """Backend holding a stored file's URL (or key), e.g. to delete it."""
+    if local_storage.owns_url(url):
+        return local_storage
+    if _memory_storage is not None and _memory_storage.owns_url(url):
+        return _memory_storage
+    s3_storage = get_s3_storage() if url.startswith(("http://", "https://")) else None
+    if s3_storage is not None and s3_storage.owns_url(url):
+        return s3_storage
+    return get_storage()
@@ -4,14 +4,26 @@ Handles user-related business logic.
 UPDATED: Enhanced with additional helper functions while keeping all existing code intact.
 """
 
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_, and_
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, or_, and_, desc, insert
 from fastapi import HTTPException, status
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from datetime import datetime, timezone
+from ..config.settings import settings
 from ..models.user import User
 from ..models.post import Post
-from ..models.follow import Follow
+from ..models.follow import Follow, FollowSuggestion
 from ..schemas.user import UserUpdate, UserResponse, UserSearchResponse
+from .follow_graph import get_follow_graph, record_follow_change
+
+
+# Follow suggestion scoring
+SUGGESTION_MUTUAL_WEIGHT = 1.0              # Per followed user who follows the candidate
+SUGGESTION_SHARED_SPECIALTY_WEIGHT = 2.0
+SUGGESTION_SHARED_COLLEGE_WEIGHT = 2.0
+SUGGESTION_RECENCY_WEIGHT = 1.0             # Decays with the age of the newest mutual follow
+SUGGESTION_RECENCY_HALF_LIFE_DAYS = 30
+SUGGESTION_CANDIDATE_POOL = 200             # Candidates scored per source before ranking
 
 
 def get_user_by_id(user_id: int, db: Session) -> Optional[User]:
@@ -119,6 +131,7 @@ def follow_user(follower: User, following_id: int, db: Session) -> bool:
     # Create follow relationship
     new_follow = Follow(follower_id=follower.id, following_id=following_id)
     db.add(new_follow)
+    record_follow_change(db, follower.id, following_id, True)
     db.commit()
     
     return True
@@ -151,6 +164,7 @@ def unfollow_user(follower: User, following_id: int, db: Session) -> bool:
         )
     
     db.delete(follow_relationship)
+    record_follow_change(db, follower.id, following_id, False)
     db.commit()
     
     return True
@@ -194,6 +208,10 @@ def check_user_following(follower_id: int, following_id: int, db: Session) -> bo
     if follower_id == following_id:
         return False  # User cannot follow themselves
     
+    graph = get_follow_graph(db)
+    if graph:
+        return graph.follows(follower_id, following_id)
+    
     follow = db.query(Follow).filter(
         and_(
             Follow.follower_id == follower_id,
@@ -216,6 +234,11 @@ def get_mutual_followers(user1_id: int, user2_id: int, db: Session) -> List[User
     Returns:
         List[User]: List of mutual follower user objects
     """
+    graph = get_follow_graph(db)
+    if graph:
+        mutual_ids = graph.mutual_followers(user1_id, user2_id)
+        return db.query(User).filter(User.id.in_(mutual_ids)).all() if mutual_ids else []
+    
     # Get followers of user1
     user1_followers = db.query(Follow.follower_id).filter(
         Follow.following_id == user1_id
@@ -229,22 +252,103 @@ def get_mutual_followers(user1_id: int, user2_id: int, db: Session) -> List[User
     # Find mutual followers
     mutual_follower_ids = db.query(user1_followers.c.follower_id).intersect(
         db.query(user2_followers.c.follower_id)
-    ).all()
+    )
     
-    # Get user objects for mutual followers
-    mutual_users = []
-    for (follower_id,) in mutual_follower_ids:
-        user = db.query(User).filter(User.id == follower_id).first()
-        if user:
-            mutual_users.append(user)
+    # Load all mutual followers in one query
+    return db.query(User).filter(User.id.in_(mutual_follower_ids.subquery().select())).all()
+
+
+def _as_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Convert a DB timestamp to naive UTC (SQLite returns naive, PostgreSQL aware)."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def compute_follow_suggestions(user: User, db: Session, limit: int = 10) -> List[Tuple[User, float, int]]:
+    """
+    Score follow candidates for a user.
+    
+    Candidates come from second-degree follows (one grouped query) and, when the
+    user has a specialty/college, from users sharing it (one query). They are
+    scored by mutual-connection count, shared specialty/college and recency of
+    the newest mutual follow, and all candidate users are loaded in one query.
     
-    return mutual_users
+    Args:
+        user: User to get suggestions for
+        db: Database session
+        limit: Maximum number of suggestions
+        
+    Returns:
+        List[Tuple[User, float, int]]: (suggested user, score, mutual count), best first
+    """
+    following_ids = db.query(Follow.following_id).filter(Follow.follower_id == user.id)
+    
+    # Second-degree connections: followed by people the user follows
+    first, second = aliased(Follow), aliased(Follow)
+    second_degree = db.query(
+        second.following_id,
+        func.count(func.distinct(first.following_id)),
+        func.max(second.created_at)
+    ).join(
+        second, second.follower_id == first.following_id
+    ).filter(
+        first.follower_id == user.id,
+        second.following_id != user.id,  # Don't suggest self
+        ~second.following_id.in_(following_ids)  # Don't suggest already following
+    ).group_by(second.following_id).order_by(
+        desc(func.count(func.distinct(first.following_id)))
+    ).limit(SUGGESTION_CANDIDATE_POOL).all()
+    
+    mutuals = {candidate_id: (mutual_count, _as_naive_utc(last_connected_at))
+               for candidate_id, mutual_count, last_connected_at in second_degree}
+    candidate_ids = set(mutuals)
+    
+    # Same specialty/college (also covers users who follow nobody yet)
+    shared_filters = []
+    if user.specialty:
+        shared_filters.append(User.specialty == user.specialty)
+    if user.college:
+        shared_filters.append(User.college == user.college)
+    if shared_filters:
+        candidate_ids.update(candidate_id for (candidate_id,) in db.query(User.id).filter(
+            or_(*shared_filters),
+            User.id != user.id,
+            User.is_active == True,
+            ~User.id.in_(following_ids)
+        ).order_by(User.followers_count.desc()).limit(SUGGESTION_CANDIDATE_POOL).all())
+    
+    if not candidate_ids:
+        return []
+    
+    # Load every candidate in one query
+    candidates = db.query(User).filter(User.id.in_(candidate_ids), User.is_active == True).all()
+    
+    now = datetime.utcnow()
+    scored = []
+    for candidate in candidates:
+        mutual_count, last_connected_at = mutuals.get(candidate.id, (0, None))
+        score = mutual_count * SUGGESTION_MUTUAL_WEIGHT
+        if user.specialty and candidate.specialty and candidate.specialty.lower() == user.specialty.lower():
+            score += SUGGESTION_SHARED_SPECIALTY_WEIGHT
+        if user.college and candidate.college and candidate.college.lower() == user.college.lower():
+            score += SUGGESTION_SHARED_COLLEGE_WEIGHT
+        if last_connected_at:
+            age_days = max((now - last_connected_at).total_seconds(), 0) / 86400
+            score += SUGGESTION_RECENCY_WEIGHT * 0.5 ** (age_days / SUGGESTION_RECENCY_HALF_LIFE_DAYS)
+        scored.append((candidate, score, mutual_count))
+    
+    scored.sort(key=lambda item: (-item[1], -(item[0].followers_count or 0), item[0].id))
+    return scored[:limit]
 
 
 def get_follow_suggestions(user: User, db: Session, limit: int = 10) -> List[User]:
     """
     Get follow suggestions for a user based on mutual connections.
     
+    Served from the precomputed follow_suggestions table (one indexed read)
+    when it is enabled and filled, otherwise scored on demand.
+    
     Args:
         user: User to get suggestions for
         db: Database session
@@ -253,29 +357,66 @@ def get_follow_suggestions(user: User, db: Session, limit: int = 10) -> List[Use
     Returns:
         List[User]: List of suggested users to follow
     """
-    # Get users that current user is following
-    following_ids = db.query(Follow.following_id).filter(
-        Follow.follower_id == user.id
-    ).subquery()
-    
-    # Get users followed by people the current user follows
-    # (second-degree connections)
-    suggested_follows = db.query(Follow.following_id).filter(
-        and_(
-            Follow.follower_id.in_(following_ids),
-            Follow.following_id != user.id,  # Don't suggest self
-            ~Follow.following_id.in_(following_ids)  # Don't suggest already following
-        )
-    ).group_by(Follow.following_id).limit(limit).all()
+    if settings.follow_suggestions_precomputed:
+        already_following = db.query(Follow.id).filter(
+            Follow.follower_id == user.id,
+            Follow.following_id == FollowSuggestion.suggested_user_id
+        ).exists()
+        
+        suggestions = db.query(User).join(
+            FollowSuggestion, FollowSuggestion.suggested_user_id == User.id
+        ).filter(
+            FollowSuggestion.user_id == user.id,
+            User.is_active == True,
+            ~already_following  # Followed since the last batch run
+        ).order_by(FollowSuggestion.rank).limit(limit).all()
+        
+        if suggestions:
+            return suggestions
     
-    # Get user objects for suggestions
-    suggestions = []
-    for (user_id,) in suggested_follows:
-        suggested_user = db.query(User).filter(User.id == user_id).first()
-        if suggested_user:
-            suggestions.append(suggested_user)
+    return [candidate for candidate, _, _ in compute_follow_suggestions(user, db, limit)]
+
+
+def refresh_follow_suggestions(db: Session, per_user: int = None, batch_size: int = 200) -> dict:
+    """
+    Precompute the top suggestions of every active user (nightly batch job).
     
-    return suggestions
+    Args:
+        db: Database session
+        per_user: Suggestions stored per user (default: settings.follow_suggestions_per_user)
+        batch_size: Users committed per transaction
+        
+    Returns:
+        dict: Users processed and rows written
+    """
+    per_user = per_user or settings.follow_suggestions_per_user
+    user_ids = [user_id for (user_id,) in db.query(User.id).filter(User.is_active == True).order_by(User.id).all()]
+    rows_written = 0
+    
+    for start in range(0, len(user_ids), batch_size):
+        batch_ids = user_ids[start:start + batch_size]
+        rows = []
+        for user in db.query(User).filter(User.id.in_(batch_ids)).all():
+            rows.extend(
+                {
+                    "user_id": user.id,
+                    "suggested_user_id": candidate.id,
+                    "rank": rank,
+                    "score": score,
+                    "mutual_count": mutual_count
+                }
+                for rank, (candidate, score, mutual_count) in enumerate(compute_follow_suggestions(user, db, per_user))
+            )
+        
+        # Replace the batch's suggestions in one transaction
+        db.query(FollowSuggestion).filter(FollowSuggestion.user_id.in_(batch_ids)).delete(synchronize_session=False)
+        if rows:
+            db.execute(insert(FollowSuggestion), rows)
+        db.commit()
+        rows_written += len(rows)
+        print(f"📝 Follow suggestions: {min(start + batch_size, len(user_ids))}/{len(user_ids)} users")
+    
+    return {"users_processed": len(user_ids), "rows_written": rows_written}
 
 
 def get_user_activity_stats(user: User, db: Session) -> dict:
@@ -0,0 +1,147 @@
+"""
+In-process cache utilities for IAP Connect application.
+Bounded LRU cache with TTL, tag-based invalidation and hit/memory statistics.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with per-entry TTL.
+
+    Entries can be tagged (e.g. with a post ID) so that every entry derived
+    from one object can be invalidated or patched together.
+
+    Attributes:
+        max_entries: Maximum number of entries kept before evicting the least recently used
+        ttl_seconds: Seconds an entry stays valid after it is stored
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, expires_at, size, tags)
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._lock = threading.RLock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.patches = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a live entry, or None on miss/expiry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, size: int = 0, tags: Iterable[Hashable] = ()):
+        """
+        Store an entry.
+
+        Args:
+            key: Cache key
+            value: Cached value
+            size: Approximate size in bytes (for memory reporting)
+            tags: Tags used for grouped invalidation/patching
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            tags = tuple(tags)
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds, size, tags)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        """Drop one entry. Returns whether it was cached."""
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            self.invalidations += 1
+            return True
+
+    def invalidate_tag(self, tag: Hashable) -> int:
+        """Drop every entry carrying the tag. Returns the number of entries removed."""
+        with self._lock:
+            keys = list(self._tags.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def patch_tag(self, tag: Hashable, patch: Callable[[Any], None]) -> int:
+        """
+        Apply an in-place update to every entry carrying the tag.
+
+        The patch runs under the cache lock so readers never see a half-applied change.
+
+        Returns:
+            int: Number of entries patched
+        """
+        with self._lock:
+            keys = list(self._tags.get(tag, ()))
+            for key in keys:
+                patch(self._entries[key][0])
+            self.patches += len(keys)
+            return len(keys)
+
+    def clear(self):
+        """Drop all entries (statistics are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit rate, size and memory statistics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "patches": self.patches,
+                "approx_bytes": self._bytes
+            }
+
+    @property
+    def lock(self) -> threading.RLock:
+        """Lock guarding the entries; hold it while reading values that may be patched."""
+        return self._lock
+
+    def _remove(self, key: Hashable):
+        """Remove an entry and its tag references (lock must be held)."""
+        value, expires_at, size, tags = self._entries.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
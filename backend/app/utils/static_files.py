@@ -0,0 +1,285 @@
+"""
+Static file serving for IAP Connect application.
+Conditional GET, byte ranges and zero-copy sends for uploaded files.
+
+Files with content-hashed names (see media_store) never change, so they are
+served as immutable with the name as their ETag and revalidated without
+touching the disk. Other files get a strong ETag from mtime and size.
+
+Resolving a request path (joining, resolving symlinks, the containment check
+and the MIME type) is cached per path; each hit then costs one open() and
+one fstat() on the opened file.
+"""
+
+import asyncio
+import mimetypes
+import os
+import re
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from ..config.settings import settings
+from .cache import LRUCache
+
+
+# Content-addressed names: '<sha256>.<ext>' and renditions such as 'thumb_<sha256>.webp'
+CONTENT_HASHED_NAME = re.compile(r'^(?:[a-z]+_)?[0-9a-f]{64}\.[0-9a-z]+$')
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class StaticPath(NamedTuple):
+    """A request path resolved to a file under the served directory."""
+    path: Path
+    content_type: str
+    content_disposition: str
+    etag: Optional[str]  # Fixed ETag of content-hashed names
+
+
+# Resolved request paths, keyed by (root, request path)
+static_path_cache = LRUCache(
+    max_entries=settings.static_path_cache_entries,
+    ttl_seconds=settings.static_path_cache_ttl_seconds
+)
+
+
+class StaticFileResponse(Response):
+    """
+    Body of an already opened file, whole or one byte range.
+
+    Uses the server's zero-copy send (ASGI 'http.response.zerocopysend'
+    or 'http.response.pathsend') when it offers one, and otherwise streams
+    the file in chunks read off the event loop. The file is closed once sent.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(
+        self,
+        file,
+        path: Path,
+        offset: int,
+        length: int,
+        whole_file: bool,
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+        send_body: bool = True
+    ):
+        self.file = file
+        self.path = path
+        self.offset = offset
+        self.length = length
+        self.whole_file = whole_file
+        self.send_body = send_body
+        self.status_code = status_code
+        self.background = None
+        self.init_headers(headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if not self.send_body or self.length == 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+                return
+
+            extensions = scope.get("extensions") or {}
+            if "http.response.zerocopysend" in extensions:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": self.file,
+                    "offset": self.offset,
+                    "count": self.length,
+                    "more_body": False
+                })
+                return
+            if "http.response.pathsend" in extensions and self.whole_file:
+                await send({"type": "http.response.pathsend", "path": str(self.path)})
+                return
+
+            self.file.seek(self.offset)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await asyncio.to_thread(self.file.read, min(self.chunk_size, remaining))
+                if not chunk:
+                    break  # File shrank since it was opened
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            self.file.close()
+
+
+def _resolve_static_path(root: Path, file_path: str) -> Optional[StaticPath]:
+    """
+    Resolve a request path under root (cached).
+
+    Returns:
+        Optional[StaticPath]: None if the path points outside root
+    """
+    cache_key = (str(root), file_path)
+    cached = static_path_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    full_path = (root / file_path).resolve()
+    try:
+        full_path.relative_to(root.resolve())
+    except ValueError:
+        return None
+
+    name = full_path.name
+    quoted_name = quote(name)
+    if quoted_name != name:
+        content_disposition = f"attachment; filename*=utf-8''{quoted_name}"
+    else:
+        content_disposition = f'attachment; filename="{name}"'
+
+    resolved = StaticPath(
+        path=full_path,
+        content_type=mimetypes.guess_type(name)[0] or "application/octet-stream",
+        content_disposition=content_disposition,
+        etag=f'"{name}"' if CONTENT_HASHED_NAME.match(name) else None
+    )
+    static_path_cache.set(cache_key, resolved)
+    return resolved
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag (weak comparison)."""
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags or f"W/{etag}" in tags
+
+
+def _not_modified_since(if_modified_since: str, mtime: float) -> bool:
+    """Whether the file is unchanged since an If-Modified-Since date."""
+    try:
+        return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def _parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Byte range (first, last inclusive) of a Range header.
+
+    Returns:
+        Optional[Tuple[int, int]]: None to serve the whole file (malformed or multi-range header)
+
+    Raises:
+        ValueError: If the range cannot be satisfied (416)
+    """
+    unit, _, ranges = range_header.partition('=')
+    if unit.strip() != "bytes" or ',' in ranges:
+        return None
+    first, dash, last = ranges.strip().partition('-')
+    first, last = first.strip(), last.strip()
+    if not dash or not (first or last) or not (first + last).isdigit():
+        return None
+
+    if not first:
+        # Suffix range: the last N bytes
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - suffix, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range outside the file")
+    return start, end
+
+
+def _open_regular_file(path: Path):
+    """Open a file for reading and fstat it, or None if it is missing or not a regular file."""
+    try:
+        file = open(path, 'rb')
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError, PermissionError):
+        return None, None
+    stat_result = os.fstat(file.fileno())
+    if not stat.S_ISREG(stat_result.st_mode):
+        file.close()
+        return None, None
+    return file, stat_result
+
+
+async def static_file_response(
+    request: Request,
+    root: Path,
+    file_path: str,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Serve a file under root with validators, conditional GET and ranges.
+
+    Args:
+        request: Incoming GET or HEAD request
+        root: Directory being served
+        file_path: Requested path relative to root
+        headers: Extra headers for every response (e.g. CORS)
+
+    Returns:
+        Response: 200/206 with the file, 304, 403, 404 or 416
+    """
+    headers = dict(headers or {})
+    resolved = _resolve_static_path(root, file_path)
+    if resolved is None:
+        return JSONResponse(status_code=403, content={"detail": "Access denied"}, headers=headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    cache_control = IMMUTABLE_CACHE_CONTROL if resolved.etag else f"public, max-age={settings.static_max_age_seconds}"
+    headers["Cache-Control"] = cache_control
+
+    # Content-hashed files revalidate without touching the disk
+    if resolved.etag and if_none_match and _etag_matches(if_none_match, resolved.etag):
+        return Response(status_code=304, headers={**headers, "ETag": resolved.etag})
+
+    # One open() and fstat() per hit; blocking, but cheaper than a thread hop
+    file, stat_result = _open_regular_file(resolved.path)
+    if file is None:
+        static_path_cache.delete((str(root), file_path))
+        return JSONResponse(status_code=404, content={"detail": "File not found"}, headers=headers)
+
+    size = stat_result.st_size
+    etag = resolved.etag or f'"{stat_result.st_mtime_ns:x}-{size:x}"'
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    headers.update({"ETag": etag, "Last-Modified": last_modified, "Accept-Ranges": "bytes"})
+
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = bool(if_modified_since) and _not_modified_since(if_modified_since, stat_result.st_mtime)
+    if not_modified:
+        file.close()
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() in (etag, last_modified)):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            file.close()
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    headers.update({"Content-Type": resolved.content_type, "Content-Disposition": resolved.content_disposition})
+    send_body = request.method != "HEAD"
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StaticFileResponse(file, resolved.path, 0, size, True, headers=headers, send_body=send_body)
+
+    start, end = byte_range
+    length = end - start + 1
+    headers.update({"Content-Length": str(length), "Content-Range": f"bytes {start}-{end}/{size}"})
+    return StaticFileResponse(
+        file, resolved.path, start, length, length == size, status_code=206, headers=headers, send_body=send_body
+    )
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+One-time backfill of the media index (media_files) with files stored before
+the upload pipeline started recording them. Safe to re-run: files already
+indexed are skipped. Run this from the backend directory:
+
+    python backfill_media_index.py                 # local uploads folder
+    python backfill_media_index.py --storage s3    # S3 bucket (from its listing)
+    python backfill_media_index.py --workers 16 --no-hash
+"""
+
+import argparse
+import asyncio
+import sys
+
+from app.config.database import SessionLocal, engine, Base
+from app.models import MediaFile
+from app.models.notification import Notification  # noqa: F401 (registers User.notifications)
+from app.services.media_index import backfill_local_media, backfill_remote_media
+from app.services.storage import local_storage, get_s3_storage
+
+
+def main():
+    """Index every stored file that is not in media_files yet."""
+    parser = argparse.ArgumentParser(description="Backfill the media index")
+    parser.add_argument("--storage", choices=["local", "s3"], default="local", help="Storage to scan")
+    parser.add_argument("--workers", type=int, default=8, help="Parallel directory scanners (local)")
+    parser.add_argument("--no-hash", action="store_true", help="Skip SHA-256 digests (local)")
+    args = parser.parse_args()
+
+    # Make sure the table exists on databases created before it was added
+    Base.metadata.create_all(bind=engine, tables=[MediaFile.__table__])
+
+    db = SessionLocal()
+    try:
+        print(f"🔄 Indexing {args.storage} media...")
+        if args.storage == "local":
+            result = backfill_local_media(db, local_storage, workers=args.workers, hash_files=not args.no_hash)
+        else:
+            storage = get_s3_storage()
+            if storage is None:
+                print("❌ S3 is not configured")
+                sys.exit(1)
+            result = asyncio.run(backfill_remote_media(db, storage))
+        print(f"\n✅ {result['files_indexed']} of {result['files_scanned']} files indexed "
+              f"in {result['seconds']:.1f}s")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Media index backfill failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the in-process CSR follow graph.
+Builds a synthetic graph (skewed towards popular accounts) and reports memory
+and per-operation latency. No database is needed.
+Run this from the backend directory:
+
+    python benchmark_follow_graph.py [users] [edges]
+"""
+
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from app.services.follow_graph import FollowGraph
+
+
+SAMPLES = 20000
+
+
+def synthetic_edges(user_count: int, edge_count: int, seed: int = 42):
+    """Unique follow edges; targets follow a Zipf-like popularity skew."""
+    rng = random.Random(seed)
+    edges = set()
+    while len(edges) < edge_count:
+        follower = rng.randint(1, user_count)
+        following = min(int(rng.paretovariate(1.2)), user_count) if rng.random() < 0.5 else rng.randint(1, user_count)
+        if follower != following:
+            edges.add((follower, following))
+    return sorted(edges)
+
+
+def time_per_call(label: str, fn, args_list):
+    """Print mean microseconds per call."""
+    start = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    elapsed = (time.perf_counter() - start) / len(args_list) * 1e6
+    print(f"{label:>32}: {elapsed:8.2f} µs")
+
+
+def main():
+    user_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    edge_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+
+    print(f"🔄 Generating {edge_count} edges over {user_count} users...")
+    edges = synthetic_edges(user_count, edge_count)
+
+    graph = FollowGraph()
+    start = time.perf_counter()
+    graph.load_edges(edges)
+    load_seconds = time.perf_counter() - start
+
+    stats = graph.stats()
+    # Loading also holds two temporary edge arrays (8 bytes per edge)
+    print(f"\n📊 Load: {load_seconds:.2f}s, CSR arrays: {stats['array_bytes'] / 1e6:.1f} MB")
+
+    rng = random.Random(7)
+    pairs = [(rng.randint(1, user_count), rng.randint(1, user_count)) for _ in range(SAMPLES)]
+    existing = [edges[rng.randrange(len(edges))] for _ in range(SAMPLES)]
+    users = [(rng.randint(1, user_count),) for _ in range(SAMPLES)]
+
+    print()
+    time_per_call("follows (random pair)", graph.follows, pairs)
+    time_per_call("follows (existing edge)", graph.follows, existing)
+    time_per_call("following_ids", graph.following_ids, users)
+    time_per_call("follower_ids", graph.follower_ids, users)
+    time_per_call("mutual_followers", graph.mutual_followers, pairs[:2000])
+    time_per_call("friends_of_friends", graph.friends_of_friends, users[:500])
+
+    # Delta path: the same operations with pending follow/unfollow changes
+    for follower, following in pairs[:5000]:
+        graph.apply(follower, following, True)
+    for follower, following in existing[:5000]:
+        graph.apply(follower, following, False)
+    print("\n   with 10k pending changes:")
+    time_per_call("follows (random pair)", graph.follows, pairs)
+    time_per_call("following_ids", graph.following_ids, users)
+
+
+if __name__ == "__main__":
+    main()
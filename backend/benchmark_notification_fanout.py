@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark for hybrid push/pull new-post notification delivery.
+Compares write amplification and follower read latency at different follower counts.
+
+Runs against a throwaway SQLite database unless BENCH_DATABASE_URL is set.
+Run this from the backend directory:
+
+    python benchmark_notification_fanout.py [100 10000 100000]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Point the app at the benchmark database before importing it
+BENCH_DATABASE_URL = os.environ.get(
+    "BENCH_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_fanout.db')}"
+)
+os.environ["DATABASE_URL"] = BENCH_DATABASE_URL
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from sqlalchemy import insert
+
+from app.config.database import SessionLocal, engine, Base
+from app.config.settings import settings
+from app.models.user import User, UserType
+from app.models.follow import Follow
+from app.models.post import Post
+from app.models.notification import Notification, AuthorActivity
+from app.services.notification_service import NotificationService
+
+
+READ_SAMPLES = 50
+
+
+def create_author_with_followers(db, follower_count: int, run_id: str) -> User:
+    """Create one author and follower_count followers in bulk."""
+    author = User(
+        username=f"author_{run_id}",
+        email=f"author_{run_id}@bench.local",
+        password_hash="x",
+        user_type=UserType.DOCTOR,
+        full_name=f"Dr. Author {run_id}",
+        followers_count=follower_count
+    )
+    db.add(author)
+    db.commit()
+
+    first_id = db.query(User.id).order_by(User.id.desc()).first()[0] + 1
+    db.execute(insert(User), [
+        {
+            "username": f"f_{run_id}_{i}",
+            "email": f"f_{run_id}_{i}@bench.local",
+            "password_hash": "x",
+            "user_type": UserType.STUDENT,
+            "full_name": f"Follower {i}",
+            "followers_count": 0,
+            "following_count": 1,
+            "posts_count": 0,
+            "is_active": True
+        }
+        for i in range(follower_count)
+    ])
+    db.execute(insert(Follow), [
+        {"follower_id": first_id + i, "following_id": author.id}
+        for i in range(follower_count)
+    ])
+    db.commit()
+    return author
+
+
+def measure(db, author: User, follower_count: int, threshold: int) -> dict:
+    """Create one post with the given fan-out threshold and time writes and reads."""
+    settings.notification_fanout_follower_threshold = threshold
+
+    post = Post(user_id=author.id, content="Benchmark case discussion")
+    db.add(post)
+    db.commit()
+
+    start = time.perf_counter()
+    result = NotificationService.create_new_post_notifications(db, author, post)
+    write_ms = (time.perf_counter() - start) * 1000
+
+    sample_ids = [
+        row[0] for row in db.query(Follow.follower_id).filter(
+            Follow.following_id == author.id
+        ).limit(READ_SAMPLES).all()
+    ]
+    read_times = []
+    for follower_id in sample_ids:
+        start = time.perf_counter()
+        NotificationService.get_user_notifications(db, follower_id, 1, 20)
+        read_times.append((time.perf_counter() - start) * 1000)
+    read_times.sort()
+
+    return {
+        "mode": result["mode"],
+        "rows_written": result["rows_written"],
+        "write_ms": write_ms,
+        "read_p50_ms": read_times[len(read_times) // 2] if read_times else 0.0,
+        "read_p99_ms": read_times[min(len(read_times) - 1, int(len(read_times) * 0.99))] if read_times else 0.0
+    }
+
+
+def main():
+    follower_counts = [int(arg) for arg in sys.argv[1:]] or [100, 10_000, 100_000]
+
+    print(f"🔗 Benchmark database: {BENCH_DATABASE_URL}")
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        print(f"\n{'followers':>10} {'mode':>6} {'rows':>8} {'write ms':>10} {'read p50':>10} {'read p99':>10}")
+        for follower_count in follower_counts:
+            author = create_author_with_followers(db, follower_count, str(follower_count))
+            for threshold in (follower_count + 1, 0):  # push, then pull
+                stats = measure(db, author, follower_count, threshold)
+                print(f"{follower_count:>10} {stats['mode']:>6} {stats['rows_written']:>8} "
+                      f"{stats['write_ms']:>10.1f} {stats['read_p50_ms']:>10.2f} {stats['read_p99_ms']:>10.2f}")
+
+        print(f"\n📊 notifications rows: {db.query(Notification).count()}, "
+              f"author_activities rows: {db.query(AuthorActivity).count()}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Job that deletes uploaded files no post or profile references any more
+(never-published post media, files of deleted posts, replaced avatars).
+Run this from the backend directory (e.g. from cron once a night):
+
+    python collect_orphaned_media.py                    # configured storage
+    python collect_orphaned_media.py --storage local --dry-run
+    python collect_orphaned_media.py --grace-hours 72
+"""
+
+import argparse
+import asyncio
+import sys
+
+from app.config.database import SessionLocal
+from app.models.notification import Notification  # noqa: F401 (registers User.notifications)
+from app.services.media_gc import collect_orphaned_media
+from app.services.storage import local_storage, get_storage, get_s3_storage
+
+
+def main():
+    """Collect orphaned media in one storage."""
+    parser = argparse.ArgumentParser(description="Delete unreferenced uploaded files")
+    parser.add_argument("--storage", choices=["local", "s3"], help="Storage to collect (default: the configured one)")
+    parser.add_argument("--grace-hours", type=int, help="Keep unreferenced files younger than this")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted")
+    args = parser.parse_args()
+
+    storage = {"local": local_storage, "s3": get_s3_storage()}.get(args.storage) if args.storage else get_storage()
+    if storage is None:
+        print("❌ S3 is not configured")
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        print(f"🔄 Collecting orphaned media in {storage.name} storage...")
+        result = asyncio.run(collect_orphaned_media(db, storage, args.grace_hours, args.dry_run))
+        verb = "would be deleted" if args.dry_run else "deleted"
+        print(f"\n✅ {result['files_deleted']} of {result['files_scanned']} files {verb}, "
+              f"{result['bytes_reclaimed'] / (1024 * 1024):.1f} MB reclaimed in {result['seconds']:.1f}s "
+              f"({result['files_referenced']} referenced, {result['files_too_recent']} within the grace period, "
+              f"{result['files_failed']} failed)")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Orphaned media collection failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Nightly job that precomputes follow suggestions into follow_suggestions.
+Enable serving from the table with FOLLOW_SUGGESTIONS_PRECOMPUTED=true.
+Run this from the backend directory (e.g. from cron once a night):
+
+    python compute_follow_suggestions.py
+"""
+
+import sys
+import time
+
+from app.config.database import SessionLocal, engine, Base
+from app.models.follow import FollowSuggestion
+from app.services.user_service import refresh_follow_suggestions
+
+
+def main():
+    """Recompute follow suggestions for every active user."""
+    # Make sure the table exists on databases created before it was added
+    Base.metadata.create_all(bind=engine, tables=[FollowSuggestion.__table__])
+
+    db = SessionLocal()
+    try:
+        print("🔄 Computing follow suggestions...")
+        start = time.perf_counter()
+        result = refresh_follow_suggestions(db)
+        print(f"\n✅ {result['rows_written']} suggestions for {result['users_processed']} users "
+              f"in {time.perf_counter() - start:.1f}s")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Follow suggestion job failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Database migration script for materialized-path comment threads.
+Adds path/depth columns to comments and backfills them for existing rows.
+Run this from the backend directory:
+
+    python migrate_comments.py
+"""
+
+import sys
+from sqlalchemy import text
+
+from app.config.database import engine
+from app.models.comment import PATH_SEGMENT_WIDTH
+
+
+# Migration SQL (PostgreSQL)
+MIGRATION_SQL = f"""
+-- Materialized path columns
+ALTER TABLE comments
+ADD COLUMN IF NOT EXISTS path TEXT,
+ADD COLUMN IF NOT EXISTS depth INTEGER DEFAULT 0 NOT NULL;
+
+-- Subtree range scans
+CREATE INDEX IF NOT EXISTS ix_comments_path ON comments (path);
+
+-- Backfill: walk every thread from its top-level comment down
+WITH RECURSIVE tree AS (
+    SELECT id, LPAD(id::text, {PATH_SEGMENT_WIDTH}, '0') AS path, 0 AS depth
+    FROM comments
+    WHERE parent_id IS NULL
+    UNION ALL
+    SELECT c.id, tree.path || LPAD(c.id::text, {PATH_SEGMENT_WIDTH}, '0'), tree.depth + 1
+    FROM comments c
+    JOIN tree ON c.parent_id = tree.id
+)
+UPDATE comments
+SET path = tree.path, depth = tree.depth
+FROM tree
+WHERE comments.id = tree.id
+  AND comments.path IS DISTINCT FROM tree.path;
+"""
+
+
+def run_migration():
+    """Run the comment path migration."""
+    try:
+        print("🔄 Starting comment path migration...")
+
+        with engine.connect() as connection:
+            statements = [stmt.strip() for stmt in MIGRATION_SQL.split(';') if stmt.strip()]
+
+            for i, statement in enumerate(statements, 1):
+                try:
+                    print(f"📝 Executing statement {i}/{len(statements)}...")
+                    result = connection.execute(text(statement))
+                    connection.commit()
+                    print(f"   ✅ Statement {i} completed ({result.rowcount} rows)")
+                except Exception as e:
+                    connection.rollback()
+                    print(f"   ⚠️  Warning in statement {i}: {e}")
+                    continue
+
+            missing = connection.execute(text("SELECT COUNT(*) FROM comments WHERE path IS NULL")).scalar()
+            if missing:
+                print(f"⚠️ {missing} comments still have no path (orphaned parents?)")
+
+        print("\n✅ Comment path migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Database migration script for notifications.
+Adds coalescing columns, updated_at and the unique (recipient_id, group_key)
+index, and optionally converts the table to monthly range partitions (PostgreSQL).
+
+Coalescing bumps updated_at, never created_at, so a row stays in the partition
+it was created in. After partitioning, the unique index only holds per
+partition; the coalescing upsert serializes each key with an advisory lock.
+Run this from the backend directory:
+
+    python migrate_notifications.py            # coalescing columns/index
+    python migrate_notifications.py partition  # convert to monthly partitions
+"""
+
+import sys
+from sqlalchemy import text
+
+from app.config.database import engine, SessionLocal
+
+
+# Migration SQL (PostgreSQL)
+MIGRATION_SQL = """
+-- Coalescing columns
+ALTER TABLE notifications
+ADD COLUMN IF NOT EXISTS group_key VARCHAR(120),
+ADD COLUMN IF NOT EXISTS actor_count INTEGER DEFAULT 1 NOT NULL,
+ADD COLUMN IF NOT EXISTS recent_actor_ids TEXT;
+
+-- Latest coalesced activity (lists sort on it; created_at stays the partition key)
+ALTER TABLE notifications
+ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE;
+
+UPDATE notifications SET updated_at = created_at WHERE updated_at IS NULL;
+
+ALTER TABLE notifications
+ALTER COLUMN updated_at SET DEFAULT now(),
+ALTER COLUMN updated_at SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS ix_notifications_recipient_updated
+    ON notifications (recipient_id, updated_at);
+
+-- One row per (recipient, aggregation key); stops duplicates on retry
+CREATE UNIQUE INDEX IF NOT EXISTS uq_notifications_recipient_group_key
+    ON notifications (recipient_id, group_key)
+    WHERE group_key IS NOT NULL;
+"""
+
+
+# Partition conversion (PostgreSQL). Statements run in order in one transaction;
+# the old table is kept as notifications_legacy until you drop it manually.
+PARTITION_STATEMENTS = [
+    "ALTER TABLE notifications RENAME TO notifications_legacy",
+    "ALTER INDEX IF EXISTS uq_notifications_recipient_group_key RENAME TO uq_notifications_legacy_group_key",
+    "ALTER INDEX IF EXISTS ix_notifications_recipient_updated RENAME TO ix_notifications_legacy_recipient_updated",
+    """CREATE TABLE notifications (LIKE notifications_legacy INCLUDING DEFAULTS)
+       PARTITION BY RANGE (created_at)""",
+    "ALTER TABLE notifications ALTER COLUMN created_at SET DEFAULT now()",
+    "ALTER TABLE notifications ALTER COLUMN created_at SET NOT NULL",
+    "ALTER TABLE notifications ADD PRIMARY KEY (id, created_at)",
+    """ALTER TABLE notifications ADD FOREIGN KEY (recipient_id)
+       REFERENCES users(id) ON DELETE CASCADE""",
+    """ALTER TABLE notifications ADD FOREIGN KEY (sender_id)
+       REFERENCES users(id) ON DELETE CASCADE""",
+    "CREATE INDEX ix_notifications_recipient_created ON notifications (recipient_id, created_at DESC)",
+    "CREATE INDEX ix_notifications_recipient_updated ON notifications (recipient_id, updated_at DESC)",
+    "CREATE INDEX ix_notifications_created_at_part ON notifications (created_at)",
+    "CREATE INDEX ix_notifications_is_read_part ON notifications (is_read)",
+    "CREATE TABLE notifications_default PARTITION OF notifications DEFAULT",
+    """CREATE UNIQUE INDEX uq_notifications_default_group_key
+       ON notifications_default (recipient_id, group_key) WHERE group_key IS NOT NULL""",
+    "ALTER SEQUENCE IF EXISTS notifications_id_seq OWNED BY notifications.id",
+]
+
+
+def run_partition_migration():
+    """Convert notifications to a month-partitioned table and copy existing rows."""
+    from app.services.notification_service import NotificationService
+
+    if engine.dialect.name != "postgresql":
+        print("⚠️ Partitioning is PostgreSQL-only; SQLite uses batched retention instead")
+        return
+
+    db = SessionLocal()
+    try:
+        if NotificationService.is_partitioned(db):
+            print("✅ notifications is already partitioned")
+            return
+
+        has_updated_at = db.execute(text("""
+            SELECT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'notifications' AND column_name = 'updated_at'
+            )
+        """)).scalar()
+        if not has_updated_at:
+            print("❌ Run `python migrate_notifications.py` first (adds updated_at)")
+            sys.exit(1)
+
+        print("🔄 Converting notifications to monthly partitions...")
+        oldest = db.execute(text("SELECT MIN(created_at) FROM notifications")).scalar()
+
+        for i, statement in enumerate(PARTITION_STATEMENTS, 1):
+            print(f"📝 Executing statement {i}/{len(PARTITION_STATEMENTS)}...")
+            db.execute(text(statement))
+
+        # Monthly partitions covering existing rows plus the configured months ahead
+        created = NotificationService.ensure_notification_partitions(
+            db, start=oldest.replace(tzinfo=None) if oldest else None, commit=False
+        )
+        print(f"   ✅ Created {len(created)} partitions")
+
+        db.execute(text("UPDATE notifications_legacy SET created_at = now() WHERE created_at IS NULL"))
+        copied = db.execute(text("INSERT INTO notifications SELECT * FROM notifications_legacy")).rowcount
+        db.commit()
+
+        print(f"\n✅ Copied {copied} notifications into the partitioned table")
+        print("🧹 Drop notifications_legacy once you have verified the data")
+
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Partition migration failed (rolled back): {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+def run_migration():
+    """Run the notification migration."""
+    try:
+        print("🔄 Starting notification migration...")
+
+        with engine.connect() as connection:
+            statements = [stmt.strip() for stmt in MIGRATION_SQL.split(';') if stmt.strip()]
+
+            for i, statement in enumerate(statements, 1):
+                try:
+                    print(f"📝 Executing statement {i}/{len(statements)}...")
+                    connection.execute(text(statement))
+                    connection.commit()
+                    print(f"   ✅ Statement {i} completed")
+                except Exception as e:
+                    connection.rollback()
+                    print(f"   ⚠️  Warning in statement {i}: {e}")
+                    continue
+
+        print("\n✅ Notification migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        if sys.argv[1] == "partition":
+            run_partition_migration()
+        else:
+            print("Usage: python migrate_notifications.py [partition]")
+    else:
+        run_migration()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Database migration script for trigram user search.
+Enables pg_trgm and adds GIN trigram indexes on the searchable user columns,
+so ILIKE '%q%' and similarity() ranking stop scanning the whole users table,
+and indexes users.updated_at for the per-worker prefix index sync.
+Run this from the backend directory:
+
+    python migrate_user_search.py
+"""
+
+import sys
+from sqlalchemy import text
+
+from app.config.database import engine
+
+
+# Columns searched by /users/search and admin user search
+SEARCH_COLUMNS = ["full_name", "username", "bio", "specialty", "college", "email"]
+
+# Migration SQL (PostgreSQL)
+MIGRATION_SQL = "CREATE EXTENSION IF NOT EXISTS pg_trgm;\n" + "".join(
+    f"CREATE INDEX IF NOT EXISTS ix_users_{column}_trgm ON users USING gin ({column} gin_trgm_ops);\n"
+    for column in SEARCH_COLUMNS
+) + (
+    # Each worker's user prefix index polls for recently updated users
+    "CREATE INDEX IF NOT EXISTS ix_users_updated_at ON users (updated_at);\n"
+)
+
+
+def run_migration():
+    """Run the user search migration."""
+    try:
+        print("🔄 Starting user search migration...")
+
+        with engine.connect() as connection:
+            statements = [stmt.strip() for stmt in MIGRATION_SQL.split(';') if stmt.strip()]
+
+            for i, statement in enumerate(statements, 1):
+                try:
+                    print(f"📝 Executing statement {i}/{len(statements)}...")
+                    connection.execute(text(statement))
+                    connection.commit()
+                    print(f"   ✅ Statement {i} completed")
+                except Exception as e:
+                    connection.rollback()
+                    print(f"   ⚠️  Warning in statement {i}: {e}")
+                    continue
+
+        print("\n✅ User search migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run_migration()
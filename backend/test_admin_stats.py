@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Tests for the admin dashboard statistics snapshot.
+
+Runs against a throwaway SQLite database unless TEST_DATABASE_URL is set.
+Run this from the backend directory:
+
+    python test_admin_stats.py    (or: python -m pytest test_admin_stats.py)
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# Point the app at the test database before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_admin_stats.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from sqlalchemy import event, func
+
+from app.config.database import SessionLocal, engine, Base
+from app.models.admin_stats import AdminStatsSnapshot
+from app.models.comment import Comment
+from app.models.post import Post
+from app.models.user import User, UserType
+from app.models.notification import Notification  # noqa: F401 (registers User.notifications)
+from app.services import admin_stats_service
+from app.services.admin_stats_service import (
+    SNAPSHOT_ID, get_admin_stats, refresh_admin_stats, refresh_admin_stats_if_stale
+)
+
+
+@contextmanager
+def _count_queries():
+    """Count the SQL statements executed inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _add_content(db, posts: int = 3):
+    """A doctor, an inactive student and a few posts; returns the doctor."""
+    Base.metadata.create_all(bind=engine)
+    run_id = os.urandom(4).hex()
+    doctor = User(username=f"as_{run_id}_d", email=f"as_{run_id}_d@test.local", password_hash="x",
+                  user_type=UserType.DOCTOR, full_name="Dr. Stats", followers_count=1000 + posts)
+    student = User(username=f"as_{run_id}_s", email=f"as_{run_id}_s@test.local", password_hash="x",
+                   user_type=UserType.STUDENT, full_name="Student Stats", is_active=False)
+    db.add_all([doctor, student])
+    db.commit()
+    db.add_all(Post(user_id=doctor.id, content="x" * 150, likes_count=i, comments_count=1) for i in range(posts))
+    db.commit()
+    return doctor
+
+
+def test_snapshot_matches_exact_counts_and_is_served_from_one_row():
+    """Refresh stores exact counts on SQLite; dashboard reads one row until the next refresh."""
+    db = SessionLocal()
+    try:
+        doctor = _add_content(db)
+        refresh_admin_stats(db)
+
+        stats = get_admin_stats(db)
+        users = stats["user_stats"]
+        assert users["total_users"] == db.query(func.count(User.id)).scalar()
+        assert users["active_users"] == db.query(func.count(User.id)).filter(User.is_active == True).scalar()
+        assert users["total_students"] == db.query(func.count(User.id)).filter(
+            User.user_type == UserType.STUDENT).scalar()
+        assert stats["content_stats"]["total_posts"] == db.query(func.count(Post.id)).scalar()
+        assert stats["content_stats"]["total_comments"] == db.query(func.count(Comment.id)).scalar()
+        assert stats["most_followed_users"][0]["id"] == doctor.id
+        assert stats["top_posts"][0]["author"] == doctor.username
+        assert stats["top_posts"][0]["content"].endswith("...")
+        assert stats["snapshot"]["estimated_tables"] == []
+
+        # Page views read the snapshot row only, and do not see new posts until a refresh
+        total_posts = stats["content_stats"]["total_posts"]
+        db.add(Post(user_id=doctor.id, content="new"))
+        db.commit()
+        db.expire_all()
+        with _count_queries() as statements:
+            stats = get_admin_stats(db)
+        assert len(statements) == 1, statements
+        assert stats["content_stats"]["total_posts"] == total_posts
+
+        refresh_admin_stats(db)
+        assert get_admin_stats(db)["content_stats"]["total_posts"] == total_posts + 1
+    finally:
+        db.close()
+
+
+def test_refresh_if_stale_skips_fresh_snapshots():
+    """Only a snapshot older than the refresh interval is recomputed."""
+    db = SessionLocal()
+    try:
+        _add_content(db)
+        refresh_admin_stats(db)
+        assert refresh_admin_stats_if_stale(db, max_age_seconds=60) is False
+
+        snapshot = db.get(AdminStatsSnapshot, SNAPSHOT_ID)
+        snapshot.computed_at = datetime.utcnow() - timedelta(minutes=5)
+        db.commit()
+        assert refresh_admin_stats_if_stale(db, max_age_seconds=60) is True
+        assert (datetime.utcnow() - db.get(AdminStatsSnapshot, SNAPSHOT_ID).computed_at).total_seconds() < 60
+    finally:
+        db.close()
+
+
+def test_planner_estimates_used_only_for_large_analyzed_tables():
+    """reltuples replaces COUNT(*) above the threshold; small or unanalyzed tables are counted."""
+    db = SessionLocal()
+    original = admin_stats_service._table_estimates
+    try:
+        _add_content(db)
+        assert original(db) == {}  # No planner estimates outside PostgreSQL
+
+        admin_stats_service._table_estimates = lambda session: {
+            "posts": 250000.0,  # Large: estimated
+            "comments": -1.0,  # Never analyzed: counted
+            "likes": 12.0  # Small: counted
+        }
+        with _count_queries() as statements:
+            counts, estimated = admin_stats_service._content_counts(db)
+        assert counts["total_posts"] == 250000
+        assert counts["total_comments"] == db.query(func.count(Comment.id)).scalar()
+        assert estimated == ["posts"]
+        assert len(statements) == 3  # COUNT(*) for comments, likes and follows only
+
+        snapshot = refresh_admin_stats(db)
+        assert snapshot.estimated_tables == ["posts"]
+        assert get_admin_stats(db)["snapshot"]["estimated_tables"] == ["posts"]
+    finally:
+        admin_stats_service._table_estimates = original
+        db.close()
+
+
+if __name__ == "__main__":
+    test_snapshot_matches_exact_counts_and_is_served_from_one_row()
+    test_refresh_if_stale_skips_fresh_snapshots()
+    test_planner_estimates_used_only_for_large_analyzed_tables()
+    print("✅ Admin stats tests passed")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Tests for comment pages, reply previews and like state.
+
+Runs against a throwaway SQLite database unless TEST_DATABASE_URL is set.
+Run this from the backend directory:
+
+    python test_comments.py    (or: python -m pytest test_comments.py)
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+# Point the app at the test database before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_comments.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from sqlalchemy import event
+
+from app.config.database import SessionLocal, engine, Base
+from app.config.settings import settings
+from app.models.user import User, UserType
+from app.models.post import Post
+from app.models.comment_like import CommentLike
+from app.models.notification import Notification  # noqa: F401 (registers User.notifications)
+from app.schemas.comment import CommentCreate
+from app.services import comment_service
+
+
+def _make_post(db, comment_count: int, replies_per_comment: int = 0):
+    """A post with comment_count top-level comments, each with replies, all liked by a viewer."""
+    Base.metadata.create_all(bind=engine)
+    run_id = os.urandom(4).hex()
+    author, viewer = [
+        User(username=f"{role}_{run_id}", email=f"{role}_{run_id}@test.local", password_hash="x",
+             user_type=UserType.DOCTOR, full_name=f"Dr. {role.title()}")
+        for role in ("author", "viewer")
+    ]
+    db.add_all([author, viewer])
+    db.commit()
+    post = Post(user_id=author.id, content="Case discussion")
+    db.add(post)
+    db.commit()
+
+    top_level_ids, comment_ids = [], []
+    for i in range(comment_count):
+        comment = comment_service.create_comment(author, post, CommentCreate(content=f"Comment {i}"), db)
+        top_level_ids.append(comment.id)
+        comment_ids.append(comment.id)
+        for j in range(replies_per_comment):
+            reply = comment_service.create_comment(
+                viewer, post, CommentCreate(content=f"Reply {i}.{j}", parent_id=comment.id), db
+            )
+            comment_ids.append(reply.id)
+    db.add_all(CommentLike(comment_id=comment_id, user_id=viewer.id) for comment_id in comment_ids)
+    db.commit()
+    return post.id, viewer.id, top_level_ids, comment_ids
+
+
+@contextmanager
+def _count_queries():
+    """Count the SQL statements executed inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _queries_for(call) -> int:
+    """Statements run by call(db) on a fresh session (nothing in the identity map)."""
+    db = SessionLocal()
+    try:
+        with _count_queries() as statements:
+            call(db)
+        return len(statements)
+    finally:
+        db.close()
+
+
+def test_comment_page_query_count_is_constant():
+    """get_post_comments runs the same number of queries for 1 or 10 comments with replies."""
+    cache_enabled = settings.comment_cache_enabled
+    settings.comment_cache_enabled = False
+    db = SessionLocal()
+    try:
+        small = _make_post(db, 1, replies_per_comment=2)
+        large = _make_post(db, 10, replies_per_comment=4)
+    finally:
+        db.close()
+
+    try:
+        counts = []
+        for post_id, viewer_id, _, _ in (small, large):
+            def page(session):
+                comments, total = comment_service.get_post_comments(post_id, session, user_id=viewer_id)
+                assert all(comment.is_liked for comment in comments)
+                assert all(reply.is_liked for comment in comments for reply in comment.replies)
+            counts.append(_queries_for(page))
+        assert counts[0] == counts[1], counts
+    finally:
+        settings.comment_cache_enabled = cache_enabled
+
+
+def test_replies_preview_and_likes_query_count_is_constant():
+    """get_replies_preview and get_liked_comment_ids run one query each, whatever the batch size."""
+    db = SessionLocal()
+    try:
+        small = _make_post(db, 1, replies_per_comment=1)
+        large = _make_post(db, 12, replies_per_comment=5)
+    finally:
+        db.close()
+
+    for _, viewer_id, top_level_ids, comment_ids in (small, large):
+        def preview(session):
+            replies = comment_service.get_replies_preview(session, top_level_ids)
+            assert set(replies) == set(top_level_ids)
+            for batch in replies.values():
+                assert len(batch) <= comment_service.REPLIES_PREVIEW_LIMIT
+                assert all(reply.author.username for reply in batch)
+
+        def likes(session):
+            assert comment_service.get_liked_comment_ids(session, viewer_id, comment_ids) == set(comment_ids)
+
+        assert _queries_for(preview) == 1
+        assert _queries_for(likes) == 1
+
+
+def test_thread_keyset_pagination():
+    """get_comment_thread pages a deep subtree in depth-first order with no gaps or repeats."""
+    db = SessionLocal()
+    try:
+        post_id, viewer_id, top_level_ids, _ = _make_post(db, 2, replies_per_comment=3)
+        viewer = db.get(User, viewer_id)
+        post = db.get(Post, post_id)
+        root_id = top_level_ids[0]
+
+        # Nest a chain of replies under the root's first reply
+        first_reply = comment_service.get_comment_replies(root_id, db)[0][0]
+        parent_id = first_reply.id
+        for depth in range(4):
+            parent_id = comment_service.create_comment(
+                viewer, post, CommentCreate(content=f"Nested {depth}", parent_id=parent_id), db
+            ).id
+
+        full, cursor = comment_service.get_comment_thread(root_id, db, limit=100)
+        assert cursor is None
+        assert len(full) == 3 + 4
+        assert [comment.depth for comment in full[:5]] == [1, 2, 3, 4, 5]
+
+        paged, after = [], None
+        while True:
+            page, after = comment_service.get_comment_thread(root_id, db, after=after, limit=2)
+            paged.extend(page)
+            if after is None:
+                break
+        assert [comment.id for comment in paged] == [comment.id for comment in full]
+
+        shallow, _ = comment_service.get_comment_thread(root_id, db, max_depth=1, limit=100)
+        assert [comment.id for comment in shallow] == [
+            comment.id for comment in full if comment.depth == 1
+        ]
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    test_comment_page_query_count_is_constant()
+    test_replies_preview_and_likes_query_count_is_constant()
+    test_thread_keyset_pagination()
+    print("✅ Comment tests passed")
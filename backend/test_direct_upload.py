@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Tests for publishing presigned direct-to-S3 uploads (process_direct_upload).
+
+Uses moto's in-process S3 mock (pip install moto, dev only); the tests are
+skipped when it is not installed. Run this from the backend directory:
+
+    python test_direct_upload.py    (or: python -m pytest test_direct_upload.py)
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+
+# Point the app at a test database and a mocked bucket before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_direct_upload.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+for name, value in {
+    "AWS_ACCESS_KEY_ID": "test",
+    "AWS_SECRET_ACCESS_KEY": "test",
+    "AWS_S3_BUCKET_NAME": "iap-direct-upload-test",
+    "AWS_S3_REGION": "us-east-1"
+}.items():
+    os.environ[name] = value
+
+import boto3
+from fastapi import HTTPException, UploadFile, status
+from PIL import Image
+from starlette.datastructures import Headers
+
+from app.config.database import SessionLocal, engine, Base
+from app.models.media import MediaFile, MediaObject
+from app.models.user import User, UserType
+from app.models.notification import Notification  # noqa: F401 (registers User.notifications)
+from app.services.image_executor import image_executor
+from app.services.media_index import media_stats
+
+try:
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+SOURCE_KEY = "incoming/1/posts/photo.jpg"
+FINAL_KEY = "posts/photo.jpg"
+
+
+def _jpeg() -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (800, 600), (200, 80, 40)).save(output, format="JPEG")
+    return output.getvalue()
+
+
+def _service():
+    """S3Service on a mocked bucket holding one incoming upload (call inside mock_aws)."""
+    client = boto3.client("s3", region_name=os.environ["AWS_S3_REGION"])
+    client.create_bucket(Bucket=os.environ["AWS_S3_BUCKET_NAME"])
+    client.put_object(Bucket=os.environ["AWS_S3_BUCKET_NAME"], Key=SOURCE_KEY, Body=_jpeg(), ContentType="image/jpeg")
+    # Imported here so the module's global service also connects to the mock
+    from app.services.s3_service import S3Service
+    return S3Service()
+
+
+def _keys(service):
+    listing = service.s3_client.list_objects_v2(Bucket=service.bucket_name)
+    return sorted(item["Key"] for item in listing.get("Contents", []))
+
+
+def _busy_then(calls_busy: int):
+    """image_executor.run stand-in answering 503 for the first calls_busy calls."""
+    original = image_executor.run
+    calls = []
+
+    async def run(func, *args, **kwargs):
+        calls.append(func)
+        if len(calls) <= calls_busy:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Image processing is busy",
+                headers={"Retry-After": "0"}
+            )
+        return await original(func, *args, **kwargs)
+
+    return run, calls
+
+
+def test_busy_pool_keeps_upload_and_raises_for_waiting_request():
+    """A saturated image pool answers 503 to a waiting finalize and keeps the incoming object."""
+    if mock_aws is None:
+        print("⚠️ moto not installed, skipping")
+        return
+    original = image_executor.run
+    image_executor.run, _ = _busy_then(1)
+    try:
+        with mock_aws():
+            service = _service()
+            try:
+                asyncio.run(service.process_direct_upload(SOURCE_KEY, FINAL_KEY, "posts"))
+                raise AssertionError("expected a 503")
+            except HTTPException as e:
+                assert e.status_code == 503
+            assert _keys(service) == [SOURCE_KEY]
+    finally:
+        image_executor.run = original
+
+
+def test_background_finalize_retries_busy_pool_then_publishes():
+    """A background finalize waits out a busy pool, publishes, and only then deletes the source."""
+    if mock_aws is None:
+        print("⚠️ moto not installed, skipping")
+        return
+    original = image_executor.run
+    image_executor.run, calls = _busy_then(2)
+    try:
+        with mock_aws():
+            service = _service()
+            published = asyncio.run(service.process_direct_upload(
+                SOURCE_KEY, FINAL_KEY, "posts", busy_retries=3
+            ))
+            assert published
+            assert len(calls) == 3
+            assert _keys(service) == [FINAL_KEY, "posts/thumb_photo.jpg"]
+    finally:
+        image_executor.run = original
+
+
+def test_failed_publish_keeps_upload():
+    """When a rendition cannot be written, the incoming object stays for another finalize."""
+    if mock_aws is None:
+        print("⚠️ moto not installed, skipping")
+        return
+    with mock_aws():
+        service = _service()
+        put = service.storage.put
+
+        async def failing_put(key, data, content_type=None):
+            raise OSError("connection reset")
+
+        service.storage.put = failing_put
+        assert asyncio.run(service.process_direct_upload(SOURCE_KEY, FINAL_KEY, "posts", busy_retries=1)) is False
+        assert _keys(service) == [SOURCE_KEY]
+
+        service.storage.put = put
+        assert asyncio.run(service.process_direct_upload(SOURCE_KEY, FINAL_KEY, "posts"))
+        assert SOURCE_KEY not in _keys(service)
+
+
+def test_published_upload_is_indexed_and_deduplicated():
+    """Published renditions land in the media index and store, so a later upload of the bytes reuses them."""
+    if mock_aws is None:
+        print("⚠️ moto not installed, skipping")
+        return
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        run_id = os.urandom(4).hex()
+        owner = User(username=f"du_{run_id}", email=f"du_{run_id}@test.local", password_hash="x",
+                     user_type=UserType.DOCTOR, full_name="Dr. Direct")
+        db.add(owner)
+        db.commit()
+        original = _jpeg()
+
+        with mock_aws():
+            service = _service()
+            before = media_stats(db, storage="s3")["total_files"]
+            assert asyncio.run(service.process_direct_upload(
+                SOURCE_KEY, FINAL_KEY, "posts", owner_id=owner.id, db=db
+            ))
+
+            indexed = {row.key: row for row in db.query(MediaFile).filter(MediaFile.owner_id == owner.id)}
+            assert sorted(indexed) == _keys(service) == [FINAL_KEY, "posts/thumb_photo.jpg"]
+            assert indexed[FINAL_KEY].rendition == "main" and indexed[FINAL_KEY].width == 800
+            assert indexed["posts/thumb_photo.jpg"].rendition == "thumbnail"
+            assert media_stats(db, storage="s3")["total_files"] == before + 2
+
+            media = db.query(MediaObject).filter(MediaObject.key == FINAL_KEY).one()
+            assert media.content_hash == hashlib.sha256(original).hexdigest()
+            assert media.ref_count == 1 and media.original_size == len(original)
+            assert media.thumbnail_url == service.storage.url("posts/thumb_photo.jpg")
+
+            # A regular upload of the same bytes reuses the published files
+            upload = UploadFile(file=io.BytesIO(original), filename="again.jpg", size=len(original),
+                                headers=Headers({"content-type": "image/jpeg"}))
+            result = asyncio.run(service.upload_image(upload, folder="posts", db=db, owner_id=owner.id))
+            assert result["deduplicated"] and result["s3_key"] == FINAL_KEY
+            db.refresh(media)
+            assert media.ref_count == 2
+            assert _keys(service) == [FINAL_KEY, "posts/thumb_photo.jpg"]
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    test_busy_pool_keeps_upload_and_raises_for_waiting_request()
+    test_background_finalize_retries_busy_pool_then_publishes()
+    test_failed_publish_keeps_upload()
+    test_published_upload_is_indexed_and_deduplicated()
+    print("✅ Direct upload tests passed")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-process follow graph and its change feed.
+
+Runs against a throwaway SQLite database unless TEST_DATABASE_URL is set.
+Run this from the backend directory:
+
+    python test_follow_graph.py    (or: python -m pytest test_follow_graph.py)
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# Point the app at the test database before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_follow_graph.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from sqlalchemy import event
+
+from app.config.database import SessionLocal, engine, Base
+from app.config.settings import settings
+from app.models.user import User, UserType
+from app.models.follow import Follow, FollowChange
+from app.models.notification import Notification  # noqa: F401 (registers User.notifications)
+from app.routers.admin import delete_user
+from app.services.follow_graph import FollowGraph, follow_graph
+
+
+def _make_users(db, count: int):
+    """count users, where everyone follows user 0 and user 0 follows user 1."""
+    Base.metadata.create_all(bind=engine)
+    run_id = os.urandom(4).hex()
+    users = [
+        User(username=f"fg_{run_id}_{i}", email=f"fg_{run_id}_{i}@test.local", password_hash="x",
+             user_type=UserType.DOCTOR, full_name=f"User {i}")
+        for i in range(count)
+    ]
+    db.add_all(users)
+    db.commit()
+    db.add_all(Follow(follower_id=user.id, following_id=users[0].id) for user in users[1:])
+    db.add(Follow(follower_id=users[0].id, following_id=users[1].id))
+    db.commit()
+    return users
+
+
+def test_deleted_user_edges_reach_other_workers():
+    """Admin delete publishes unfollows, so another worker's graph drops the user's edges."""
+    enabled = settings.follow_graph_enabled
+    settings.follow_graph_enabled = True
+    db = SessionLocal()
+    try:
+        users = _make_users(db, 4)
+        admin = User(id=-1, user_type=UserType.ADMIN)
+        deleted_id = users[0].id
+
+        follow_graph.load(db)
+        other_worker = FollowGraph()
+        other_worker.load(db)
+        assert other_worker.follows(users[2].id, deleted_id)
+        assert other_worker.follows(deleted_id, users[1].id)
+
+        delete_user(deleted_id, admin_user=admin, db=db)
+
+        # Local graph is updated on commit, the other worker on its next sync
+        assert follow_graph.follower_ids(deleted_id) == set()
+        other_worker._next_sync = 0
+        other_worker.sync(db)
+        assert other_worker.follower_ids(deleted_id) == set()
+        assert other_worker.following_ids(deleted_id) == set()
+        assert not other_worker.follows(users[3].id, deleted_id)
+    finally:
+        follow_graph.loaded = False
+        settings.follow_graph_enabled = enabled
+        db.close()
+
+
+def test_change_feed_prune_does_not_commit_request_session():
+    """The hourly prune runs in its own session and never commits the caller's transaction."""
+    db = SessionLocal()
+    try:
+        Base.metadata.create_all(bind=engine)
+        stale = datetime.utcnow() - timedelta(hours=settings.follow_graph_change_retention_hours + 1)
+        db.add(FollowChange(follower_id=1, following_id=2, followed=True, created_at=stale))
+        db.commit()
+
+        commits = []
+        event.listen(db, "after_commit", lambda session: commits.append(session))
+        graph = FollowGraph()
+        graph.loaded = True
+        graph._next_sync = graph._next_prune = 0
+        graph.sync(db)
+
+        assert commits == []
+        assert db.query(FollowChange).filter(FollowChange.created_at <= stale).count() == 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    test_deleted_user_edges_reach_other_workers()
+    test_change_feed_prune_does_not_commit_request_session()
+    print("✅ Follow graph tests passed")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Tests for follow suggestion scoring and the precomputed suggestion table.
+
+Runs against a throwaway SQLite database unless TEST_DATABASE_URL is set.
+Run this from the backend directory:
+
+    python test_follow_suggestions.py    (or: python -m pytest test_follow_suggestions.py)
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# Point the app at the test database before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_follow_suggestions.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from sqlalchemy import event
+
+from app.config.database import SessionLocal, engine, Base
+from app.config.settings import settings
+from app.models.follow import Follow
+from app.models.user import User, UserType
+from app.models.notification import Notification  # noqa: F401 (registers User.notifications)
+from app.services.user_service import (
+    compute_follow_suggestions, get_follow_suggestions, refresh_follow_suggestions
+)
+
+
+@contextmanager
+def _count_queries():
+    """Count the SQL statements executed inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _make_graph(db, extra_mutual_candidates: int = 0):
+    """
+    A user following a, b and c, plus candidates scored by each signal.
+
+    Returns:
+        dict: Users by role
+    """
+    Base.metadata.create_all(bind=engine)
+    run_id = os.urandom(4).hex()
+
+    def user(role, **fields):
+        return User(username=f"fs_{run_id}_{role}", email=f"fs_{run_id}_{role}@test.local", password_hash="x",
+                    user_type=UserType.DOCTOR, full_name=f"User {role}", **fields)
+
+    users = {role: user(role) for role in ("a", "b", "c", "popular_mutual", "recent", "old", "inactive")}
+    users["me"] = user("me", specialty=f"Cardiology {run_id}")
+    users["same_specialty"] = user("same_specialty", specialty=f"Cardiology {run_id}", followers_count=5)
+    users["same_specialty_popular"] = user("same_specialty_popular", specialty=f"Cardiology {run_id}",
+                                           followers_count=9)
+    users["inactive"].is_active = False
+    for i in range(extra_mutual_candidates):
+        users[f"extra{i}"] = user(f"extra{i}")
+    db.add_all(users.values())
+    db.commit()
+
+    now = datetime.utcnow()
+    long_ago = now - timedelta(days=3650)
+
+    def follow(follower, following, created_at=long_ago):
+        db.add(Follow(follower_id=users[follower].id, following_id=users[following].id, created_at=created_at))
+
+    for followed in ("a", "b", "c"):
+        follow("me", followed)
+        follow(followed, "popular_mutual")  # 3 mutuals, long ago
+        follow(followed, "inactive")  # Never suggested
+    follow("a", "me")  # Never suggest self
+    follow("b", "a")  # Already followed
+    follow("a", "recent", now - timedelta(days=1))  # 1 mutual + almost full recency
+    follow("a", "old", now - timedelta(days=90))  # 1 mutual + 1/8 recency
+    for i in range(extra_mutual_candidates):
+        follow("c", f"extra{i}")
+    db.commit()
+    return users
+
+
+def test_ranking_combines_mutuals_shared_fields_and_recency():
+    """Mutual count, shared specialty and recency rank candidates; ties go to followers."""
+    db = SessionLocal()
+    try:
+        users = _make_graph(db)
+        suggestions = compute_follow_suggestions(users["me"], db, limit=10)
+        ranked = [(candidate.id, round(score, 3), mutual_count) for candidate, score, mutual_count in suggestions]
+
+        assert ranked == [
+            (users["popular_mutual"].id, 3.0, 3),
+            (users["same_specialty_popular"].id, 2.0, 0),
+            (users["same_specialty"].id, 2.0, 0),
+            (users["recent"].id, 1.977, 1),
+            (users["old"].id, 1.125, 1),
+        ], ranked
+
+        assert [candidate.id for candidate, _, _ in compute_follow_suggestions(users["me"], db, limit=2)] == [
+            users["popular_mutual"].id, users["same_specialty_popular"].id
+        ]
+    finally:
+        db.close()
+
+
+def test_query_count_does_not_grow_with_candidates():
+    """Scoring runs a fixed number of queries however many candidates there are."""
+    db = SessionLocal()
+    try:
+        counts = []
+        for extra in (0, 30):
+            me = _make_graph(db, extra_mutual_candidates=extra)["me"]
+            specialty = me.specialty  # Load the row before counting
+            with _count_queries() as statements:
+                suggestions = compute_follow_suggestions(me, db, limit=50)
+            assert len(suggestions) == 5 + extra and specialty
+            counts.append(len(statements))
+        assert counts[0] == counts[1] == 3, counts
+    finally:
+        db.close()
+
+
+def test_precomputed_suggestions_keep_rank_and_skip_new_follows():
+    """The nightly table serves the same order, minus users followed since the run."""
+    precomputed = settings.follow_suggestions_precomputed
+    settings.follow_suggestions_precomputed = True
+    db = SessionLocal()
+    try:
+        users = _make_graph(db)
+        expected = [candidate.id for candidate, _, _ in compute_follow_suggestions(users["me"], db, limit=10)]
+        refresh_follow_suggestions(db, per_user=10)
+        assert [user.id for user in get_follow_suggestions(users["me"], db, limit=10)] == expected
+
+        db.add(Follow(follower_id=users["me"].id, following_id=users["recent"].id))
+        db.commit()
+        served = [user.id for user in get_follow_suggestions(users["me"], db, limit=10)]
+        assert served == [user_id for user_id in expected if user_id != users["recent"].id]
+    finally:
+        settings.follow_suggestions_precomputed = precomputed
+        db.close()
+
+
+if __name__ == "__main__":
+    test_ranking_combines_mutuals_shared_fields_and_recency()
+    test_query_count_does_not_grow_with_candidates()
+    test_precomputed_suggestions_keep_rank_and_skip_new_follows()
+    print("✅ Follow suggestion tests passed")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for the #hashtag completion index and its periodic reload.
+
+Runs against a throwaway SQLite database unless TEST_DATABASE_URL is set.
+Run this from the backend directory:
+
+    python test_hashtag_index.py    (or: python -m pytest test_hashtag_index.py)
+"""
+
+import os
+import tempfile
+import time
+
+# Point the app at the test database before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_hashtag_index.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from app.config.database import SessionLocal, engine, Base
+from app.models.post import Post
+from app.models.user import User, UserType
+from app.models.notification import Notification  # noqa: F401 (registers User.notifications)
+from app.services import autocomplete_service
+from app.services.autocomplete_service import hashtag_index, load_hashtag_index, refresh_hashtag_index
+
+
+def _wait_for_reload(timeout: float = 10):
+    """Block until the background reload thread has finished."""
+    deadline = time.monotonic() + timeout
+    while autocomplete_service._reloading and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not autocomplete_service._reloading
+
+
+def test_periodic_reload_picks_up_other_workers_posts():
+    """Hashtags of posts written by another worker show up once the reload is due."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        run_id = os.urandom(3).hex()
+        author = User(username=f"ht_{run_id}", email=f"ht_{run_id}@test.local", password_hash="x",
+                      user_type=UserType.DOCTOR, full_name="Dr. Hashtag")
+        db.add(author)
+        db.commit()
+        db.add(Post(user_id=author.id, content="a", hashtags=[f"#Old{run_id}"]))
+        db.commit()
+        load_hashtag_index(db)
+        assert [c["term"] for c in hashtag_index.complete(f"old{run_id}")] == [f"old{run_id}"]
+
+        # Another worker's post: not counted here until the reload
+        db.add_all(Post(user_id=author.id, content="b", hashtags=[f"#new{run_id}", f"#old{run_id}"])
+                   for _ in range(2))
+        db.commit()
+        refresh_hashtag_index()
+        _wait_for_reload()
+        assert hashtag_index.complete(f"new{run_id}") == []
+
+        autocomplete_service._next_reload = 0.0
+        refresh_hashtag_index()
+        _wait_for_reload()
+        assert [(c["term"], c["weight"]) for c in hashtag_index.complete(f"new{run_id}")] == [(f"new{run_id}", 2)]
+        assert hashtag_index.complete(f"old{run_id}")[0]["weight"] == 3
+        assert autocomplete_service._next_reload > time.monotonic()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    test_periodic_reload_picks_up_other_workers_posts()
+    print("✅ Hashtag index tests passed")
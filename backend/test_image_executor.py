@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded image executor (admission queue, 503 backpressure, stats).
+
+Run this from the backend directory:
+
+    python test_image_executor.py    (or: python -m pytest test_image_executor.py)
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+# Point the app at a test database before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_image_executor.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from fastapi import HTTPException
+
+from app.services.image_executor import ImageExecutor
+
+
+def _blocking_job(release: threading.Event, value):
+    """Thread-mode job that holds its slot until released."""
+    assert release.wait(10)
+    return value
+
+
+def _failing_job():
+    raise ValueError("corrupt image")
+
+
+def test_full_queue_answers_503_with_retry_after():
+    """With every worker and queue slot taken, the next job waits queue_timeout and gets a 503."""
+    executor = ImageExecutor(max_workers=0, max_queue=1, queue_timeout=0.2)
+    release = threading.Event()
+
+    async def scenario():
+        held = [asyncio.create_task(executor.run(_blocking_job, release, i)) for i in range(2)]
+        await asyncio.sleep(0.05)
+        assert executor.stats()["in_flight"] == 2
+
+        started = time.monotonic()
+        try:
+            await executor.run(_blocking_job, release, "rejected")
+            raise AssertionError("expected a 503")
+        except HTTPException as e:
+            assert e.status_code == 503
+            assert e.headers["Retry-After"] == "1"
+        assert time.monotonic() - started >= 0.2
+        assert executor.stats()["rejected"] == 1
+
+        release.set()
+        return await asyncio.gather(*held)
+
+    assert asyncio.run(scenario()) == [0, 1]
+    stats = executor.stats()
+    assert (stats["jobs"], stats["in_flight"], stats["queue_depth"]) == (2, 0, 0)
+
+
+def test_queued_job_admitted_when_a_slot_frees():
+    """A job waiting in the queue runs as soon as a slot is released, within the timeout."""
+    executor = ImageExecutor(max_workers=0, max_queue=0, queue_timeout=5)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.create_task(executor.run(_blocking_job, release, "first"))
+        await asyncio.sleep(0.05)
+        second = asyncio.create_task(executor.run(_blocking_job, release, "second"))
+        await asyncio.sleep(0.05)
+        assert executor.stats()["queue_depth"] == 1
+        release.set()
+        return await first, await second
+
+    assert asyncio.run(scenario()) == ("first", "second")
+    assert executor.rejected == 0 and executor.jobs == 2
+
+
+def test_failures_release_their_slot():
+    """A failing job is counted and does not leak its slot."""
+    executor = ImageExecutor(max_workers=0, max_queue=0, queue_timeout=0.5)
+
+    async def scenario():
+        for _ in range(3):
+            try:
+                await executor.run(_failing_job)
+                raise AssertionError("expected ValueError")
+            except ValueError:
+                pass
+        return await executor.run(pow, 2, 10)
+
+    assert asyncio.run(scenario()) == 1024
+    stats = executor.stats()
+    assert (stats["failures"], stats["jobs"], stats["rejected"], stats["in_flight"]) == (3, 1, 0, 0)
+
+
+def test_process_pool_keeps_event_loop_responsive():
+    """Pool jobs run in worker processes: the loop keeps ticking and a full pool answers 503."""
+    executor = ImageExecutor(max_workers=1, max_queue=0, queue_timeout=0.1)
+
+    async def scenario():
+        assert await executor.run(pow, 3, 4) == 81  # Starts the pool (spawn)
+
+        job = asyncio.create_task(executor.run(time.sleep, 0.5))
+        ticks = 0
+        deadline = time.monotonic() + 0.3
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        try:
+            await executor.run(pow, 2, 2)
+            raise AssertionError("expected a 503")
+        except HTTPException as e:
+            assert e.status_code == 503
+        await job
+        return ticks
+
+    try:
+        assert asyncio.run(scenario()) >= 10
+        stats = executor.stats()
+        assert stats["pool_started"] and stats["jobs"] == 2 and stats["rejected"] == 1
+        assert stats["run_ms_p99"] >= 500
+    finally:
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    test_full_queue_answers_503_with_retry_after()
+    test_queued_job_admitted_when_a_slot_frees()
+    test_failures_release_their_slot()
+    test_process_pool_keeps_event_loop_responsive()
+    print("✅ Image executor tests passed")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for the image rendition pipeline (render_renditions and upload_file).
+
+Runs against a throwaway SQLite database unless TEST_DATABASE_URL is set.
+Run this from the backend directory:
+
+    python test_image_renditions.py    (or: python -m pytest test_image_renditions.py)
+"""
+
+import asyncio
+import io
+import os
+import tempfile
+
+# Point the app at the test database before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_image_renditions.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from fastapi import UploadFile
+from PIL import Image
+from starlette.datastructures import Headers
+
+from app.config.settings import settings
+from app.services.file_service import rendition_storage_keys, upload_file
+from app.services.storage import InMemoryStorageBackend
+
+
+def _image_bytes(fmt: str, size=(640, 480)) -> bytes:
+    """A solid-colour test image encoded as fmt."""
+    output = io.BytesIO()
+    Image.new("RGB", size, (30, 120, 200)).save(output, format=fmt)
+    return output.getvalue()
+
+
+def _upload(filename: str, data: bytes, content_type: str) -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename=filename, headers=Headers({"content-type": content_type}))
+
+
+def test_webp_copy_never_replaces_primary_key():
+    """A .webp upload keeps its primary rendition under its own filename."""
+    outputs = {
+        "main": {"jpg": b"main-jpeg", "webp": b"main-webp"},
+        "thumbnail": {"jpg": b"thumb-jpeg", "webp": b"thumb-webp"}
+    }
+
+    keys = rendition_storage_keys("posts/a.webp", outputs)
+    assert keys["posts/a.webp"] == ("main", "jpg")
+    assert keys["posts/thumb_a.webp"] == ("thumbnail", "jpg")
+
+    keys = rendition_storage_keys("posts/a.jpg", outputs)
+    assert keys == {
+        "posts/a.jpg": ("main", "jpg"),
+        "posts/a.webp": ("main", "webp"),
+        "posts/thumb_a.jpg": ("thumbnail", "jpg"),
+        "posts/thumb_a.webp": ("thumbnail", "webp")
+    }
+
+
+def test_webp_upload_with_webp_renditions_stores_primary():
+    """With WebP renditions on, uploading a .webp stores the JPEG main, not the WebP copy, under its name."""
+    webp_renditions = settings.image_webp_renditions
+    settings.image_webp_renditions = True
+    storage = InMemoryStorageBackend()
+    try:
+        result = asyncio.run(upload_file(
+            _upload("photo.webp", _image_bytes("WEBP"), "image/webp"),
+            folder="posts", should_create_thumbnail=True, storage=storage
+        ))
+        key = storage.key_from_url(result["url"])
+        assert key.endswith(".webp")
+        with Image.open(io.BytesIO(storage.data[key])) as stored:
+            assert stored.format == "JPEG"
+        assert storage.objects[key].content_type == "image/jpeg"
+        assert len(storage.data) == 2  # main and thumbnail, no duplicates
+    finally:
+        settings.image_webp_renditions = webp_renditions
+
+
+if __name__ == "__main__":
+    test_webp_copy_never_replaces_primary_key()
+    test_webp_upload_with_webp_renditions_stores_primary()
+    print("✅ Image rendition tests passed")
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Tests for the on-demand resized image cache (/static/img).
+
+Run this from the backend directory:
+
+    python test_image_resizer.py    (or: python -m pytest test_image_resizer.py)
+"""
+
+import asyncio
+import fcntl
+import io
+import os
+import tempfile
+from pathlib import Path
+
+# Point the app at a test database before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_image_resizer.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from fastapi import HTTPException
+from PIL import Image
+
+from app.config.settings import settings
+from app.services.image_executor import image_executor
+from app.services.image_resizer import SWEEP_LOCK_FILE, ResizedImageCache, snap_to_ladder
+
+LADDER = [64, 128, 256, 400, 640, 800, 1200]
+
+
+def _jpeg(size=(1000, 750)) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", size, (90, 160, 60)).save(output, format="JPEG")
+    return output.getvalue()
+
+
+def _cache(max_bytes: int = 64 * 1024 * 1024, root=None, sweep_seconds: float = 60) -> ResizedImageCache:
+    """A cache (in a temporary directory unless root is given) whose sources are one in-memory JPEG."""
+    cache = ResizedImageCache(root or Path(tempfile.mkdtemp()), max_bytes, sweep_seconds=sweep_seconds)
+    source = _jpeg()
+
+    async def load_source(key):
+        return source
+
+    cache._load_source = load_source
+    return cache
+
+
+def _slow_executor(fail: bool = False):
+    """image_executor.run stand-in that renders inline after a pause, counting calls."""
+    calls = []
+
+    async def run(func, *args, **kwargs):
+        calls.append(args[1:4])
+        await asyncio.sleep(0.05)
+        if fail:
+            raise ValueError("truncated image")
+        return func(*args, **kwargs)
+
+    return run, calls
+
+
+def test_snap_to_ladder():
+    """Requested sizes snap up to the next ladder step and are capped at the largest."""
+    assert snap_to_ladder(None, LADDER) == 0
+    assert snap_to_ladder(0, LADDER) == 0
+    assert snap_to_ladder(1, LADDER) == 64
+    assert snap_to_ladder(64, LADDER) == 64
+    assert snap_to_ladder(65, LADDER) == 128
+    assert snap_to_ladder(333, LADDER) == 400
+    assert snap_to_ladder(5000, LADDER) == 1200
+
+
+def test_concurrent_requests_render_once():
+    """Concurrent requests for sizes on the same ladder step share a single render."""
+    cache = _cache()
+    original, ladder = image_executor.run, settings.image_resize_ladder
+    image_executor.run, calls = _slow_executor()
+    settings.image_resize_ladder = ",".join(str(size) for size in LADDER)
+
+    async def requests():
+        return await asyncio.gather(*(
+            cache.get_variant("posts/photo.jpg", width, None, None) for width in (300, 333, 350, 400) * 5
+        ))
+
+    try:
+        paths = asyncio.run(requests())
+        assert len(set(paths)) == 1
+        assert calls == [(400, 0, "jpg")]
+        assert cache.misses == 1 and cache.joined == 19
+
+        with Image.open(cache.root / paths[0]) as variant:
+            assert variant.size == (400, 300)
+
+        # Later requests are cache hits
+        assert asyncio.run(cache.get_variant("posts/photo.jpg", 390, None, None)) == paths[0]
+        assert cache.hits == 1 and len(calls) == 1
+        assert cache.stats()["in_flight"] == 0
+    finally:
+        image_executor.run = original
+        settings.image_resize_ladder = ladder
+
+
+def test_failed_render_reaches_every_waiter():
+    """A render failure is raised to every joined request and is not cached."""
+    cache = _cache()
+    original = image_executor.run
+    image_executor.run, calls = _slow_executor(fail=True)
+
+    async def requests():
+        return await asyncio.gather(*(
+            cache.get_variant("posts/photo.jpg", 100, None, "webp") for _ in range(4)
+        ), return_exceptions=True)
+
+    try:
+        results = asyncio.run(requests())
+        assert all(isinstance(result, HTTPException) and result.status_code == 422 for result in results)
+        assert len(calls) == 1
+        assert cache.failures == 1
+        assert cache.stats()["in_flight"] == 0 and cache.stats()["entries"] == 0
+    finally:
+        image_executor.run = original
+
+
+def test_cache_stays_within_budget():
+    """Least recently used variants are evicted once the byte budget is exceeded."""
+    cache = _cache(max_bytes=1)
+    original = image_executor.run
+    image_executor.run, _ = _slow_executor()
+    try:
+        first = asyncio.run(cache.get_variant("posts/photo.jpg", 64, None, None))
+        second = asyncio.run(cache.get_variant("posts/photo.jpg", 128, None, None))
+        assert cache.stats()["entries"] == 1
+        assert cache.evictions == 1
+        assert not (cache.root / first).exists()
+        assert (cache.root / second).exists()
+    finally:
+        image_executor.run = original
+
+
+def _directory_bytes(root: Path) -> int:
+    return sum(path.stat().st_size for path in root.rglob("*") if path.is_file() and path.name != SWEEP_LOCK_FILE)
+
+
+def test_workers_share_one_disk_budget():
+    """Two workers on one directory stay within a single budget; the sweep removes the least recently used files."""
+    first = _cache(max_bytes=1600, sweep_seconds=0)
+    second = _cache(max_bytes=1600, root=first.root, sweep_seconds=0)
+    original = image_executor.run
+    image_executor.run, _ = _slow_executor()
+
+    async def scenario():
+        small = await first.get_variant("posts/photo.jpg", 64, None, None)
+        await first.get_variant("posts/photo.jpg", 128, None, None)
+        await second.get_variant("posts/photo.jpg", 256, None, None)
+        await asyncio.sleep(0.05)
+        assert await first.get_variant("posts/photo.jpg", 64, None, None) == small  # Hit: touched
+        await asyncio.sleep(0.05)
+        return small, await second.get_variant("posts/photo.jpg", 400, None, None)
+
+    try:
+        small, large = asyncio.run(scenario())
+    finally:
+        image_executor.run = original
+
+    # Each worker alone is within budget; together they were not until the sweep
+    assert first.stats()["size_mb"] * 1024 * 1024 <= 1600 and second.evictions == 2
+    assert _directory_bytes(first.root) <= 1600
+    remaining = {path.relative_to(first.root).as_posix() for path in first.root.rglob("*.jpg")}
+    assert remaining == {small, large}
+
+
+def test_sweep_skipped_while_another_worker_holds_the_lock():
+    """Only one worker sweeps at a time; the others leave the directory alone."""
+    cache = _cache(max_bytes=1)
+    original = image_executor.run
+    image_executor.run, _ = _slow_executor()
+    try:
+        for width in (64, 128, 256):
+            asyncio.run(cache.get_variant("posts/photo.jpg", width, None, None))
+    finally:
+        image_executor.run = original
+    cache._index.clear()  # Files the local LRU never evicted, as if written by other workers
+    for width in (64, 128):
+        path = cache.root / cache.variant_path("posts/photo.jpg", width, 0, "jpg")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * 100)
+
+    with open(cache.root / SWEEP_LOCK_FILE, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        assert cache._sweep() == []
+        assert len(list(cache.root.rglob("*.jpg"))) == 3
+    assert len(cache._sweep()) == 2
+    assert len(list(cache.root.rglob("*.jpg"))) == 1
+
+
+if __name__ == "__main__":
+    test_snap_to_ladder()
+    test_concurrent_requests_render_once()
+    test_failed_render_reaches_every_waiter()
+    test_cache_stays_within_budget()
+    test_workers_share_one_disk_budget()
+    test_sweep_skipped_while_another_worker_holds_the_lock()
+    print("✅ Image resizer tests passed")
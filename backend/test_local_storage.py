@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for the local storage backend: hashed fan-out, legacy flat paths and listing.
+
+Run this from the backend directory:
+
+    python test_local_storage.py    (or: python -m pytest test_local_storage.py)
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+# Point the app at a test database before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_local_storage.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from app.services import storage as storage_module
+from app.services.storage import LocalStorageBackend
+
+
+def _backend(fanout_levels: int = 2) -> LocalStorageBackend:
+    return LocalStorageBackend(tempfile.mkdtemp(), "/static", fanout_levels=fanout_levels)
+
+
+def _fanned(name: str) -> str:
+    digest = hashlib.md5(name.encode()).hexdigest()
+    return f"{digest[:2]}/{digest[2:4]}/{name}"
+
+
+def test_new_files_are_fanned_out_and_round_trip():
+    """put writes under hashed subdirectories; URLs and keys map back to the logical key."""
+    storage = _backend()
+
+    async def scenario():
+        url = await storage.put("posts/photo.jpg", b"jpeg")
+        stored = await storage.stat("posts/photo.jpg")
+        return url, stored, await storage.get("posts/photo.jpg")
+
+    url, stored, data = asyncio.run(scenario())
+    assert (storage.root / "posts" / _fanned("photo.jpg")).read_bytes() == b"jpeg"
+    assert not (storage.root / "posts" / "photo.jpg").exists()
+    assert url == f"/static/posts/{_fanned('photo.jpg')}" == stored.url
+    assert (stored.key, stored.size, data) == ("posts/photo.jpg", 4, b"jpeg")
+    assert storage.key_from_url(url) == "posts/photo.jpg"
+    assert storage.path("posts/photo.jpg") == storage.root / "posts" / _fanned("photo.jpg")
+
+
+def test_legacy_flat_files_are_still_found():
+    """Files written before fan-out are read, stat'ed and deleted at their flat path."""
+    storage = _backend()
+    flat = storage.root / "avatars" / "old.png"
+    flat.parent.mkdir(parents=True)
+    flat.write_bytes(b"png!")
+
+    async def scenario():
+        return (await storage.get("avatars/old.png"), await storage.stat("avatars/old.png"),
+                await storage.delete("avatars/old.png"), await storage.delete("avatars/old.png"))
+
+    data, stored, deleted, deleted_again = asyncio.run(scenario())
+    assert data == b"png!"
+    assert stored.url == "/static/avatars/old.png"
+    assert storage.key_from_url("/static/avatars/old.png") == "avatars/old.png"
+    assert (deleted, deleted_again) == (True, False)
+    assert not flat.exists()
+
+
+def test_key_of_strips_only_matching_fanout_dirs():
+    """Only directories equal to the name's own hash prefix are removed from a path."""
+    storage = _backend()
+    assert storage._key_of(f"posts/{_fanned('a.jpg')}") == "posts/a.jpg"
+    assert storage._key_of(_fanned("root.txt")) == "root.txt"  # No folder
+    assert storage._key_of("posts/2024/01/a.jpg") == "posts/2024/01/a.jpg"  # Real subfolders
+    other_dirs = _fanned("b.jpg").rsplit("/", 1)[0]
+    assert storage._key_of(f"posts/{other_dirs}/a.jpg") == f"posts/{other_dirs}/a.jpg"  # Another name's hash
+    assert storage._key_of("posts/a.jpg") == "posts/a.jpg"
+
+    flat = _backend(fanout_levels=0)
+    assert flat._relative_path("posts/a.jpg") == "posts/a.jpg"
+    assert flat._key_of(f"posts/{_fanned('a.jpg')}") == f"posts/{_fanned('a.jpg')}"
+
+
+def test_list_pages_cover_fanned_and_flat_files():
+    """list yields full pages of logical keys, across fan-out and legacy files, within a prefix."""
+    storage = _backend()
+    original_page_size = storage_module.LIST_PAGE_SIZE
+    storage_module.LIST_PAGE_SIZE = 7
+    expected = {f"posts/{i}.jpg" for i in range(20)} | {"posts/legacy.jpg"}
+    try:
+        async def scenario():
+            for key in sorted(expected - {"posts/legacy.jpg"}):
+                await storage.put(key, b"x")
+            await storage.put("avatars/me.png", b"x")
+            legacy = storage.root / "posts" / "legacy.jpg"
+            legacy.write_bytes(b"x")
+            return ([page async for page in storage.list("posts/")],
+                    [page async for page in storage.list()])
+
+        posts_pages, all_pages = asyncio.run(scenario())
+    finally:
+        storage_module.LIST_PAGE_SIZE = original_page_size
+
+    assert [len(page) for page in posts_pages] == [7, 7, 7]
+    assert {stored.key for page in posts_pages for stored in page} == expected
+    assert all(Path(stored.url).name == stored.key.rsplit("/", 1)[-1] for page in posts_pages for stored in page)
+    assert {stored.key for page in all_pages for stored in page} == expected | {"avatars/me.png"}
+    assert sum(len(page) for page in all_pages) == 22
+
+
+if __name__ == "__main__":
+    test_new_files_are_fanned_out_and_round_trip()
+    test_legacy_flat_files_are_still_found()
+    test_key_of_strips_only_matching_fanout_dirs()
+    test_list_pages_cover_fanned_and_flat_files()
+    print("✅ Local storage tests passed")
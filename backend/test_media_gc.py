@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Tests for the orphaned media collector (collect_orphaned_media).
+
+Runs against a throwaway SQLite database unless TEST_DATABASE_URL is set.
+Run this from the backend directory:
+
+    python test_media_gc.py    (or: python -m pytest test_media_gc.py)
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+# Point the app at the test database before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_media_gc.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from app.config.database import SessionLocal, engine, Base
+from app.models.user import User, UserType
+from app.models.post import Post
+from app.models.media import MediaObject
+from app.models.notification import Notification  # noqa: F401 (registers User.notifications)
+from app.services import media_store
+from app.services.media_gc import collect_orphaned_media
+from app.services.storage import InMemoryStorageBackend, StoredObject
+
+OLD = time.time() - 7 * 24 * 3600
+
+
+def _store(storage: InMemoryStorageBackend, key: str):
+    """An object last written a week ago."""
+    storage.data[key] = b"x"
+    storage.objects[key] = StoredObject(key, 1, OLD, storage.url(key))
+
+
+def _post_with_media(db, media_urls):
+    Base.metadata.create_all(bind=engine)
+    run_id = os.urandom(4).hex()
+    author = User(username=f"gc_{run_id}", email=f"gc_{run_id}@test.local", password_hash="x",
+                  user_type=UserType.DOCTOR, full_name="Dr. Author")
+    db.add(author)
+    db.commit()
+    db.add(Post(user_id=author.id, content="Case", media_urls=media_urls))
+    db.commit()
+
+
+def _old_media_object(db, storage: InMemoryStorageBackend, key: str) -> MediaObject:
+    """A media_objects row for key whose references last changed a week ago."""
+    content_hash = os.urandom(32).hex()
+    media = media_store.register_media_object(
+        db, storage.name, "posts", content_hash, key=key, url=storage.url(key), size=1, original_size=1
+    )
+    db.query(MediaObject).filter(MediaObject.id == media.id).update(
+        {MediaObject.updated_at: datetime.now(timezone.utc) - timedelta(days=7)}, synchronize_session=False
+    )
+    db.commit()
+    return media
+
+
+def test_urls_on_other_hosts_keep_their_files():
+    """CDN, old S3 endpoint and path-style URLs protect the file named by their path."""
+    storage = InMemoryStorageBackend()
+    run_id = os.urandom(4).hex()
+    keys = {name: f"posts/{name}_{run_id}.jpg" for name in ("cdn", "s3", "bucket", "orphan")}
+    for key in keys.values():
+        _store(storage, key)
+        _store(storage, f"posts/thumb_{key.split('/')[-1]}")
+
+    db = SessionLocal()
+    try:
+        _post_with_media(db, [
+            f"https://cdn.example.com/{keys['cdn']}",
+            f"https://iap.s3.us-east-1.amazonaws.com/{keys['s3']}",
+            f"https://s3.amazonaws.com/iap-media/{keys['bucket']}",
+            "https://lh3.googleusercontent.com/a/avatar",
+        ])
+        result = asyncio.run(collect_orphaned_media(db, storage, grace_hours=24))
+    finally:
+        db.close()
+
+    for name in ("cdn", "s3", "bucket"):
+        assert keys[name] in storage.objects, name
+        assert f"posts/thumb_{keys[name].split('/')[-1]}" in storage.objects, name
+    assert keys["orphan"] not in storage.objects
+    assert result["files_deleted"] >= 2
+
+
+def test_duplicate_upload_during_collection_keeps_files():
+    """Files reused by a duplicate upload after the scan started are neither deleted nor forgotten."""
+    storage = InMemoryStorageBackend()
+    run_id = os.urandom(4).hex()
+    reused_key, stale_key = f"posts/reused_{run_id}.jpg", f"posts/stale_{run_id}.jpg"
+    for key in (reused_key, stale_key):
+        _store(storage, key)
+
+    db, other = SessionLocal(), SessionLocal()
+    try:
+        Base.metadata.create_all(bind=engine)
+        reused = _old_media_object(db, storage, reused_key)
+        _old_media_object(db, storage, stale_key)
+
+        # The duplicate upload lands while the folder is being listed
+        list_objects = storage.list
+
+        async def list_then_reuse(prefix: str = ""):
+            async for page in list_objects(prefix):
+                if prefix == "posts/":
+                    assert media_store.acquire_media_object(other, other.get(MediaObject, reused.id))
+                yield page
+
+        storage.list = list_then_reuse
+        result = asyncio.run(collect_orphaned_media(db, storage, grace_hours=24))
+
+        assert reused_key in storage.objects
+        assert stale_key not in storage.objects
+        assert db.query(MediaObject).filter(MediaObject.key == reused_key).one().ref_count == 2
+        assert db.query(MediaObject).filter(MediaObject.key == stale_key).count() == 0
+        assert result["files_too_recent"] >= 1
+
+        # The next collection still sees the reuse as recent
+        storage.list = list_objects
+        asyncio.run(collect_orphaned_media(db, storage, grace_hours=24))
+        assert reused_key in storage.objects
+    finally:
+        other.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    test_urls_on_other_hosts_keep_their_files()
+    test_duplicate_upload_during_collection_keeps_files()
+    print("✅ Media GC tests passed")
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Tests for the media index (media_files): storage stats, file info and the backfill.
+
+Runs against a throwaway SQLite database unless TEST_DATABASE_URL is set.
+Run this from the backend directory:
+
+    python test_media_index.py    (or: python -m pytest test_media_index.py)
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+# Point the app at the test database before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_media_index.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from PIL import Image
+from sqlalchemy import event
+
+from app.config.database import SessionLocal, engine, Base
+from app.models.media import MediaFile
+from app.models.user import User, UserType
+from app.models.notification import Notification  # noqa: F401 (registers User.notifications)
+from app.services import media_index
+from app.services.file_service import get_file_info
+from app.services.media_index import (
+    backfill_local_media, backfill_remote_media, media_file_row, media_stats, record_media_files
+)
+from app.services.storage import InMemoryStorageBackend, LocalStorageBackend
+
+
+@contextmanager
+def _count_queries():
+    """Count the SQL statements executed inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _jpeg(size=(320, 240)) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", size, (30, 90, 150)).save(output, format="JPEG")
+    return output.getvalue()
+
+
+def test_media_stats_are_three_aggregate_queries():
+    """Totals, per-extension counts and recent uploads come from the index, filtered by storage."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        storage = f"t{os.urandom(3).hex()}"
+        old = datetime.now(timezone.utc) - timedelta(days=3)
+        record_media_files(db, [
+            media_file_row(storage, "posts/a.jpg", "/static/posts/a.jpg", 1000, rendition="main"),
+            media_file_row(storage, "posts/thumb_a.jpg", "/static/posts/thumb_a.jpg", 100, rendition="thumbnail"),
+            media_file_row(storage, "documents/cv.pdf", "/static/documents/cv.pdf", 5000),
+            media_file_row(storage, "posts/old.png", "/static/posts/old.png", 400, created_at=old),
+        ])
+        record_media_files(db, [media_file_row("s3", f"posts/{storage}.jpg", "https://cdn/x.jpg", 7)])
+
+        with _count_queries() as statements:
+            stats = media_stats(db, storage=storage)
+        assert len(statements) == 3, statements
+        assert stats == {
+            'total_files': 4,
+            'total_size': 6500,
+            'files_by_type': {'jpg': 2, 'pdf': 1, 'png': 1},
+            'recent_uploads': 3
+        }
+
+        everything = media_stats(db)
+        assert everything['total_files'] == db.query(MediaFile).count()
+        assert everything['total_size'] >= 6507
+
+        empty = media_stats(db, storage="none")
+        assert (empty['total_files'], empty['total_size'], empty['files_by_type']) == (0, 0, {})
+    finally:
+        db.close()
+
+
+def test_get_file_info_reads_the_index_before_storage():
+    """Indexed files are one primary-key lookup and never reach storage; others fall back to stat."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    storage = InMemoryStorageBackend()
+    stat_calls = []
+    stat = storage.stat
+
+    async def counting_stat(key):
+        stat_calls.append(key)
+        return await stat(key)
+
+    storage.stat = counting_stat
+    try:
+        key = f"posts/{os.urandom(4).hex()}.jpg"
+        record_media_files(db, [media_file_row(
+            storage.name, key, storage.url(key), 3 * 1024 * 1024, rendition="main", width=640, height=480
+        )])
+        db.expire_all()
+
+        with _count_queries() as statements:
+            info = asyncio.run(get_file_info(storage.url(key), storage=storage, db=db))
+        assert len(statements) == 1, statements
+        assert stat_calls == []
+        assert info['exists'] and info['is_image']
+        assert (info['filename'], info['size_mb'], info['width'], info['height']) == (key[6:], 3.0, 640, 480)
+        assert (info['extension'], info['mime_type'], info['url']) == ("jpg", "image/jpeg", storage.url(key))
+
+        # Not indexed: storage is asked, and answers for files it has
+        asyncio.run(storage.put("documents/notes.txt", b"hello", "text/plain"))
+        info = asyncio.run(get_file_info("documents/notes.txt", storage=storage, db=db))
+        assert info['exists'] and info['size'] == 5 and not info['is_image']
+        assert asyncio.run(get_file_info("documents/missing.txt", storage=storage, db=db)) == {'exists': False}
+        assert stat_calls == ["documents/notes.txt", "documents/missing.txt"]
+    finally:
+        db.close()
+
+
+def test_backfill_local_media_indexes_each_file_once():
+    """The backfill indexes fanned-out and legacy files with dimensions, hashes and owners, in batches."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    storage = LocalStorageBackend(tempfile.mkdtemp(), "/static")
+    original_batch_size = media_index.BACKFILL_BATCH_SIZE
+    try:
+        photo = _jpeg()
+        avatar_url = asyncio.run(storage.put("avatars/me.jpg", _jpeg((64, 64))))
+        asyncio.run(storage.put("posts/photo.jpg", photo))
+        asyncio.run(storage.put("posts/thumb_photo.jpg", _jpeg((150, 150))))
+        asyncio.run(storage.put("documents/cv.pdf", b"%PDF-1.4"))
+        legacy = storage.root / "posts" / "legacy.png"
+        Image.new("RGB", (10, 20)).save(legacy, format="PNG")
+        for skipped in ("temp/spool.tmp", "thumbnails/aa/bb.jpg", "incoming/upload.jpg"):
+            (storage.root / skipped).parent.mkdir(parents=True, exist_ok=True)
+            (storage.root / skipped).write_bytes(b"skip")
+
+        run_id = os.urandom(4).hex()
+        owner = User(username=f"mi_{run_id}", email=f"mi_{run_id}@test.local", password_hash="x",
+                     user_type=UserType.DOCTOR, full_name="Dr. Media", profile_picture_url=avatar_url)
+        db.add(owner)
+        db.commit()
+
+        # Already indexed by the upload pipeline: left as it is
+        record_media_files(db, [media_file_row(storage.name, "documents/cv.pdf", "/static/documents/cv.pdf", 1)])
+
+        media_index.BACKFILL_BATCH_SIZE = 2
+        with _count_queries() as statements:
+            result = backfill_local_media(db, storage, workers=4)
+        assert (result['files_scanned'], result['files_indexed']) == (5, 4)
+        inserts = [s for s in statements if s.lstrip().upper().startswith("INSERT INTO MEDIA_FILES")]
+        assert 2 <= len(inserts) <= 3, inserts  # One statement per batch of two
+
+        rows = {row.key: row for row in db.query(MediaFile).filter(MediaFile.storage == storage.name)}
+        main = rows["posts/photo.jpg"]
+        assert (main.width, main.height, main.rendition) == (320, 240, "main")
+        assert main.file_hash == hashlib.sha256(photo).hexdigest()
+        assert main.url == asyncio.run(storage.stat("posts/photo.jpg")).url
+        assert rows["posts/thumb_photo.jpg"].rendition == "thumbnail"
+        assert (rows["posts/legacy.png"].width, rows["posts/legacy.png"].url) == (10, "/static/posts/legacy.png")
+        assert rows["avatars/me.jpg"].owner_id == owner.id
+        assert rows["documents/cv.pdf"].size == 1
+        assert not any(key.split("/", 1)[0] in media_index.BACKFILL_SKIP_FOLDERS for key in rows)
+
+        # Re-running finds everything indexed
+        again = backfill_local_media(db, storage, workers=4)
+        assert (again['files_scanned'], again['files_indexed']) == (5, 0)
+    finally:
+        media_index.BACKFILL_BATCH_SIZE = original_batch_size
+        db.close()
+
+
+def test_backfill_remote_media_uses_the_listing_only():
+    """Remote objects are indexed from their listing pages, without downloading any of them."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    storage = InMemoryStorageBackend()
+    run_id = os.urandom(4).hex()
+    keys = [f"posts/{run_id}_{i}.jpg" for i in range(5)] + [f"incoming/{run_id}.jpg"]
+    for key in keys:
+        asyncio.run(storage.put(key, b"x" * 10, "image/jpeg"))
+
+    async def no_downloads(key):
+        raise AssertionError(f"downloaded {key}")
+
+    storage.get = no_downloads
+    try:
+        result = asyncio.run(backfill_remote_media(db, storage))
+        assert (result['files_scanned'], result['files_indexed']) == (5, 5)
+        rows = db.query(MediaFile).filter(MediaFile.storage == storage.name, MediaFile.key.in_(keys)).all()
+        assert sorted(row.key for row in rows) == sorted(keys[:5])
+        assert all(row.size == 10 and row.width is None and row.file_hash is None for row in rows)
+        assert all(row.content_type == "image/jpeg" and row.rendition == "main" for row in rows)
+
+        assert asyncio.run(backfill_remote_media(db, storage))['files_indexed'] == 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    test_media_stats_are_three_aggregate_queries()
+    test_get_file_info_reads_the_index_before_storage()
+    test_backfill_local_media_indexes_each_file_once()
+    test_backfill_remote_media_uses_the_listing_only()
+    print("✅ Media index tests passed")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed media store (media_objects reference counts).
+
+Runs against a throwaway SQLite database unless TEST_DATABASE_URL is set.
+Run this from the backend directory:
+
+    python test_media_store.py    (or: python -m pytest test_media_store.py)
+"""
+
+import os
+import tempfile
+
+# Point the app at the test database before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_media_store.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from app.config.database import SessionLocal, engine, Base
+from app.models.media import MediaObject
+from app.models.notification import Notification  # noqa: F401 (registers User.notifications)
+from app.services import media_store
+
+
+def _fields(content_hash: str) -> dict:
+    key = media_store.content_filename("posts", content_hash, "jpg")
+    return {"key": key, "url": f"/static/{key}", "size": 10, "original_size": 20}
+
+
+def test_register_existing_takes_reference():
+    """Registering bytes that are already stored adds a reference to the existing row."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        content_hash = os.urandom(32).hex()
+        first = media_store.register_media_object(db, "local", "posts", content_hash, **_fields(content_hash))
+        second = media_store.register_media_object(
+            db, "local", "posts", content_hash, thumbnail_url="/static/thumb.jpg", **_fields(content_hash)
+        )
+        assert second.id == first.id
+        assert second.ref_count == 2
+        assert second.thumbnail_url == "/static/thumb.jpg"
+    finally:
+        db.close()
+
+
+def test_register_retries_when_conflicting_row_is_released():
+    """If the row that blocked the insert is released before the lookup, the insert is retried."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    other = SessionLocal()
+    original_find = media_store.find_media_object
+    lookups = []
+
+    def find_after_release(session, storage, folder, content_hash):
+        # Another request drops the last reference right after our insert failed
+        if not lookups:
+            media_store.release_media_object(other, storage, _fields(content_hash)["key"])
+        lookups.append(content_hash)
+        return original_find(session, storage, folder, content_hash)
+
+    try:
+        content_hash = os.urandom(32).hex()
+        media_store.register_media_object(other, "local", "posts", content_hash, **_fields(content_hash))
+
+        media_store.find_media_object = find_after_release
+        media = media_store.register_media_object(db, "local", "posts", content_hash, **_fields(content_hash))
+
+        assert media.ref_count == 1
+        assert lookups == [content_hash]
+        assert db.query(MediaObject).filter(MediaObject.content_hash == content_hash).count() == 1
+    finally:
+        media_store.find_media_object = original_find
+        other.close()
+        db.close()
+
+
+def test_adopt_leaves_existing_row_alone():
+    """A direct upload of bytes already stored gets no row, and the stored row keeps its key."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        content_hash = os.urandom(32).hex()
+        adopted = media_store.adopt_media_object(
+            db, "s3", "posts", content_hash, key=f"posts/{content_hash[:8]}.jpg", url="/a.jpg", size=10
+        )
+        assert adopted.ref_count == 1 and adopted.key == f"posts/{content_hash[:8]}.jpg"
+
+        assert media_store.adopt_media_object(
+            db, "s3", "posts", content_hash, key="posts/other.jpg", url="/b.jpg", size=10
+        ) is None
+        db.refresh(adopted)
+        assert (adopted.key, adopted.ref_count) == (f"posts/{content_hash[:8]}.jpg", 1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    test_register_existing_takes_reference()
+    test_register_retries_when_conflicting_row_is_released()
+    test_adopt_leaves_existing_row_alone()
+    print("✅ Media store tests passed")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for notification stats and admin analytics (grouped aggregate and daily rollup).
+
+Runs against a throwaway SQLite database unless TEST_DATABASE_URL is set.
+Run this from the backend directory:
+
+    python test_notification_analytics.py    (or: python -m pytest test_notification_analytics.py)
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# Point the app at the test database before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_notification_analytics.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from sqlalchemy import event
+
+from app.config.database import SessionLocal, engine, Base
+from app.config.settings import settings
+from app.models.user import User, UserType
+from app.models.notification import Notification, NotificationDailyStat, NotificationType
+from app.services.notification_service import NotificationService
+
+
+def _make_history(db):
+    """A recipient with notifications spread over the last week (two of them read)."""
+    Base.metadata.create_all(bind=engine)
+    run_id = os.urandom(4).hex()
+    recipient = User(username=f"na_{run_id}", email=f"na_{run_id}@test.local", password_hash="x",
+                     user_type=UserType.DOCTOR, full_name="Dr. Recipient")
+    db.add(recipient)
+    db.commit()
+
+    today_noon = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    history = [
+        (5, NotificationType.LIKE, True),
+        (4, NotificationType.LIKE, False),
+        (4, NotificationType.COMMENT, True),
+        (1, NotificationType.FOLLOW, False),
+        (0, NotificationType.LIKE, False),
+    ]
+    for days_ago, notification_type, is_read in history:
+        db.add(Notification(
+            recipient_id=recipient.id, type=notification_type, title="t", message="m", is_read=is_read,
+            created_at=today_noon - timedelta(days=days_ago)
+        ))
+    db.commit()
+    return recipient
+
+
+@contextmanager
+def _count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _totals(analytics: dict) -> tuple:
+    return analytics["total_sent"], analytics["total_read"], analytics["type_breakdown"]
+
+
+def test_stats_come_from_one_grouped_query():
+    """Per-type, read and unread figures are folded from a single GROUP BY statement."""
+    db = SessionLocal()
+    try:
+        recipient_id = _make_history(db).id
+        with _count_queries() as statements:
+            stats = NotificationService.get_notification_stats(db, recipient_id)
+        assert len(statements) == 1
+        assert stats["total_notifications"] == 5
+        assert stats["unread_count"] == 3
+        assert stats["type_counts"]["like"] == 3
+        assert stats["type_counts"]["comment"] == 1
+        assert stats["read_rate"] == 0.4
+    finally:
+        db.close()
+
+
+def test_partial_rollup_matches_live_analytics():
+    """Days the rollup never covered are aggregated live instead of counting as zero."""
+    enabled = settings.notification_rollup_enabled
+    db = SessionLocal()
+    try:
+        _make_history(db)
+        db.query(NotificationDailyStat).delete()
+        db.commit()
+
+        settings.notification_rollup_enabled = False
+        live = _totals(NotificationService.get_notification_analytics(db, days=7))
+
+        settings.notification_rollup_enabled = True
+        assert _totals(NotificationService.get_notification_analytics(db, days=7)) == live
+
+        NotificationService.refresh_daily_rollup(db, days=2)
+        assert db.query(NotificationDailyStat).count() > 0
+        assert _totals(NotificationService.get_notification_analytics(db, days=7)) == live
+
+        NotificationService.refresh_daily_rollup(db, days=7)
+        assert _totals(NotificationService.get_notification_analytics(db, days=7)) == live
+    finally:
+        settings.notification_rollup_enabled = enabled
+        db.close()
+
+
+def test_rollup_refresh_errors_reach_the_caller():
+    """A failed refresh is rolled back and raised, not reported as 0 rows written."""
+    db = SessionLocal()
+    try:
+        Base.metadata.create_all(bind=engine)
+
+        def failing_execute(*args, **kwargs):
+            raise RuntimeError("statement timeout")
+
+        db.execute = failing_execute
+        try:
+            NotificationService.refresh_daily_rollup(db, days=2)
+            raise AssertionError("expected the error to be raised")
+        except RuntimeError as e:
+            assert str(e) == "statement timeout"
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    test_stats_come_from_one_grouped_query()
+    test_partial_rollup_matches_live_analytics()
+    test_rollup_refresh_errors_reach_the_caller()
+    print("✅ Notification analytics tests passed")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Tests for coalesced like/comment notifications ("A and N others liked your post").
+
+Runs against a throwaway SQLite database unless TEST_DATABASE_URL is set.
+Run this from the backend directory:
+
+    python test_notification_coalescing.py    (or: python -m pytest test_notification_coalescing.py)
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# Point the app at the test database before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_notifications.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from app.config.database import SessionLocal, engine, Base
+from app.config.settings import settings
+from app.models.user import User, UserType
+from app.models.post import Post
+from app.models.notification import NotificationType, NotificationGroupActor
+from app.services.notification_service import NotificationService
+
+
+def _setup(db, actor_count: int):
+    """An author with one post and actor_count other users."""
+    Base.metadata.create_all(bind=engine)
+    run_id = os.urandom(4).hex()
+    users = [
+        User(username=f"u_{run_id}_{i}", email=f"u_{run_id}_{i}@test.local", password_hash="x",
+             user_type=UserType.DOCTOR, full_name=f"User {i}")
+        for i in range(actor_count + 1)
+    ]
+    db.add_all(users)
+    db.commit()
+    author, actors = users[0], users[1:]
+    post = Post(user_id=author.id, content="Case discussion")
+    db.add(post)
+    db.commit()
+    return post, actors
+
+
+def _age(db, notification, hours: int):
+    """Backdate a notification's created_at and updated_at."""
+    notification.created_at = notification.updated_at = datetime.utcnow() - timedelta(hours=hours)
+    db.commit()
+
+
+def test_repeat_like_beyond_recent_list_counted_once():
+    """An actor who dropped off the capped recent list is not counted again (like, unlike, like)."""
+    db = SessionLocal()
+    try:
+        limit = settings.notification_recent_actors_limit
+        post, actors = _setup(db, limit + 3)
+        for actor in actors:
+            NotificationService.create_like_notification(db, post, actor)
+
+        assert actors[0].id not in NotificationService.create_like_notification(db, post, actors[-1]).recent_actor_id_list
+        notification = NotificationService.create_like_notification(db, post, actors[0])
+        assert notification.actor_count == len(actors)
+        assert notification.display_message == (
+            f"{actors[-1].full_name} and {len(actors) - 1} others liked your post"
+        )
+
+        rows = db.query(NotificationGroupActor).filter(
+            NotificationGroupActor.recipient_id == post.user_id
+        ).count()
+        assert rows == len(actors)
+    finally:
+        db.close()
+
+
+def test_second_comment_beyond_recent_list_counted_once():
+    """A second comment by an early commenter refreshes the row without inflating the count."""
+    db = SessionLocal()
+    try:
+        limit = settings.notification_recent_actors_limit
+        post, actors = _setup(db, limit + 2)
+
+        def comment(actor):
+            return NotificationService.coalesce_notification(
+                db, post.user_id, actor, NotificationType.COMMENT,
+                "New Comment", "commented on your post", "post", post.id
+            )
+
+        for actor in actors:
+            comment(actor)
+        notification = comment(actors[0])
+        assert notification.actor_count == len(actors)
+        assert notification.sender_id == actors[0].id
+        assert notification.recent_actor_id_list[0] == actors[0].id
+    finally:
+        db.close()
+
+
+def test_new_actor_increments_count():
+    """Each distinct actor adds one to actor_count."""
+    db = SessionLocal()
+    try:
+        post, actors = _setup(db, 3)
+        counts = [NotificationService.create_like_notification(db, post, actor).actor_count for actor in actors]
+        assert counts == [1, 2, 3]
+    finally:
+        db.close()
+
+
+def test_fold_bumps_updated_at_not_created_at():
+    """Coalescing keeps created_at (the partition key) and moves the row up via updated_at."""
+    db = SessionLocal()
+    try:
+        post, actors = _setup(db, 2)
+        other_post = Post(user_id=post.user_id, content="Follow-up case")
+        db.add(other_post)
+        db.commit()
+
+        folded = NotificationService.create_like_notification(db, post, actors[0])
+        _age(db, folded, 2)
+        created_at = folded.created_at
+        _age(db, NotificationService.create_like_notification(db, other_post, actors[0]), 1)
+
+        folded = NotificationService.create_like_notification(db, post, actors[1])
+        assert folded.actor_count == 2
+        assert folded.created_at == created_at
+        assert folded.updated_at > created_at
+
+        notifications, total, _ = NotificationService.get_user_notifications(db, post.user_id)
+        assert total == 2
+        assert notifications[0].id == folded.id
+    finally:
+        db.close()
+
+
+def test_coalesced_display_message_names_actor_once():
+    """The rendered message names the newest actor once, followed by the other actors' count."""
+    db = SessionLocal()
+    try:
+        post, actors = _setup(db, 3)
+        NotificationService.create_like_notification(db, post, actors[0])
+        assert NotificationService.create_like_notification(db, post, actors[0]).display_message == (
+            f"{actors[0].full_name} liked your post"
+        )
+        NotificationService.create_like_notification(db, post, actors[1])
+
+        notifications, _, _ = NotificationService.get_user_notifications(db, post.user_id)
+        assert notifications[0].message == "liked your post"
+        assert notifications[0].display_message == f"{actors[1].full_name} and 1 other liked your post"
+
+        NotificationService.create_like_notification(db, post, actors[2])
+        notifications, _, _ = NotificationService.get_user_notifications(db, post.user_id)
+        assert notifications[0].display_message == f"{actors[2].full_name} and 2 others liked your post"
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    test_repeat_like_beyond_recent_list_counted_once()
+    test_second_comment_beyond_recent_list_counted_once()
+    test_new_actor_increments_count()
+    test_fold_bumps_updated_at_not_created_at()
+    test_coalesced_display_message_names_actor_once()
+    print("✅ Notification coalescing tests passed")
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Tests for hybrid push/pull delivery of new-post notifications.
+
+Runs against a throwaway SQLite database unless TEST_DATABASE_URL is set.
+Run this from the backend directory:
+
+    python test_notification_delivery.py    (or: python -m pytest test_notification_delivery.py)
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# Point the app at the test database before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_notification_delivery.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from app.config.database import SessionLocal, engine, Base
+from app.config.settings import settings
+from app.models.user import User, UserType
+from app.models.post import Post
+from app.models.follow import Follow
+from app.models.notification import AuthorActivity, Notification, NotificationType
+from app.schemas.notification import NotificationFilter
+from app.services.notification_service import NotificationService
+
+THRESHOLD = 3
+
+
+def _users(db, count: int):
+    Base.metadata.create_all(bind=engine)
+    run_id = os.urandom(4).hex()
+    users = [
+        User(username=f"nd_{run_id}_{i}", email=f"nd_{run_id}_{i}@test.local", password_hash="x",
+             user_type=UserType.DOCTOR, full_name=f"Dr. User {i}")
+        for i in range(count)
+    ]
+    db.add_all(users)
+    db.commit()
+    return users
+
+
+def _follow(db, author, followers, since: datetime):
+    db.add_all(Follow(follower_id=follower.id, following_id=author.id, created_at=since) for follower in followers)
+    author.followers_count = len(followers)
+    db.commit()
+
+
+def _publish(db, author, when: datetime):
+    """A post by author, delivered to followers, with its notification rows dated `when`."""
+    post = Post(user_id=author.id, content="New case")
+    db.add(post)
+    db.commit()
+    result = NotificationService.create_new_post_notifications(db, author, post)
+    db.query(AuthorActivity).filter(AuthorActivity.post_id == post.id).update({"created_at": when})
+    db.query(Notification).filter(Notification.type == NotificationType.POST_UPDATE, Notification.sender_id == author.id).filter(
+        Notification.data.contains(f'"post_id": {post.id},')
+    ).update({"created_at": when, "updated_at": when}, synchronize_session=False)
+    db.commit()
+    return result
+
+
+def test_follower_threshold_picks_push_or_pull():
+    """Authors below the threshold get one row per follower; at or above it, one activity row."""
+    threshold = settings.notification_fanout_follower_threshold
+    settings.notification_fanout_follower_threshold = THRESHOLD
+    db = SessionLocal()
+    try:
+        small, large, *readers = _users(db, 2 + THRESHOLD)
+        since = datetime.utcnow() - timedelta(days=1)
+        _follow(db, small, readers[:THRESHOLD - 1], since)
+        _follow(db, large, readers, since)
+
+        assert _publish(db, small, datetime.utcnow()) == {"mode": "push", "rows_written": THRESHOLD - 1}
+        assert db.query(Notification).filter(Notification.sender_id == small.id).count() == THRESHOLD - 1
+
+        assert _publish(db, large, datetime.utcnow()) == {"mode": "pull", "rows_written": 1}
+        assert db.query(Notification).filter(Notification.sender_id == large.id).count() == 0
+        assert db.query(AuthorActivity).filter(AuthorActivity.author_id == large.id).count() == 1
+    finally:
+        settings.notification_fanout_follower_threshold = threshold
+        db.close()
+
+
+def test_pulled_activities_merge_with_stored_rows():
+    """Pulled activities and stored rows come back as one time-ordered list, across pages."""
+    threshold = settings.notification_fanout_follower_threshold
+    settings.notification_fanout_follower_threshold = THRESHOLD
+    db = SessionLocal()
+    try:
+        small, large, *readers = _users(db, 2 + THRESHOLD)
+        reader = readers[0]
+        now = datetime.utcnow()
+        _follow(db, small, [reader], now - timedelta(days=10))
+        _follow(db, large, readers, now - timedelta(days=10))
+
+        # Posted before the reader followed: never shown
+        db.add(AuthorActivity(author_id=large.id, post_id=0, created_at=now - timedelta(days=20)))
+        db.commit()
+        for hours_ago in reversed(range(6)):
+            _publish(db, small if hours_ago % 2 else large, now - timedelta(hours=hours_ago))
+
+        notifications, total, unread = NotificationService.get_user_notifications(db, reader.id, page=1, size=100)
+        assert total == 6 and unread == 6
+        assert [n.sender_id for n in notifications] == [large.id, small.id] * 3
+        assert all((n.id < 0) == (n.sender_id == large.id) for n in notifications)
+        assert all(n.display_message == f"{n.sender.full_name} shared a new post" for n in notifications)
+
+        paged = []
+        for page in (1, 2, 3):
+            items, page_total, _ = NotificationService.get_user_notifications(db, reader.id, page=page, size=2)
+            assert page_total == 6
+            paged.extend(n.id for n in items)
+        assert paged == [n.id for n in notifications]
+    finally:
+        settings.notification_fanout_follower_threshold = threshold
+        db.close()
+
+
+def test_read_marks_and_unread_counts_agree():
+    """Reading pulled entries advances the read mark; the list and badge counts always agree."""
+    threshold = settings.notification_fanout_follower_threshold
+    settings.notification_fanout_follower_threshold = THRESHOLD
+    db = SessionLocal()
+    try:
+        small, large, *readers = _users(db, 2 + THRESHOLD)
+        reader = readers[0]
+        now = datetime.utcnow()
+        _follow(db, small, [reader], now - timedelta(days=1))
+        _follow(db, large, readers, now - timedelta(days=1))
+        for hours_ago in reversed(range(4)):
+            _publish(db, small if hours_ago % 2 else large, now - timedelta(hours=hours_ago))
+
+        filters = [
+            None,
+            NotificationFilter(sender_id=small.id),
+            NotificationFilter(sender_id=large.id),
+            NotificationFilter(type="like"),
+            NotificationFilter(date_from=now - timedelta(minutes=30)),
+        ]
+
+        def assert_counts(expected: int):
+            assert NotificationService.get_unread_count(db, reader.id) == expected
+            for notification_filter in filters:
+                _, _, unread = NotificationService.get_user_notifications(
+                    db, reader.id, notification_filter=notification_filter
+                )
+                assert unread == expected, notification_filter
+
+        assert_counts(4)
+        notifications, _, _ = NotificationService.get_user_notifications(db, reader.id)
+        oldest_pulled = min((n for n in notifications if n.id < 0), key=lambda n: n.created_at)
+        newest_pulled = max((n for n in notifications if n.id < 0), key=lambda n: n.created_at)
+
+        # The read mark is a high-water mark: reading the newest activity covers the older one
+        assert NotificationService.mark_notification_as_read(db, newest_pulled.id, reader.id)
+        assert_counts(2)
+        assert NotificationService.mark_notification_as_read(db, oldest_pulled.id, reader.id)
+        assert_counts(2)
+
+        unread_only, total, _ = NotificationService.get_user_notifications(db, reader.id, unread_only=True)
+        assert total == 2 and all(n.id > 0 for n in unread_only)
+
+        # Another reader's activity cannot be marked
+        assert not NotificationService.mark_notification_as_read(db, -10 ** 9, reader.id)
+
+        assert NotificationService.mark_all_as_read(db, reader.id) == 2
+        assert_counts(0)
+        # Other followers keep their own read marks
+        assert NotificationService.get_unread_count(db, readers[1].id) == 2
+    finally:
+        settings.notification_fanout_follower_threshold = threshold
+        db.close()
+
+
+if __name__ == "__main__":
+    test_follower_threshold_picks_push_or_pull()
+    test_pulled_activities_merge_with_stored_rows()
+    test_read_marks_and_unread_counts_agree()
+    print("✅ Notification delivery tests passed")
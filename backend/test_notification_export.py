@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for the streamed notification export (/notifications/export).
+
+Runs against a throwaway SQLite database unless TEST_DATABASE_URL is set.
+Run this from the backend directory:
+
+    python test_notification_export.py    (or: python -m pytest test_notification_export.py)
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+
+# Point the app at the test database before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_notification_export.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from app.config.database import SessionLocal, engine, Base
+from app.models.user import User, UserType
+from app.models.post import Post
+from app.models.follow import Follow
+from app.models.notification import AuthorActivity, NotificationType
+from app.routers import notifications as notifications_router
+from app.services.notification_service import NotificationService
+
+
+def _setup(db):
+    """A reader who got one stored notification and follows an author with one pulled post."""
+    Base.metadata.create_all(bind=engine)
+    run_id = os.urandom(4).hex()
+    reader, author = [
+        User(username=f"{role}_{run_id}", email=f"{role}_{run_id}@test.local", password_hash="x",
+             user_type=UserType.DOCTOR, full_name=f"Dr. {role.title()}")
+        for role in ("reader", "author")
+    ]
+    db.add_all([reader, author])
+    db.commit()
+    db.add(Follow(follower_id=reader.id, following_id=author.id))
+    db.commit()
+
+    post = Post(user_id=author.id, content="New case")
+    db.add(post)
+    db.commit()
+    db.add(AuthorActivity(author_id=author.id, post_id=post.id))
+    NotificationService.create_notification(
+        db, reader.id, NotificationType.SYSTEM, "Welcome", "Welcome to IAP Connect"
+    )
+    db.commit()
+    return reader, author, post
+
+
+def test_export_includes_pulled_activities():
+    """Pulled new-post activities follow the stored notifications, with negated IDs."""
+    db = SessionLocal()
+    try:
+        reader, author, post = _setup(db)
+        lines = "".join(NotificationService.iter_notification_export(db, reader.id)).splitlines()
+        records = [json.loads(line) for line in lines]
+
+        assert [record["type"] for record in records] == ["system", "post_update"]
+        activity = records[1]
+        assert activity["id"] < 0
+        assert activity["sender_id"] == author.id
+        assert activity["data"]["post_id"] == post.id
+
+        # The activity cursor makes the next export incremental
+        rest = "".join(NotificationService.iter_notification_export(
+            db, reader.id, since_id=records[0]["id"], since_activity_id=-activity["id"]
+        ))
+        assert rest == ""
+
+        csv_rows = "".join(NotificationService.iter_notification_export(db, reader.id, "csv")).splitlines()
+        assert len(csv_rows) == 3
+        assert csv_rows[2].startswith(f"{activity['id']},post_update,")
+    finally:
+        db.close()
+
+
+def test_export_failure_ends_with_error_record():
+    """A failure after the headers are sent ends the body with an error record and is re-raised."""
+    db = SessionLocal()
+    try:
+        reader, _, _ = _setup(db)
+        reader_id = reader.id
+    finally:
+        db.close()
+
+    def failing_export(*args, **kwargs):
+        yield '{"id": 1}\n'
+        raise RuntimeError("connection lost")
+
+    async def consume(response):
+        chunks = []
+        try:
+            async for chunk in response.body_iterator:
+                chunks.append(chunk)
+        except RuntimeError:
+            return chunks, True
+        return chunks, False
+
+    original = NotificationService.iter_notification_export
+    NotificationService.iter_notification_export = staticmethod(failing_export)
+    try:
+        response = notifications_router.export_notifications(
+            format="ndjson", days=None, since=None, since_activity=None, current_user=User(id=reader_id)
+        )
+        chunks, raised = asyncio.run(consume(response))
+        lines = "".join(chunks).splitlines()
+        assert raised
+        assert lines[0] == '{"id": 1}'
+        assert json.loads(lines[-1]) == {"error": "Export failed before completion"}
+    finally:
+        NotificationService.iter_notification_export = original
+
+
+if __name__ == "__main__":
+    test_export_includes_pulled_activities()
+    test_export_failure_ends_with_error_record()
+    print("✅ Notification export tests passed")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Tests for S3 uploads: concurrent multi-image uploads and multipart documents.
+
+Uses moto's in-process S3 mock (pip install moto, dev only); the tests are
+skipped when it is not installed. Run this from the backend directory:
+
+    python test_s3_uploads.py    (or: python -m pytest test_s3_uploads.py)
+"""
+
+import asyncio
+import io
+import os
+import tempfile
+import threading
+import time
+
+# Point the app at a test database and a mocked bucket before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_s3_uploads.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+for name, value in {
+    "AWS_ACCESS_KEY_ID": "test",
+    "AWS_SECRET_ACCESS_KEY": "test",
+    "AWS_S3_BUCKET_NAME": "iap-s3-upload-test",
+    "AWS_S3_REGION": "us-east-1"
+}.items():
+    os.environ[name] = value
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from fastapi import UploadFile
+from PIL import Image
+from starlette.datastructures import Headers
+
+try:
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+MB = 1024 * 1024
+
+
+def _service():
+    """S3Service on an empty mocked bucket (call inside mock_aws)."""
+    client = boto3.client("s3", region_name=os.environ["AWS_S3_REGION"])
+    client.create_bucket(Bucket=os.environ["AWS_S3_BUCKET_NAME"])
+    # Imported here so the module's global service also connects to the mock
+    from app.services.s3_service import S3Service
+    return S3Service()
+
+
+def _upload(filename: str, data: bytes, content_type: str) -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename=filename, size=len(data),
+                      headers=Headers({"content-type": content_type}))
+
+
+def _jpeg(color) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (640, 480), color).save(output, format="JPEG")
+    return output.getvalue()
+
+
+def test_multiple_images_upload_concurrently_off_the_event_loop():
+    """A post's images are put in parallel on the S3 thread pool; failures are reported per file, in order."""
+    if mock_aws is None:
+        print("⚠️ moto not installed, skipping")
+        return
+    with mock_aws():
+        service = _service()
+        put_object = service.s3_client.put_object
+        lock = threading.Lock()
+        active, peak, threads = [0], [0], set()
+
+        def slow_put_object(**kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+                threads.add(threading.current_thread().name)
+            try:
+                time.sleep(0.1)  # Network latency, so overlapping calls are visible
+                return put_object(**kwargs)
+            finally:
+                with lock:
+                    active[0] -= 1
+
+        service.s3_client.put_object = slow_put_object
+        files = [
+            _upload("a.jpg", _jpeg((255, 0, 0)), "image/jpeg"),
+            _upload("notes.txt", b"not an image", "text/plain"),
+            _upload("b.jpg", _jpeg((0, 255, 0)), "image/jpeg"),
+            _upload("c.jpg", _jpeg((0, 0, 255)), "image/jpeg"),
+        ]
+        result = asyncio.run(service.upload_multiple_images(files, folder="posts"))
+
+        assert result["successful_uploads"] == 3 and result["failed_uploads"] == 1
+        assert [item["original_filename"] for item in result["uploaded_files"]] == ["a.jpg", "b.jpg", "c.jpg"]
+        assert [item["filename"] for item in result["failed_files"]] == ["notes.txt"]
+        assert peak[0] > 1, peak
+        assert threads and all(name.startswith("s3-upload") for name in threads), threads
+
+        listing = service.s3_client.list_objects_v2(Bucket=service.bucket_name)
+        keys = {item["Key"] for item in listing.get("Contents", [])}
+        assert {item["s3_key"] for item in result["uploaded_files"]} <= keys
+
+
+def test_large_document_goes_up_as_multipart():
+    """Documents above the threshold upload in parallel parts; small ones in a single PUT."""
+    if mock_aws is None:
+        print("⚠️ moto not installed, skipping")
+        return
+    with mock_aws():
+        service = _service()
+        # S3 parts must be at least 5MB
+        service.transfer_config = TransferConfig(
+            multipart_threshold=5 * MB, multipart_chunksize=5 * MB, max_concurrency=3
+        )
+        create_multipart_upload = service.s3_client.create_multipart_upload
+        multipart_keys = []
+
+        def record_multipart(**kwargs):
+            multipart_keys.append(kwargs["Key"])
+            return create_multipart_upload(**kwargs)
+
+        service.s3_client.create_multipart_upload = record_multipart
+
+        data = os.urandom(12 * MB)
+        result = asyncio.run(service.upload_document(_upload("scan.pdf", data, "application/pdf")))
+        assert result["multipart"] and multipart_keys == [result["s3_key"]]
+        head = service.s3_client.head_object(Bucket=service.bucket_name, Key=result["s3_key"])
+        assert head["ContentLength"] == len(data)
+        assert head["ETag"].strip('"').endswith("-3")  # Three parts: 5MB + 5MB + 2MB
+        body = service.s3_client.get_object(Bucket=service.bucket_name, Key=result["s3_key"])["Body"].read()
+        assert body == data
+
+        small = asyncio.run(service.upload_document(_upload("note.txt", b"hello", "text/plain")))
+        assert not small["multipart"] and len(multipart_keys) == 1
+
+
+if __name__ == "__main__":
+    test_multiple_images_upload_concurrently_off_the_event_loop()
+    test_large_document_goes_up_as_multipart()
+    print("✅ S3 upload tests passed")
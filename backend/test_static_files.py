@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Tests for /static file serving (conditional GET and byte ranges).
+
+Run this from the backend directory:
+
+    python test_static_files.py    (or: python -m pytest test_static_files.py)
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+# Point the app at a test database before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_static_files.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.routers import upload as upload_router
+from app.services.storage import LocalStorageBackend
+from app.utils.static_files import IMMUTABLE_CACHE_CONTROL, static_file_response
+
+BODY = bytes(range(256)) * 4
+HASHED_NAME = f"{'ab' * 32}.jpg"
+
+
+def _client():
+    """An app serving a temporary directory at /static, and that directory."""
+    root = Path(tempfile.mkdtemp())
+    (root / "posts").mkdir()
+    (root / "posts" / "doc.pdf").write_bytes(BODY)
+    (root / "posts" / HASHED_NAME).write_bytes(BODY)
+    app = FastAPI()
+
+    @app.api_route("/static/{file_path:path}", methods=["GET", "HEAD"])
+    async def serve(request: Request, file_path: str):
+        return await static_file_response(request, root, file_path)
+
+    return TestClient(app), root
+
+
+def test_byte_ranges():
+    """Single ranges are served as 206, unsatisfiable ones as 416, stale If-Range as the whole file."""
+    client, _ = _client()
+
+    response = client.get("/static/posts/doc.pdf", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == BODY[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(BODY)}"
+    assert response.headers["content-length"] == "10"
+
+    response = client.get("/static/posts/doc.pdf", headers={"Range": "bytes=-16"})
+    assert response.status_code == 206
+    assert response.content == BODY[-16:]
+
+    response = client.get("/static/posts/doc.pdf", headers={"Range": "bytes=1000-"})
+    assert response.status_code == 206
+    assert response.content == BODY[1000:]
+
+    response = client.get("/static/posts/doc.pdf", headers={"Range": f"bytes={len(BODY)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(BODY)}"
+
+    # Multiple ranges and a stale If-Range get the whole file
+    for headers in ({"Range": "bytes=0-1,4-5"}, {"Range": "bytes=0-1", "If-Range": '"stale"'}):
+        response = client.get("/static/posts/doc.pdf", headers=headers)
+        assert response.status_code == 200
+        assert response.content == BODY
+
+    etag = client.head("/static/posts/doc.pdf").headers["etag"]
+    response = client.get("/static/posts/doc.pdf", headers={"Range": "bytes=0-3", "If-Range": etag})
+    assert response.status_code == 206
+    assert response.content == BODY[:4]
+
+
+def test_conditional_get():
+    """Matching validators answer 304; content-hashed names revalidate without the file."""
+    client, root = _client()
+
+    response = client.get("/static/posts/doc.pdf")
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert response.headers["accept-ranges"] == "bytes"
+    etag, last_modified = response.headers["etag"], response.headers["last-modified"]
+
+    assert client.get("/static/posts/doc.pdf", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/static/posts/doc.pdf", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert client.get("/static/posts/doc.pdf", headers={"If-Modified-Since": last_modified}).status_code == 304
+    # If-None-Match takes precedence over If-Modified-Since
+    response = client.get("/static/posts/doc.pdf", headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified})
+    assert response.status_code == 200
+
+    response = client.get(f"/static/posts/{HASHED_NAME}")
+    assert response.headers["etag"] == f'"{HASHED_NAME}"'
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    (root / "posts" / HASHED_NAME).unlink()
+    response = client.get(f"/static/posts/{HASHED_NAME}", headers={"If-None-Match": f'"{HASHED_NAME}"'})
+    assert response.status_code == 304
+
+
+def test_head_missing_and_outside_root():
+    """HEAD sends headers only; missing files are 404 and paths outside the root 403."""
+    client, _ = _client()
+
+    response = client.head("/static/posts/doc.pdf")
+    assert response.status_code == 200
+    assert response.headers["content-length"] == str(len(BODY))
+    assert response.content == b""
+
+    assert client.get("/static/posts/missing.pdf").status_code == 404
+    assert client.get("/static/posts/..%2F..%2Fetc%2Fpasswd").status_code == 403
+
+
+def test_upload_router_static_route_uses_validators():
+    """/upload/static resolves keys to fanned-out or flat files and serves them like /static."""
+    storage = LocalStorageBackend(tempfile.mkdtemp(), "/static")
+    (storage.root / "posts").mkdir()
+    (storage.root / "posts" / "legacy.pdf").write_bytes(BODY)  # Written before fan-out
+    fanned = storage.root / storage._relative_path("posts/doc.pdf")
+    fanned.parent.mkdir(parents=True)
+    fanned.write_bytes(BODY)
+
+    original = upload_router.local_storage
+    upload_router.local_storage = storage
+    try:
+        app = FastAPI()
+        app.include_router(upload_router.router)
+        client = TestClient(app)
+
+        response = client.get("/upload/static/posts/doc.pdf")
+        assert response.status_code == 200 and response.content == BODY
+        etag = response.headers["etag"]
+        assert response.headers["accept-ranges"] == "bytes"
+        assert client.get("/upload/static/posts/doc.pdf", headers={"If-None-Match": etag}).status_code == 304
+
+        response = client.get("/upload/static/posts/legacy.pdf", headers={"Range": "bytes=0-9"})
+        assert response.status_code == 206 and response.content == BODY[:10]
+        assert client.head("/upload/static/posts/legacy.pdf").headers["content-length"] == str(len(BODY))
+
+        assert client.get("/upload/static/posts/missing.pdf").status_code == 404
+        assert client.get("/upload/static/posts/..%2F..%2Fetc%2Fpasswd").status_code == 403
+    finally:
+        upload_router.local_storage = original
+
+
+if __name__ == "__main__":
+    test_byte_ranges()
+    test_conditional_get()
+    test_head_missing_and_outside_root()
+    test_upload_router_static_route_uses_validators()
+    print("✅ Static file tests passed")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Tests for upload size limits: the request-size middleware and spool_upload.
+
+Run this from the backend directory:
+
+    python test_upload_limits.py    (or: python -m pytest test_upload_limits.py)
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+from pathlib import Path
+
+# Point the app at a test database before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_upload_limits.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+from app.config.settings import settings
+from app.middleware.upload_limit import add_upload_limit_middleware, upload_request_limit
+from app.services import file_service
+from app.services.file_service import spool_upload
+
+MB = 1024 * 1024
+
+
+def _limited_app():
+    """Tiny app with the middleware in front of an upload route; records the bytes it parsed."""
+    app = FastAPI()
+    add_upload_limit_middleware(app)
+    app.state.parsed = []
+
+    @app.post("/api/v1/upload/avatar")
+    async def upload_avatar(file: UploadFile = File(...)):
+        data = await file.read()
+        app.state.parsed.append(len(data))
+        return {"size": len(data)}
+
+    @app.post("/api/v1/posts")
+    async def create_post(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    return app
+
+
+def test_content_length_over_limit_rejected_before_body_is_read():
+    """A declared Content-Length over the route limit gets a 413 and the route never runs."""
+    app = _limited_app()
+    client = TestClient(app)
+    limit = upload_request_limit("/api/v1/upload/avatar")
+    assert limit == settings.max_avatar_size_mb * MB + 64 * 1024
+
+    response = client.post("/api/v1/upload/avatar", files={"file": ("a.jpg", b"x" * (limit + 1), "image/jpeg")})
+    assert response.status_code == 413
+    assert response.headers["connection"] == "close"
+    assert "Maximum request size" in response.json()["detail"]
+    assert app.state.parsed == []
+
+    response = client.post("/api/v1/upload/avatar", files={"file": ("a.jpg", b"x" * 1000, "image/jpeg")})
+    assert response.status_code == 200 and app.state.parsed == [1000]
+
+    # Non-upload routes are not limited here
+    response = client.post("/api/v1/posts", files={"file": ("a.jpg", b"x" * (limit + 1), "image/jpeg")})
+    assert response.status_code == 200
+
+
+def test_chunked_body_over_limit_stops_streaming():
+    """Without Content-Length the body is counted as it streams and cut off past the limit."""
+    app = _limited_app()
+    limit = upload_request_limit("/api/v1/upload/avatar")
+    boundary = "limit-test"
+    chunk = b"x" * (256 * 1024)
+    head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.jpg\"\r\n"
+            f"Content-Type: image/jpeg\r\n\r\n").encode()
+    messages = [head] + [chunk] * 40 + [f"\r\n--{boundary}--\r\n".encode()]  # 10MB, well over the limit
+    received, sent = [], []
+
+    async def receive():
+        body = messages[len(received)]
+        received.append(len(body))
+        return {"type": "http.request", "body": body, "more_body": len(received) < len(messages)}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/api/v1/upload/avatar", "raw_path": b"/api/v1/upload/avatar",
+        "root_path": "", "query_string": b"", "server": ("test", 80), "client": ("test", 1),
+        "headers": [(b"content-type", f"multipart/form-data; boundary={boundary}".encode()),
+                    (b"transfer-encoding", b"chunked")],
+    }
+    asyncio.run(app(scope, receive, send))
+
+    assert sent[0]["type"] == "http.response.start" and sent[0]["status"] == 413
+    assert app.state.parsed == []
+    assert limit < sum(received) <= limit + len(chunk) + len(head), sum(received)  # Not all 10MB
+
+
+def _upload(data: bytes, size=None) -> UploadFile:
+    """UploadFile as the multipart parser hands it over."""
+    return UploadFile(file=io.BytesIO(data), filename="scan.pdf", size=size,
+                      headers=Headers({"content-type": "application/pdf"}))
+
+
+def test_spool_upload_hashes_while_streaming():
+    """The spooled copy matches the upload; MD5/SHA-256 are computed over every chunk."""
+    original_folder = file_service.UPLOAD_FOLDER
+    file_service.UPLOAD_FOLDER = tempfile.mkdtemp()
+    try:
+        data = os.urandom(file_service.UPLOAD_CHUNK_SIZE * 3 + 123)  # Several chunks plus a partial one
+        upload = asyncio.run(spool_upload(_upload(data), max_size=10 * MB))
+        assert upload.size == len(data)
+        assert upload.md5 == hashlib.md5(data).hexdigest()
+        assert upload.sha256 == hashlib.sha256(data).hexdigest()
+        assert upload.path.read_bytes() == data
+        assert upload.path.parent == Path(file_service.UPLOAD_FOLDER) / file_service.TEMP_FOLDER
+    finally:
+        file_service.UPLOAD_FOLDER = original_folder
+
+
+def test_spool_upload_cleans_up_rejected_files():
+    """Oversized (declared or streamed) and empty uploads leave no temp file behind."""
+    original_folder = file_service.UPLOAD_FOLDER
+    file_service.UPLOAD_FOLDER = tempfile.mkdtemp()
+    temp_dir = Path(file_service.UPLOAD_FOLDER) / file_service.TEMP_FOLDER
+    try:
+        cases = [
+            (_upload(b"x" * 10, size=2 * MB), 413),  # Declared size: rejected before copying
+            (_upload(b"x" * (file_service.UPLOAD_CHUNK_SIZE * 4)), 413),  # Passes the limit mid-stream
+            (_upload(b""), 400),
+        ]
+        for upload, expected_status in cases:
+            try:
+                asyncio.run(spool_upload(upload, max_size=file_service.UPLOAD_CHUNK_SIZE * 2))
+                raise AssertionError("expected HTTPException")
+            except HTTPException as e:
+                assert e.status_code == expected_status
+            assert not temp_dir.exists() or list(temp_dir.iterdir()) == []
+    finally:
+        file_service.UPLOAD_FOLDER = original_folder
+
+
+if __name__ == "__main__":
+    test_content_length_over_limit_rejected_before_body_is_read()
+    test_chunked_body_over_limit_stops_streaming()
+    test_spool_upload_hashes_while_streaming()
+    test_spool_upload_cleans_up_rejected_files()
+    print("✅ Upload limit tests passed")
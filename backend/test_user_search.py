@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Tests for user search ranking and the username/full-name prefix index.
+
+Runs against a throwaway SQLite database unless TEST_DATABASE_URL is set.
+Run this from the backend directory:
+
+    python test_user_search.py    (or: python -m pytest test_user_search.py)
+"""
+
+import os
+import random
+import tempfile
+from types import SimpleNamespace
+
+# Point the app at the test database before importing it
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_user_search.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost")
+
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from app.config.database import SessionLocal, engine, Base
+from app.config.settings import settings
+from app.models.user import User, UserType
+from app.models.notification import Notification  # noqa: F401 (registers User.notifications)
+from app.routers.autocomplete import suggest_mentions
+from app.services.search_service import UserPrefixIndex, UserSearchService, TOP_LIST_SIZE, user_prefix_index
+
+
+def _user(user_id: int, username: str, full_name: str, followers_count: int, is_active: bool = True):
+    """Stand-in for a User row with the columns the index reads."""
+    return SimpleNamespace(
+        id=user_id, username=username, full_name=full_name, profile_picture_url=None,
+        user_type=UserType.DOCTOR, followers_count=followers_count, is_active=is_active
+    )
+
+
+def _expected(users: dict, prefix: str, limit: int, exclude_user_id=None):
+    """Brute-force ranking over every user."""
+    prefix = UserPrefixIndex._normalize(prefix)
+    matches = [
+        user for user in users.values()
+        if user.is_active and user.id != exclude_user_id and any(
+            key.startswith(prefix) for key in UserPrefixIndex._index_keys(user.username, user.full_name)
+        )
+    ]
+    matches.sort(key=lambda user: (-user.followers_count, user.username, user.id))
+    return [user.id for user in matches[:limit]]
+
+
+def test_complete_matches_brute_force_under_updates():
+    """Top lists stay exact while users gain/lose followers, rename, register and leave."""
+    rng = random.Random(7)
+    syllables = ["an", "ar", "sa", "se", "ma", "mi", "ra", "jo", "ja", "ka"]
+
+    def name():
+        return "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+
+    users = {
+        user_id: _user(user_id, f"{name()}{user_id}", f"Dr {name().title()} {name().title()}", rng.randint(0, 500))
+        for user_id in range(1, 3 * TOP_LIST_SIZE * len(syllables))
+    }
+    index = UserPrefixIndex()
+    index._users = {user.id: index._user_entry(user) for user in users.values()}
+    index._keys = sorted(
+        (key, user.id) for user in users.values() for key in index._index_keys(user.username, user.full_name)
+    )
+    index.loaded = True
+
+    prefixes = ["a", "s", "m", "j", "ma", "sa", "jo", "mar", "dr", "kara", "sam"]
+    for step in range(1500):
+        user = users[rng.choice(list(users))]
+        action = rng.random()
+        if action < 0.6:
+            user.followers_count = max(user.followers_count + rng.randint(-50, 50), 0)
+            index.update_followers(user.id, user.followers_count)
+        elif action < 0.75:
+            user.username = f"{name()}{user.id}"
+            index.upsert_user(user)
+        elif action < 0.85:
+            user.is_active = not user.is_active
+            if user.is_active:
+                index.upsert_user(user)
+            else:
+                index.remove_user(user.id)
+        else:
+            new_user = _user(max(users) + 1, f"{name()}{max(users) + 1}", f"Dr {name().title()}", rng.randint(0, 500))
+            users[new_user.id] = new_user
+            index.upsert_user(new_user)
+
+        if step % 100 == 0:
+            for prefix in prefixes:
+                limit = rng.choice([1, 8, 25])
+                exclude = rng.choice([None, user.id])
+                got = [entry["id"] for entry in index.complete(prefix, limit, exclude_user_id=exclude)]
+                assert got == _expected(users, prefix, limit, exclude), (step, prefix)
+
+    assert index.stats()["top_lists"] > 0
+
+
+class _FailingTrigramSession:
+    """Session stand-in on PostgreSQL whose trigram query raises the given error."""
+
+    def __init__(self):
+        self.rollbacks = 0
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def _search_failing_with(error):
+    """Run search_users with a failing trigram query and a stubbed Python fallback."""
+    original_trigram = UserSearchService._search_trigram
+    original_python = UserSearchService._search_python
+
+    def failing(*args):
+        raise error
+
+    UserSearchService._search_trigram = staticmethod(failing)
+    UserSearchService._search_python = staticmethod(lambda *args: ([], 0))
+    try:
+        return UserSearchService.search_users(_FailingTrigramSession(), "smith")
+    finally:
+        UserSearchService._search_trigram = staticmethod(original_trigram)
+        UserSearchService._search_python = staticmethod(original_python)
+
+
+def test_trigram_only_latched_off_when_missing():
+    """Only a missing pg_trgm disables trigram search for good; other errors are retried."""
+    UserSearchService._trigram_available = None
+
+    timeout = OperationalError("SELECT ...", {}, SimpleNamespace(pgcode="57014"))
+    assert _search_failing_with(timeout) == ([], 0)
+    assert UserSearchService._trigram_available is None
+
+    missing = ProgrammingError("SELECT ...", {}, SimpleNamespace(pgcode="42883"))
+    assert _search_failing_with(missing) == ([], 0)
+    assert UserSearchService._trigram_available is False
+
+    UserSearchService._trigram_available = None
+
+
+def test_mentions_served_from_user_prefix_index():
+    """@mention suggestions come from the shared prefix index, most followed first."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        run_id = os.urandom(3).hex()
+        users = [
+            User(username=f"men{run_id}_{i}", email=f"men{run_id}_{i}@test.local", password_hash="x",
+                 user_type=UserType.DOCTOR, full_name=f"Dr. Mention {i}", followers_count=i)
+            for i in range(4)
+        ]
+        db.add_all(users)
+        db.commit()
+        user_prefix_index.load(db)
+
+        suggestions = suggest_mentions(q=f"@men{run_id}", limit=2, current_user=users[3], db=db)
+        assert [suggestion.username for suggestion in suggestions] == [users[2].username, users[1].username]
+
+        users[0].followers_count = 10
+        user_prefix_index.update_followers(users[0].id, 10)
+        suggestions = suggest_mentions(q=f"men{run_id}", limit=1, current_user=users[3], db=db)
+        assert suggestions[0].id == users[0].id
+        assert suggestions[0].followers_count == 10
+    finally:
+        db.close()
+
+
+def test_prefix_index_syncs_writes_from_other_workers():
+    """A worker's index picks up users created, renamed or deactivated by another worker."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    original_sync = settings.user_index_sync_seconds
+    settings.user_index_sync_seconds = 0
+    try:
+        run_id = os.urandom(3).hex()
+        renamed = User(username=f"syn{run_id}_a", email=f"syn{run_id}_a@test.local", password_hash="x",
+                       user_type=UserType.DOCTOR, full_name="Dr. Sync A")
+        db.add(renamed)
+        db.commit()
+        worker = UserPrefixIndex()
+        worker.load(db)
+        assert [entry["id"] for entry in worker.complete(f"syn{run_id}", 5)] == [renamed.id]
+
+        # Writes handled by another worker only reach this index through sync
+        created = User(username=f"syn{run_id}_b", email=f"syn{run_id}_b@test.local", password_hash="x",
+                       user_type=UserType.DOCTOR, full_name="Dr. Sync B", followers_count=3)
+        db.add(created)
+        renamed.username = f"moved{run_id}"
+        db.commit()
+        assert [entry["id"] for entry in worker.complete(f"syn{run_id}", 5)] == [renamed.id]
+
+        worker.ensure_loaded(db)
+        assert [entry["id"] for entry in worker.complete(f"syn{run_id}", 5)] == [created.id]
+        assert [entry["id"] for entry in worker.complete(f"moved{run_id}", 5)] == [renamed.id]
+
+        created.is_active = False
+        db.commit()
+        worker.ensure_loaded(db)
+        assert worker.complete(f"syn{run_id}", 5) == []
+    finally:
+        settings.user_index_sync_seconds = original_sync
+        db.close()
+
+
+if __name__ == "__main__":
+    test_complete_matches_brute_force_under_updates()
+    test_trigram_only_latched_off_when_missing()
+    test_mentions_served_from_user_prefix_index()
+    test_prefix_index_syncs_writes_from_other_workers()
+    print("✅ User search tests passed")